@@ -0,0 +1 @@
+"""Prueba de carga de extremo a extremo de los tres servicios (ejecutar desde la raíz del repo con python -m)."""
@@ -0,0 +1,468 @@
+"""
+Prueba de carga de extremo a extremo de los tres servicios, sin red.
+
+Levanta cada servicio en su propio proceso (loadtest/serve.py, con la sonda de bloqueo del
+event loop) y con sus proveedores falsos:
+- nutri-ai-backend: detector falso con una red diminuta de pesos aleatorios
+  (DETECTION_FAKE_DETECTOR_*), correcciones a un destino en memoria (MLOPS_FAKE_SINK) y una
+  base de correcciones temporal;
+- rag-service: Groq falso y embeddings falsos (RAG_FAKE_PROVIDERS), índice en un directorio
+  temporal;
+- nutrition-label-agent: Gemini y Tavily falsos (LABEL_AGENT_FAKE_PROVIDERS).
+Cada proveedor tiene latencia lognormal (mediana y dispersión) y tasa de error configurables.
+
+El tráfico es de lazo abierto: llegadas de Poisson a --rate peticiones/s repartidas según
+--mix entre /detect, /corrections, /chat y /analyze-label. Las fotos salen de un conjunto fijo
+(se repiten, como platos habituales) y las correcciones son de esas mismas fotos. Primero un
+calentamiento de --warmup s que no cuenta; luego --duration s medidos.
+
+Por endpoint se informa: peticiones, respuestas correctas por segundo, p50/p95/p99, tasa de
+error (no 2xx, timeouts y errores de conexión) con su desglose, y el tiempo que el event loop
+del servicio pasó bloqueado dentro de esas peticiones.
+
+Necesita las dependencias de los tres servicios y httpx en el mismo entorno.
+
+Uso (desde la raíz del repo):
+    python -m loadtest.run
+    python -m loadtest.run --rate 20 --duration 120 --mix detect=6,corrections=1,chat=2,analyze-label=1
+    python -m loadtest.run --endpoints detect,corrections --detector-ms 150 --output resultado.json
+    python -m loadtest.run --gemini-ms 2500 --gemini-errors 0.05 --latency-sigma 0.8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+from PIL import Image, ImageDraw
+
+from loadtest.serve import OUTSIDE_REQUESTS, REPORT_PATH
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# endpoint → (servicio, método, ruta)
+ENDPOINTS = {
+    "detect": ("nutri", "POST", "/detect"),
+    "corrections": ("nutri", "POST", "/corrections"),
+    "chat": ("rag", "POST", "/chat"),
+    "analyze-label": ("label", "POST", "/analyze-label"),
+}
+SERVICE_DIRS = {"nutri": "nutri-ai-backend", "rag": "rag-service", "label": "nutrition-label-agent"}
+
+_CATEGORIES = (None, "breakfast", "lunch", "snack", "dinner")
+_QUESTIONS = (
+    "¿Cuánta proteína necesito para ganar masa muscular?",
+    "¿Qué como antes de entrenar por la mañana?",
+    "¿Sirve la creatina si entreno tres veces por semana?",
+    "Dame una rutina de fuerza para principiantes",
+    "¿Es malo cenar carbohidratos?",
+    "¿Cuántas veces por semana debería entrenar piernas?",
+)
+_FOLLOW_UPS = ("¿Y si soy vegetariano?", "¿Cuánto tiempo antes?", "¿Y para perder grasa?", "Explícalo más simple")
+_LABEL_LINES = ("INFORMACIÓN NUTRICIONAL", "Porción 30 g", "Valor energético 140 kcal", "Azúcares 12 g",
+                "Grasas totales 6 g", "Sodio 95 mg", "INGREDIENTES: harina, azúcar, aceite vegetal,",
+                "jarabe de glucosa, emulsionante, saborizante artificial")
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)  # ms de las respuestas 2xx
+    requests: int = 0
+    errors: Counter = field(default_factory=Counter)
+
+    def record(self, elapsed_ms: float, outcome: str) -> None:
+        self.requests += 1
+        if outcome == "ok":
+            self.latencies.append(elapsed_ms)
+        else:
+            self.errors[outcome] += 1
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _jpeg(image: Image.Image, quality: int = 85) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def make_photos(count: int, rng: random.Random) -> list[bytes]:
+    """Fotos sintéticas de platos (tamaños de móvil), fijas durante toda la prueba."""
+    photos = []
+    for _ in range(count):
+        size = rng.choice(((640, 480), (1024, 768), (1280, 960)))
+        x0, y0 = rng.uniform(-2.0, -0.6), rng.uniform(-1.2, -0.4)
+        span = rng.uniform(0.6, 2.4)
+        image = Image.effect_mandelbrot(size, (x0, y0, x0 + span, y0 + span * 0.75), rng.randint(24, 120))
+        photos.append(_jpeg(image.convert("RGB")))
+    return photos
+
+
+def make_labels(count: int, rng: random.Random) -> list[bytes]:
+    """Fotos sintéticas de etiquetas nutricionales (texto negro sobre fondo claro)."""
+    labels = []
+    for i in range(count):
+        image = Image.new("RGB", (800, 1000), (rng.randint(225, 255),) * 3)
+        draw = ImageDraw.Draw(image)
+        for n, line in enumerate(_LABEL_LINES):
+            draw.text((40, 60 + 90 * n), f"{line} ({i})" if n == 0 else line, fill=(20, 20, 20))
+        labels.append(_jpeg(image.rotate(rng.uniform(-4, 4), fillcolor=(240, 240, 240))))
+    return labels
+
+
+def parse_mix(text: str, endpoints: list[str]) -> dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Endpoint desconocido en --mix: {name} (válidos: {', '.join(ENDPOINTS)})")
+        if name in endpoints:
+            mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise SystemExit("--mix no deja ningún endpoint con peso > 0")
+    return mix
+
+
+def service_env(service: str, args: argparse.Namespace, tmp: Path) -> dict[str, str]:
+    """Variables de entorno de cada servicio: proveedores falsos, sin red, estado en `tmp`."""
+    env = {
+        **os.environ,
+        "PYTHONUNBUFFERED": "1",
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1",
+    }
+
+    def provider(name: str, median_ms: float, error_rate: float) -> dict[str, str]:
+        return {
+            f"FAKE_{name}_LATENCY_MS": str(median_ms),
+            f"FAKE_{name}_LATENCY_SIGMA": str(args.latency_sigma),
+            f"FAKE_{name}_ERROR_RATE": str(error_rate),
+        }
+
+    if service == "nutri":
+        env.update({
+            "DETECTION_FAKE_DETECTOR_MS": str(args.detector_ms),
+            "DETECTION_FAKE_DETECTOR_PER_IMAGE_MS": str(args.detector_per_image_ms),
+            "DETECTION_FAKE_DETECTOR_COMPUTE": "false" if args.sleep_detector else "true",
+            "MLOPS_CORRECTIONS_DIR": str(tmp / "corrections"),
+            "MLOPS_CORRECTIONS_DB": str(tmp / "corrections" / "corrections.db"),
+            "MLOPS_JOURNAL_DIR": str(tmp / "corrections" / "journal"),
+            "MLOPS_FAKE_SINK": "true",
+            "MLOPS_SIMILAR_LOOKUP": "true",
+            "MLOPS_FAKE_SINK_LATENCY_MS": str(args.sink_ms),
+            "MLOPS_FAKE_SINK_ERROR_RATE": str(args.sink_errors),
+            # Vacías (no ausentes) para que un .env local no active Supabase
+            "SUPABASE_URL": "",
+            "VITE_SUPABASE_URL": "",
+            "SUPABASE_SERVICE_ROLE_KEY": "",
+        })
+    elif service == "rag":
+        env.update({
+            "RAG_FAKE_PROVIDERS": "true",
+            "RAG_STORAGE": str(tmp / "rag-storage"),
+            "RAG_DATA_SOURCE": str(Path(args.rag_data).resolve()),
+            **provider("GROQ", args.groq_ms, args.groq_errors),
+        })
+    elif service == "label":
+        env.update({
+            "LABEL_AGENT_FAKE_PROVIDERS": "true",
+            "FAKE_GEMINI_ULTRAPROCESSED_RATE": str(args.ultraprocessed_rate),
+            **provider("GEMINI", args.gemini_ms, args.gemini_errors),
+            **provider("TAVILY", args.tavily_ms, args.tavily_errors),
+        })
+    return env
+
+
+class Services:
+    """Procesos de los servicios (uno por servicio); se terminan al salir del bloque with."""
+
+    def __init__(self, names: set[str], args: argparse.Namespace, tmp: Path):
+        self.names = sorted(names)
+        self.args = args
+        self.tmp = tmp
+        self.urls: dict[str, str] = {}
+        self._procs: dict[str, subprocess.Popen] = {}
+        self._logs: dict[str, Path] = {}
+
+    def __enter__(self) -> Services:
+        for name in self.names:
+            port = _free_port()
+            log = self.tmp / f"{name}.log"
+            self._logs[name] = log
+            self._procs[name] = subprocess.Popen(
+                [sys.executable, "-m", "loadtest.serve", "--app-dir", str(ROOT / SERVICE_DIRS[name]),
+                 "--port", str(port), "--threshold-ms", str(self.args.block_threshold_ms)],
+                cwd=ROOT,
+                env=service_env(name, self.args, self.tmp),
+                stdout=log.open("wb"),
+                stderr=subprocess.STDOUT,
+            )
+            self.urls[name] = f"http://127.0.0.1:{port}"
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        for proc in self._procs.values():
+            proc.terminate()
+        for proc in self._procs.values():
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    async def wait_ready(self, client: httpx.AsyncClient, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        pending = set(self.names)
+        while pending:
+            for name in list(pending):
+                if self._procs[name].poll() is not None:
+                    raise SystemExit(f"{SERVICE_DIRS[name]} terminó al arrancar:\n{self._logs[name].read_text(errors='replace')[-3000:]}")
+                try:
+                    if (await client.get(self.urls[name] + "/health", timeout=2)).status_code == 200:
+                        pending.discard(name)
+                except httpx.TransportError:
+                    pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"Sin respuesta de /health tras {timeout:.0f} s: {', '.join(SERVICE_DIRS[n] for n in pending)} (logs en {self.tmp})")
+            await asyncio.sleep(0.25)
+
+    async def blocking(self, client: httpx.AsyncClient, reset: bool = False) -> dict[str, dict]:
+        reports = {}
+        for name in self.names:
+            r = await client.get(self.urls[name] + REPORT_PATH, params={"reset": "1"} if reset else None)
+            reports[name] = r.json()
+        return reports
+
+
+class Traffic:
+    """Construye cada petición del mix con datos sintéticos realistas."""
+
+    def __init__(self, urls: dict[str, str], args: argparse.Namespace, rng: random.Random):
+        self.urls = urls
+        self.args = args
+        self.rng = rng
+        print("Generando fotos sintéticas...", flush=True)
+        self.photos = make_photos(args.photos, rng)
+        self.labels = make_labels(args.labels, rng)
+        self.detected: dict[int, list[str]] = {}  # foto → labels que devolvió /detect
+
+    async def send(self, client: httpx.AsyncClient, endpoint: str) -> httpx.Response:
+        return await getattr(self, "_" + endpoint.replace("-", "_"))(client)
+
+    async def _detect(self, client: httpx.AsyncClient) -> httpx.Response:
+        index = self.rng.randrange(len(self.photos))
+        category = self.rng.choice(_CATEGORIES)
+        r = await client.post(
+            self.urls["nutri"] + "/detect",
+            params={"category": category} if category else None,
+            files={"file": ("plato.jpg", self.photos[index], "image/jpeg")},
+        )
+        if r.status_code == 200:
+            self.detected[index] = [i["label"] for i in r.json().get("ingredients", [])]
+        return r
+
+    async def _corrections(self, client: httpx.AsyncClient) -> httpx.Response:
+        # Corrección de una foto ya detectada (si aún no hay ninguna, de una cualquiera)
+        index = self.rng.choice(list(self.detected)) if self.detected else self.rng.randrange(len(self.photos))
+        detected = self.detected.get(index, [])
+        corrected = [{"label": label, "box": None} for label in detected if self.rng.random() < 0.8]
+        corrected.append({"label": self.rng.choice(("rice", "salad", "chicken", "egg")), "box": [10, 10, 200, 160]})
+        return await client.post(
+            self.urls["nutri"] + "/corrections",
+            files={"file": ("plato.jpg", self.photos[index], "image/jpeg")},
+            data={
+                "detected_ingredients": json.dumps([{"label": label} for label in detected]),
+                "corrected_ingredients": json.dumps(corrected),
+                "consent": "true",
+            },
+        )
+
+    async def _chat(self, client: httpx.AsyncClient) -> httpx.Response:
+        history = []
+        for _ in range(self.rng.choice((0, 0, 1, 2, 3))):
+            history += [
+                {"role": "user", "content": self.rng.choice(_QUESTIONS)},
+                {"role": "assistant", "content": "Depende de tu objetivo y de tu nivel de entrenamiento."},
+            ]
+        message = self.rng.choice(_FOLLOW_UPS) if history else self.rng.choice(_QUESTIONS)
+        return await client.post(self.urls["rag"] + "/chat", json={"message": message, "chat_history": history})
+
+    async def _analyze_label(self, client: httpx.AsyncClient) -> httpx.Response:
+        label = self.rng.choice(self.labels)
+        return await client.post(
+            self.urls["label"] + "/analyze-label",
+            files={"file": ("etiqueta.jpg", label, "image/jpeg")},
+        )
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    traffic: Traffic,
+    mix: dict[str, float],
+    rate: float,
+    duration: float,
+    rng: random.Random,
+) -> tuple[dict[str, EndpointStats], float, int]:
+    """Llegadas de Poisson durante `duration` s. Devuelve (stats, segundos, peticiones enviadas)."""
+    stats = {name: EndpointStats() for name in mix}
+    names, weights = list(mix), list(mix.values())
+
+    async def one(endpoint: str) -> None:
+        start = time.monotonic()
+        try:
+            r = await traffic.send(client, endpoint)
+            outcome = "ok" if 200 <= r.status_code < 300 else str(r.status_code)
+        except httpx.TimeoutException:
+            outcome = "timeout"
+        except httpx.TransportError:
+            outcome = "conexión"
+        stats[endpoint].record((time.monotonic() - start) * 1000, outcome)
+
+    tasks = []
+    start = time.monotonic()
+    next_at = start
+    while True:
+        next_at += rng.expovariate(rate)
+        if next_at - start >= duration:
+            break
+        await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        tasks.append(asyncio.create_task(one(rng.choices(names, weights)[0])))
+    await asyncio.gather(*tasks)
+    return stats, time.monotonic() - start, len(tasks)
+
+
+def report(
+    stats: dict[str, EndpointStats],
+    elapsed: float,
+    blocking: dict[str, dict],
+) -> list[dict[str, Any]]:
+    rows = []
+    for endpoint, s in stats.items():
+        service, method, path = ENDPOINTS[endpoint]
+        blocked = blocking.get(service, {}).get("paths", {}).get(f"{method} {path}", {})
+        failed = sum(s.errors.values())
+        rows.append({
+            "endpoint": endpoint,
+            "requests": s.requests,
+            "throughput": len(s.latencies) / elapsed,
+            "p50_ms": _percentile(s.latencies, 0.50),
+            "p95_ms": _percentile(s.latencies, 0.95),
+            "p99_ms": _percentile(s.latencies, 0.99),
+            "error_rate": failed / s.requests if s.requests else 0.0,
+            "errors": dict(s.errors),
+            "blocked_s": blocked.get("blocked_s", 0.0),
+            "stalls": blocked.get("stalls", 0),
+            "max_stall_ms": blocked.get("max_stall_ms", 0.0),
+        })
+
+    print(f"\n{'endpoint':<15}{'pet.':>7}{'ok/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'error':>8}"
+          f"{'loop bloq. s':>14}{'máx ms':>9}  errores")
+    for r in rows:
+        errors = ", ".join(f"{k}×{v}" for k, v in sorted(r["errors"].items())) or "-"
+        print(
+            f"{r['endpoint']:<15}{r['requests']:>7}{r['throughput']:>8.2f}{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}"
+            f"{r['p99_ms']:>9.0f}{r['error_rate']:>8.1%}{r['blocked_s']:>14.2f}{r['max_stall_ms']:>9.0f}  {errors}"
+        )
+    for service, data in blocking.items():
+        outside = data.get("paths", {}).get(OUTSIDE_REQUESTS)
+        if outside:
+            print(f"{SERVICE_DIRS[service]}: loop bloqueado {outside['blocked_s']:.2f} s fuera de peticiones "
+                  f"({outside['stalls']} veces, máx {outside['max_stall_ms']:.0f} ms)")
+    return rows
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    endpoints = [e.strip() for e in args.endpoints.split(",")]
+    mix = parse_mix(args.mix, endpoints)
+    rng = random.Random(args.seed)
+    needed = {ENDPOINTS[e][0] for e in mix}
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+        with Services(needed, args, Path(tmp)) as services:
+            async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+                print(f"Arrancando {', '.join(SERVICE_DIRS[n] for n in services.names)} (logs en {tmp})...", flush=True)
+                await services.wait_ready(client, args.startup_timeout)
+                traffic = Traffic(services.urls, args, rng)
+                total = sum(mix.values())
+                print("Mix: " + ", ".join(f"{e} {w / total:.0%}" for e, w in mix.items())
+                      + f"; {args.rate:g} pet/s, calentamiento {args.warmup:g} s, medición {args.duration:g} s", flush=True)
+                if args.warmup > 0:
+                    await drive(client, traffic, mix, args.rate, args.warmup, rng)
+                await services.blocking(client, reset=True)
+                stats, elapsed, sent = await drive(client, traffic, mix, args.rate, args.duration, rng)
+                blocking = await services.blocking(client)
+    print(f"\n{sent} peticiones en {elapsed:.1f} s ({sent / elapsed:.1f}/s enviadas)")
+    rows = report(stats, elapsed, blocking)
+    if args.output:
+        rows = [{k: None if isinstance(v, float) and math.isnan(v) else v for k, v in r.items()} for r in rows]
+        Path(args.output).write_text(json.dumps(
+            {"args": vars(args), "elapsed_s": elapsed, "sent": sent, "endpoints": rows, "blocking": blocking},
+            indent=2, ensure_ascii=False,
+        ))
+        print(f"\nResultados en {args.output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    traffic = parser.add_argument_group("tráfico")
+    traffic.add_argument("--rate", type=float, default=10.0, help="Peticiones por segundo (todas las rutas)")
+    traffic.add_argument("--duration", type=float, default=60.0, help="Segundos medidos")
+    traffic.add_argument("--warmup", type=float, default=10.0, help="Segundos de calentamiento (no cuentan)")
+    traffic.add_argument("--mix", default="detect=5,corrections=1,chat=2,analyze-label=2", help="Pesos por endpoint")
+    traffic.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Endpoints del mix a usar (y servicios a levantar)")
+    traffic.add_argument("--photos", type=int, default=48, help="Fotos de platos distintas")
+    traffic.add_argument("--labels", type=int, default=12, help="Etiquetas distintas")
+    traffic.add_argument("--timeout", type=float, default=30.0, help="Timeout del cliente (s)")
+    traffic.add_argument("--connections", type=int, default=256, help="Conexiones máximas del cliente")
+    traffic.add_argument("--seed", type=int, default=0)
+
+    fakes = parser.add_argument_group("proveedores falsos")
+    fakes.add_argument("--detector-ms", type=float, default=120.0, help="Forward del detector falso")
+    fakes.add_argument("--detector-per-image-ms", type=float, default=20.0, help="Coste por imagen del batch")
+    fakes.add_argument("--sleep-detector", action="store_true", help="El detector duerme en vez de calcular")
+    fakes.add_argument("--sink-ms", type=float, default=80.0, help="Latencia del destino de correcciones")
+    fakes.add_argument("--sink-errors", type=float, default=0.0)
+    fakes.add_argument("--groq-ms", type=float, default=600.0, help="Mediana de latencia de Groq")
+    fakes.add_argument("--groq-errors", type=float, default=0.01)
+    fakes.add_argument("--gemini-ms", type=float, default=1500.0, help="Mediana de latencia de Gemini")
+    fakes.add_argument("--gemini-errors", type=float, default=0.02)
+    fakes.add_argument("--tavily-ms", type=float, default=900.0, help="Mediana de latencia de Tavily")
+    fakes.add_argument("--tavily-errors", type=float, default=0.02)
+    fakes.add_argument("--latency-sigma", type=float, default=0.5, help="Dispersión lognormal de las latencias")
+    fakes.add_argument("--ultraprocessed-rate", type=float, default=0.6, help="Etiquetas que pasan por Tavily")
+
+    parser.add_argument("--rag-data", default=str(ROOT / "rag-service" / "data_source"), help="PDFs a indexar")
+    parser.add_argument("--block-threshold-ms", type=float, default=20.0, help="Sin latido del loop más de esto = bloqueado")
+    parser.add_argument("--startup-timeout", type=float, default=180.0)
+    parser.add_argument("--output", help="Guardar resultados en JSON")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
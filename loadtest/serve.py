@@ -0,0 +1,158 @@
+"""
+Lanza uno de los servicios FastAPI del repo con una sonda de bloqueo del event loop.
+
+La sonda envuelve la app ASGI:
+- una tarea del loop actualiza un latido cada --interval-ms;
+- un hilo vigía comprueba el latido; si lleva más de --threshold-ms sin actualizarse, el loop
+  está bloqueado (código síncrono dentro de un `async def`, CPU con el GIL tomado...). El vigía
+  toma la pila del hilo del loop (sys._current_frames) y atribuye el tiempo bloqueado a la
+  petición en curso: el `scope` ASGI más interno de esa pila ("POST /detect"). Lo que bloquea
+  fuera de una petición (tareas de fondo, lifespan) cuenta como "(fuera de peticiones)".
+- GET /__loadtest/blocking devuelve el acumulado por ruta (segundos bloqueados, número de
+  bloqueos y el más largo); con ?reset=1 además lo pone a cero.
+
+Uso (desde la raíz del repo; normalmente lo lanza loadtest.run):
+    python -m loadtest.serve --app-dir rag-service --port 8101
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+REPORT_PATH = "/__loadtest/blocking"
+OUTSIDE_REQUESTS = "(fuera de peticiones)"
+
+
+def request_label(frame: Any) -> str:
+    """Método y ruta de la petición ASGI más interna en la pila de `frame`."""
+    while frame is not None:
+        code = frame.f_code
+        if "scope" in code.co_varnames or "scope" in code.co_cellvars:
+            scope = frame.f_locals.get("scope")
+            if isinstance(scope, dict) and scope.get("type") in ("http", "websocket"):
+                method = scope.get("method", "WS")
+                return f"{method} {scope.get('path', '?')}"
+        frame = frame.f_back
+    return OUTSIDE_REQUESTS
+
+
+class LoopBlockingProbe:
+    """App ASGI que mide el tiempo que el event loop pasa bloqueado, por ruta."""
+
+    def __init__(self, app: Any, interval_ms: float = 2.0, threshold_ms: float = 20.0):
+        self.app = app
+        self.interval = interval_ms / 1000.0
+        self.threshold = threshold_ms / 1000.0
+        self._lock = threading.Lock()
+        self._blocked: dict[str, float] = defaultdict(float)
+        self._stalls: dict[str, int] = defaultdict(int)
+        self._max_stall: dict[str, float] = defaultdict(float)
+        self._beat = time.monotonic()
+        self._loop_thread: int | None = None
+        self._since = time.monotonic()
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if self._loop_thread is None:
+            self._start()
+        if scope["type"] == "http" and scope["path"] == REPORT_PATH:
+            await self._report(scope, send)
+            return
+        await self.app(scope, receive, send)
+
+    def _start(self) -> None:
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        asyncio.get_running_loop().create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-blocking-probe", daemon=True).start()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self) -> None:
+        current: tuple[str, float] | None = None  # (ruta, latido) del bloqueo en curso
+        last = time.monotonic()
+        while True:
+            time.sleep(self.interval)
+            now = time.monotonic()
+            beat = self._beat
+            stall = now - beat
+            if stall < self.threshold:
+                current = None
+                last = now
+                continue
+            label = request_label(sys._current_frames().get(self._loop_thread))
+            with self._lock:
+                if current is None or current[1] != beat:
+                    # Bloqueo nuevo: cuenta desde el último latido
+                    current = (label, beat)
+                    self._stalls[label] += 1
+                    self._blocked[label] += stall
+                else:
+                    self._blocked[label] += now - last
+                self._max_stall[current[0]] = max(self._max_stall[current[0]], stall)
+            last = now
+
+    def snapshot(self, reset: bool = False) -> dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            data = {
+                "interval_ms": self.interval * 1000,
+                "threshold_ms": self.threshold * 1000,
+                "window_s": round(now - self._since, 3),
+                "paths": {
+                    label: {
+                        "blocked_s": round(self._blocked[label], 4),
+                        "stalls": self._stalls[label],
+                        "max_stall_ms": round(self._max_stall[label] * 1000, 1),
+                    }
+                    for label in sorted(set(self._blocked) | set(self._stalls))
+                },
+            }
+            if reset:
+                self._blocked.clear()
+                self._stalls.clear()
+                self._max_stall.clear()
+                self._since = now
+        return data
+
+    async def _report(self, scope: dict, send: Any) -> None:
+        reset = b"reset=1" in scope.get("query_string", b"")
+        body = json.dumps(self.snapshot(reset)).encode()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-dir", required=True, help="Carpeta del servicio (con main.py y `app`)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--interval-ms", type=float, default=2.0, help="Periodo del latido y del vigía")
+    parser.add_argument("--threshold-ms", type=float, default=20.0, help="Sin latido durante más de esto = bloqueado")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    # Como `uvicorn main:app` desde la carpeta del servicio (rutas relativas, .env, imports)
+    app_dir = Path(args.app_dir).resolve()
+    os.chdir(app_dir)
+    sys.path.insert(0, str(app_dir))
+    app = importlib.import_module("main").app
+    probe = LoopBlockingProbe(app, interval_ms=args.interval_ms, threshold_ms=args.threshold_ms)
+    uvicorn.run(probe, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
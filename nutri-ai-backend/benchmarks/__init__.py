@@ -0,0 +1 @@
+"""Scripts de benchmark del servicio de detección (ejecutar desde nutri-ai-backend/ con python -m)."""
@@ -0,0 +1,116 @@
+"""
+Control de admisión bajo sobrecarga: ráfaga de peticiones por encima de la capacidad del
+scheduler, con el detector falso (detection/fake.py, sin modelo).
+
+Casos, con la misma llegada en lazo abierto (--rate peticiones/s durante --duration s):
+- sin control: cola prácticamente ilimitada y sin deadline (el comportamiento anterior). El
+  cliente abandona a los --timeout ms pero el servidor ejecuta igual: cada resultado tardío es
+  un forward perdido.
+- con control: cola acotada (--queue-depth, 503 + Retry-After) y deadline = timeout del cliente
+  (504 al llegar si la espera estimada no cabe, o al vencer en la cola sin ejecutarse).
+
+Se informa: respuestas a tiempo (goodput), tardías, 503 y 504, imágenes procesadas que nadie
+recibió a tiempo y p50/p95 de las respuestas a tiempo.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_admission
+    python -m benchmarks.bench_admission --rate 120 --duration 5 --forward-ms 80 --timeout-ms 1500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from PIL import Image
+
+from detection.batching import BatchScheduler, DeadlineExceededError, QueueFullError
+from detection.config import INGREDIENTS_LIST
+from detection.fake import FakeDetector
+
+
+async def run_case(controlled: bool, args: argparse.Namespace) -> dict[str, float]:
+    detector = FakeDetector(forward_ms=args.forward_ms, per_image_ms=args.per_image_ms)
+    scheduler = BatchScheduler(
+        lambda: detector,
+        max_batch_size=args.batch,
+        max_wait_ms=args.wait_ms,
+        max_queue_depth=args.queue_depth if controlled else 10**9,
+    )
+    image = Image.new("RGB", (64, 48))
+    timeout = args.timeout_ms / 1000
+    counts = {"ok": 0, "late": 0, "503": 0, "504": 0}
+    latencies: list[float] = []
+
+    async def request() -> None:
+        start = time.monotonic()
+        deadline = start + timeout if controlled else None
+        try:
+            scheduler.admit(deadline)
+            await scheduler.submit(
+                image,
+                text_prompts=INGREDIENTS_LIST,
+                box_threshold=0.3,
+                text_threshold=0.25,
+                deadline=deadline,
+            )
+        except QueueFullError:
+            counts["503"] += 1
+            return
+        except DeadlineExceededError:
+            counts["504"] += 1
+            return
+        elapsed = time.monotonic() - start
+        if elapsed > timeout:
+            counts["late"] += 1  # el cliente ya se fue: el forward se desperdició
+        else:
+            counts["ok"] += 1
+            latencies.append(elapsed * 1000)
+
+    tasks = []
+    total = int(args.rate * args.duration)
+    start = time.monotonic()
+    for i in range(total):
+        await asyncio.sleep(max(0.0, start + i / args.rate - time.monotonic()))
+        tasks.append(asyncio.create_task(request()))
+    await asyncio.gather(*tasks)
+    wall = time.monotonic() - start
+
+    latencies.sort()
+    return {
+        **counts,
+        "wasted": detector.images - counts["ok"],
+        "goodput": counts["ok"] / wall,
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else float("nan"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=100.0, help="Peticiones por segundo")
+    parser.add_argument("--duration", type=float, default=5.0, help="Duración de la ráfaga en segundos")
+    parser.add_argument("--forward-ms", type=float, default=100.0, help="Coste fijo de un forward")
+    parser.add_argument("--per-image-ms", type=float, default=15.0, help="Coste por imagen del batch")
+    parser.add_argument("--batch", type=int, default=4, help="Tamaño máximo del micro-batch")
+    parser.add_argument("--wait-ms", type=float, default=10.0)
+    parser.add_argument("--queue-depth", type=int, default=32)
+    parser.add_argument("--timeout-ms", type=float, default=2000.0, help="Timeout del cliente / deadline")
+    args = parser.parse_args()
+
+    capacity = args.batch / ((args.forward_ms + args.per_image_ms * args.batch) / 1000)
+    print(f"Capacidad ≈ {capacity:.0f} img/s, llegada {args.rate:.0f}/s durante {args.duration:.0f} s, "
+          f"timeout {args.timeout_ms:.0f} ms\n")
+    print(f"{'caso':<14}{'a tiempo':>10}{'tardías':>9}{'503':>6}{'504':>6}{'perdidas':>10}{'goodput/s':>11}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, controlled in (("sin control", False), ("con control", True)):
+        r = asyncio.run(run_case(controlled, args))
+        print(
+            f"{name:<14}{r['ok']:>10}{r['late']:>9}{r['503']:>6}{r['504']:>6}{r['wasted']:>10}"
+            f"{r['goodput']:>11.1f}{r['p50']:>9.0f}{r['p95']:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark: throughput del scheduler de micro-batching vs. una imagen por forward.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_batching --requests 32 --concurrency 8
+    python -m benchmarks.bench_batching --images fotos/ --batch-sizes 1,4,8
+
+Sin --images se usan imágenes sintéticas de 1024x768.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from detection.batching import BatchScheduler
+from detection.config import BOX_THRESHOLD, INGREDIENTS_LIST, TEXT_THRESHOLD
+from detection.grounding_dino import GroundingDinoDetector
+
+
+def load_images(folder: str | None, count: int) -> list[Image.Image]:
+    """Imágenes de una carpeta (se repiten hasta `count`) o sintéticas si no hay carpeta."""
+    if folder:
+        paths = sorted(
+            p for p in Path(folder).iterdir()
+            if p.suffix.lower() in {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+        )
+        if not paths:
+            raise SystemExit(f"No hay imágenes en {folder}")
+        base = [Image.open(p).convert("RGB") for p in paths]
+    else:
+        base = [
+            Image.effect_noise((1024, 768), 64).convert("RGB"),
+            Image.linear_gradient("L").resize((1024, 768)).convert("RGB"),
+        ]
+    return [base[i % len(base)] for i in range(count)]
+
+
+def run_sequential(detector: GroundingDinoDetector, images: list[Image.Image]) -> float:
+    """Camino actual: una imagen por forward, en serie. Devuelve segundos totales."""
+    start = time.perf_counter()
+    for image in images:
+        detector.detect(
+            image,
+            text_prompts=INGREDIENTS_LIST,
+            box_threshold=BOX_THRESHOLD,
+            text_threshold=TEXT_THRESHOLD,
+        )
+    return time.perf_counter() - start
+
+
+async def run_scheduled(
+    detector: GroundingDinoDetector,
+    images: list[Image.Image],
+    batch_size: int,
+    max_wait_ms: float,
+    concurrency: int,
+) -> float:
+    """Envía las imágenes al scheduler con `concurrency` clientes simultáneos."""
+    scheduler = BatchScheduler(
+        lambda: detector,
+        max_batch_size=batch_size,
+        max_wait_ms=max_wait_ms,
+        max_queue_depth=len(images) + 1,
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(image: Image.Image) -> None:
+        async with semaphore:
+            await scheduler.submit(image, INGREDIENTS_LIST, BOX_THRESHOLD, TEXT_THRESHOLD)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(im) for im in images))
+    elapsed = time.perf_counter() - start
+    await scheduler.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Carpeta con fotos de platos (opcional)")
+    parser.add_argument("--requests", type=int, default=32, help="Número de imágenes a procesar")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clientes simultáneos")
+    parser.add_argument("--batch-sizes", default="1,2,4,8", help="Tamaños de batch a probar")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.requests)
+    detector = GroundingDinoDetector()
+    detector.load_model()
+    detector.detect(images[0], text_prompts=INGREDIENTS_LIST)  # warm-up
+
+    seq = run_sequential(detector, images)
+    print(f"{'modo':<24}{'total (s)':>12}{'img/s':>10}{'speedup':>10}")
+    print(f"{'secuencial (actual)':<24}{seq:>12.2f}{len(images) / seq:>10.2f}{1.0:>10.2f}")
+    for bs in (int(x) for x in args.batch_sizes.split(",")):
+        elapsed = asyncio.run(
+            run_scheduled(detector, images, bs, args.max_wait_ms, args.concurrency)
+        )
+        print(f"{f'scheduler batch={bs}':<24}{elapsed:>12.2f}{len(images) / elapsed:>10.2f}{seq / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
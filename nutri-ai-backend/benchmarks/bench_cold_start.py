@@ -0,0 +1,145 @@
+"""
+Arranque en frío: desde que se lanza el proceso hasta el primer POST /detect correcto.
+
+Fases por ejecución (cada una en un proceso nuevo):
+- import: `import main` en un intérprete aparte, y si deja torch cargado (no debería).
+- escuchando: uvicorn lanzado → primer GET /health 200.
+- primer /detect: uvicorn lanzado → primer POST /detect 200 (carga del modelo incluida).
+
+Modos:
+- hub: sin modelo horneado y con una cache de Hugging Face vacía (como un contenedor nuevo
+  antes de hornear el modelo: el primer /detect lo descarga).
+- hub-cache: sin modelo horneado, cache de HF ya llena (reinicio en la misma máquina).
+- baked: GROUNDING_DINO_MODEL_DIR con el modelo de `python -m detection.artifacts fetch`,
+  sin red (HF_HUB_OFFLINE=1), pesos safetensors mapeados en memoria.
+
+Para comparar con el código anterior, ejecutar el mismo comando en ese commit (modos hub y
+hub-cache). Necesita red para `hub` y el modelo descargado para `baked`.
+
+Uso (desde nutri-ai-backend/):
+    python -m detection.artifacts fetch --output models/grounding-dino
+    python -m benchmarks.bench_cold_start --modes hub-cache,baked --model-dir models/grounding-dino --runs 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from pathlib import Path
+
+_IMPORT_PROBE = (
+    "import sys, time; t = time.perf_counter(); import main; "
+    "print(time.perf_counter() - t, 'torch' in sys.modules)"
+)
+
+
+def sample_jpeg() -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.effect_noise((640, 480), 64).convert("RGB").save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+def multipart(field: str, filename: str, data: bytes, content_type: str) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    head = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+    return head + data + f"\r\n--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def mode_env(mode: str, model_dir: str | None, hf_home: str) -> dict[str, str]:
+    env = dict(os.environ, DETECTION_PRELOAD="false", PYTHONUNBUFFERED="1")
+    if mode == "baked":
+        if not model_dir:
+            raise SystemExit("El modo baked necesita --model-dir (python -m detection.artifacts fetch)")
+        env.update(GROUNDING_DINO_MODEL_DIR=str(Path(model_dir).resolve()), HF_HUB_OFFLINE="1", TRANSFORMERS_OFFLINE="1")
+    else:
+        env["GROUNDING_DINO_MODEL_DIR"] = ""
+    if mode == "hub":
+        env["HF_HOME"] = hf_home
+    return env
+
+
+def wait_for(request_fn, deadline: float) -> float:
+    """Reintenta hasta que request_fn() no lance; devuelve el instante (perf_counter) del éxito."""
+    while time.perf_counter() < deadline:
+        try:
+            request_fn()
+            return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.05)
+    raise TimeoutError("El servidor no respondió a tiempo")
+
+
+def run_once(mode: str, model_dir: str | None, image: bytes, timeout: float) -> dict[str, float | bool]:
+    with tempfile.TemporaryDirectory(prefix="hf-home-") as hf_home:
+        env = mode_env(mode, model_dir, hf_home)
+        probe = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], env=env, capture_output=True, text=True, check=True)
+        import_s, torch_loaded = probe.stdout.split()[-2:]
+
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        body, content_type = multipart("file", "plate.jpg", image, "image/jpeg")
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = start + timeout
+            listening = wait_for(lambda: urllib.request.urlopen(f"{base}/health", timeout=5).read(), deadline)
+            request = urllib.request.Request(
+                f"{base}/detect", data=body, headers={"Content-Type": content_type}, method="POST"
+            )
+            first = wait_for(lambda: urllib.request.urlopen(request, timeout=timeout).read(), deadline)
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+    return {
+        "import_s": float(import_s),
+        "torch_on_import": torch_loaded == "True",
+        "listening_s": listening - start,
+        "first_detect_s": first - start,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="hub-cache,baked")
+    parser.add_argument("--model-dir", help="Carpeta del modelo horneado (modo baked)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=900.0)
+    args = parser.parse_args()
+
+    image = sample_jpeg()
+    print(f"{'modo':<12}{'import s':>10}{'torch':>7}{'escuchando s':>14}{'1er /detect s':>15}  (mediana de {args.runs})")
+    for mode in args.modes.split(","):
+        runs = [run_once(mode, args.model_dir, image, args.timeout) for _ in range(args.runs)]
+        med = {k: statistics.median(r[k] for r in runs) for k in ("import_s", "listening_s", "first_detect_s")}
+        torch_flag = "sí" if any(r["torch_on_import"] for r in runs) else "no"
+        print(f"{mode:<12}{med['import_s']:>10.2f}{torch_flag:>7}{med['listening_s']:>14.2f}{med['first_detect_s']:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
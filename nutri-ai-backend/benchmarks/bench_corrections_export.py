@@ -0,0 +1,271 @@
+"""
+Benchmark y verificación del exportador incremental de correcciones (corrections/export.py).
+
+- Throughput (correcciones/s) leyendo imágenes con latencia simulada de almacenamiento,
+  secuencial vs. con lecturas concurrentes acotadas.
+- Memoria: pico de asignaciones Python (tracemalloc) frente al tamaño total del dataset.
+- Incremental: re-ejecutar no escribe nada; tras añadir correcciones solo aparecen shards nuevos
+  con exactamente esas correcciones.
+- Fila tardía: una corrección con created_at anterior a todo lo exportado que llega después
+  (como las que el writer write-behind guarda tras reintentos o un reinicio) se exporta igual.
+- Lectura fallida: una imagen que falla al leerse (error pasajero de Storage) no hace avanzar la
+  marca de agua más allá de ella y se exporta en la siguiente ejecución.
+- Mismo resultado desde el almacén local y desde el sustituto de Supabase (FakeSource).
+
+Termina con código 1 si alguna verificación falla. Necesita Pillow; no necesita Supabase ni el modelo.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_corrections_export
+    python -m benchmarks.bench_corrections_export --records 5000 --latency-ms 20 --concurrency 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import random
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from PIL import Image
+
+from corrections.export import ExportRecord, FakeSource, LocalSource, export_corrections
+from corrections.journal import Correction
+from corrections.sinks import FakeSink, LocalSink
+from corrections.store import CorrectionStore
+
+_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+_LABELS = ["rice", "beans", "tomato", "lettuce", "chicken", "egg"]
+
+
+def make_image(seed: int, size: tuple[int, int] = (640, 480)) -> bytes:
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    for _ in range(8):
+        x, y = rng.randrange(size[0] - 40), rng.randrange(size[1] - 40)
+        img.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, x + 40, y + 40))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+def make_corrections(start: int, count: int, distinct_images: int) -> list[tuple[Correction, bytes]]:
+    """Correcciones con cajas normalizadas, en píxeles y sin caja; varias comparten imagen."""
+    rng = random.Random(start)
+    out = []
+    for i in range(start, start + count):
+        corrected = []
+        for label in rng.sample(_LABELS, 3):
+            kind = rng.random()
+            if kind < 0.4:
+                corrected.append({"label": label, "box": [0.1, 0.1, 0.6, 0.5]})
+            elif kind < 0.8:
+                corrected.append({"label": label, "box": [32.0, 24.0, 320.0, 240.0]})
+            else:
+                corrected.append({"label": label, "box": None})
+        correction = Correction(
+            image_id=f"{i:08d}",
+            ext="jpg",
+            content_type="image/jpeg",
+            detected=[{"label": c["label"]} for c in corrected],
+            corrected=corrected,
+            created_at=(_START + timedelta(seconds=i // 2)).isoformat(),
+            consent=rng.random() > 0.05,
+        )
+        out.append((correction, make_image(i % distinct_images)))
+    return out
+
+
+def populate(items: list[tuple[Correction, bytes]], local: LocalSink, fake: FakeSink, workdir: Path) -> None:
+    for correction, data in items:
+        path = workdir / "upload.jpg"
+        path.write_bytes(data)
+        for sink in (local, fake):
+            sink.upload_image(correction, path)
+        local.insert_rows([correction])
+        fake.insert_rows([correction])
+
+
+class SlowSource:
+    """Envuelve un origen añadiendo latencia por imagen (como Storage remoto)."""
+
+    def __init__(self, source, latency_s: float):
+        self.source = source
+        self.name = source.name
+        self.lag = source.lag
+        self.latency_s = latency_s
+
+    def records(self, after: int, page_size: int = 1000):
+        return self.source.records(after, page_size)
+
+    def resume_seq(self, created_at: str, image_id: str) -> int:
+        return self.source.resume_seq(created_at, image_id)
+
+    def read_image(self, record: ExportRecord) -> bytes:
+        time.sleep(self.latency_s)
+        return self.source.read_image(record)
+
+
+class FlakySource(SlowSource):
+    """Origen cuya lectura de las imágenes de `failing` falla (como un error pasajero de Storage)."""
+
+    def __init__(self, source, failing: set[str]):
+        super().__init__(source, 0.0)
+        self.failing = failing
+
+    def read_image(self, record: ExportRecord) -> bytes:
+        if record.image_id in self.failing:
+            raise OSError("503 Service Unavailable (simulado)")
+        return self.source.read_image(record)
+
+
+def expected_records(items: list[tuple[Correction, bytes]]) -> int:
+    return sum(1 for c, _ in items if c.consent and any(i["box"] for i in c.corrected))
+
+
+def shard_records(out: Path) -> tuple[int, list[str]]:
+    """Correcciones en todos los shards y problemas de formato encontrados."""
+    total, problems = 0, []
+    for shard in sorted(out.glob("shard-*.tar")):
+        with tarfile.open(shard) as tar:
+            names = set(tar.getnames())
+            coco = json.load(tar.extractfile("annotations.coco.json"))
+            odvg = tar.extractfile("annotations.odvg.jsonl").read().decode().splitlines()
+        images = {img["id"]: img for img in coco["images"]}
+        total += len(images)
+        if len(odvg) != len(images):
+            problems.append(f"{shard.name}: {len(odvg)} líneas ODVG para {len(images)} imágenes")
+        for img in images.values():
+            if img["file_name"] not in names:
+                problems.append(f"{shard.name}: falta {img['file_name']}")
+        for ann in coco["annotations"]:
+            img = images[ann["image_id"]]
+            x, y, w, h = ann["bbox"]
+            if x < 0 or y < 0 or x + w > img["width"] + 0.01 or y + h > img["height"] + 0.01:
+                problems.append(f"{shard.name}: caja fuera de la imagen {ann}")
+    return total, problems
+
+
+def timed_export(source, out: Path, shard_size: int, concurrency: int) -> tuple[list, float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    shards = export_corrections(source, out, shard_size=shard_size, concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return shards, elapsed, peak
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--distinct-images", type=int, default=500)
+    parser.add_argument("--shard-size", type=int, default=250)
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="Latencia simulada por lectura de imagen")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    failures: list[str] = []
+
+    with tempfile.TemporaryDirectory(prefix="bench-export-") as tmp:
+        tmp = Path(tmp)
+        local = LocalSink(tmp / "images", CorrectionStore(tmp / "corrections.db"))
+        fake = FakeSink()
+        items = make_corrections(0, args.records, args.distinct_images)
+        populate(items, local, fake, tmp)
+        dataset_bytes = sum(p.stat().st_size for p in (tmp / "images").iterdir())
+        expected = expected_records(items)
+        print(f"{args.records} correcciones ({expected} exportables), {dataset_bytes / 1e6:.1f} MB de imágenes")
+        print(f"Latencia simulada por imagen: {args.latency_ms:.0f} ms\n")
+
+        print(f"{'lecturas':<22}{'corr/s':>10}{'total s':>10}{'pico MB':>10}{'shards':>8}")
+        for concurrency in (1, args.concurrency):
+            out = tmp / f"out-{concurrency}"
+            source = SlowSource(LocalSource(local.store), args.latency_ms / 1000)
+            shards, elapsed, peak = timed_export(source, out, args.shard_size, concurrency)
+            records = sum(s["records"] for s in shards)
+            label = "secuencial" if concurrency == 1 else f"{concurrency} en paralelo"
+            print(f"{label:<22}{records / elapsed:>10,.0f}{elapsed:>10.2f}{peak / 1e6:>10.1f}{len(shards):>8}")
+            if records != expected:
+                failures.append(f"{label}: {records} exportadas, se esperaban {expected}")
+        print(f"(pico de memoria Python frente a {dataset_bytes / 1e6:.1f} MB de dataset)")
+
+        out = tmp / f"out-{args.concurrency}"
+        total, problems = shard_records(out)
+        failures += problems[:5]
+        if total != expected:
+            failures.append(f"los shards contienen {total} correcciones, se esperaban {expected}")
+
+        again = export_corrections(LocalSource(local.store), out, shard_size=args.shard_size)
+        if again:
+            failures.append(f"re-ejecutar escribió {len(again)} shards")
+
+        extra = make_corrections(args.records, args.records // 4, args.distinct_images)
+        populate(extra, local, fake, tmp)
+        before = {p.name for p in out.glob("shard-*.tar")}
+        new = export_corrections(LocalSource(local.store), out, shard_size=args.shard_size)
+        new_records = sum(s["records"] for s in new)
+        if new_records != expected_records(extra):
+            failures.append(f"incremental: {new_records} nuevas, se esperaban {expected_records(extra)}")
+        if any(s["name"] in before for s in new):
+            failures.append("incremental: se reescribió un shard existente")
+        print(f"\nIncremental: {len(extra)} correcciones nuevas → {len(new)} shards nuevos ({new_records} exportadas)")
+
+        late = Correction(
+            image_id="late-0",
+            ext="jpg",
+            content_type="image/jpeg",
+            detected=[{"label": "rice"}],
+            corrected=[{"label": "rice", "box": [10.0, 10.0, 200.0, 150.0]}],
+            created_at=(_START - timedelta(days=1)).isoformat(),
+        )
+        populate([(late, make_image(0))], local, fake, tmp)
+        late_shards = export_corrections(LocalSource(local.store), out, shard_size=args.shard_size)
+        if sum(s["records"] for s in late_shards) != 1:
+            failures.append("fila tardía: no se exportó una corrección que llegó después de su created_at")
+        print(f"Fila tardía (created_at anterior a la marca de agua): {sum(s['records'] for s in late_shards)}/1 exportada")
+
+        flaky = [
+            Correction(
+                image_id=f"flaky-{i}",
+                ext="jpg",
+                content_type="image/jpeg",
+                detected=[{"label": "rice"}],
+                corrected=[{"label": "rice", "box": [10.0, 10.0, 200.0, 150.0]}],
+            )
+            for i in range(3)
+        ]
+        populate([(c, make_image(i)) for i, c in enumerate(flaky)], local, fake, tmp)
+        failing = FlakySource(LocalSource(local.store), {"flaky-0"})
+        first = sum(s["records"] for s in export_corrections(failing, out, shard_size=args.shard_size))
+        failing.failing.clear()
+        retried = sum(s["records"] for s in export_corrections(failing, out, shard_size=args.shard_size))
+        if (first, retried) != (2, 1):
+            failures.append(f"lectura fallida: {first} + {retried} exportadas, se esperaban 2 + 1")
+        print(f"Lectura fallida: {first} exportadas, la fallida en la siguiente ejecución ({retried}/1)")
+
+        fake_out = tmp / "out-fake"
+        fake_shards = export_corrections(FakeSource(fake), fake_out, shard_size=args.shard_size)
+        fake_total = sum(s["records"] for s in fake_shards)
+        fake_expected = expected + expected_records(extra) + 1 + len(flaky)
+        if fake_total != fake_expected:
+            failures.append(f"FakeSource: {fake_total} exportadas, se esperaban {fake_expected}")
+        print(f"Sustituto de Supabase (FakeSource): {fake_total} exportadas en {len(fake_shards)} shards")
+        local.store.close()
+
+    if failures:
+        print("\nFALLOS:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("\nOK: exportación completa, incremental y sin shards repetidos")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Benchmark del almacén local de correcciones (corrections/store.py) frente a annotations.jsonl.
+
+- Escritura: registros/s con lotes de distinto tamaño (un fsync por lote) y con varios
+  procesos escribiendo a la vez (como varios workers de uvicorn). Para el JSONL se mide el
+  camino anterior: abrir, añadir una línea y cerrar por corrección.
+- Lectura con N registros (por defecto 1M): latencia de búsqueda por image_id (p50/p99) y de
+  una ventana de created_at; en el JSONL la búsqueda es un recorrido del archivo.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_corrections_store
+    python -m benchmarks.bench_corrections_store --records 200000 --processes 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from corrections.store import CorrectionStore
+
+_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+_SPAN_SECONDS = 365 * 24 * 3600
+
+
+def make_record(i: int, total: int) -> dict[str, Any]:
+    image_id = str(uuid.UUID(int=random.getrandbits(128), version=4))
+    ts = _START + timedelta(seconds=_SPAN_SECONDS * i / max(1, total))
+    return {
+        "image_id": image_id,
+        "image_path": f"data/corrections/images/{image_id}.jpg",
+        "detected": [{"label": "rice"}, {"label": "beans"}, {"label": "tomato"}],
+        "corrected": [{"label": "rice", "box": [0.12, 0.2, 0.55, 0.61]}, {"label": "lettuce", "box": None}],
+        "consent": True,
+        "created_at": ts.isoformat(),
+    }
+
+
+def _write_worker(db: str, start: int, count: int, total: int, batch: int, synchronous: str) -> None:
+    random.seed(start)
+    store = CorrectionStore(Path(db), synchronous=synchronous)
+    for offset in range(0, count, batch):
+        n = min(batch, count - offset)
+        store.insert_many(make_record(start + offset + k, total) for k in range(n))
+    store.close()
+
+
+def bench_write(db: Path, records: int, batch: int, processes: int, synchronous: str) -> float:
+    """Registros/s escribiendo `records` en lotes de `batch` con `processes` procesos."""
+    per_proc = records // processes
+    ctx = mp.get_context("spawn")
+    procs = [
+        ctx.Process(target=_write_worker, args=(str(db), i * per_proc, per_proc, records, batch, synchronous))
+        for i in range(processes)
+    ]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return per_proc * processes / (time.perf_counter() - start)
+
+
+def bench_jsonl_append(path: Path, records: int) -> float:
+    """Camino anterior: una apertura + línea + cierre por corrección."""
+    start = time.perf_counter()
+    for i in range(records):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(make_record(i, records), ensure_ascii=False) + "\n")
+    return records / (time.perf_counter() - start)
+
+
+def percentiles(values: list[float]) -> str:
+    values = sorted(values)
+    p99 = values[min(len(values) - 1, int(0.99 * len(values)))]
+    return f"p50 {statistics.median(values):.3f} ms  p99 {p99:.3f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=500, help="Registros por transacción al poblar")
+    parser.add_argument("--processes", type=int, default=4, help="Procesos escritores concurrentes")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--synchronous", default="FULL", choices=["FULL", "NORMAL"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-store-") as tmp:
+        tmp = Path(tmp)
+
+        print(f"Escritura (synchronous={args.synchronous})")
+        small = min(args.records, 20_000)
+        rate = bench_jsonl_append(tmp / "append.jsonl", small)
+        print(f"  jsonl, abrir+línea por corrección     {rate:>10,.0f} reg/s  ({small:,} registros)")
+        for batch in (1, 50, 500):
+            n = min(small, 2_000) if batch == 1 else small
+            rate = bench_write(tmp / f"w{batch}.db", n, batch, 1, args.synchronous)
+            print(f"  sqlite, lote {batch:<4} 1 proceso           {rate:>10,.0f} reg/s  ({n:,} registros)")
+        rate = bench_write(tmp / "wp.db", small, 50, args.processes, args.synchronous)
+        print(f"  sqlite, lote 50   {args.processes} procesos          {rate:>10,.0f} reg/s  ({small:,} registros)")
+
+        db = tmp / "big.db"
+        rate = bench_write(db, args.records, args.batch, 1, args.synchronous)
+        print(f"  sqlite, lote {args.batch:<4} 1 proceso           {rate:>10,.0f} reg/s  ({args.records:,} registros)")
+
+        store = CorrectionStore(db)
+        store.checkpoint()
+        total = store.count()
+        print(f"\nLectura con {total:,} registros ({db.stat().st_size / 1e6:.0f} MB)")
+        ids = [r[0] for r in store._conn().execute(
+            "SELECT image_id FROM corrections ORDER BY random() LIMIT ?", (args.lookups,)
+        )]
+        times = []
+        for image_id in ids:
+            start = time.perf_counter()
+            assert store.get(image_id) is not None
+            times.append((time.perf_counter() - start) * 1000)
+        print(f"  sqlite, por image_id                  {percentiles(times)}")
+
+        times = []
+        for _ in range(200):
+            day = _START + timedelta(seconds=random.uniform(0, _SPAN_SECONDS - 3600))
+            start = time.perf_counter()
+            rows = list(store.iter_range(since=day.isoformat(), until=(day + timedelta(hours=1)).isoformat()))
+            times.append((time.perf_counter() - start) * 1000)
+        print(f"  sqlite, ventana de 1 h (~{len(rows)} filas)   {percentiles(times)}")
+
+        jsonl = tmp / "big.jsonl"
+        with open(jsonl, "w", encoding="utf-8") as f:
+            for row in store.iter_range(page_size=10_000):
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        times = []
+        for image_id in ids[:5]:
+            start = time.perf_counter()
+            with open(jsonl, encoding="utf-8") as f:
+                next(line for line in f if image_id in line)
+            times.append((time.perf_counter() - start) * 1000)
+        print(f"  jsonl, recorrido por image_id          {percentiles(times)}  (5 búsquedas)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Benchmark y verificación del write-behind de /corrections contra FakeSink (storage + tabla
+en memoria con latencia y fallos simulados).
+
+- Latencia por corrección y bloqueo del event loop: llamadas síncronas al destino dentro del
+  handler (camino anterior) vs. CorrectionWriter.submit (journal + fsync).
+- Persistencia completa con fallos: todas las correcciones llegan una sola vez aunque el
+  destino falle un porcentaje de las llamadas (reintentos con backoff).
+- Reinicio: un writer que se cierra con trabajo pendiente lo deja en el journal y el
+  siguiente lo vacía al arrancar.
+- Dead-letter: con el destino siempre caído, los lotes se apartan tras el máximo de intentos
+  y la cola queda vacía.
+
+Termina con código 1 si alguna verificación falla. No necesita Supabase ni el modelo.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_corrections_writer
+    python -m benchmarks.bench_corrections_writer --corrections 500 --latency-ms 80 --fail-rate 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from corrections import Correction, CorrectionJournal, CorrectionWriter, FakeSink
+
+
+def make_correction() -> Correction:
+    return Correction(
+        image_id=str(uuid.uuid4()),
+        ext="jpg",
+        content_type="image/jpeg",
+        detected=[{"label": "rice"}, {"label": "beans"}],
+        corrected=[{"label": "rice", "box": [0.1, 0.2, 0.5, 0.6]}],
+    )
+
+
+async def _loop_lag(stop: asyncio.Event, samples: list[float], interval: float = 0.005) -> None:
+    """Retraso del event loop: cuánto tarda en despertar un sleep de `interval`."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append((loop.time() - start - interval) * 1000)
+
+
+async def run_sync(n: int, concurrency: int, latency_s: float, image: bytes, workdir: Path) -> dict:
+    """Camino anterior: upload + insert síncronos dentro del handler async."""
+    sink = FakeSink(latency_s=latency_s)
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def handler() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            c = make_correction()
+            path = workdir / c.image_name
+            path.write_bytes(image)
+            sink.upload_image(c, path)
+            sink.insert_rows([c])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    lag: list[float] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_loop_lag(stop, lag))
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(n)))
+    total = time.perf_counter() - start
+    stop.set()
+    await lag_task
+    return {"latencies": latencies, "lag": lag, "total": total, "rows": len(sink.rows), "inserts": sink.insert_calls}
+
+
+async def run_write_behind(
+    n: int, concurrency: int, latency_s: float, fail_rate: float, image: bytes, journal_dir: Path,
+) -> dict:
+    sink = FakeSink(latency_s=latency_s, fail_rate=fail_rate, seed=1)
+    writer = CorrectionWriter(
+        sink, CorrectionJournal(journal_dir), retry_base_seconds=0.01, retry_max_seconds=0.2,
+        # Con --fail-rate alto, ningún lote debe acabar en el dead-letter
+        retry_max_attempts=100,
+    )
+    await writer.start()
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def handler() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await writer.submit(make_correction(), image)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    lag: list[float] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_loop_lag(stop, lag))
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(n)))
+    drained = await writer.drain(timeout=120)
+    total = time.perf_counter() - start
+    stop.set()
+    await lag_task
+    await writer.close()
+    return {
+        "latencies": latencies,
+        "lag": lag,
+        "total": total,
+        "rows": len(sink.rows),
+        "inserts": sink.insert_calls,
+        "retries": writer.retries,
+        "drained": drained,
+        "journal_left": len(CorrectionJournal(journal_dir).pending_ids()),
+    }
+
+
+async def check_restart(image: bytes, journal_dir: Path, n: int = 20) -> list[str]:
+    """Destino caído → se cierra con pendientes → otro writer los vacía al arrancar."""
+    failures = []
+    down = CorrectionWriter(FakeSink(fail_rate=1.0), CorrectionJournal(journal_dir), retry_base_seconds=0.05)
+    await down.start()
+    for _ in range(n):
+        await down.submit(make_correction(), image)
+    await asyncio.sleep(0.2)
+    await down.close()
+
+    left = len(CorrectionJournal(journal_dir).pending_ids())
+    if left != n:
+        failures.append(f"tras cerrar con el destino caído quedaron {left} entradas en el journal (esperadas {n})")
+
+    sink = FakeSink()
+    writer = CorrectionWriter(sink, CorrectionJournal(journal_dir), flush_interval_ms=10)
+    resumed = await writer.start()
+    await writer.drain(timeout=30)
+    await writer.close()
+    if resumed != n or len(sink.rows) != n:
+        failures.append(f"reinicio: reanudadas {resumed}, persistidas {len(sink.rows)} (esperadas {n})")
+    if CorrectionJournal(journal_dir).pending_ids():
+        failures.append("reinicio: el journal no quedó vacío")
+    return failures
+
+
+async def check_dead_letter(image: bytes, journal_dir: Path, n: int = 10) -> list[str]:
+    """Destino siempre caído → cada lote se aparta tras retry_max_attempts y la cola sigue."""
+    failures = []
+    journal = CorrectionJournal(journal_dir)
+    writer = CorrectionWriter(
+        FakeSink(fail_rate=1.0), journal, retry_base_seconds=0.01, retry_max_attempts=3, flush_interval_ms=10,
+    )
+    await writer.start()
+    for _ in range(n):
+        await writer.submit(make_correction(), image)
+    drained = await writer.drain(timeout=30)
+    await writer.close()
+    if not drained:
+        failures.append("dead-letter: la cola no se vació con el destino caído")
+    if journal.pending_ids() or journal.dead_letter_count() != n or writer.dead_lettered != n:
+        failures.append(
+            f"dead-letter: {journal.dead_letter_count()} apartadas, "
+            f"{len(journal.pending_ids())} en el journal (esperadas {n} y 0)"
+        )
+    return failures
+
+
+def _p(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corrections", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16, help="Peticiones /corrections simultáneas")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latencia simulada por llamada al destino")
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="Fracción de llamadas que fallan (write-behind)")
+    parser.add_argument("--image-kb", type=int, default=300)
+    args = parser.parse_args()
+
+    image = b"\xff\xd8\xff\xe0" + os.urandom(args.image_kb * 1024)
+    latency_s = args.latency_ms / 1000.0
+    failures: list[str] = []
+
+    with tempfile.TemporaryDirectory(prefix="bench-corrections-") as tmp:
+        tmp = Path(tmp)
+        (tmp / "sync").mkdir()
+        sync = asyncio.run(run_sync(args.corrections, args.concurrency, latency_s, image, tmp / "sync"))
+        wb = asyncio.run(run_write_behind(
+            args.corrections, args.concurrency, latency_s, args.fail_rate, image, tmp / "journal",
+        ))
+        failures += asyncio.run(check_restart(image, tmp / "restart"))
+        failures += asyncio.run(check_dead_letter(image, tmp / "dead-letter"))
+
+    print(f"{args.corrections} correcciones, concurrencia {args.concurrency}, "
+          f"latencia del destino {args.latency_ms:.0f} ms, fallos {args.fail_rate:.0%} (solo write-behind)")
+    print(f"{'camino':<14}{'p50 ms':>9}{'p99 ms':>9}{'lag loop p99 ms':>17}{'inserts':>9}{'total s':>9}")
+    for name, r in (("síncrono", sync), ("write-behind", wb)):
+        print(
+            f"{name:<14}{statistics.median(r['latencies']):>9.1f}{_p(r['latencies'], 0.99):>9.1f}"
+            f"{_p(r['lag'], 0.99):>17.1f}{r['inserts']:>9}{r['total']:>9.2f}"
+        )
+    print(f"write-behind: {wb['retries']} reintentos")
+
+    if not wb["drained"]:
+        failures.append("el writer no terminó de vaciar la cola")
+    if wb["rows"] != args.corrections:
+        failures.append(f"write-behind persistió {wb['rows']} de {args.corrections} correcciones")
+    if wb["journal_left"]:
+        failures.append(f"quedaron {wb['journal_left']} entradas en el journal")
+    for failure in failures:
+        print(f"FALLO: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: todas las correcciones persistidas una vez; reinicio vacía el journal")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: tiempo de decodificación y memoria pico por petición, decodificación completa
+(`Image.open(...).convert("RGB")`, camino anterior) vs. detection.image_io.decode_image
+(draft JPEG + EXIF + reducción al tamaño del processor).
+
+Cada caso se ejecuta en un proceso nuevo para que el pico de RSS (ru_maxrss) sea comparable.
+Sin --images se generan JPEG sintéticos con tamaños típicos de cámaras de móvil.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_decode
+    python -m benchmarks.bench_decode --images fotos/ --repeat 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import multiprocessing as mp
+import resource
+import statistics
+import time
+from pathlib import Path
+
+from PIL import Image
+
+PHONE_SIZES = {
+    "3MP (2048x1536)": (2048, 1536),
+    "8MP (3264x2448)": (3264, 2448),
+    "12MP (4032x3024)": (4032, 3024),
+    "48MP (8000x6000)": (8000, 6000),
+}
+
+
+def synthetic_jpeg(size: tuple[int, int]) -> bytes:
+    """JPEG con gradiente + ruido (comprime parecido a una foto, no a un color plano)."""
+    base = Image.linear_gradient("L").resize(size).convert("RGB")
+    noise = Image.effect_noise(size, 40).convert("RGB")
+    buf = io.BytesIO()
+    Image.blend(base, noise, 0.3).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _legacy(contents: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(contents)).convert("RGB")
+
+
+def _fast(contents: bytes) -> Image.Image:
+    from detection.image_io import decode_image
+
+    return decode_image(contents, max_pixels=0).image
+
+
+def _run_case(method: str, contents: bytes, repeat: int, out: mp.Queue) -> None:
+    decode = _legacy if method == "completa" else _fast
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        image = decode(contents)
+        times.append((time.perf_counter() - start) * 1000)
+        del image
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    out.put((statistics.median(times), peak / 1024))
+
+
+def measure(method: str, contents: bytes, repeat: int) -> tuple[float, float]:
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    p = ctx.Process(target=_run_case, args=(method, contents, repeat, out))
+    p.start()
+    result = out.get()
+    p.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Carpeta con fotos reales (JPEG/PNG)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.images:
+        cases = {p.name: p.read_bytes() for p in sorted(Path(args.images).iterdir()) if p.is_file()}
+    else:
+        cases = {name: synthetic_jpeg(size) for name, size in PHONE_SIZES.items()}
+
+    print(f"{'imagen':<20}{'MB':>6}{'completa ms':>13}{'pico MB':>9}{'draft ms':>10}{'pico MB':>9}")
+    for name, contents in cases.items():
+        full_ms, full_mb = measure("completa", contents, args.repeat)
+        fast_ms, fast_mb = measure("draft", contents, args.repeat)
+        print(f"{name:<20}{len(contents) / 1e6:>6.1f}{full_ms:>13.1f}{full_mb:>9.1f}{fast_ms:>10.1f}{fast_mb:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Suite de micro-benchmarks de detección: GroundingDinoDetector y el handler /detect.
+
+Recorre combinaciones de resolución × prompt (lista por defecto, listas por categoría,
+prompt personalizado) × umbrales × tamaño de batch y, para cada una, mide:
+- latencia p50/p95/p99 y throughput (imágenes/s),
+- RSS actual y pico del proceso,
+- reparto del tiempo entre decode, preprocess, forward, postprocess y serialize
+  (modo `detector`, que llama al pipeline directamente con timings por etapa).
+
+El modo `endpoint` envía multipart a /detect en proceso a través de la app ASGI (httpx,
+sin red), con `batch` peticiones concurrentes. Cada petición lleva bytes únicos para que
+la cache de resultados no las resuelva.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_detect run --output bench.json
+    python -m benchmarks.bench_detect run --modes endpoint --resolutions 1280x960 --batch-sizes 1,8
+    python -m benchmarks.bench_detect compare base.json bench.json --tolerance 0.10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from PIL import Image
+
+from detection.config import (
+    BACKEND,
+    BOX_THRESHOLD,
+    INGREDIENTS_LIST,
+    MEAL_CATEGORIES,
+    MODEL_ID,
+    TEXT_THRESHOLD,
+    ingredients_from_string,
+)
+from detection.image_io import decode_image
+from detection.timing import stage
+
+STAGES = ("decode", "preprocess", "forward", "postprocess", "serialize")
+# Campos que identifican un caso al comparar dos ejecuciones
+CASE_FIELDS = ("mode", "resolution", "prompt_set", "box_threshold", "text_threshold", "batch_size")
+
+
+def prompt_sets(names: list[str] | None = None) -> dict[str, list[str]]:
+    sets = {"default": INGREDIENTS_LIST}
+    sets.update({f"category:{k}": v for k, v in MEAL_CATEGORIES.items()})
+    sets["custom"] = ingredients_from_string("rice, lentils, tomato, chicken, broccoli")
+    if names:
+        sets = {k: v for k, v in sets.items() if k in names}
+    return sets
+
+
+class PhotoFactory:
+    """JPEG sintéticos tipo foto; cada llamada devuelve bytes distintos (sufijo tras EOI)."""
+
+    def __init__(self, size: tuple[int, int]):
+        base = Image.linear_gradient("L").resize(size).convert("RGB")
+        noise = Image.effect_noise(size, 40).convert("RGB")
+        buf = io.BytesIO()
+        Image.blend(base, noise, 0.3).save(buf, format="JPEG", quality=90)
+        self._jpeg = buf.getvalue()
+        self._counter = itertools.count()
+
+    def next(self) -> bytes:
+        # Los decoders ignoran los bytes posteriores al marcador EOI
+        return self._jpeg + f"bench-{next(self._counter)}".encode()
+
+
+def parse_size(spec: str) -> tuple[int, int]:
+    w, h = spec.lower().split("x")
+    return int(w), int(h)
+
+
+def percentiles(values_ms: list[float]) -> dict[str, float]:
+    if len(values_ms) == 1:
+        v = round(values_ms[0], 2)
+        return {"mean": v, "p50": v, "p95": v, "p99": v}
+    q = statistics.quantiles(values_ms, n=100, method="inclusive")
+    return {
+        "mean": round(statistics.mean(values_ms), 2),
+        "p50": round(q[49], 2),
+        "p95": round(q[94], 2),
+        "p99": round(q[98], 2),
+    }
+
+
+def rss_mb() -> dict[str, float]:
+    """RSS actual y pico (VmHWM) del proceso en MB."""
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return {
+            "rss_mb": round(int(fields["VmRSS"].split()[0]) / 1024, 1),
+            "peak_rss_mb": round(int(fields["VmHWM"].split()[0]) / 1024, 1),
+        }
+    except (OSError, KeyError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+        return {"rss_mb": None, "peak_rss_mb": round(peak_mb, 1)}
+
+
+def run_detector_case(
+    detector: Any,
+    photos: PhotoFactory,
+    prompts: list[str],
+    box_threshold: float,
+    text_threshold: float,
+    batch_size: int,
+    iterations: int,
+) -> dict[str, Any]:
+    """Pipeline directo (decode → detect_batch → filtrado + JSON) con tiempos por etapa."""
+    from main import DetectionResponse, _build_ingredients
+    from detection.result_cache import CachedDetection
+
+    latencies, totals = [], {s: 0.0 for s in STAGES}
+    start_all = time.perf_counter()
+    for _ in range(iterations):
+        timings: dict[str, float] = {}
+        start = time.perf_counter()
+        with stage(timings, "decode"):
+            decoded = [decode_image(photos.next()) for _ in range(batch_size)]
+        raws = detector.detect_batch(
+            [d.image for d in decoded],
+            text_prompts=prompts,
+            box_threshold=box_threshold,
+            text_threshold=text_threshold,
+            original_sizes=[d.original_size for d in decoded],
+            timings=timings,
+        )
+        with stage(timings, "serialize"):
+            for raw, d in zip(raws, decoded):
+                result = CachedDetection(detections=raw, image_size=d.original_size)
+                ingredients = _build_ingredients(result, prompts, None, include_boxes=True)
+                DetectionResponse(ingredients=ingredients).model_dump_json()
+        latencies.append((time.perf_counter() - start) * 1000)
+        for name, seconds in timings.items():
+            totals[name] = totals.get(name, 0.0) + seconds
+    elapsed = time.perf_counter() - start_all
+    return {
+        "latency_ms": percentiles(latencies),
+        "throughput_ips": round(batch_size * iterations / elapsed, 3),
+        "stages_ms": {k: round(v * 1000 / iterations, 2) for k, v in totals.items()},
+    }
+
+
+async def run_endpoint_case(
+    photos: PhotoFactory,
+    prompt_set: str,
+    prompts: list[str],
+    box_threshold: float,
+    text_threshold: float,
+    concurrency: int,
+    iterations: int,
+) -> dict[str, Any]:
+    """`concurrency` clientes enviando multipart a /detect a través de la app ASGI."""
+    import httpx
+
+    import main
+
+    params = {"box_threshold": box_threshold, "text_threshold": text_threshold}
+    if prompt_set != "default":
+        params["ingredients_prompt"] = ", ".join(prompts)
+    latencies: list[float] = []
+    errors = 0
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one() -> None:
+            nonlocal errors
+            files = {"file": ("plate.jpg", photos.next(), "image/jpeg")}
+            start = time.perf_counter()
+            r = await client.post("/detect", params=params, files=files)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if r.status_code != 200:
+                errors += 1
+
+        start_all = time.perf_counter()
+        for _ in range(iterations):
+            await asyncio.gather(*(one() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start_all
+    return {
+        "latency_ms": percentiles(latencies),
+        "throughput_ips": round(len(latencies) / elapsed, 3),
+        "errors": errors,
+    }
+
+
+def cmd_run(args: argparse.Namespace) -> None:
+    from detection.grounding_dino import GroundingDinoDetector
+    from detection.result_cache import DetectionResultCache
+    import main
+
+    # Sin cache de resultados: cada petición debe ejecutar el modelo
+    main._result_cache = DetectionResultCache(max_entries=0)
+    detector = main.get_detector() if "endpoint" in args.modes else GroundingDinoDetector()
+    detector.load_model()
+    detector.detect(Image.effect_noise((800, 600), 64).convert("RGB"))  # warm-up
+
+    resolutions = [parse_size(s) for s in args.resolutions.split(",")]
+    thresholds = [tuple(float(x) for x in pair.split(":")) for pair in args.thresholds.split(",")]
+    batch_sizes = [int(x) for x in args.batch_sizes.split(",")]
+    sets = prompt_sets(args.prompt_sets.split(",") if args.prompt_sets else None)
+
+    results = []
+    for mode, size, (set_name, prompts), (bt, tt), bs in itertools.product(
+        args.modes, resolutions, sets.items(), thresholds, batch_sizes
+    ):
+        photos = PhotoFactory(size)
+        if mode == "detector":
+            metrics = run_detector_case(detector, photos, prompts, bt, tt, bs, args.iterations)
+        else:
+            metrics = asyncio.run(run_endpoint_case(photos, set_name, prompts, bt, tt, bs, args.iterations))
+        row = {
+            "mode": mode,
+            "resolution": f"{size[0]}x{size[1]}",
+            "prompt_set": set_name,
+            "prompt_len": len(prompts),
+            "box_threshold": bt,
+            "text_threshold": tt,
+            "batch_size": bs,
+            **metrics,
+            **rss_mb(),
+        }
+        results.append(row)
+        lat = row["latency_ms"]
+        print(
+            f"{mode:<9}{row['resolution']:>10} {set_name:<18} bt={bt:.2f} tt={tt:.2f} bs={bs:<3}"
+            f" p50={lat['p50']:>8.1f} p95={lat['p95']:>8.1f} p99={lat['p99']:>8.1f} ms"
+            f" {row['throughput_ips']:>7.2f} img/s  pico {row['peak_rss_mb']} MB"
+        )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model_id": MODEL_ID,
+            "backend": BACKEND,
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados en {args.output}")
+
+
+def cmd_compare(args: argparse.Namespace) -> None:
+    """Compara dos JSON de resultados; exit 1 si algún caso empeora más que la tolerancia."""
+    with open(args.base, encoding="utf-8") as f:
+        base = {tuple(r[k] for k in CASE_FIELDS): r for r in json.load(f)["results"]}
+    with open(args.new, encoding="utf-8") as f:
+        new = {tuple(r[k] for k in CASE_FIELDS): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"{'caso':<62}{'p50 Δ':>9}{'p95 Δ':>9}{'img/s Δ':>9}")
+    for key in sorted(base.keys() & new.keys(), key=str):
+        b, n = base[key], new[key]
+        d50 = n["latency_ms"]["p50"] / b["latency_ms"]["p50"] - 1
+        d95 = n["latency_ms"]["p95"] / b["latency_ms"]["p95"] - 1
+        dthr = n["throughput_ips"] / b["throughput_ips"] - 1
+        worse = d50 > args.tolerance or d95 > args.tolerance or dthr < -args.tolerance
+        regressions += worse
+        label = " ".join(str(k) for k in key)
+        print(f"{label:<62}{d50:>+9.1%}{d95:>+9.1%}{dthr:>+9.1%}{'  REGRESIÓN' if worse else ''}")
+    missing = base.keys() ^ new.keys()
+    if missing:
+        print(f"{len(missing)} casos solo están en una de las dos ejecuciones")
+    sys.exit(1 if regressions else 0)
+
+
+def main_cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Ejecutar el barrido y escribir JSON")
+    p_run.add_argument("--output", default="bench-detect.json")
+    p_run.add_argument("--modes", type=lambda s: s.split(","), default=["detector", "endpoint"])
+    p_run.add_argument("--resolutions", default="640x480,1280x960,4032x3024")
+    p_run.add_argument("--prompt-sets", default="", help="Ej: default,category:lunch,custom (vacío = todos)")
+    p_run.add_argument("--thresholds", default=f"{BOX_THRESHOLD}:{TEXT_THRESHOLD},0.20:0.15",
+                       help="Pares box:text separados por comas")
+    p_run.add_argument("--batch-sizes", default="1,4")
+    p_run.add_argument("--iterations", type=int, default=10)
+
+    p_cmp = sub.add_parser("compare", help="Comparar dos ejecuciones")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--tolerance", type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        cmd_run(args)
+    else:
+        cmd_compare(args)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,124 @@
+"""
+Latencia y paridad de los modos de ejecución (detection/execution.py) frente a eager fp32 con
+torch.no_grad() y los hilos por defecto de torch (el comportamiento anterior).
+
+Cada modo corre en un proceso nuevo: los hilos inter-op solo se pueden fijar una vez por
+proceso y torch.compile modifica el modelo. Se informa el modo efectivo (p. ej. bf16 sin
+soporte de hardware cae a fp32), la latencia de la primera llamada (incluye compilación),
+p50/p95 y la paridad de cajas y scores con la referencia.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_execution_modes --images fixtures/ --repeat 5
+    python -m benchmarks.bench_execution_modes --modes baseline,inference_mode,bf16 --threads 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import statistics
+import time
+from typing import Any
+
+
+def mode_kwargs(name: str, threads: int) -> dict[str, Any]:
+    """Parámetros de ExecutionMode de cada modo del benchmark (threads=0: default de torch)."""
+    base = {
+        "precision": "fp32",
+        "inference_mode": False,
+        "compile": False,
+        "channels_last": False,
+        "intra_op_threads": 0,
+        "inter_op_threads": 0,
+    }
+    modes = {
+        "baseline": {},
+        "inference_mode": {"inference_mode": True},
+        "threads": {"inference_mode": True, "intra_op_threads": threads, "inter_op_threads": 1},
+        "channels_last": {"inference_mode": True, "channels_last": True},
+        "bf16": {"inference_mode": True, "precision": "bf16"},
+        "compile": {"inference_mode": True, "compile": True},
+        "bf16+compile": {"inference_mode": True, "precision": "bf16", "compile": True},
+    }
+    if name not in modes:
+        raise SystemExit(f"Modo desconocido: {name}. Valores: {list(modes)}")
+    return {**base, **modes[name]}
+
+
+def _run_mode(name: str, threads: int, folder: str | None, repeat: int, out: mp.Queue) -> None:
+    from detection.execution import ExecutionMode
+    from detection.export import load_fixture_images
+    from detection.grounding_dino import GroundingDinoDetector
+
+    images = load_fixture_images(folder)
+    detector = GroundingDinoDetector(device="cpu", execution_mode=ExecutionMode(**mode_kwargs(name, threads)))
+    detector.load_model()
+    start = time.perf_counter()
+    detector.detect(images[0])
+    first_ms = (time.perf_counter() - start) * 1000
+    results, latencies = [], []
+    for image in images:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = detector.detect(image)
+            latencies.append((time.perf_counter() - start) * 1000)
+        results.append(result)
+    latencies.sort()
+    out.put((
+        detector.execution.as_dict(),
+        first_ms,
+        statistics.median(latencies),
+        latencies[int(0.95 * (len(latencies) - 1))],
+        results,
+    ))
+
+
+def run_mode(name: str, args: argparse.Namespace):
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    p = ctx.Process(target=_run_mode, args=(name, args.threads, args.images, args.repeat, out))
+    p.start()
+    result = out.get()
+    p.join()
+    return result
+
+
+def main() -> None:
+    from detection.parity import ParityReport
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Carpeta de imágenes de fixture")
+    parser.add_argument("--modes", default="baseline,inference_mode,threads,channels_last,bf16,compile")
+    parser.add_argument("--threads", type=int, default=4, help="Hilos intra-op del modo `threads`")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    names = args.modes.split(",")
+    if names[0] != "baseline":
+        names.insert(0, "baseline")
+    print(f"{'modo':<16}{'1ª ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'speedup':>9}{'mean IoU':>10}{'Δscore':>9}{'perd/extra':>12}  efectivo")
+    reference, base_p50 = None, None
+    for name in names:
+        mode, first_ms, p50, p95, results = run_mode(name, args)
+        effective = f"{mode['precision']}, {mode['threads']['intra_op']} hilos"
+        if mode["compile"]:
+            effective += ", compile"
+        if mode["note"]:
+            effective += f" ({mode['note']})"
+        if reference is None:
+            reference, base_p50 = results, p50
+            print(f"{name:<16}{first_ms:>9.0f}{p50:>9.1f}{p95:>9.1f}{1.0:>9.2f}{'-':>10}{'-':>9}{'-':>12}  {effective}")
+            continue
+        report = ParityReport()
+        for ref, cand in zip(reference, results):
+            report.add(ref, cand)
+        s = report.summary()
+        lost = f"{s['missing']}/{s['extra']}"
+        print(
+            f"{name:<16}{first_ms:>9.0f}{p50:>9.1f}{p95:>9.1f}{base_p50 / p50:>9.2f}"
+            f"{s['mean_iou'] or 0:>10.3f}{s['mean_score_drift'] or 0:>9.3f}{lost:>12}  {effective}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Modo cámara en vivo (detection/live.py) sobre un clip grabado, frente a detectar cada fotograma.
+
+El clip es una carpeta de fotogramas (JPEG/PNG, en orden de nombre) o, sin --clip, uno
+sintético: paneo sobre una foto, cámara quieta, corte a otra foto y otro paneo. Los fotogramas
+se envían a --fps como lo haría la cámara (sin esperar respuesta).
+
+Casos:
+- cada fotograma: decodificar + detectar cada fotograma en serie, como llamar a /detect por
+  fotograma (el cliente envía el siguiente cuando recibe la respuesta).
+- en vivo: LiveSession, con fotogramas clave, tracker y descarte de fotogramas viejos.
+
+Se informa fotogramas procesados por segundo, inferencias por segundo, fotogramas clave y
+descartados, y la latencia de cada respuesta desde que llegó su fotograma (p50/p95).
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_live --fake-ms 150
+    python -m benchmarks.bench_live --clip fixtures/clip/ --fps 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import statistics
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from detection.batching import BatchScheduler
+from detection.config import BOX_THRESHOLD, INGREDIENTS_LIST, LIVE_LONGEST_EDGE, TEXT_THRESHOLD
+from detection.image_io import DecodedImage, decode_image
+from detection.live import LiveSession
+
+
+def _jpeg(image: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=80)
+    return buf.getvalue()
+
+
+def load_clip(folder: str | None, size: tuple[int, int] = (640, 480)) -> list[bytes]:
+    """Fotogramas del clip como bytes codificados (lo que enviaría la app)."""
+    if folder:
+        paths = sorted(p for p in Path(folder).iterdir() if p.suffix.lower() in {".jpg", ".jpeg", ".png", ".webp"})
+        if not paths:
+            raise SystemExit(f"No hay fotogramas en {folder}")
+        return [p.read_bytes() for p in paths]
+
+    w, h = size
+    first = Image.effect_mandelbrot((w + 240, h + 120), (-2.0, -1.2, 1.0, 1.2), 64).convert("RGB")
+    second = Image.effect_mandelbrot((w + 240, h + 120), (-0.8, -0.4, 0.2, 0.4), 96).convert("RGB")
+    frames = [first.crop((x, 40, x + w, 40 + h)) for x in range(0, 240, 4)]          # paneo
+    frames += [frames[-1]] * 30                                                      # quieta
+    frames += [second.crop((0, y, w, y + h)) for y in range(0, 120, 2)]             # corte + paneo vertical
+    return [_jpeg(f) for f in frames]
+
+
+def make_detector(fake_ms: float):
+    if fake_ms > 0:
+        from detection.fake import FakeDetector
+
+        return FakeDetector(forward_ms=fake_ms)
+    from detection.grounding_dino import GroundingDinoDetector
+
+    detector = GroundingDinoDetector()
+    detector.load_model()
+    return detector
+
+
+def _decode(data: bytes) -> DecodedImage:
+    return decode_image(data, longest_edge=LIVE_LONGEST_EDGE)
+
+
+async def run_every_frame(frames: list[bytes], scheduler: BatchScheduler) -> dict[str, float]:
+    latencies = []
+    start = time.monotonic()
+    for data in frames:
+        t = time.monotonic()
+        decoded = await asyncio.to_thread(_decode, data)
+        await scheduler.submit(
+            decoded.image,
+            text_prompts=INGREDIENTS_LIST,
+            box_threshold=BOX_THRESHOLD,
+            text_threshold=TEXT_THRESHOLD,
+            original_size=decoded.original_size,
+        )
+        latencies.append((time.monotonic() - t) * 1000)
+    elapsed = time.monotonic() - start
+    return {
+        "fps": len(frames) / elapsed,
+        "inference_per_s": len(frames) / elapsed,
+        "keyframes": len(frames),
+        "dropped": 0,
+        "latencies": latencies,
+    }
+
+
+async def run_live(frames: list[bytes], scheduler: BatchScheduler, fps: float) -> dict[str, float]:
+    async def infer(decoded: DecodedImage) -> list[dict]:
+        return await scheduler.submit(
+            decoded.image,
+            text_prompts=INGREDIENTS_LIST,
+            box_threshold=BOX_THRESHOLD,
+            text_threshold=TEXT_THRESHOLD,
+            original_size=decoded.original_size,
+        )
+
+    arrived: dict[int, float] = {}
+    latencies: list[float] = []
+    start = time.monotonic()
+    sent = 0
+
+    async def receive() -> bytes | None:
+        nonlocal sent
+        if sent == len(frames):
+            return None
+        await asyncio.sleep(max(0.0, start + sent / fps - time.monotonic()))
+        sent += 1
+        arrived[sent] = time.monotonic()
+        return frames[sent - 1]
+
+    async def send(message: dict) -> None:
+        latencies.append((time.monotonic() - arrived[message["frame"]]) * 1000)
+
+    session = LiveSession(_decode, infer)
+    stats = (await session.run(receive, send)).as_dict()
+    return {**stats, "latencies": latencies}
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    frames = load_clip(args.clip)
+    detector = make_detector(args.fake_ms)
+    clip_s = len(frames) / args.fps
+    print(f"Clip: {len(frames)} fotogramas ({clip_s:.1f} s a {args.fps:.0f} fps)\n")
+    print(f"{'caso':<16}{'fps':>8}{'inf/s':>8}{'clave':>7}{'descart.':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, run in (
+        ("cada fotograma", lambda s: run_every_frame(frames, s)),
+        ("en vivo", lambda s: run_live(frames, s, args.fps)),
+    ):
+        scheduler = BatchScheduler(lambda: detector)
+        try:
+            await run_every_frame(frames[:1], scheduler)  # calentamiento: carga del modelo
+            r = await run(scheduler)
+        finally:
+            await scheduler.close()
+        lat = sorted(r["latencies"])
+        print(
+            f"{name:<16}{r['fps']:>8.1f}{r['inference_per_s']:>8.2f}{r['keyframes']:>7}{r['dropped']:>10}"
+            f"{statistics.median(lat):>9.0f}{lat[int(0.95 * (len(lat) - 1))]:>9.0f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clip", help="Carpeta con los fotogramas del clip (si no, uno sintético)")
+    parser.add_argument("--fps", type=float, default=30.0, help="Fotogramas por segundo de la cámara")
+    parser.add_argument("--fake-ms", type=float, default=0.0, help="Usar el detector falso con este forward (ms)")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
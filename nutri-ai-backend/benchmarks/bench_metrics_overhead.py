@@ -0,0 +1,141 @@
+"""
+Coste de la instrumentación (telemetry/): cuánto añade por petición dejarla activa.
+
+- ns por operación: Histogram.observe, Histogram.time(), Counter.inc, con varios hilos a la vez.
+- µs por petición del MetricsMiddleware sobre una app ASGI mínima (sin servidor).
+- Tiempo de render de /metrics con series realistas, y verificación del formato (buckets
+  acumulativos, _count igual al bucket +Inf).
+
+No necesita el modelo ni FastAPI. Termina con código 1 si la verificación de formato falla.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_metrics_overhead
+    python -m benchmarks.bench_metrics_overhead --ops 500000 --threads 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import re
+import sys
+import threading
+import time
+
+from telemetry.metrics import Counter, Histogram, MetricsMiddleware, Registry
+
+
+def per_op_ns(fn, ops: int, threads: int) -> float:
+    """ns por llamada (tiempo de pared total / llamadas) con `threads` hilos llamando a la vez."""
+    per_thread = ops // threads
+
+    def run() -> None:
+        for _ in range(per_thread):
+            fn()
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return (time.perf_counter() - start) / (per_thread * threads) * 1e9
+
+
+async def _app(scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def per_request_us(app, requests: int) -> float:
+    scope = {"type": "http", "method": "POST", "path": "/detect"}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def check_format(text: str) -> list[str]:
+    problems = []
+    sample = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[^}]*\})? [-+0-9.eEInf]+$')
+    buckets: dict[str, list[int]] = {}
+    counts: dict[str, int] = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        if not sample.match(line):
+            problems.append(f"línea inválida: {line}")
+            continue
+        name_labels, value = line.rsplit(" ", 1)
+        if "_bucket{" in name_labels:
+            series = re.sub(r',?le="[^"]*"', "", name_labels).replace("_bucket", "")
+            buckets.setdefault(series, []).append(int(float(value)))
+        elif name_labels.split("{")[0].endswith("_count"):
+            counts[name_labels.replace("_count", "")] = int(float(value))
+    for series, values in buckets.items():
+        if values != sorted(values):
+            problems.append(f"buckets no acumulativos en {series}")
+        if counts.get(series) != values[-1]:
+            problems.append(f"_count distinto del bucket +Inf en {series}")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=50_000)
+    args = parser.parse_args()
+
+    registry = Registry()
+    hist = Histogram("bench_stage_seconds", "bench", ["stage"], registry=registry)
+    counter = Counter("bench_total", "bench", ["label"], registry=registry)
+
+    def timed_block() -> None:
+        with hist.time("decode"):
+            pass
+
+    print(f"{'operación':<34}{'1 hilo':>10}{f'{args.threads} hilos':>12}  (ns/op)")
+    cases = {
+        "Histogram.observe": lambda: hist.observe(0.0123, "forward"),
+        "with Histogram.time()": timed_block,
+        "Counter.inc": lambda: counter.inc("rice"),
+        "time.perf_counter (referencia)": time.perf_counter,
+    }
+    for name, fn in cases.items():
+        single = per_op_ns(fn, args.ops, 1)
+        multi = per_op_ns(fn, args.ops, args.threads)
+        print(f"{name:<34}{single:>10,.0f}{multi:>12,.0f}")
+
+    bare = asyncio.run(per_request_us(_app, args.requests))
+    wrapped = asyncio.run(per_request_us(MetricsMiddleware(_app, {"/detect"}), args.requests))
+    print(f"\nMetricsMiddleware: {wrapped - bare:.2f} µs por petición ({bare:.2f} → {wrapped:.2f} µs, app ASGI vacía)")
+
+    stages = ["read", "decode", "queue", "preprocess", "forward", "postprocess", "inference", "filter", "draw", "encode"]
+    for i in range(10_000):
+        hist.observe((i % 100) / 100, stages[i % len(stages)])
+        counter.inc(f"label-{i % 60}")
+    start = time.perf_counter()
+    text = registry.render()
+    render_ms = (time.perf_counter() - start) * 1000
+    print(f"render: {render_ms:.2f} ms para {len(text.splitlines())} líneas")
+
+    problems = check_format(text)
+    if problems:
+        print("\nFALLOS:")
+        for p in problems[:10]:
+            print(f"  - {p}")
+        return 1
+    print("OK: formato de exposición válido")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Benchmark: post-proceso en el caso denso (umbrales bajos → cientos de detecciones).
+
+Compara la implementación anterior (.cpu() por elemento, _is_box_too_large por caja y
+_normalize_label recorriendo toda la lista por detección) con la vectorizada
+(detector._to_detections + main._build_ingredients) y verifica que la salida es idéntica.
+No necesita el modelo: genera resultados sintéticos con la forma de
+post_process_grounded_object_detection.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_postprocess --detections 900 --repeat 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+import torch
+
+from detection.config import INGREDIENTS_LIST, MEAL_CATEGORIES
+from detection.grounding_dino import GroundingDinoDetector
+from detection.result_cache import CachedDetection
+from main import MAX_BOX_AREA_RATIO, DetectedIngredient, _build_ingredients
+
+
+# --- Implementación anterior (referencia) ---
+
+def legacy_to_detections(result, text_prompts):
+    out = []
+    labels_raw = result.get("text_labels", result.get("labels", []))
+    for i, (box, score) in enumerate(zip(result["boxes"], result["scores"])):
+        raw = labels_raw[i] if i < len(labels_raw) else "object"
+        label_str = str(raw).strip() if raw else "object"
+        out.append({"label": label_str, "box": box.cpu().tolist(), "score": float(score.cpu().item())})
+    return out
+
+
+def legacy_normalize_label(label, ingredients_list):
+    label_lower = label.lower().strip()
+    label_words = set(label_lower.split())
+    for ing in ingredients_list:
+        ing_lower = ing.lower()
+        if ing_lower in label_lower:
+            return ing
+        ing_words = set(ing_lower.split())
+        if ing_words and ing_words <= label_words:
+            return ing
+    return label
+
+
+def legacy_is_box_too_large(box, image_width, image_height):
+    x0, y0, x1, y1 = box
+    w = max(0, x1 - x0)
+    h = max(0, y1 - y0)
+    image_area = image_width * image_height
+    if image_area <= 0:
+        return False
+    return w * h / image_area > MAX_BOX_AREA_RATIO
+
+
+def legacy_pipeline(result, prompts, size, category):
+    w, h = size
+    ingredients = []
+    for d in legacy_to_detections(result, prompts):
+        if legacy_is_box_too_large(d["box"], w, h):
+            continue
+        label = legacy_normalize_label(d["label"], prompts)
+        ingredients.append(DetectedIngredient(label=label, score=round(d["score"], 4), box=d["box"]))
+    if category is not None:
+        allowed = set(MEAL_CATEGORIES[category])
+        ingredients = [i for i in ingredients if i.label in allowed]
+    return ingredients
+
+
+def vectorized_pipeline(result, prompts, size, category):
+    raw = GroundingDinoDetector._to_detections(result, prompts)
+    return _build_ingredients(CachedDetection(detections=raw, image_size=size), prompts, category, True)
+
+
+# --- Datos sintéticos ---
+
+def dense_result(n: int, size: tuple[int, int], seed: int = 0) -> dict:
+    """Resultado con n cajas; etiquetas simples y concatenadas como las que devuelve el modelo."""
+    rng = random.Random(seed)
+    w, h = size
+    boxes, labels = [], []
+    for _ in range(n):
+        x0, y0 = rng.uniform(0, w * 0.9), rng.uniform(0, h * 0.9)
+        boxes.append([x0, y0, min(w, x0 + rng.uniform(5, w * 0.8)), min(h, y0 + rng.uniform(5, h * 0.8))])
+        parts = rng.sample(INGREDIENTS_LIST, rng.choice([1, 1, 2, 3]))
+        labels.append(" ".join(parts))
+    return {
+        "boxes": torch.tensor(boxes),
+        "scores": torch.rand(n),
+        "text_labels": labels,
+    }
+
+
+def timeit(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--detections", type=int, default=900)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    size = (1333, 1000)
+    result = dense_result(args.detections, size)
+    print(f"{'categoría':<12}{'anterior ms':>13}{'vectorizado ms':>16}{'speedup':>9}  salida")
+    for category in [None, *MEAL_CATEGORIES]:
+        prompts = INGREDIENTS_LIST
+        old = legacy_pipeline(result, prompts, size, category)
+        new = vectorized_pipeline(result, prompts, size, category)
+        same = [i.model_dump() for i in old] == [i.model_dump() for i in new]
+        old_ms = timeit(lambda: legacy_pipeline(result, prompts, size, category), args.repeat)
+        new_ms = timeit(lambda: vectorized_pipeline(result, prompts, size, category), args.repeat)
+        print(f"{str(category):<12}{old_ms:>13.2f}{new_ms:>16.2f}{old_ms / new_ms:>9.1f}  {'idéntica' if same else 'DISTINTA'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark: latencia por categoría con el prompt completo vs. el prompt planificado.
+
+Antes, /detect?category=X ejecutaba el modelo con los ~70 prompts de INGREDIENTS_LIST y
+luego descartaba las etiquetas fuera de la categoría. Con el planificador el modelo solo
+recibe la intersección. Ambos con la cache de texto activa (medida en régimen estable).
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_prompt_planner --repeat 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from benchmarks.bench_batching import load_images
+from detection.config import INGREDIENTS_LIST, MEAL_CATEGORIES
+from detection.grounding_dino import GroundingDinoDetector
+from detection.prompts import category_prompt_lists, plan_prompts
+
+
+def median_ms(detector: GroundingDinoDetector, image, prompts: list[str], repeat: int) -> float:
+    detector.detect(image, text_prompts=prompts)  # captura features de texto
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        detector.detect(image, text_prompts=prompts)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Carpeta con fotos de platos (opcional)")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    image = load_images(args.images, 1)[0]
+    detector = GroundingDinoDetector()
+    detector.prepare_prompts(category_prompt_lists())
+    full_ms = median_ms(detector, image, INGREDIENTS_LIST, args.repeat)
+
+    print(f"{'categoría':<12}{'prompts':>9}{'completo ms':>13}{'planificado ms':>16}{'ahorro':>9}")
+    for category in MEAL_CATEGORIES:
+        planned = list(plan_prompts(tuple(INGREDIENTS_LIST), category))
+        planned_ms = median_ms(detector, image, planned, args.repeat)
+        print(
+            f"{category:<12}{len(planned):>4}/{len(INGREDIENTS_LIST):<4}{full_ms:>13.1f}"
+            f"{planned_ms:>16.1f}{(1 - planned_ms / full_ms) * 100:>8.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark del render de POST /detect/image: dibujo de cajas + codificación de la respuesta.
+
+Compara el camino anterior (copia de la imagen, ImageFont.truetype("arial.ttf") en cada
+petición, JPEG q90) con detection/render.py en varias configuraciones (JPEG, JPEG progresivo,
+WebP, max_size). Mide p50/p95 del render y bytes de la respuesta y, para el caso de cache de
+resultados acertada, el total decode + render desde los bytes subidos.
+
+No necesita el modelo: las detecciones son sintéticas, en coordenadas de la imagen original.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_render
+    python -m benchmarks.bench_render --size 4032x3024 --boxes 20 --repeat 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import random
+import statistics
+import time
+from dataclasses import dataclass
+
+from PIL import Image, ImageDraw, ImageFont
+
+from detection.config import DECODE_LONGEST_EDGE, DECODE_SHORTEST_EDGE
+from detection.image_io import decode_image
+from detection.render import RenderOptions, render_detections
+
+
+@dataclass
+class Ingredient:
+    label: str
+    score: float
+    box: list[float] | None
+
+
+def synthetic_jpeg(size: tuple[int, int]) -> bytes:
+    """JPEG con gradiente + ruido (comprime parecido a una foto, no a un color plano)."""
+    base = Image.linear_gradient("L").resize(size).convert("RGB")
+    noise = Image.effect_noise(size, 40).convert("RGB")
+    buf = io.BytesIO()
+    Image.blend(base, noise, 0.3).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def synthetic_ingredients(size: tuple[int, int], count: int) -> list[Ingredient]:
+    rng = random.Random(0)
+    out = []
+    for i in range(count):
+        x0, y0 = rng.uniform(0, size[0] * 0.7), rng.uniform(0, size[1] * 0.7)
+        w, h = rng.uniform(size[0] * 0.05, size[0] * 0.3), rng.uniform(size[1] * 0.05, size[1] * 0.3)
+        out.append(Ingredient(f"ingredient-{i}", rng.uniform(0.3, 0.9), [x0, y0, x0 + w, y0 + h]))
+    return out
+
+
+def legacy_render(image: Image.Image, ingredients: list[Ingredient], scale: float) -> bytes:
+    """Camino anterior de main.py: _draw_detections + JPEG q90."""
+    img = image.copy()
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.truetype("arial.ttf", size=max(14, img.width // 50))
+    except (OSError, IOError):
+        font = ImageFont.load_default()
+    for ing in ingredients:
+        x0, y0, x1, y1 = [int(round(x * scale)) for x in ing.box]
+        draw.rectangle([x0, y0, x1, y1], outline="lime", width=max(2, img.width // 300))
+        text = f"{ing.label} {ing.score:.2f}"
+        bbox = draw.textbbox((x0, y0), text, font=font)
+        draw.rectangle(bbox, fill="green")
+        draw.text((x0, y0 - 2), text, fill="white", font=font)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def measure(fn, repeat: int) -> tuple[float, float, int]:
+    """(p50 ms, p95 ms, bytes de la última respuesta)."""
+    fn()  # calentamiento (fuentes, tablas de codificación)
+    times, size = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn())
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return statistics.median(times), times[int(0.95 * (len(times) - 1))], size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="4032x3024", help="Tamaño de la foto subida (ANCHOxALTO)")
+    parser.add_argument("--boxes", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--max-size", type=int, default=640)
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+    data = synthetic_jpeg(size)
+    ingredients = synthetic_ingredients(size, args.boxes)
+    decoded = decode_image(data)
+    print(f"Foto {size[0]}x{size[1]} ({len(data) / 1e6:.1f} MB), decodificada a {decoded.image.size}, "
+          f"{args.boxes} cajas\n")
+
+    variants = {
+        "anterior (JPEG q90)": None,
+        "JPEG q90": RenderOptions(format="jpeg", quality=90),
+        "JPEG q80 progresivo": RenderOptions(format="jpeg", quality=80, progressive=True),
+        "WebP q80": RenderOptions(format="webp", quality=80),
+        f"JPEG q80, max_size={args.max_size}": RenderOptions(format="jpeg", quality=80, max_size=args.max_size),
+    }
+
+    print("Render (dibujo + codificación) sobre la imagen ya decodificada:")
+    print(f"{'variante':<30}{'p50 ms':>9}{'p95 ms':>9}{'KB':>9}")
+    for name, options in variants.items():
+        if options is None:
+            fn = lambda: legacy_render(decoded.image, ingredients, decoded.scale)
+        else:
+            # render_detections dibuja sobre la imagen recibida: cada llamada usa una copia, como
+            # cada petición usa su propia imagen decodificada (la copia se mide aparte)
+            fn = lambda o=options: render_detections(decoded.image.copy(), ingredients, decoded.scale, o)
+        p50, p95, nbytes = measure(fn, args.repeat)
+        print(f"{name:<30}{p50:>9.1f}{p95:>9.1f}{nbytes / 1024:>9.0f}")
+    p50, _, _ = measure(lambda: decoded.image.copy() and b"", args.repeat)
+    print(f"(copia de la imagen incluida en las variantes nuevas: ~{p50:.1f} ms)")
+
+    print("\nCache de resultados acertada, decode + render desde los bytes subidos:")
+    print(f"{'variante':<30}{'p50 ms':>9}{'p95 ms':>9}{'KB':>9}")
+
+    def legacy_hit() -> bytes:
+        dec = decode_image(data)
+        return legacy_render(dec.image, ingredients, dec.scale)
+
+    def reduced_hit() -> bytes:
+        # Igual que /detect/image: sin inferencia se decodifica directamente al tamaño de salida
+        longest = min(DECODE_LONGEST_EDGE, args.max_size)
+        dec = decode_image(data, shortest_edge=DECODE_SHORTEST_EDGE, longest_edge=longest)
+        return render_detections(dec.image, ingredients, dec.scale, variants[f"JPEG q80, max_size={args.max_size}"])
+
+    for name, fn in (("anterior (JPEG q90)", legacy_hit), (f"JPEG q80, max_size={args.max_size}", reduced_hit)):
+        p50, p95, nbytes = measure(fn, args.repeat)
+        print(f"{name:<30}{p50:>9.1f}{p95:>9.1f}{nbytes / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Índice de platos corregidos (corrections/similar.py): carga, búsqueda y recuperación.
+
+- Carga: construir el índice desde una base con N filas (arranque del proceso).
+- Búsqueda: vecino más cercano con XOR + popcount en numpy frente a un bucle Python con
+  hamming() (como ImageIndex.find_near), p50/p95 sobre hashes aleatorios.
+- Recuperación: fotos sintéticas indexadas y consultadas tras recomprimirlas, reducirlas o
+  recortarlas un poco; cuántas se encuentran a distancia ≤ --max-distance (con
+  --max-scale, las reducidas a la mitad también valen; los recortes cambian la relación de
+  aspecto y deben rechazarse) y cuántas fotos distintas dan un falso positivo.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_similar --sizes 10000,100000,1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from corrections.dedup import hamming
+from corrections.journal import Correction
+from corrections.similar import SimilarImageIndex
+from corrections.store import connect
+
+
+def fill(db: Path, count: int, seed: int = 0) -> list[int]:
+    """Inserta `count` filas con hashes aleatorios directamente (sin imágenes)."""
+    rng = random.Random(seed)
+    hashes = [rng.getrandbits(64) for _ in range(count)]
+    SimilarImageIndex(db).close()  # crea la tabla
+    conn = connect(db, synchronous="NORMAL")
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO similar_images (image_id, dhash, width, height, corrected, created_at) VALUES (?, ?, 640, 480, ?, ?)",
+        ((f"img-{i}", f"{h:016x}", '[{"label": "rice", "box": null}]', "2026-01-01T00:00:00+00:00") for i, h in enumerate(hashes)),
+    )
+    conn.execute("COMMIT")
+    conn.close()
+    return hashes
+
+
+def percentiles(times: list[float]) -> tuple[float, float]:
+    times = sorted(times)
+    return statistics.median(times), times[int(0.95 * (len(times) - 1))]
+
+
+def bench_size(count: int, queries: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "corrections.db"
+        hashes = fill(db, count)
+        start = time.perf_counter()
+        index = SimilarImageIndex(db)
+        load_s = time.perf_counter() - start
+        rng = random.Random(1)
+        probes = [rng.getrandbits(64) for _ in range(queries)]
+
+        numpy_ms = []
+        for value in probes:
+            t = time.perf_counter()
+            index.nearest(value)
+            numpy_ms.append((time.perf_counter() - t) * 1000)
+        loop_ms = []
+        for value in probes[: max(1, queries // 10)]:
+            t = time.perf_counter()
+            min(hamming(value, h) for h in hashes)
+            loop_ms.append((time.perf_counter() - t) * 1000)
+        index.close()
+    n50, n95 = percentiles(numpy_ms)
+    l50, _ = percentiles(loop_ms)
+    print(f"{count:>10,}{load_s * 1000:>10.0f}{n50:>10.2f}{n95:>10.2f}{l50:>12.1f}{l50 / n50:>9.0f}x")
+
+
+def _encoded(image: Image.Image, quality: int = 90) -> io.BytesIO:
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=quality)
+    buf.seek(0)
+    return buf
+
+
+def bench_recall(count: int, max_distance: int, max_scale: float) -> None:
+    variants = {
+        "recomprimida q60": lambda im: _encoded(im, 60),
+        "reducida 50 %": lambda im: _encoded(im.resize((im.width // 2, im.height // 2))),
+        "recorte 3 %": lambda im: _encoded(im.crop((im.width * 3 // 100, 0, im.width, im.height))),
+    }
+    rng = random.Random(2)
+    photos = [
+        Image.effect_mandelbrot((640, 480), (rng.uniform(-2, -0.5), -1.0, rng.uniform(0, 1), 1.0), rng.randint(20, 120)).convert("RGB")
+        for _ in range(2 * count)
+    ]
+    indexed, others = photos[:count], photos[count:]
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SimilarImageIndex(Path(tmp) / "corrections.db", max_distance=max_distance, max_scale=max_scale)
+        index.add_many(
+            (Correction(f"img-{i}", "jpg", "image/jpeg", [], [{"label": "rice", "box": None}]), _encoded(im))
+            for i, im in enumerate(indexed)
+        )
+        print(f"\nRecuperación (distancia ≤ {max_distance}, escala ≤ {max_scale:g}, {count} fotos indexadas):")
+        for name, make in variants.items():
+            found = sum(
+                1 for i, im in enumerate(indexed)
+                if (m := index.lookup(make(im))) is not None and m.image_id == f"img-{i}"
+            )
+            print(f"  {name:<20}{found:>5}/{count}")
+        false_pos = sum(1 for im in others if index.lookup(_encoded(im)) is not None)
+        print(f"  {'fotos distintas':<20}{false_pos:>5}/{count} falsos positivos")
+        index.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--recall-images", type=int, default=50)
+    parser.add_argument("--max-distance", type=int, default=3)
+    parser.add_argument("--max-scale", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{'filas':>10}{'carga ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'bucle ms':>12}{'speedup':>10}")
+    for count in (int(n) for n in args.sizes.split(",")):
+        bench_size(count, args.queries)
+    bench_recall(args.recall_images, args.max_distance, args.max_scale)
+
+
+if __name__ == "__main__":
+    main()
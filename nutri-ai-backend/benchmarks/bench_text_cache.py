@@ -0,0 +1,61 @@
+"""
+Benchmark: latencia por petición con y sin cache de features de texto.
+
+Recorre los prompts típicos (lista por defecto, listas por categoría y un prompt
+personalizado) repitiendo cada uno `--repeat` veces, primero con la cache desactivada
+y luego activada, e imprime latencia media/p50 por prompt y los contadores de la cache.
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_text_cache --repeat 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from benchmarks.bench_batching import load_images
+from detection.config import INGREDIENTS_LIST, MEAL_CATEGORIES, ingredients_from_string
+from detection.grounding_dino import GroundingDinoDetector
+
+
+def prompt_sets() -> dict[str, list[str]]:
+    prompts = {"default": INGREDIENTS_LIST}
+    prompts.update({f"category:{k}": v for k, v in MEAL_CATEGORIES.items()})
+    prompts["custom"] = ingredients_from_string("rice, lentils, tomato, chicken")
+    return prompts
+
+
+def measure(detector: GroundingDinoDetector, image, prompts: list[str], repeat: int) -> list[float]:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        detector.detect(image, text_prompts=prompts)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Carpeta con fotos de platos (opcional)")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    image = load_images(args.images, 1)[0]
+    without = GroundingDinoDetector(text_cache_size=0)
+    with_cache = GroundingDinoDetector()
+    without.load_model()
+    with_cache.load_model()
+    without.detect(image)  # warm-up
+
+    print(f"{'prompt':<22}{'sin cache ms':>14}{'con cache ms':>14}{'ahorro':>9}")
+    for name, prompts in prompt_sets().items():
+        base = statistics.median(measure(without, image, prompts, args.repeat))
+        cached = statistics.median(measure(with_cache, image, prompts, args.repeat))
+        print(f"{name:<22}{base:>14.1f}{cached:>14.1f}{(1 - cached / base) * 100:>8.1f}%")
+    print(f"cache: {with_cache.text_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark del modo teselas (detection/tiling.py) frente a inferencia en una sola pasada.
+
+Casos, sobre las mismas fotos decodificadas a TILING_SHORTEST_EDGE / TILING_LONGEST_EDGE:
+- una pasada (processor por defecto, lado corto 800): lo que hace /detect hoy,
+- una pasada a la misma resolución efectiva que las teselas (el processor redimensiona a
+  TILING_SHORTEST_EDGE / TILING_LONGEST_EDGE en lugar de 800 / 1333),
+- teselas con y sin la vista completa.
+
+Cada caso corre en un proceso nuevo (el pico de RSS, ru_maxrss, es comparable) e imprime p50/p95,
+memoria pico sobre la del modelo cargado, detecciones y cuántas son pequeñas (< 1 % del área).
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_tiling --images fotos/ --repeat 5
+    python -m benchmarks.bench_tiling --tile-size 640 --overlap 0.25
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import resource
+import statistics
+import time
+
+from detection.config import INGREDIENTS_LIST, TILING_LONGEST_EDGE, TILING_SHORTEST_EDGE
+
+
+def _load(folder: str | None, count: int):
+    """Fotos decodificadas como en /detect?tiles=true (RGB, lado mayor ≤ TILING_LONGEST_EDGE)."""
+    from PIL import Image
+
+    from benchmarks.bench_batching import load_images
+
+    images = []
+    for image in load_images(folder, count):
+        factor = min(TILING_SHORTEST_EDGE / min(image.size), TILING_LONGEST_EDGE / max(image.size))
+        if folder is None:
+            # Las sintéticas son de 1024x768: se amplían para simular una foto de móvil reducida
+            factor = TILING_LONGEST_EDGE / max(image.size)
+        size = (round(image.width * factor), round(image.height * factor))
+        images.append(image.resize(size, Image.BILINEAR) if size != image.size else image)
+    return images
+
+
+def _run_case(case: str, folder: str | None, count: int, repeat: int, tile_size: int, overlap: float, out: mp.Queue) -> None:
+    from detection.grounding_dino import GroundingDinoDetector
+    from detection.tiling import TileSpec
+
+    images = _load(folder, count)
+    detector = GroundingDinoDetector()
+    detector.load_model()
+    if case == "una pasada (res. efectiva)":
+        # Misma resolución que ven las teselas (tesela de tile_size → lado corto 800 del processor)
+        detector._processor.image_processor.size = {
+            "shortest_edge": TILING_SHORTEST_EDGE,
+            "longest_edge": TILING_LONGEST_EDGE,
+        }
+    tiling = TileSpec(tile_size=tile_size, overlap=overlap, include_full=case == "teselas + vista completa")
+
+    def run(image):
+        if case.startswith("teselas"):
+            return detector.detect_tiled(image, text_prompts=INGREDIENTS_LIST, tiling=tiling)
+        return detector.detect(image, text_prompts=INGREDIENTS_LIST)
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # con el modelo ya cargado
+    run(images[0])  # calentamiento
+    times, found, small = [], 0, 0
+    for _ in range(repeat):
+        for image in images:
+            start = time.perf_counter()
+            detections = run(image)
+            times.append((time.perf_counter() - start) * 1000)
+            found += len(detections)
+            area = image.width * image.height
+            small += sum(1 for d in detections if (d["box"][2] - d["box"][0]) * (d["box"][3] - d["box"][1]) < 0.01 * area)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    times.sort()
+    runs = repeat * len(images)
+    out.put((statistics.median(times), times[int(0.95 * (len(times) - 1))], peak / 1024, found / runs, small / runs))
+
+
+def measure(case: str, args: argparse.Namespace) -> tuple[float, float, float, float, float]:
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    p = ctx.Process(
+        target=_run_case,
+        args=(case, args.images, args.count, args.repeat, args.tile_size, args.overlap, out),
+    )
+    p.start()
+    result = out.get()
+    p.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Carpeta con fotos de platos (opcional)")
+    parser.add_argument("--count", type=int, default=2, help="Fotos por ronda")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tile-size", type=int, default=800)
+    parser.add_argument("--overlap", type=float, default=0.2)
+    args = parser.parse_args()
+
+    cases = ["una pasada (800)", "una pasada (res. efectiva)", "teselas", "teselas + vista completa"]
+    print(f"Resolución efectiva: {TILING_SHORTEST_EDGE}/{TILING_LONGEST_EDGE}, teselas de {args.tile_size} px, "
+          f"solape {args.overlap:.0%}\n")
+    print(f"{'caso':<28}{'p50 ms':>9}{'p95 ms':>9}{'pico MB':>9}{'dets':>7}{'pequeñas':>10}")
+    for case in cases:
+        p50, p95, peak, found, small = measure(case, args)
+        print(f"{case:<28}{p50:>9.0f}{p95:>9.0f}{peak:>9.0f}{found:>7.1f}{small:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Memoria pico con subidas grandes concurrentes: camino anterior (`await file.read()` +
+decodificación completa, bytes e imagen vivos hasta responder) vs. la ingesta de
+detection/upload.py (lectura por bloques con tope + decode_image + release de los bytes).
+
+También comprueba los rechazos tempranos:
+- un archivo por encima de DETECTION_MAX_UPLOAD_MB deja de leerse al pasar el tope,
+- un archivo que no es imagen se rechaza en el primer bloque,
+- BodySizeLimitMiddleware responde 413 por Content-Length sin llamar a la app y corta un
+  cuerpo chunked en cuanto supera el límite.
+
+Y que la ingesta no copia la subida: con tracemalloc, read_upload no reserva más que el
+propio buffer (el sondeo de cabecera lee de una vista) y decode_image lee de los mismos bytes.
+
+Cada modo corre en un proceso nuevo para que el pico de RSS sea comparable. Termina con
+código 1 si algún chequeo falla o si el pico de la ingesta supera --budget-mb (por defecto
+se calcula a partir de la concurrencia y del tamaño de las imágenes).
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_upload_memory
+    python -m benchmarks.bench_upload_memory --concurrency 16 --megapixels 48
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+from benchmarks.bench_decode import synthetic_jpeg
+from benchmarks.bench_detect import rss_mb
+from detection.image_io import target_size
+
+
+def _legacy(path: Path, barrier: threading.Barrier) -> None:
+    with open(path, "rb") as f:
+        contents = f.read()
+    image = Image.open(io.BytesIO(contents)).convert("RGB")
+    barrier.wait()  # todas las peticiones en vuelo a la vez, con bytes e imagen vivos
+    del image, contents
+
+
+def _ingest(path: Path, barrier: threading.Barrier) -> None:
+    from detection.image_io import decode_image
+    from detection.upload import read_upload
+
+    with open(path, "rb") as f:
+        upload = read_upload(f)
+    decoded = decode_image(upload.data)
+    upload.release()
+    barrier.wait()
+    del decoded
+
+
+def _run_mode(mode: str, paths: list[str], out: mp.Queue) -> None:
+    handler = _legacy if mode == "anterior" else _ingest
+    if mode != "anterior":
+        import detection.upload  # noqa: F401  (las importaciones no cuentan en el pico)
+    before = rss_mb()["peak_rss_mb"]
+    barrier = threading.Barrier(len(paths))
+    with ThreadPoolExecutor(max_workers=len(paths)) as pool:
+        for fut in [pool.submit(handler, Path(p), barrier) for p in paths]:
+            fut.result()
+    out.put(rss_mb()["peak_rss_mb"] - before)
+
+
+def measure(mode: str, paths: list[Path]) -> float:
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    p = ctx.Process(target=_run_mode, args=(mode, [str(x) for x in paths], out))
+    p.start()
+    result = out.get()
+    p.join()
+    return result
+
+
+class _CountingReader(io.RawIOBase):
+    """Fuente infinita con firma JPEG que cuenta cuántos bytes se le pidieron."""
+
+    def __init__(self):
+        self.read_bytes = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, n: int = -1) -> bytes:
+        n = 64 * 1024 if n is None or n < 0 else n
+        chunk = (b"\xff\xd8\xff\xe0" if self.read_bytes == 0 else b"") + b"\0" * n
+        chunk = chunk[:n]
+        self.read_bytes += len(chunk)
+        return chunk
+
+
+def check_early_rejection() -> list[str]:
+    from detection.upload import (
+        BodySizeLimitMiddleware,
+        InvalidImageError,
+        UploadTooLargeError,
+        read_upload,
+    )
+
+    failures = []
+    limit = 2 * 1024 * 1024
+    src = _CountingReader()
+    try:
+        read_upload(src, max_bytes=limit)
+        failures.append("read_upload aceptó un archivo sin fin")
+    except UploadTooLargeError:
+        if src.read_bytes > limit + 64 * 1024:
+            failures.append(f"read_upload leyó {src.read_bytes} bytes con tope {limit}")
+    except Exception as e:
+        failures.append(f"read_upload (tope) lanzó {type(e).__name__}: {e}")
+
+    try:
+        read_upload(io.BytesIO(b"%PDF-1.7" + b"\0" * 10_000_000), max_bytes=limit)
+        failures.append("read_upload aceptó un PDF")
+    except InvalidImageError:
+        pass
+    except Exception as e:
+        failures.append(f"read_upload (firma) lanzó {type(e).__name__}: {e}")
+
+    async def middleware_checks() -> None:
+        called = False
+
+        async def app(scope, receive, send):
+            nonlocal called
+            called = True
+            while True:
+                message = await receive()
+                if not message.get("more_body"):
+                    break
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        mw = BodySizeLimitMiddleware(app, default_limit=limit)
+        sent: list[dict] = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def no_body():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        scope = {"type": "http", "path": "/detect", "headers": [(b"content-length", str(limit * 10).encode())]}
+        await mw(scope, no_body, send)
+        if called or sent[0]["status"] != 413:
+            failures.append("el middleware no rechazó por Content-Length antes de llamar a la app")
+
+        chunks_sent = 0
+
+        async def endless():
+            nonlocal chunks_sent
+            chunks_sent += 1
+            return {"type": "http.request", "body": b"\0" * 65536, "more_body": True}
+
+        sent.clear()
+        await mw({"type": "http", "path": "/detect", "headers": []}, endless, send)
+        if not sent or sent[0]["status"] != 413:
+            failures.append("el middleware no respondió 413 a un cuerpo chunked demasiado grande")
+        elif chunks_sent * 65536 > limit + 65536:
+            failures.append(f"el middleware siguió leyendo ({chunks_sent * 65536} bytes)")
+
+    asyncio.run(middleware_checks())
+    return failures
+
+
+def check_no_copies(photo: bytes) -> list[str]:
+    from detection.image_io import decode_image
+    from detection.upload import read_upload
+
+    failures = []
+    tracemalloc.start()
+    try:
+        upload = read_upload(io.BytesIO(photo))
+        held, peak = tracemalloc.get_traced_memory()
+        # bytearray crece con sobre-reserva (~1/8); una copia del buffer al sondear la duplicaría
+        if peak > held * 1.25 + 256 * 1024:
+            failures.append(f"read_upload reservó {peak / 1e6:.1f} MB para {held / 1e6:.1f} MB de subida")
+        tracemalloc.reset_peak()
+        decode_image(upload.data)
+        _, peak = tracemalloc.get_traced_memory()
+        if peak - held > len(photo) / 4:
+            failures.append(f"decode_image reservó {(peak - held) / 1e6:.1f} MB (copia de la subida)")
+    finally:
+        tracemalloc.stop()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8, help="Subidas simultáneas")
+    parser.add_argument("--megapixels", type=float, default=12.0, help="Tamaño de cada foto sintética")
+    parser.add_argument("--budget-mb", type=float, default=None, help="Pico máximo aceptado para la ingesta")
+    args = parser.parse_args()
+
+    width = int((args.megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    photo = synthetic_jpeg((width, height))
+    failures = check_early_rejection() + check_no_copies(photo)
+
+    with tempfile.TemporaryDirectory(prefix="bench-upload-") as tmp:
+        paths = []
+        for i in range(args.concurrency):
+            path = Path(tmp) / f"{i}.jpg"
+            # Bytes distintos por foto (como subidas reales distintas)
+            path.write_bytes(photo + os.urandom(16))
+            paths.append(path)
+
+        legacy_mb = measure("anterior", paths)
+        ingest_mb = measure("ingesta", paths)
+
+    file_mb = len(photo) / (1024 * 1024)
+    out_w, out_h = target_size(width, height)
+    decoded_mb = out_w * out_h * 3 / (1024 * 1024)
+    # El modo draft de JPEG decodifica a 1/2, 1/4 o 1/8 sin bajar del objetivo; esa imagen
+    # intermedia convive con la reducida y con los bytes de la subida
+    scale = 1
+    while scale < 8 and width // (scale * 2) >= out_w and height // (scale * 2) >= out_h:
+        scale *= 2
+    draft_mb = (width // scale) * (height // scale) * 3 / (1024 * 1024)
+    budget = args.budget_mb or args.concurrency * (file_mb + draft_mb + decoded_mb) * 1.5 + 32
+
+    print(f"{args.concurrency} subidas de {width}x{height} ({file_mb:.1f} MB cada una)")
+    print(f"{'camino':<12}{'pico RSS MB':>14}")
+    print(f"{'anterior':<12}{legacy_mb:>14.1f}")
+    print(f"{'ingesta':<12}{ingest_mb:>14.1f}   (presupuesto {budget:.0f} MB)")
+
+    if ingest_mb > budget:
+        failures.append(f"pico de la ingesta {ingest_mb:.1f} MB > presupuesto {budget:.0f} MB")
+    for failure in failures:
+        print(f"FALLO: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: rechazos tempranos y memoria pico dentro del presupuesto")
+
+
+if __name__ == "__main__":
+    main()
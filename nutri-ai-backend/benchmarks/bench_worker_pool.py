@@ -0,0 +1,88 @@
+"""
+Benchmark: escalado del pool de procesos (DETECTION_WORKERS) y memoria total.
+
+Para cada número de workers mide throughput con `concurrency` clientes y la memoria
+de padre + workers. RSS cuenta las páginas compartidas una vez por proceso; PSS las
+reparte entre los procesos que las comparten, así que la suma de PSS es la memoria real
+(debería quedar cerca de una sola copia del modelo). Solo Linux (lee /proc).
+
+Uso (desde nutri-ai-backend/):
+    python -m benchmarks.bench_worker_pool --workers 1,2,4 --requests 48
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.bench_batching import load_images
+from detection.config import BOX_THRESHOLD, INGREDIENTS_LIST, TEXT_THRESHOLD
+from detection.grounding_dino import GroundingDinoDetector
+from detection.worker_pool import DetectorPool
+
+
+def memory_kb(pid: int) -> tuple[int, int]:
+    """(rss, pss) en kB de un proceso, desde /proc/<pid>/smaps_rollup."""
+    rss = pss = 0
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Rss:"):
+                rss = int(line.split()[1])
+            elif line.startswith("Pss:"):
+                pss = int(line.split()[1])
+    return rss, pss
+
+
+async def run(pool: DetectorPool, images, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(image) -> None:
+        async with semaphore:
+            await pool.submit(image, INGREDIENTS_LIST, BOX_THRESHOLD, TEXT_THRESHOLD)
+
+    # Warm-up: un forward por worker
+    await asyncio.gather(*(one(images[0]) for _ in range(pool.num_workers)))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(im) for im in images))
+    return time.perf_counter() - start
+
+
+async def bench(num_workers: int, images, concurrency: int, threads: int) -> tuple[float, int, int]:
+    # Cada configuración carga su propia copia en un padre limpio (sin forwards previos)
+    detector = GroundingDinoDetector(device="cpu")
+    detector.load_model()
+    pool = DetectorPool(detector, num_workers=num_workers, threads_per_worker=threads,
+                        max_queue_depth=len(images) + num_workers)
+    pool.start()
+    try:
+        elapsed = await run(pool, images, concurrency)
+        pids = [0] + pool.worker_pids
+        mems = [memory_kb(pid or os.getpid()) for pid in pids]
+    finally:
+        await pool.close()
+    return elapsed, sum(m[0] for m in mems), sum(m[1] for m in mems)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Carpeta con fotos de platos (opcional)")
+    parser.add_argument("--requests", type=int, default=48)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--threads", type=int, default=0, help="Hilos por worker (0 = repartir cores)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.requests)
+    print(f"{'workers':>8}{'img/s':>10}{'escalado':>10}{'RSS total (MB)':>16}{'PSS total (MB)':>16}")
+    base = None
+    for n in (int(x) for x in args.workers.split(",")):
+        elapsed, rss, pss = asyncio.run(bench(n, images, args.concurrency, args.threads))
+        throughput = len(images) / elapsed
+        base = base or throughput
+        print(f"{n:>8}{throughput:>10.2f}{throughput / base:>10.2f}{rss / 1024:>16.0f}{pss / 1024:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
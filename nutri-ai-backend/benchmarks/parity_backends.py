@@ -0,0 +1,67 @@
+"""
+Paridad y latencia de los backends acelerados frente a PyTorch eager fp32.
+
+Para cada backend (int8, onnx) y cada imagen de fixture: IoU de cajas y deriva de score
+respecto a eager, detecciones perdidas/sobrantes y latencia mediana por imagen.
+
+Uso (desde nutri-ai-backend/):
+    python -m detection.export onnx            # una vez, para el backend onnx
+    python -m benchmarks.parity_backends --images fixtures/ --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from detection.export import load_fixture_images
+from detection.grounding_dino import GroundingDinoDetector
+from detection.parity import ParityReport
+
+
+def timed_detect(detector: GroundingDinoDetector, image, repeat: int):
+    latencies = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = detector.detect(image)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Carpeta de imágenes de fixture")
+    parser.add_argument("--backends", default="int8,onnx")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    images = load_fixture_images(args.images)
+    # Sin cache de texto para medir el forward completo en todos los backends
+    eager = GroundingDinoDetector(backend="eager", device="cpu", text_cache_size=0)
+    eager.detect(images[0])  # carga + warm-up
+    references = [timed_detect(eager, im, args.repeat) for im in images]
+    eager_ms = statistics.mean(ms for _, ms in references)
+
+    print(f"{'backend':<8}{'ms/img':>9}{'speedup':>9}{'mean IoU':>10}{'min IoU':>9}{'Δscore':>9}{'perdidas':>10}{'extra':>7}")
+    print(f"{'eager':<8}{eager_ms:>9.1f}{1.0:>9.2f}{'-':>10}{'-':>9}{'-':>9}{'-':>10}{'-':>7}")
+    for name in args.backends.split(","):
+        detector = GroundingDinoDetector(backend=name, device="cpu", text_cache_size=0)
+        detector.detect(images[0])
+        report = ParityReport()
+        latencies = []
+        for image, (reference, _) in zip(images, references):
+            result, ms = timed_detect(detector, image, args.repeat)
+            report.add(reference, result)
+            latencies.append(ms)
+        s = report.summary()
+        ms = statistics.mean(latencies)
+        print(
+            f"{name:<8}{ms:>9.1f}{eager_ms / ms:>9.2f}{s['mean_iou'] or 0:>10.3f}{s['min_iou'] or 0:>9.3f}"
+            f"{s['mean_score_drift'] or 0:>9.3f}{s['missing']:>10}{s['extra']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Almacenamiento de correcciones MLOps (human-in-the-loop) de POST /corrections.
+"""
+
+from corrections.dedup import ImageDeduplicator, ImageIndex
+from corrections.journal import Correction, CorrectionJournal
+from corrections.similar import SimilarImageIndex, SimilarMatch
+from corrections.store import CorrectionStore
+from corrections.sinks import FakeSink, LocalSink, SupabaseSink, create_sink, get_supabase
+from corrections.writer import CorrectionWriter
+
+__all__ = [
+    "Correction",
+    "CorrectionJournal",
+    "CorrectionStore",
+    "CorrectionWriter",
+    "FakeSink",
+    "ImageDeduplicator",
+    "ImageIndex",
+    "LocalSink",
+    "SimilarImageIndex",
+    "SimilarMatch",
+    "SupabaseSink",
+    "create_sink",
+    "get_supabase",
+]
@@ -0,0 +1,76 @@
+"""
+Configuración del almacenamiento de correcciones MLOps (human-in-the-loop).
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+# Supabase (si está configurado, las correcciones se guardan ahí; si no, en local)
+# Acepta SUPABASE_URL o VITE_SUPABASE_URL (mismo valor que el frontend)
+SUPABASE_URL = (
+    os.environ.get("SUPABASE_URL", "").strip()
+    or os.environ.get("VITE_SUPABASE_URL", "").strip()
+)
+# La key debe ser SERVICE_ROLE (no anon): el backend escribe en Storage y en ingredient_corrections
+SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "").strip()
+MLOPS_BUCKET = os.environ.get("MLOPS_BUCKET", "mlops-corrections")
+CORRECTIONS_TABLE = "ingredient_corrections"
+
+# Destino falso en memoria (FakeSink, ver corrections/sinks.py) para pruebas de carga sin red:
+# cada llamada tarda FAKE_SINK_LATENCY_MS y falla con probabilidad FAKE_SINK_ERROR_RATE.
+FAKE_SINK = os.environ.get("MLOPS_FAKE_SINK", "false").strip().lower() in ("1", "true", "yes")
+FAKE_SINK_LATENCY_MS = float(os.environ.get("MLOPS_FAKE_SINK_LATENCY_MS", "80"))
+FAKE_SINK_ERROR_RATE = float(os.environ.get("MLOPS_FAKE_SINK_ERROR_RATE", "0"))
+
+# Directorio local (fallback si no hay Supabase)
+CORRECTIONS_DIR = Path(os.environ.get("MLOPS_CORRECTIONS_DIR", "data/corrections"))
+CORRECTIONS_IMAGES_DIR = CORRECTIONS_DIR / "images"
+# Formato anterior (una línea JSON por corrección); se migra con python -m corrections.import_jsonl
+CORRECTIONS_ANNOTATIONS_FILE = CORRECTIONS_DIR / "annotations.jsonl"
+# Almacén local indexado (ver corrections/store.py)
+CORRECTIONS_DB = Path(os.environ.get("MLOPS_CORRECTIONS_DB", str(CORRECTIONS_DIR / "corrections.db")))
+# PRAGMA synchronous de SQLite: FULL = fsync por lote insertado; NORMAL = solo en checkpoints
+DB_SYNCHRONOUS = os.environ.get("MLOPS_DB_SYNCHRONOUS", "FULL").strip().upper()
+
+# Write-behind (ver corrections/writer.py): POST /corrections escribe en un journal local y
+# responde; un worker sube las imágenes con concurrencia acotada e inserta las filas en bloque.
+JOURNAL_DIR = Path(os.environ.get("MLOPS_JOURNAL_DIR", str(CORRECTIONS_DIR / "journal")))
+UPLOAD_CONCURRENCY = int(os.environ.get("MLOPS_UPLOAD_CONCURRENCY", "4"))
+INSERT_BATCH_SIZE = int(os.environ.get("MLOPS_INSERT_BATCH_SIZE", "50"))
+FLUSH_INTERVAL_MS = float(os.environ.get("MLOPS_FLUSH_INTERVAL_MS", "500"))
+# Reintentos con backoff exponencial (con jitter) entre RETRY_BASE_SECONDS y RETRY_MAX_SECONDS.
+# Un lote que falla RETRY_MAX_ATTEMPTS veces (o con un error permanente) pasa al directorio
+# dead-letter del journal y la cola sigue con los siguientes.
+RETRY_BASE_SECONDS = float(os.environ.get("MLOPS_RETRY_BASE_SECONDS", "1"))
+RETRY_MAX_SECONDS = float(os.environ.get("MLOPS_RETRY_MAX_SECONDS", "60"))
+RETRY_MAX_ATTEMPTS = int(os.environ.get("MLOPS_RETRY_MAX_ATTEMPTS", "8"))
+
+# Imágenes por contenido (ver corrections/dedup.py). NEAR activa además la comparación por dHash
+# (misma foto recomprimida); MAX_DISTANCE es la distancia de Hamming máxima sobre 64 bits.
+DEDUP_NEAR = os.environ.get("MLOPS_DEDUP_NEAR", "false").strip().lower() in ("1", "true", "yes")
+DEDUP_MAX_DISTANCE = int(os.environ.get("MLOPS_DEDUP_MAX_DISTANCE", "4"))
+
+# Búsqueda de platos ya corregidos en /detect (ver corrections/similar.py), desactivada por
+# defecto: si la foto está a distancia dHash ≤ SIMILAR_MAX_DISTANCE de una imagen corregida con la
+# misma relación de aspecto, se devuelven los ingredientes corregidos sin ejecutar el modelo.
+# MAX_SCALE: cuánto puede diferir el tamaño (1 = mismo ancho y alto; 2 = hasta la mitad o el doble).
+# REFRESH_MS: cada cuánto se leen las filas que añadieron otros procesos (varios workers de
+# uvicorn comparten la base).
+SIMILAR_LOOKUP = os.environ.get("MLOPS_SIMILAR_LOOKUP", "false").strip().lower() in ("1", "true", "yes")
+SIMILAR_MAX_DISTANCE = int(os.environ.get("MLOPS_SIMILAR_MAX_DISTANCE", "3"))
+SIMILAR_MAX_SCALE = max(1.0, float(os.environ.get("MLOPS_SIMILAR_MAX_SCALE", "1")))
+SIMILAR_REFRESH_MS = float(os.environ.get("MLOPS_SIMILAR_REFRESH_MS", "1000"))
+
+# Exportación incremental a shards de entrenamiento (ver corrections/export.py)
+EXPORT_DIR = Path(os.environ.get("MLOPS_EXPORT_DIR", "data/export"))
+EXPORT_SHARD_SIZE = int(os.environ.get("MLOPS_EXPORT_SHARD_SIZE", "1000"))
+EXPORT_READ_CONCURRENCY = int(os.environ.get("MLOPS_EXPORT_READ_CONCURRENCY", "8"))
+# En Postgres inserted_seq se asigna al insertar pero las transacciones confirman en cualquier
+# orden: cada exportación desde Supabase vuelve a leer esta ventana detrás de la marca de agua
+# (deduplicando por image_id) para recoger las filas que se confirmaron tarde.
+EXPORT_LAG_ROWS = int(os.environ.get("MLOPS_EXPORT_LAG_ROWS", "1000"))
+# Exportaciones en las que se reintenta una corrección cuya imagen no se pudo leer (error de
+# Storage o de red) antes de darla por perdida; mientras tanto la marca de agua no la pasa.
+EXPORT_READ_RETRIES = int(os.environ.get("MLOPS_EXPORT_READ_RETRIES", "5"))
@@ -0,0 +1,195 @@
+"""
+Almacenamiento de imágenes de corrección por contenido, con deduplicación.
+
+Cada imagen se guarda en el destino como `<sha256>.<ext>`: la misma foto corregida varias
+veces (o reenviada por un reintento) se sube una sola vez y la referencian varias filas.
+Un índice local (tabla `images` en la base SQLite de correcciones) recuerda qué hashes ya
+están en el destino; si no los conoce (contenedor nuevo), se pregunta al destino antes de subir.
+
+Opcionalmente (MLOPS_DEDUP_NEAR=1) se compara además un dHash de 64 bits: una imagen del
+mismo tamaño a distancia de Hamming ≤ MLOPS_DEDUP_MAX_DISTANCE de otra ya guardada (p. ej.
+la misma foto recomprimida) reutiliza ese objeto. Solo se comparan imágenes del mismo
+ancho × alto, para que las cajas de la corrección sigan valiendo sobre la imagen referenciada.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from corrections.config import CORRECTIONS_DB, DEDUP_MAX_DISTANCE, DEDUP_NEAR
+from corrections.journal import Correction, utc_now_iso
+from corrections.store import connect
+
+# Orientaciones EXIF que intercambian ancho y alto (como en detection/image_io.py)
+_SWAPPING_ORIENTATIONS = {5, 6, 7, 8}
+_EXIF_ORIENTATION_TAG = 0x0112
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    sha256      TEXT PRIMARY KEY,
+    object_name TEXT NOT NULL,
+    width       INTEGER,
+    height      INTEGER,
+    dhash       TEXT,
+    bytes       INTEGER NOT NULL DEFAULT 0,
+    created_at  TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_images_size ON images(width, height);
+"""
+
+
+def dhash(image: Any, hash_size: int = 8) -> int:
+    """Difference hash: gris (hash_size+1)×hash_size; cada bit compara un píxel con su vecino derecho."""
+    from PIL import Image
+
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def image_signature(path: Path | BinaryIO) -> tuple[tuple[int, int], int]:
+    """(ancho, alto) orientado según EXIF y dHash de la imagen en `path` (ruta o archivo abierto)."""
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as img:
+        width, height = img.size
+        if img.getexif().get(_EXIF_ORIENTATION_TAG, 1) in _SWAPPING_ORIENTATIONS:
+            width, height = height, width
+        img.draft("RGB", (64, 64))  # JPEG: decodifica ya reducida; el hash no necesita más
+        return (width, height), dhash(ImageOps.exif_transpose(img))
+
+
+class ImageIndex:
+    """Hashes de las imágenes ya guardadas en el destino. Una conexión por hilo."""
+
+    def __init__(self, path: Path = CORRECTIONS_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def get(self, sha256: str) -> str | None:
+        row = self._conn().execute("SELECT object_name FROM images WHERE sha256 = ?", (sha256,)).fetchone()
+        return row[0] if row else None
+
+    def find_near(self, size: tuple[int, int], value: int, max_distance: int) -> str | None:
+        """Objeto del mismo tamaño con dHash más cercano, si está a ≤ max_distance."""
+        best, best_distance = None, max_distance + 1
+        rows = self._conn().execute(
+            "SELECT object_name, dhash FROM images WHERE width = ? AND height = ? AND dhash IS NOT NULL",
+            size,
+        )
+        for object_name, hex_hash in rows:
+            distance = hamming(value, int(hex_hash, 16))
+            if distance < best_distance:
+                best, best_distance = object_name, distance
+        return best
+
+    def add(
+        self,
+        sha256: str,
+        object_name: str,
+        size: tuple[int, int] | None = None,
+        value: int | None = None,
+        nbytes: int = 0,
+    ) -> None:
+        self._conn().execute(
+            "INSERT OR IGNORE INTO images (sha256, object_name, width, height, dhash, bytes, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                sha256,
+                object_name,
+                size[0] if size else None,
+                size[1] if size else None,
+                f"{value:016x}" if value is not None else None,
+                nbytes,
+                utc_now_iso(),
+            ),
+        )
+
+
+@dataclass
+class Resolution:
+    """Objeto que referenciará la corrección y si hace falta subirlo."""
+    object_name: str
+    upload: bool
+    size: tuple[int, int] | None = None
+    dhash: int | None = None
+
+
+class ImageDeduplicator:
+    """
+    Decide a qué objeto apunta cada corrección. Bloqueante (lo llama el writer desde hilos).
+    `sink` debe exponer has_image(object_name) para los hashes que el índice no conoce.
+    """
+
+    def __init__(
+        self,
+        index: ImageIndex,
+        sink: Any,
+        near: bool = DEDUP_NEAR,
+        max_distance: int = DEDUP_MAX_DISTANCE,
+    ):
+        self.index = index
+        self.sink = sink
+        self.near = near
+        self.max_distance = max_distance
+        self.exact_hits = 0
+        self.near_hits = 0
+
+    def resolve(self, correction: Correction, path: Path) -> Resolution:
+        sha = correction.image_sha256
+        if not sha:
+            # Entradas antiguas del journal, sin hash: se guardan por image_id como antes
+            return Resolution(correction.image_name, upload=True)
+        known = self.index.get(sha)
+        if known is not None:
+            self.exact_hits += 1
+            return Resolution(known, upload=False)
+
+        size = value = None
+        if self.near:
+            try:
+                size, value = image_signature(path)
+            except Exception:
+                size = value = None
+            if value is not None:
+                match = self.index.find_near(size, value, self.max_distance)
+                if match is not None:
+                    self.near_hits += 1
+                    self.index.add(sha, match, size, value, path.stat().st_size)
+                    return Resolution(match, upload=False, size=size, dhash=value)
+
+        object_name = f"{sha}.{correction.ext}"
+        if self.sink.has_image(object_name):
+            self.exact_hits += 1
+            self.index.add(sha, object_name, size, value, path.stat().st_size)
+            return Resolution(object_name, upload=False, size=size, dhash=value)
+        return Resolution(object_name, upload=True, size=size, dhash=value)
+
+    def record(self, correction: Correction, path: Path, resolution: Resolution) -> None:
+        """Registra en el índice una imagen recién subida."""
+        if correction.image_sha256:
+            self.index.add(
+                correction.image_sha256, resolution.object_name, resolution.size, resolution.dhash,
+                path.stat().st_size,
+            )
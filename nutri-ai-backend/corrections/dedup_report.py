@@ -0,0 +1,131 @@
+"""
+Informe de deduplicación del dataset de correcciones guardado.
+
+Cuenta filas frente a objetos de imagen distintos (varias filas pueden compartir image_path)
+y, en local, los bytes que ocupan frente a los que ocuparía una copia por fila. Con --near
+agrupa además las imágenes distintas que estarían a distancia dHash ≤ --max-distance
+(mismo tamaño), para estimar cuánto ahorraría MLOPS_DEDUP_NEAR.
+
+Uso (desde nutri-ai-backend/):
+    python -m corrections.dedup_report
+    python -m corrections.dedup_report --near --max-distance 4
+    python -m corrections.dedup_report --source supabase
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterator
+
+from corrections.config import CORRECTIONS_DB, CORRECTIONS_TABLE, DEDUP_MAX_DISTANCE
+from corrections.dedup import hamming, image_signature
+from corrections.sinks import get_supabase
+from corrections.store import CorrectionStore
+
+
+def local_rows(db: Path) -> Iterator[dict[str, Any]]:
+    store = CorrectionStore(db)
+    try:
+        yield from store.iter_range(page_size=10_000)
+    finally:
+        store.close()
+
+
+def supabase_rows(page_size: int = 1000) -> Iterator[dict[str, Any]]:
+    client = get_supabase()
+    if client is None:
+        raise SystemExit("Supabase no configurado (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY)")
+    start = 0
+    while True:
+        page = (
+            client.table(CORRECTIONS_TABLE)
+            .select("image_id, image_path, image_sha256")
+            .order("created_at")
+            .range(start, start + page_size - 1)
+            .execute()
+            .data
+        )
+        yield from page
+        if len(page) < page_size:
+            return
+        start += page_size
+
+
+def near_groups(paths: list[Path], max_distance: int) -> int:
+    """Cuántas imágenes distintas se reutilizarían con la comparación por dHash (greedy, como el writer)."""
+    kept: dict[tuple[int, int], list[int]] = {}
+    merged = 0
+    for path in paths:
+        try:
+            size, value = image_signature(path)
+        except Exception:
+            continue
+        same_size = kept.setdefault(size, [])
+        if any(hamming(value, other) <= max_distance for other in same_size):
+            merged += 1
+        else:
+            same_size.append(value)
+    return merged
+
+
+def report(rows: Iterator[dict[str, Any]], local: bool, near: bool, max_distance: int) -> dict[str, Any]:
+    refs: Counter[str] = Counter()
+    hashed = 0
+    for row in rows:
+        refs[row["image_path"]] += 1
+        hashed += bool(row.get("image_sha256"))
+    total = sum(refs.values())
+    result: dict[str, Any] = {
+        "rows": total,
+        "rows_with_sha256": hashed,
+        "unique_images": len(refs),
+        "dedup_ratio": total / len(refs) if refs else 1.0,
+    }
+    if local:
+        sizes = {p: Path(p).stat().st_size for p in refs if Path(p).exists()}
+        stored = sum(sizes.values())
+        per_row = sum(sizes[p] * n for p, n in refs.items() if p in sizes)
+        result.update(
+            missing_images=len(refs) - len(sizes),
+            stored_bytes=stored,
+            bytes_without_dedup=per_row,
+            bytes_saved=per_row - stored,
+        )
+        if near:
+            result["near_duplicates"] = near_groups([Path(p) for p in sizes], max_distance)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=["local", "supabase"], default="local")
+    parser.add_argument("--db", type=Path, default=CORRECTIONS_DB)
+    parser.add_argument("--near", action="store_true", help="Estimar además duplicados por dHash (solo local)")
+    parser.add_argument("--max-distance", type=int, default=DEDUP_MAX_DISTANCE)
+    args = parser.parse_args()
+
+    if args.source == "local":
+        if not args.db.exists():
+            raise SystemExit(f"No existe {args.db}")
+        rows = local_rows(args.db)
+    else:
+        rows = supabase_rows()
+    result = report(rows, local=args.source == "local", near=args.near, max_distance=args.max_distance)
+
+    print(f"[MLOps] Filas: {result['rows']} ({result['rows_with_sha256']} con image_sha256)")
+    print(f"[MLOps] Imágenes distintas: {result['unique_images']}  ratio filas/imagen: {result['dedup_ratio']:.2f}")
+    if "stored_bytes" in result:
+        print(
+            f"[MLOps] Bytes guardados: {result['stored_bytes']:,}  sin deduplicar: {result['bytes_without_dedup']:,}  "
+            f"ahorro: {result['bytes_saved']:,}"
+        )
+        if result["missing_images"]:
+            print(f"[MLOps] Imágenes referenciadas que no están en disco: {result['missing_images']}")
+    if "near_duplicates" in result:
+        print(f"[MLOps] Casi duplicadas (dHash ≤ {args.max_distance}): {result['near_duplicates']} imágenes más")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,568 @@
+"""
+Exportación incremental de las correcciones a un dataset de entrenamiento por shards.
+
+Lee las correcciones en orden de inserción (inserted_seq, ver corrections/store.py y
+supabase/supabase-migration-mlops-export-seq.sql) a partir de una marca de agua guardada en
+`<out>/export_state.json` y las escribe en archivos tar de hasta --shard-size correcciones:
+
+    shard-000000.tar
+        images/<sha256>.<ext>          una vez por imagen distinta dentro del shard
+        annotations.coco.json          COCO (bbox [x, y, w, h] en píxeles)
+        annotations.odvg.jsonl         ODVG (Grounding DINO: bbox [x0, y0, x1, y1] en píxeles)
+
+Las cajas de corrected_ingredients se aceptan en píxeles o normalizadas 0-1 y se resuelven a
+píxeles con el tamaño de la imagen (orientada según EXIF; si hace falta rotarla, se reescribe).
+Las categorías tienen ids estables entre shards (`label_map.json`). Solo se exportan correcciones
+con consentimiento; por defecto, solo las que tienen al menos una caja.
+
+La marca de agua no es created_at: el writer write-behind guarda cada corrección por lotes y
+con reintentos, y una fila puede llegar al destino mucho después de su created_at (o tras un
+reinicio). Por orden de inserción esas filas quedan detrás de la marca y se exportan en la
+siguiente ejecución. En Supabase las transacciones pueden confirmarse fuera de orden, así que
+se vuelve a leer una ventana de MLOPS_EXPORT_LAG_ROWS detrás de la marca y se omiten los
+image_id ya vistos (guardados en el estado).
+
+Si la imagen de una corrección no se puede leer (error pasajero de Storage o de red), la marca de
+agua se detiene justo antes de ella: la siguiente ejecución la vuelve a leer, y las filas
+posteriores ya exportadas quedan en `recent` para no duplicarlas. Tras MLOPS_EXPORT_READ_RETRIES
+ejecuciones fallando, la corrección se da por perdida (se informa) y la marca sigue.
+
+Streaming: las filas se paginan por clave y las imágenes se leen con una ventana acotada de
+hilos; en memoria solo está el shard en curso. Un shard se escribe a un temporal y se renombra
+antes de avanzar la marca de agua: volver a ejecutar solo añade shards nuevos, y si se corta a
+mitad se rehace el mismo shard.
+
+Uso (desde nutri-ai-backend/):
+    python -m corrections.export --out data/export
+    python -m corrections.export --source supabase --shard-size 500 --concurrency 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import tarfile
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+from corrections.config import (
+    CORRECTIONS_DB,
+    CORRECTIONS_TABLE,
+    EXPORT_DIR,
+    EXPORT_LAG_ROWS,
+    EXPORT_READ_CONCURRENCY,
+    EXPORT_READ_RETRIES,
+    EXPORT_SHARD_SIZE,
+    MLOPS_BUCKET,
+)
+from corrections.sinks import FakeSink, get_supabase
+from corrections.store import CorrectionStore
+
+STATE_FILE = "export_state.json"
+LABEL_MAP_FILE = "label_map.json"
+
+_EXIF_ORIENTATION_TAG = 0x0112
+_FORMAT_EXT = {"JPEG": "jpg", "MPO": "jpg", "PNG": "png", "WEBP": "webp", "BMP": "bmp"}
+# Cajas más pequeñas que esto (en píxeles, tras recortar a la imagen) se descartan
+_MIN_BOX_SIDE = 1.0
+
+
+@dataclass
+class ExportRecord:
+    image_id: str
+    image_path: str
+    corrected: list[dict[str, Any]]
+    created_at: str
+    consent: bool = True
+    seq: int = 0  # inserted_seq: orden de inserción en el destino
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    ext: str
+    width: int
+    height: int
+
+    @property
+    def file_name(self) -> str:
+        return f"images/{hashlib.sha256(self.data).hexdigest()}.{self.ext}"
+
+
+# --- Orígenes -------------------------------------------------------------------------------
+
+
+class LocalSource:
+    """Almacén SQLite local (corrections/store.py); image_path es un archivo en disco."""
+
+    name = "local"
+    # inserted_seq se asigna con el lock de escritura tomado: crece en orden de confirmación
+    lag = 0
+
+    def __init__(self, store: CorrectionStore):
+        self.store = store
+
+    def records(self, after: int, page_size: int = 1000) -> Iterator[ExportRecord]:
+        for row in self.store.iter_inserted(after, page_size=page_size):
+            yield ExportRecord(
+                row["image_id"], row["image_path"], row["corrected"], row["created_at"], row["consent"], row["inserted_seq"]
+            )
+
+    def resume_seq(self, created_at: str, image_id: str) -> int:
+        return self.store.seq_after_key(created_at, image_id)
+
+    def read_image(self, record: ExportRecord) -> bytes:
+        return Path(record.image_path).read_bytes()
+
+
+class SupabaseSource:
+    """Tabla ingredient_corrections + bucket de Storage, paginados por inserted_seq."""
+
+    name = "supabase"
+
+    def __init__(
+        self,
+        client: Any,
+        bucket: str = MLOPS_BUCKET,
+        table: str = CORRECTIONS_TABLE,
+        lag: int = EXPORT_LAG_ROWS,
+    ):
+        self._client = client
+        self.bucket = bucket
+        self.table = table
+        self.lag = lag
+
+    def records(self, after: int, page_size: int = 1000) -> Iterator[ExportRecord]:
+        cursor = after
+        while True:
+            page = (
+                self._client.table(self.table)
+                .select("image_id, image_path, corrected_ingredients, consent, created_at, inserted_seq")
+                .gt("inserted_seq", cursor)
+                .order("inserted_seq")
+                .limit(page_size)
+                .execute()
+                .data
+                or []
+            )
+            for row in page:
+                yield ExportRecord(
+                    str(row["image_id"]),
+                    row["image_path"],
+                    row.get("corrected_ingredients") or [],
+                    row["created_at"],
+                    bool(row.get("consent", True)),
+                    int(row["inserted_seq"]),
+                )
+            if len(page) < page_size:
+                return
+            cursor = int(page[-1]["inserted_seq"])
+
+    def resume_seq(self, created_at: str, image_id: str) -> int:
+        table = self._client.table(self.table)
+        first = (
+            table.select("inserted_seq")
+            .or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",image_id.gt.{image_id})')
+            .order("inserted_seq")
+            .limit(1)
+            .execute()
+            .data
+        )
+        if first:
+            return int(first[0]["inserted_seq"]) - 1
+        last = table.select("inserted_seq").order("inserted_seq", desc=True).limit(1).execute().data
+        return int(last[0]["inserted_seq"]) if last else 0
+
+    def read_image(self, record: ExportRecord) -> bytes:
+        prefix = f"{self.bucket}/"
+        name = record.image_path[len(prefix):] if record.image_path.startswith(prefix) else record.image_path
+        return self._client.storage.from_(self.bucket).download(name)
+
+
+class FakeSource:
+    """Sustituto local de Supabase sobre un FakeSink (filas con el formato de la tabla)."""
+
+    name = "fake"
+    lag = 0
+
+    def __init__(self, sink: FakeSink):
+        self.sink = sink
+
+    def records(self, after: int, page_size: int = 1000) -> Iterator[ExportRecord]:
+        for row in sorted(self.sink.rows.values(), key=lambda r: r["inserted_seq"]):
+            if row["inserted_seq"] > after:
+                yield ExportRecord(
+                    row["image_id"],
+                    row["image_path"],
+                    row["corrected_ingredients"],
+                    row["created_at"],
+                    row["consent"],
+                    row["inserted_seq"],
+                )
+
+    def resume_seq(self, created_at: str, image_id: str) -> int:
+        rows = list(self.sink.rows.values())
+        later = [r["inserted_seq"] for r in rows if (r["created_at"], r["image_id"]) > (created_at, image_id)]
+        if later:
+            return min(later) - 1
+        return max((r["inserted_seq"] for r in rows), default=0)
+
+    def read_image(self, record: ExportRecord) -> bytes:
+        return self.sink.objects[record.image_path.split("/", 1)[1]]
+
+
+# --- Imágenes y cajas -----------------------------------------------------------------------
+
+
+def prepare_image(data: bytes) -> PreparedImage:
+    """Tamaño orientado de la imagen; si EXIF la rota, se reescribe ya orientada (las cajas son sobre esa vista)."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as img:
+        fmt = img.format
+        if img.getexif().get(_EXIF_ORIENTATION_TAG, 1) in (1, None) and fmt in _FORMAT_EXT:
+            return PreparedImage(data, _FORMAT_EXT[fmt], img.width, img.height)
+        oriented = ImageOps.exif_transpose(img).convert("RGB")
+    buf = io.BytesIO()
+    oriented.save(buf, format="JPEG", quality=95)
+    return PreparedImage(buf.getvalue(), "jpg", oriented.width, oriented.height)
+
+
+def resolve_box(box: Any, width: int, height: int) -> list[float] | None:
+    """[x0, y0, x1, y1] en píxeles, recortada a la imagen; acepta coordenadas normalizadas 0-1."""
+    if not isinstance(box, (list, tuple)) or len(box) != 4:
+        return None
+    try:
+        x0, y0, x1, y1 = (float(v) for v in box)
+    except (TypeError, ValueError):
+        return None
+    if max(abs(x0), abs(y0), abs(x1), abs(y1)) <= 1.0:
+        x0, x1 = x0 * width, x1 * width
+        y0, y1 = y0 * height, y1 * height
+    x0, x1 = sorted((min(max(x0, 0.0), width), min(max(x1, 0.0), width)))
+    y0, y1 = sorted((min(max(y0, 0.0), height), min(max(y1, 0.0), height)))
+    if x1 - x0 < _MIN_BOX_SIDE or y1 - y0 < _MIN_BOX_SIDE:
+        return None
+    return [round(x0, 2), round(y0, 2), round(x1, 2), round(y1, 2)]
+
+
+def read_ahead(
+    records: Iterable[ExportRecord],
+    load: Callable[[ExportRecord], PreparedImage],
+    concurrency: int,
+) -> Iterator[tuple[ExportRecord, PreparedImage | Exception]]:
+    """Aplica `load` en hilos con como mucho 2×concurrency lecturas en vuelo, manteniendo el orden."""
+    window: deque[tuple[ExportRecord, Future]] = deque()
+
+    def take() -> tuple[ExportRecord, PreparedImage | Exception]:
+        record, future = window.popleft()
+        try:
+            return record, future.result()
+        except Exception as e:
+            return record, e
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for record in records:
+            window.append((record, pool.submit(load, record)))
+            if len(window) >= 2 * max(1, concurrency):
+                yield take()
+        while window:
+            yield take()
+
+
+# --- Shards y estado ------------------------------------------------------------------------
+
+
+@dataclass
+class ExportState:
+    source: str | None = None
+    watermark: int = 0  # último inserted_seq procesado
+    next_shard: int = 0
+    categories: list[str] = field(default_factory=list)
+    exported: int = 0
+    shards: list[dict[str, Any]] = field(default_factory=list)
+    # image_id → inserted_seq de las filas ya procesadas dentro de la ventana de re-lectura
+    recent: dict[str, int] = field(default_factory=dict)
+    # image_id → ejecuciones en las que su imagen no se pudo leer (se reintenta hasta EXPORT_READ_RETRIES)
+    failed: dict[str, int] = field(default_factory=dict)
+    # Marca de agua de versiones anteriores, por (created_at, image_id): se convierte al exportar
+    legacy_watermark: tuple[str, str] | None = None
+
+    @classmethod
+    def load(cls, out: Path) -> ExportState:
+        try:
+            data = json.loads((out / STATE_FILE).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls()
+        watermark = data.get("watermark")
+        legacy = (watermark["created_at"], watermark["image_id"]) if isinstance(watermark, dict) else None
+        return cls(
+            source=data.get("source"),
+            watermark=watermark if isinstance(watermark, int) else 0,
+            next_shard=data.get("next_shard", 0),
+            categories=data.get("categories", []),
+            exported=data.get("exported", 0),
+            shards=data.get("shards", []),
+            recent=data.get("recent", {}),
+            failed=data.get("failed", {}),
+            legacy_watermark=legacy,
+        )
+
+    def save(self, out: Path) -> None:
+        data = {
+            "source": self.source,
+            "watermark": self.watermark,
+            "next_shard": self.next_shard,
+            "categories": self.categories,
+            "exported": self.exported,
+            "shards": self.shards,
+            "recent": self.recent,
+            "failed": self.failed,
+        }
+        _write_atomic(out / LABEL_MAP_FILE, {str(i): name for i, name in enumerate(self.categories)})
+        _write_atomic(out / STATE_FILE, data)
+
+    def category_id(self, label: str) -> int:
+        """Id 0-based estable entre shards (ODVG); en COCO se usa id + 1."""
+        try:
+            return self.categories.index(label)
+        except ValueError:
+            self.categories.append(label)
+            return len(self.categories) - 1
+
+
+def _write_atomic(path: Path, data: Any) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(data))
+
+
+class ShardWriter:
+    """Un tar en escritura: imágenes a medida que llegan, anotaciones al cerrar."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._tmp = path.with_name(path.name + ".tmp")
+        self._tar = tarfile.open(self._tmp, "w")
+        self._files: set[str] = set()
+        self.images: list[dict[str, Any]] = []
+        self.annotations: list[dict[str, Any]] = []
+        self.odvg: list[str] = []
+        self.first: int | None = None
+
+    def add(self, record: ExportRecord, image: PreparedImage, instances: list[dict[str, Any]]) -> None:
+        name = image.file_name
+        if name not in self._files:
+            _add_bytes(self._tar, name, image.data)
+            self._files.add(name)
+        if self.first is None:
+            self.first = record.seq
+        coco_id = len(self.images) + 1
+        self.images.append({
+            "id": coco_id,
+            "file_name": name,
+            "width": image.width,
+            "height": image.height,
+            "correction_id": record.image_id,
+            "created_at": record.created_at,
+        })
+        for inst in instances:
+            x0, y0, x1, y1 = inst["bbox"]
+            self.annotations.append({
+                "id": len(self.annotations) + 1,
+                "image_id": coco_id,
+                "category_id": inst["label"] + 1,
+                "bbox": [x0, y0, round(x1 - x0, 2), round(y1 - y0, 2)],
+                "area": round((x1 - x0) * (y1 - y0), 2),
+                "iscrowd": 0,
+            })
+        self.odvg.append(json.dumps({
+            "filename": name,
+            "height": image.height,
+            "width": image.width,
+            "detection": {"instances": instances},
+        }, ensure_ascii=False))
+
+    def __len__(self) -> int:
+        return len(self.images)
+
+    def close(self, categories: list[str]) -> dict[str, Any]:
+        coco = {
+            "images": self.images,
+            "annotations": self.annotations,
+            "categories": [{"id": i + 1, "name": name} for i, name in enumerate(categories)],
+        }
+        _add_bytes(self._tar, "annotations.coco.json", json.dumps(coco, ensure_ascii=False).encode("utf-8"))
+        _add_bytes(self._tar, "annotations.odvg.jsonl", ("\n".join(self.odvg) + "\n").encode("utf-8"))
+        self._tar.close()
+        with open(self._tmp, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(self._tmp, self.path)
+        return {
+            "name": self.path.name,
+            "records": len(self.images),
+            "images": len(self._files),
+            "boxes": len(self.annotations),
+        }
+
+    def abort(self) -> None:
+        self._tar.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+# Resultado de load() para una fila ya procesada en una exportación anterior
+_ALREADY_SEEN = object()
+
+
+def export_corrections(
+    source: Any,
+    out: Path = EXPORT_DIR,
+    shard_size: int = EXPORT_SHARD_SIZE,
+    concurrency: int = EXPORT_READ_CONCURRENCY,
+    include_unboxed: bool = False,
+    read_retries: int = EXPORT_READ_RETRIES,
+) -> list[dict[str, Any]]:
+    """Exporta lo nuevo desde la marca de agua de `out`. Devuelve los shards escritos."""
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    state = ExportState.load(out)
+    if state.source and state.source != source.name:
+        print(f"[MLOps] Aviso: {out} se exportó desde '{state.source}', ahora desde '{source.name}'")
+    state.source = source.name
+    if state.legacy_watermark is not None:
+        state.watermark = source.resume_seq(*state.legacy_watermark)
+        state.legacy_watermark = None
+    lag = max(0, getattr(source, "lag", 0))
+
+    written: list[dict[str, Any]] = []
+    shard: ShardWriter | None = None
+    last_seq = state.watermark
+    hold: int | None = None  # seq de la primera imagen ilegible que se reintentará: la marca no la pasa
+    seen: dict[str, int] = {}  # procesadas desde el último commit
+    skipped = 0
+
+    def commit() -> None:
+        nonlocal shard
+        if shard is not None:
+            info = shard.close(state.categories)
+            info.update(first=shard.first, last=last_seq)
+            state.shards.append(info)
+            state.next_shard += 1
+            state.exported += info["records"]
+            written.append(info)
+            shard = None
+        state.watermark = last_seq if hold is None else min(last_seq, hold - 1)
+        # Por encima de la marca quedan todas las procesadas: al releer desde ella no se duplican
+        state.recent = {i: q for i, q in {**state.recent, **seen}.items() if q > state.watermark - lag}
+        seen.clear()
+        state.save(out)
+
+    # Con lag > 0 (o tras una imagen ilegible) se relee desde detrás de la marca: las filas ya
+    # vistas no se vuelven a leer ni exportar, pero sí hacen avanzar la marca
+    records = source.records(max(0, state.watermark - lag))
+    recent = state.recent
+
+    def load(record: ExportRecord) -> PreparedImage | object | None:
+        if record.image_id in recent:
+            return _ALREADY_SEEN
+        return prepare_image(source.read_image(record)) if record.consent else None
+
+    try:
+        for record, image in read_ahead(records, load, concurrency):
+            last_seq = max(last_seq, record.seq)
+            if image is _ALREADY_SEEN:
+                continue
+            if isinstance(image, Exception):
+                skipped += 1
+                attempts = state.failed.get(record.image_id, 0) + 1
+                if attempts < read_retries:
+                    state.failed[record.image_id] = attempts
+                    hold = record.seq if hold is None else min(hold, record.seq)
+                    print(
+                        f"[MLOps] No se pudo leer la imagen de {record.image_id} ({record.image_path}): {image} "
+                        f"→ se reintenta en la próxima exportación ({attempts}/{read_retries})"
+                    )
+                else:
+                    state.failed.pop(record.image_id, None)
+                    seen[record.image_id] = record.seq
+                    print(
+                        f"[MLOps] No se pudo leer la imagen de {record.image_id} ({record.image_path}) "
+                        f"en {attempts} exportaciones: {image} → se omite definitivamente"
+                    )
+                continue
+            seen[record.image_id] = record.seq
+            state.failed.pop(record.image_id, None)
+            if image is None:
+                continue  # sin consentimiento
+            instances = []
+            for item in record.corrected:
+                bbox = resolve_box(item.get("box"), image.width, image.height) if isinstance(item, dict) else None
+                if bbox is not None and str(item.get("label", "")).strip():
+                    label = str(item["label"]).strip()
+                    instances.append({"bbox": bbox, "label": state.category_id(label), "category": label})
+            if not instances and not include_unboxed:
+                continue
+            if shard is None:
+                shard = ShardWriter(out / f"shard-{state.next_shard:06d}.tar")
+            shard.add(record, image, instances)
+            if len(shard) >= shard_size:
+                commit()
+    except BaseException:
+        if shard is not None:
+            shard.abort()
+        raise
+    if shard is not None or seen or hold is not None:
+        commit()
+    if skipped:
+        print(f"[MLOps] {skipped} correcciones omitidas por imágenes ilegibles")
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=["local", "supabase"], default="local")
+    parser.add_argument("--db", type=Path, default=CORRECTIONS_DB, help="Base SQLite (--source local)")
+    parser.add_argument("--out", type=Path, default=EXPORT_DIR)
+    parser.add_argument("--shard-size", type=int, default=EXPORT_SHARD_SIZE)
+    parser.add_argument("--concurrency", type=int, default=EXPORT_READ_CONCURRENCY, help="Lecturas de imágenes en paralelo")
+    parser.add_argument("--include-unboxed", action="store_true", help="Exportar también correcciones sin cajas")
+    args = parser.parse_args()
+
+    if args.source == "local":
+        if not args.db.exists():
+            raise SystemExit(f"No existe {args.db}")
+        source: Any = LocalSource(CorrectionStore(args.db))
+    else:
+        client = get_supabase()
+        if client is None:
+            raise SystemExit("Supabase no configurado (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY)")
+        source = SupabaseSource(client)
+
+    start = time.perf_counter()
+    shards = export_corrections(source, args.out, args.shard_size, args.concurrency, args.include_unboxed)
+    records = sum(s["records"] for s in shards)
+    print(f"[MLOps] {len(shards)} shards nuevos, {records} correcciones en {time.perf_counter() - start:.1f}s → {args.out}")
+    state = ExportState.load(args.out)
+    if state.watermark:
+        print(f"[MLOps] Marca de agua: inserted_seq {state.watermark}")
+
+
+if __name__ == "__main__":
+    main()
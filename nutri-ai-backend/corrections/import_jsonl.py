@@ -0,0 +1,85 @@
+"""
+Migra annotations.jsonl (formato local anterior) al almacén SQLite de correcciones.
+
+Lee el archivo línea a línea e inserta por lotes; los image_id ya presentes se ignoran, así
+que se puede volver a ejecutar sin duplicar. Las líneas antiguas no tienen created_at: se usa
+la fecha de modificación de la imagen, o la del archivo si la imagen no existe.
+
+Uso (desde nutri-ai-backend/):
+    python -m corrections.import_jsonl
+    python -m corrections.import_jsonl --annotations otro/annotations.jsonl --db data/corrections/corrections.db
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from corrections.config import CORRECTIONS_ANNOTATIONS_FILE, CORRECTIONS_DB
+from corrections.store import CorrectionStore
+
+
+def _mtime_iso(path: Path) -> str | None:
+    try:
+        return datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc).isoformat()
+    except OSError:
+        return None
+
+
+def read_annotations(path: Path) -> Iterator[dict[str, Any]]:
+    """Registros válidos del JSONL (las líneas corruptas se informan y se saltan)."""
+    fallback_ts = _mtime_iso(path) or datetime.now(timezone.utc).isoformat()
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"[MLOps] Línea {lineno} inválida, se omite: {e}")
+                continue
+            if not isinstance(record, dict) or not record.get("image_id") or not record.get("image_path"):
+                print(f"[MLOps] Línea {lineno} sin image_id/image_path, se omite")
+                continue
+            record.setdefault("created_at", _mtime_iso(Path(record["image_path"])) or fallback_ts)
+            yield record
+
+
+def import_annotations(path: Path, store: CorrectionStore, batch_size: int = 1000) -> tuple[int, int]:
+    """Importa `path` en `store`. Devuelve (leídas, insertadas)."""
+    read = inserted = 0
+    batch: list[dict[str, Any]] = []
+    for record in read_annotations(path):
+        batch.append(record)
+        read += 1
+        if len(batch) >= batch_size:
+            inserted += store.insert_many(batch)
+            batch = []
+    if batch:
+        inserted += store.insert_many(batch)
+    store.checkpoint()
+    return read, inserted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--annotations", type=Path, default=CORRECTIONS_ANNOTATIONS_FILE)
+    parser.add_argument("--db", type=Path, default=CORRECTIONS_DB)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    if not args.annotations.exists():
+        raise SystemExit(f"No existe {args.annotations}")
+    store = CorrectionStore(args.db)
+    read, inserted = import_annotations(args.annotations, store, args.batch_size)
+    print(f"[MLOps] {read} registros leídos de {args.annotations}, {inserted} nuevos en {args.db}")
+    print(f"[MLOps] Total en el almacén: {store.count()}")
+
+
+if __name__ == "__main__":
+    main()
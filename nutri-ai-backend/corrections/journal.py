@@ -0,0 +1,193 @@
+"""
+Journal local de correcciones pendientes de persistir.
+
+Cada corrección es un par de archivos en JOURNAL_DIR: la imagen (`<image_id>.<ext>`) y el
+registro (`<image_id>.json`). Ambos se escriben a un temporal, se hace fsync y se renombran;
+el registro va último, así una entrada existe solo si está completa. Sobrevive a reinicios:
+al arrancar, el writer vuelve a encolar todo lo que siga en el journal.
+
+Las entradas que el writer no consigue persistir (error permanente o demasiados intentos) se
+mueven a JOURNAL_DIR/dead-letter/ con el error en el registro. Ahí no se vuelven a encolar;
+para reintentarlas, moverlas de vuelta al journal y reiniciar.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class Correction:
+    """Una corrección human-in-the-loop, independiente del destino (Supabase o local)."""
+    image_id: str
+    ext: str
+    content_type: str
+    detected: list[dict[str, Any]]
+    corrected: list[dict[str, Any]]
+    consent: bool = True
+    created_at: str = field(default_factory=utc_now_iso)
+    image_sha256: str | None = None
+    # Objeto de imagen que referencia la fila; lo resuelve el writer (ver corrections/dedup.py)
+    image_object: str | None = None
+
+    @property
+    def image_name(self) -> str:
+        """Nombre de la imagen dentro del journal (uno por corrección)."""
+        return f"{self.image_id}.{self.ext}"
+
+    @property
+    def object_name(self) -> str:
+        """Nombre en el destino: por contenido si hay hash, así la misma foto se guarda una vez."""
+        if self.image_object:
+            return self.image_object
+        if self.image_sha256:
+            return f"{self.image_sha256}.{self.ext}"
+        return self.image_name
+
+
+@dataclass
+class JournalEntry:
+    correction: Correction
+    image_path: Path
+    uploaded: bool = False
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class CorrectionJournal:
+    """Spool duradero en disco. Los métodos son bloqueantes: llamarlos con asyncio.to_thread."""
+
+    ORPHAN_AGE_SECONDS = 300
+    DEAD_LETTER = "dead-letter"
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.dead_letter_dir = self.directory / self.DEAD_LETTER
+        self._lock = threading.Lock()
+
+    def _record_path(self, image_id: str) -> Path:
+        return self.directory / f"{image_id}.json"
+
+    def write(self, correction: Correction, image: bytes | bytearray) -> None:
+        """Persiste imagen + registro (fsync) antes de devolver."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.directory / correction.image_name, bytes(image))
+        record = {"correction": asdict(correction), "uploaded": False}
+        _write_atomic(self._record_path(correction.image_id), json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        _fsync_dir(self.directory)
+
+    def load(self, image_id: str) -> JournalEntry | None:
+        try:
+            record = json.loads(self._record_path(image_id).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+        correction = Correction(**record["correction"])
+        return JournalEntry(
+            correction=correction,
+            image_path=self.directory / correction.image_name,
+            uploaded=bool(record.get("uploaded")),
+        )
+
+    def mark_uploaded(self, entry: JournalEntry) -> None:
+        """La imagen ya está en el destino (con su image_object resuelto): un reintento solo repite el insert."""
+        entry.uploaded = True
+        record = {"correction": asdict(entry.correction), "uploaded": True}
+        with self._lock:
+            _write_atomic(self._record_path(entry.correction.image_id), json.dumps(record, ensure_ascii=False).encode("utf-8"))
+
+    def remove(self, entry: JournalEntry) -> None:
+        # Primero el registro: si se corta aquí, la imagen huérfana se limpia en pending_ids
+        self._record_path(entry.correction.image_id).unlink(missing_ok=True)
+        entry.image_path.unlink(missing_ok=True)
+
+    def dead_letter(self, image_id: str, error: str, attempts: int) -> bool:
+        """
+        Mueve la entrada al directorio dead-letter, con el error y los intentos en el registro.
+        Primero la imagen y después el registro: si se corta a mitad, la entrada sigue en el
+        journal (sin imagen) y vuelve a fallar hasta llegar aquí. False si ya no existía.
+        """
+        record_path = self._record_path(image_id)
+        try:
+            record = json.loads(record_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return False
+        except (OSError, json.JSONDecodeError):
+            record = {"correction": {"image_id": image_id}}
+        self.dead_letter_dir.mkdir(parents=True, exist_ok=True)
+        ext = record.get("correction", {}).get("ext")
+        if ext:
+            image_path = self.directory / f"{image_id}.{ext}"
+            if image_path.exists():
+                os.replace(image_path, self.dead_letter_dir / image_path.name)
+        record.update(error=error, attempts=attempts, dead_lettered_at=utc_now_iso())
+        with self._lock:
+            _write_atomic(
+                self.dead_letter_dir / record_path.name,
+                json.dumps(record, ensure_ascii=False).encode("utf-8"),
+            )
+            record_path.unlink(missing_ok=True)
+        _fsync_dir(self.dead_letter_dir)
+        _fsync_dir(self.directory)
+        return True
+
+    def dead_letter_count(self) -> int:
+        if not self.dead_letter_dir.exists():
+            return 0
+        return sum(1 for path in self.dead_letter_dir.iterdir() if path.suffix == ".json")
+
+    def pending_ids(self) -> list[str]:
+        """
+        Entradas completas, de la más antigua a la más nueva. Borra temporales e imágenes sin
+        registro de más de ORPHAN_AGE_SECONDS (escrituras cortadas; las recientes pueden ser
+        de otro proceso que está escribiendo ahora mismo).
+        """
+        if not self.directory.exists():
+            return []
+        records = []
+        referenced: set[str] = set()
+        orphan_before = time.time() - self.ORPHAN_AGE_SECONDS
+        paths = [p for p in self.directory.iterdir() if p.name != self.DEAD_LETTER]
+        for path in paths:
+            if path.suffix == ".json":
+                records.append((path.stat().st_mtime, path.stem))
+                referenced.add(path.stem)
+        for path in paths:
+            if path.suffix == ".json" or path.name.split(".", 1)[0] in referenced:
+                continue
+            try:
+                if path.stat().st_mtime < orphan_before:
+                    path.unlink(missing_ok=True)
+            except OSError:
+                pass
+        return [image_id for _, image_id in sorted(records)]
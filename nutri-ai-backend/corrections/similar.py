@@ -0,0 +1,335 @@
+"""
+Índice de platos ya corregidos, para responder /detect sin ejecutar el modelo.
+
+Los usuarios fotografían una y otra vez las mismas comidas, y para muchas de esas fotos ya hay
+ingredientes verificados por una persona. Cada corrección con consentimiento y al menos un
+ingrediente se guarda con el dHash de 64 bits de su imagen (corrections/dedup.py) en la tabla
+`similar_images` de la base de correcciones:
+
+- el writer (corrections/writer.py) añade las correcciones al persistir cada lote, así el índice
+  se actualiza de forma incremental y sobrevive a reinicios;
+- en memoria solo viven dos arrays numpy (hash y rowid, 16 bytes por imagen): la búsqueda del
+  vecino más cercano es un XOR + popcount vectorizado sobre todos los hashes (~1 ms a 100k);
+- los ingredientes corregidos se leen de SQLite solo para el vecino encontrado;
+- cada SIMILAR_REFRESH_MS se leen las filas nuevas (por rowid) que añadieron otros procesos.
+
+Un dHash parecido no basta: el hash se calcula sobre una miniatura 9×8, así que un recorte o
+una foto con otro encuadre pueden quedar a poca distancia. Solo se acepta una corrección con la
+misma relación de aspecto y un tamaño compatible (SIMILAR_MAX_SCALE); si no, las cajas
+corregidas no caerían sobre los mismos ingredientes.
+
+Para construirlo a partir de las correcciones ya guardadas en local:
+
+    python -m corrections.similar build
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator
+
+import numpy as np
+
+from corrections.config import CORRECTIONS_DB, SIMILAR_MAX_DISTANCE, SIMILAR_MAX_SCALE, SIMILAR_REFRESH_MS
+from corrections.dedup import image_signature
+from corrections.export import resolve_box
+from corrections.journal import Correction, utc_now_iso
+from corrections.store import CorrectionStore, connect
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS similar_images (
+    image_id   TEXT NOT NULL UNIQUE,
+    dhash      TEXT NOT NULL,
+    width      INTEGER NOT NULL,
+    height     INTEGER NOT NULL,
+    corrected  TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+"""
+
+# Candidatos (por distancia) que se comprueban contra el tamaño de la consulta
+_MAX_CANDIDATES = 8
+
+# Bits a 1 de cada byte, para numpy < 2.0 (sin np.bitwise_count)
+_POPCOUNT_8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Bits a 1 de cada elemento de un array uint64."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _POPCOUNT_8[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def compatible_size(size: tuple[int, int], query_size: tuple[int, int], max_scale: float = SIMILAR_MAX_SCALE) -> bool:
+    """
+    Misma relación de aspecto (con 1 px de margen por el redondeo al redimensionar) y una escala
+    entre 1/max_scale y max_scale (con max_scale=1, mismo ancho y alto).
+    """
+    (width, height), (query_width, query_height) = size, query_size
+    if min(width, height, query_width, query_height) <= 0:
+        return False
+    if abs(query_height - height * query_width / width) > 1.0:
+        return False
+    if max_scale <= 1.0:
+        return (query_width, query_height) == (width, height)
+    scale = query_width / width
+    return 1.0 / max_scale <= scale <= max_scale
+
+
+@dataclass(frozen=True)
+class SimilarMatch:
+    """
+    Corrección más parecida a una consulta: sus ingredientes, la distancia dHash y los tamaños
+    (ancho, alto) de la imagen corregida y de la consultada.
+    """
+    image_id: str
+    distance: int
+    corrected: list[dict[str, Any]]
+    size: tuple[int, int]
+    query_size: tuple[int, int]
+
+    def ingredients(self) -> list[dict[str, Any]]:
+        """Ingredientes corregidos con las cajas escaladas a la imagen consultada."""
+        sx, sy = self.query_size[0] / self.size[0], self.query_size[1] / self.size[1]
+        items = []
+        for item in self.corrected:
+            # Las filas indexadas antes de normalizar al insertar pueden traer cajas 0-1
+            box = resolve_box(item.get("box"), *self.size)
+            items.append({
+                "label": item["label"],
+                "box": [round(v * s, 2) for v, s in zip(box, (sx, sy, sx, sy))] if box else None,
+            })
+        return items
+
+
+class SimilarImageIndex:
+    """Vecino más cercano por dHash sobre las imágenes corregidas. Thread-safe (una conexión por hilo)."""
+
+    def __init__(
+        self,
+        path: Path = CORRECTIONS_DB,
+        max_distance: int = SIMILAR_MAX_DISTANCE,
+        refresh_ms: float = SIMILAR_REFRESH_MS,
+        max_scale: float = SIMILAR_MAX_SCALE,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_distance = max_distance
+        self.max_scale = max_scale
+        self.refresh_interval = max(0.0, refresh_ms) / 1000.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hashes = np.empty(1024, dtype=np.uint64)
+        self._rowids = np.empty(1024, dtype=np.int64)
+        self._size = 0
+        self._last_rowid = 0
+        self._refreshed_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self._conn().executescript(_SCHEMA)
+        self.refresh()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def refresh(self) -> int:
+        """Carga las filas añadidas desde la última lectura (también las de otros procesos)."""
+        with self._lock:
+            rows = self._conn().execute(
+                "SELECT rowid, dhash FROM similar_images WHERE rowid > ? ORDER BY rowid", (self._last_rowid,)
+            ).fetchall()
+            self._refreshed_at = time.monotonic()
+            if not rows:
+                return 0
+            needed = self._size + len(rows)
+            if needed > len(self._hashes):
+                capacity = max(needed, 2 * len(self._hashes))
+                # Arrays nuevos: las búsquedas en curso siguen con la vista anterior
+                self._hashes = np.concatenate([self._hashes[:self._size], np.empty(capacity - self._size, np.uint64)])
+                self._rowids = np.concatenate([self._rowids[:self._size], np.empty(capacity - self._size, np.int64)])
+            self._hashes[self._size:needed] = [int(h, 16) for _, h in rows]
+            self._rowids[self._size:needed] = [r for r, _ in rows]
+            self._size = needed
+            self._last_rowid = rows[-1][0]
+            return len(rows)
+
+    def add_many(self, items: Iterable[tuple[Correction, Path | BinaryIO]]) -> int:
+        """
+        Indexa correcciones persistidas con sus imágenes, en una sola transacción (bloqueante).
+        Las que no tienen consentimiento o ingredientes corregidos, o cuya imagen no se puede
+        leer, se omiten. Las cajas se guardan en píxeles de la imagen (resolve_box: las
+        normalizadas 0-1 se convierten). Devuelve cuántas se añadieron.
+        """
+        rows = []
+        for correction, image in items:
+            if not correction.consent or not correction.corrected:
+                continue
+            try:
+                size, value = image_signature(image)
+            except (OSError, ValueError):
+                continue
+            corrected = [
+                {**item, "box": resolve_box(item.get("box"), *size)}
+                for item in correction.corrected
+                if isinstance(item, dict) and str(item.get("label", "")).strip()
+            ]
+            if not corrected:
+                continue
+            rows.append((
+                correction.image_id,
+                f"{value:016x}",
+                size[0],
+                size[1],
+                json.dumps(corrected, ensure_ascii=False),
+                correction.created_at or utc_now_iso(),
+            ))
+        if not rows:
+            return 0
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO similar_images (image_id, dhash, width, height, corrected, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.refresh()
+        return added
+
+    def _snapshot(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (hashes, rowids) indexados hasta ahora, leídos juntos bajo el lock. refresh solo
+        escribe más allá de _size o cambia a arrays nuevos, así que estas vistas no cambian.
+        """
+        if self.refresh_interval and time.monotonic() - self._refreshed_at > self.refresh_interval:
+            self.refresh()
+        with self._lock:
+            return self._hashes[:self._size], self._rowids[:self._size]
+
+    def _distances(self, value: int) -> tuple[np.ndarray, np.ndarray]:
+        """(distancias de Hamming a `value`, rowids) sobre una misma instantánea del índice."""
+        hashes, rowids = self._snapshot()
+        return popcount(hashes ^ np.uint64(value)), rowids
+
+    def nearest(self, value: int) -> tuple[int, int] | None:
+        """(rowid, distancia) del hash más cercano a `value`; ante empates, el más reciente."""
+        distances, rowids = self._distances(value)
+        size = len(distances)
+        if not size:
+            return None
+        best = size - 1 - int(np.argmin(distances[::-1]))
+        return int(rowids[best]), int(distances[best])
+
+    def candidates(self, value: int, limit: int = _MAX_CANDIDATES) -> list[tuple[int, int]]:
+        """
+        (rowid, distancia) de los hashes a ≤ max_distance de `value`, como mucho `limit`:
+        primero los más cercanos y, ante empates, los más recientes.
+        """
+        distances, rowids = self._distances(value)
+        found = np.flatnonzero(distances <= self.max_distance)
+        order = found[np.lexsort((-found, distances[found]))][:limit]
+        return [(int(rowids[i]), int(distances[i])) for i in order]
+
+    def lookup(self, image: Path | BinaryIO) -> SimilarMatch | None:
+        """
+        Corrección a distancia ≤ max_distance de la imagen (ruta o archivo abierto), con la misma
+        relación de aspecto y un tamaño compatible (compatible_size), si la hay.
+        """
+        size, value = image_signature(image)
+        conn = self._conn()
+        for rowid, distance in self.candidates(value):
+            row = conn.execute(
+                "SELECT image_id, width, height, corrected FROM similar_images WHERE rowid = ?", (rowid,)
+            ).fetchone()
+            if row is None:
+                continue
+            image_id, width, height, corrected = row
+            if not compatible_size((width, height), size, self.max_scale):
+                continue
+            self.hits += 1
+            return SimilarMatch(image_id, distance, json.loads(corrected), (width, height), size)
+        self.misses += 1
+        return None
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _stored_corrections(store: CorrectionStore) -> Iterator[tuple[Correction, Path]]:
+    for row in store.iter_range(page_size=10_000):
+        path = Path(row["image_path"])
+        correction = Correction(
+            image_id=row["image_id"],
+            ext=path.suffix.lstrip("."),
+            content_type="",
+            detected=row["detected"],
+            corrected=row["corrected"],
+            consent=row["consent"],
+            created_at=row["created_at"],
+            image_sha256=row.get("image_sha256"),
+        )
+        yield correction, path
+
+
+def build(index: SimilarImageIndex, store: CorrectionStore, batch_size: int = 1000) -> tuple[int, int]:
+    """Indexa las correcciones guardadas en local cuyas imágenes estén en disco. (añadidas, omitidas)"""
+    added = total = 0
+    batch: list[tuple[Correction, Path]] = []
+    for item in _stored_corrections(store):
+        batch.append(item)
+        if len(batch) == batch_size:
+            added += index.add_many(batch)
+            total += len(batch)
+            batch = []
+    added += index.add_many(batch)
+    total += len(batch)
+    return added, total - added
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="Indexar las correcciones ya guardadas (almacén local)")
+    p_build.add_argument("--db", type=Path, default=CORRECTIONS_DB)
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        raise SystemExit(f"No existe {args.db}")
+    index = SimilarImageIndex(args.db, refresh_ms=0)
+    store = CorrectionStore(args.db)
+    try:
+        start = time.perf_counter()
+        added, skipped = build(index, store)
+    finally:
+        store.close()
+        index.close()
+    print(
+        f"[MLOps] Índice de platos corregidos: {added} añadidas, {skipped} omitidas, "
+        f"{len(index)} en total ({time.perf_counter() - start:.1f} s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Destinos de las correcciones: Supabase (Storage + tabla), disco local y un fake en memoria.
+
+Todos exponen la misma interfaz bloqueante (el writer los llama desde hilos):
+- upload_image(correction, path): sube la imagen como `correction.object_name`
+  (`<sha256>.<ext>`, ver corrections/dedup.py); repetirla no duplica.
+- has_image(object_name): si el objeto ya está en el destino.
+- insert_rows(corrections): inserta las filas en bloque; las que ya existen se ignoran.
+- image_path(correction): ruta que queda guardada en la fila (varias filas pueden compartirla).
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Protocol
+
+from corrections.config import (
+    CORRECTIONS_IMAGES_DIR,
+    CORRECTIONS_TABLE,
+    FAKE_SINK,
+    FAKE_SINK_ERROR_RATE,
+    FAKE_SINK_LATENCY_MS,
+    MLOPS_BUCKET,
+    SUPABASE_SERVICE_ROLE_KEY,
+    SUPABASE_URL,
+)
+from corrections.journal import Correction
+from corrections.store import CorrectionStore
+from telemetry import emit
+
+_supabase_client = None
+
+
+def get_supabase():
+    """Cliente Supabase solo si hay URL y key (backend usa service_role)."""
+    global _supabase_client
+    if _supabase_client is not None:
+        return _supabase_client
+    if not SUPABASE_URL:
+        emit("mlops.sink", "SUPABASE_URL / VITE_SUPABASE_URL no configurada → correcciones en local", sink="local")
+        return None
+    if not SUPABASE_SERVICE_ROLE_KEY:
+        emit("mlops.sink", "SUPABASE_SERVICE_ROLE_KEY no configurada → correcciones en local", sink="local")
+        return None
+    try:
+        from supabase import create_client
+        start = time.perf_counter()
+        _supabase_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+        emit(
+            "mlops.sink", "Cliente Supabase OK → correcciones se guardarán en Supabase",
+            sink="supabase", seconds=round(time.perf_counter() - start, 4),
+        )
+        return _supabase_client
+    except Exception as e:
+        emit("mlops.sink_error", f"Error al crear cliente Supabase: {e} → correcciones en local", sink="local", error=str(e))
+        return None
+
+
+class CorrectionSink(Protocol):
+    name: str
+
+    def image_path(self, correction: Correction) -> str: ...
+
+    def upload_image(self, correction: Correction, path: Path) -> None: ...
+
+    def has_image(self, object_name: str) -> bool: ...
+
+    def insert_rows(self, corrections: list[Correction]) -> None: ...
+
+
+def _table_row(sink: CorrectionSink, c: Correction) -> dict[str, Any]:
+    return {
+        "image_id": c.image_id,
+        "image_path": sink.image_path(c),
+        "detected_ingredients": c.detected,
+        "corrected_ingredients": c.corrected,
+        "consent": c.consent,
+        "created_at": c.created_at,
+        "image_sha256": c.image_sha256,
+    }
+
+
+class SupabaseSink:
+    """Bucket de Storage + tabla ingredient_corrections."""
+
+    name = "supabase"
+
+    def __init__(self, client: Any, bucket: str = MLOPS_BUCKET, table: str = CORRECTIONS_TABLE):
+        self._client = client
+        self.bucket = bucket
+        self.table = table
+
+    def image_path(self, correction: Correction) -> str:
+        return f"{self.bucket}/{correction.object_name}"
+
+    def upload_image(self, correction: Correction, path: Path) -> None:
+        try:
+            self._client.storage.from_(self.bucket).upload(
+                path=correction.object_name,
+                file=path.read_bytes(),
+                file_options={"content-type": correction.content_type, "upsert": "true"},
+            )
+        except Exception as e:
+            raise RuntimeError(
+                f"Error al subir la imagen a Supabase Storage: {e}. ¿Creaste el bucket '{self.bucket}' en Storage?"
+            ) from e
+
+    def has_image(self, object_name: str) -> bool:
+        try:
+            found = self._client.storage.from_(self.bucket).list("", {"search": object_name, "limit": 1})
+        except Exception as e:
+            raise RuntimeError(f"Error al consultar Supabase Storage: {e}") from e
+        return any(item.get("name") == object_name for item in found or [])
+
+    def insert_rows(self, corrections: list[Correction]) -> None:
+        try:
+            self._client.table(self.table).upsert(
+                [_table_row(self, c) for c in corrections],
+                on_conflict="image_id",
+                ignore_duplicates=True,
+            ).execute()
+        except Exception as e:
+            raise RuntimeError(
+                f"Error al guardar las anotaciones en Supabase: {e}. "
+                "¿Ejecutaste las migraciones supabase-migration-mlops-corrections.sql, "
+                "supabase-migration-mlops-dedup.sql y supabase-migration-mlops-export-seq.sql?"
+            ) from e
+
+
+class LocalSink:
+    """Fallback sin Supabase: imágenes en data/corrections/images y filas en el almacén SQLite."""
+
+    name = "local"
+
+    def __init__(
+        self,
+        images_dir: Path = CORRECTIONS_IMAGES_DIR,
+        store: CorrectionStore | None = None,
+    ):
+        self.images_dir = Path(images_dir)
+        self._store = store
+        self._store_lock = threading.Lock()
+
+    @property
+    def store(self) -> CorrectionStore:
+        # Se abre al primer uso (en el hilo del writer), no al crear el sink
+        with self._store_lock:
+            if self._store is None:
+                self._store = CorrectionStore()
+            return self._store
+
+    def image_path(self, correction: Correction) -> str:
+        return str(self.images_dir / correction.object_name)
+
+    def upload_image(self, correction: Correction, path: Path) -> None:
+        dest = self.images_dir / correction.object_name
+        if dest.exists():
+            return  # mismo contenido ya guardado
+        self.images_dir.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, dest)
+
+    def has_image(self, object_name: str) -> bool:
+        return (self.images_dir / object_name).exists()
+
+    def insert_rows(self, corrections: list[Correction]) -> None:
+        self.store.insert_many(
+            {
+                "image_id": c.image_id,
+                "image_path": self.image_path(c),
+                "detected": c.detected,
+                "corrected": c.corrected,
+                "consent": c.consent,
+                "created_at": c.created_at,
+                "image_sha256": c.image_sha256,
+            }
+            for c in corrections
+        )
+
+
+class FakeSink:
+    """
+    Storage + tabla en memoria para pruebas y benchmarks, con latencia por llamada y
+    probabilidad de fallo configurables. Las filas se indexan por image_id (como el UNIQUE de la tabla).
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_s: float = 0.0, fail_rate: float = 0.0, seed: int | None = None):
+        self.latency_s = latency_s
+        self.fail_rate = fail_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.objects: dict[str, bytes] = {}
+        self.rows: dict[str, dict[str, Any]] = {}
+        self.upload_calls = 0
+        self.insert_calls = 0
+        self._seq = 0
+
+    def image_path(self, correction: Correction) -> str:
+        return f"fake/{correction.object_name}"
+
+    def _call(self) -> None:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        with self._lock:
+            fail = self._rng.random() < self.fail_rate
+        if fail:
+            raise RuntimeError("fallo simulado del backend")
+
+    def upload_image(self, correction: Correction, path: Path) -> None:
+        with self._lock:
+            self.upload_calls += 1
+        self._call()
+        data = path.read_bytes()
+        with self._lock:
+            self.objects[correction.object_name] = data
+
+    def has_image(self, object_name: str) -> bool:
+        with self._lock:
+            return object_name in self.objects
+
+    def insert_rows(self, corrections: list[Correction]) -> None:
+        with self._lock:
+            self.insert_calls += 1
+        self._call()
+        with self._lock:
+            for c in corrections:
+                if c.image_id not in self.rows:
+                    # Como el DEFAULT nextval(...) de la tabla: orden de inserción
+                    self._seq += 1
+                    self.rows[c.image_id] = {**_table_row(self, c), "inserted_seq": self._seq}
+
+
+def create_sink() -> CorrectionSink:
+    """Supabase si está configurado; si no, disco local. MLOPS_FAKE_SINK=1 fuerza el destino en memoria."""
+    if FAKE_SINK:
+        return FakeSink(latency_s=FAKE_SINK_LATENCY_MS / 1000, fail_rate=FAKE_SINK_ERROR_RATE)
+    client = get_supabase()
+    return SupabaseSink(client) if client is not None else LocalSink()
@@ -0,0 +1,250 @@
+"""
+Almacén local de correcciones en SQLite (modo WAL), reemplazo de annotations.jsonl.
+
+- Varios procesos (workers de uvicorn) pueden escribir a la vez: WAL + busy_timeout serializan
+  los commits sin bloquear a los lectores.
+- insert_many escribe un lote en una sola transacción: un fsync por lote, no por corrección.
+- Búsqueda por image_id (clave primaria) y por rango de created_at (índice), sin recorrer todo.
+- inserted_seq numera las filas en orden de inserción (no de created_at): con el writer
+  write-behind una corrección puede llegar mucho después de su created_at, y la exportación
+  incremental (corrections/export.py) avanza por esta columna para no saltársela.
+
+Las filas tienen el mismo contenido que las líneas de annotations.jsonl (image_id, image_path,
+detected, corrected, consent) más created_at en ISO 8601 UTC. Para migrar archivos existentes:
+python -m corrections.import_jsonl.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from corrections.config import CORRECTIONS_DB, DB_SYNCHRONOUS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS corrections (
+    image_id   TEXT PRIMARY KEY,
+    image_path TEXT NOT NULL,
+    detected   TEXT NOT NULL DEFAULT '[]',
+    corrected  TEXT NOT NULL DEFAULT '[]',
+    consent    INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_corrections_created_at ON corrections(created_at);
+"""
+
+# Columnas añadidas después de la primera versión: (nombre, DDL, índice opcional)
+_MIGRATIONS = [
+    ("image_sha256", "ALTER TABLE corrections ADD COLUMN image_sha256 TEXT",
+     "CREATE INDEX IF NOT EXISTS idx_corrections_image_sha256 ON corrections(image_sha256)"),
+    ("inserted_seq", "ALTER TABLE corrections ADD COLUMN inserted_seq INTEGER",
+     "CREATE INDEX IF NOT EXISTS idx_corrections_inserted_seq ON corrections(inserted_seq)"),
+]
+
+_COLUMNS = "image_id, image_path, detected, corrected, consent, created_at, image_sha256, inserted_seq"
+
+
+def _to_row(record: dict[str, Any]) -> tuple:
+    return (
+        record["image_id"],
+        record["image_path"],
+        json.dumps(record.get("detected", []), ensure_ascii=False),
+        json.dumps(record.get("corrected", []), ensure_ascii=False),
+        1 if record.get("consent", True) else 0,
+        record["created_at"],
+        record.get("image_sha256"),
+    )
+
+
+def _number_unsequenced(conn: sqlite3.Connection) -> None:
+    """
+    Da inserted_seq a las filas anteriores a la columna, en orden de (created_at, image_id) y
+    detrás de las ya numeradas. Si no falta ninguna, es una consulta por índice.
+    """
+    if conn.execute("SELECT 1 FROM corrections WHERE inserted_seq IS NULL LIMIT 1").fetchone() is None:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        base = conn.execute("SELECT COALESCE(MAX(inserted_seq), 0) FROM corrections").fetchone()[0]
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _seq (image_id TEXT PRIMARY KEY, n INTEGER) WITHOUT ROWID")
+        conn.execute("DELETE FROM _seq")
+        conn.execute(
+            "INSERT INTO _seq SELECT image_id, ROW_NUMBER() OVER (ORDER BY created_at, image_id) "
+            "FROM corrections WHERE inserted_seq IS NULL"
+        )
+        conn.execute(
+            "UPDATE corrections SET inserted_seq = ? + (SELECT n FROM _seq WHERE _seq.image_id = corrections.image_id) "
+            "WHERE inserted_seq IS NULL",
+            (base,),
+        )
+        conn.execute("DROP TABLE _seq")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def connect(path: Path, synchronous: str = DB_SYNCHRONOUS) -> sqlite3.Connection:
+    """Conexión en modo WAL con espera ante bloqueos (autocommit: las transacciones son explícitas)."""
+    conn = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # FULL: fsync del WAL en cada commit (uno por lote); NORMAL solo en los checkpoints
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def _from_row(row: tuple) -> dict[str, Any]:
+    image_id, image_path, detected, corrected, consent, created_at, image_sha256, inserted_seq = row
+    return {
+        "image_id": image_id,
+        "image_path": image_path,
+        "detected": json.loads(detected),
+        "corrected": json.loads(corrected),
+        "consent": bool(consent),
+        "created_at": created_at,
+        "image_sha256": image_sha256,
+        "inserted_seq": inserted_seq,
+    }
+
+
+class CorrectionStore:
+    """Correcciones locales en SQLite. Una conexión por hilo; seguro entre procesos."""
+
+    def __init__(self, path: Path = CORRECTIONS_DB, synchronous: str = DB_SYNCHRONOUS):
+        self.path = Path(path)
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(corrections)")}
+        for name, ddl, index in _MIGRATIONS:
+            if name not in columns:
+                try:
+                    conn.execute(ddl)
+                except sqlite3.OperationalError:
+                    pass  # otro proceso la añadió a la vez
+            if index:
+                conn.execute(index)
+        _number_unsequenced(conn)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path, self.synchronous)
+            self._local.conn = conn
+        return conn
+
+    def insert_many(self, records: Iterable[dict[str, Any]]) -> int:
+        """
+        Inserta un lote en una transacción; ignora image_id repetidos. Devuelve las filas nuevas.
+        inserted_seq se asigna con el lock de escritura tomado (BEGIN IMMEDIATE), así que crece en
+        el mismo orden en que se confirman los lotes, también entre procesos.
+        """
+        rows = [_to_row(r) for r in records]
+        if not rows:
+            return 0
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            base = conn.execute("SELECT COALESCE(MAX(inserted_seq), 0) FROM corrections").fetchone()[0]
+            rows = [row + (base + i,) for i, row in enumerate(rows, 1)]
+            before = conn.total_changes
+            conn.executemany(f"INSERT OR IGNORE INTO corrections ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            inserted = conn.total_changes - before
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return inserted
+
+    def get(self, image_id: str) -> dict[str, Any] | None:
+        row = self._conn().execute(
+            f"SELECT {_COLUMNS} FROM corrections WHERE image_id = ?", (image_id,)
+        ).fetchone()
+        return _from_row(row) if row else None
+
+    def iter_range(
+        self,
+        since: str | None = None,
+        until: str | None = None,
+        limit: int | None = None,
+        page_size: int = 1000,
+        since_image_id: str | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Correcciones con since < created_at <= until (ISO 8601), en orden de (created_at, image_id).
+        Con since_image_id, el inicio es la clave (since, since_image_id): también entran las
+        filas con created_at == since e image_id mayor (marca de agua exacta para exportar).
+        Pagina por clave: no carga el rango entero en memoria.
+        """
+        conn = self._conn()
+        if since is None:
+            cursor_key = ("", "")
+        else:
+            # Sin image_id, el máximo carácter posible deja fuera todo created_at == since
+            cursor_key = (since, since_image_id if since_image_id is not None else "\U0010ffff")
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            sql = f"SELECT {_COLUMNS} FROM corrections WHERE (created_at, image_id) > (?, ?)"
+            params: list[Any] = list(cursor_key)
+            if until is not None:
+                sql += " AND created_at <= ?"
+                params.append(until)
+            sql += " ORDER BY created_at, image_id LIMIT ?"
+            params.append(size)
+            rows = conn.execute(sql, params).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _from_row(row)
+            cursor_key = (rows[-1][5], rows[-1][0])  # (created_at, image_id)
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < size:
+                return
+
+    def iter_inserted(self, after: int = 0, page_size: int = 1000) -> Iterator[dict[str, Any]]:
+        """Correcciones con inserted_seq > after, en orden de inserción (paginado por clave)."""
+        conn = self._conn()
+        while True:
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM corrections WHERE inserted_seq > ? ORDER BY inserted_seq LIMIT ?",
+                (after, page_size),
+            ).fetchall()
+            for row in rows:
+                yield _from_row(row)
+            if len(rows) < page_size:
+                return
+            after = rows[-1][7]
+
+    def seq_after_key(self, created_at: str, image_id: str) -> int:
+        """
+        inserted_seq desde el que continuar una marca de agua antigua por (created_at, image_id):
+        el anterior a la primera fila con clave mayor (o el último si no hay ninguna).
+        """
+        conn = self._conn()
+        first = conn.execute(
+            "SELECT MIN(inserted_seq) FROM corrections WHERE (created_at, image_id) > (?, ?)", (created_at, image_id)
+        ).fetchone()[0]
+        if first is not None:
+            return first - 1
+        return conn.execute("SELECT COALESCE(MAX(inserted_seq), 0) FROM corrections").fetchone()[0]
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM corrections").fetchone()[0]
+
+    def checkpoint(self) -> None:
+        """Vuelca el WAL a la base y lo trunca (compactación; útil tras importaciones grandes)."""
+        self._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
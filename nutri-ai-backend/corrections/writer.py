@@ -0,0 +1,293 @@
+"""
+Persistencia write-behind de las correcciones.
+
+POST /corrections solo escribe la corrección en el journal local (fsync) y responde. Un worker
+en segundo plano agrupa las entradas pendientes (hasta INSERT_BATCH_SIZE o FLUSH_INTERVAL_MS),
+sube las imágenes con concurrencia acotada, inserta todas las filas en una sola llamada y borra
+las entradas del journal. Con un ImageDeduplicator, cada imagen se resuelve antes a un objeto
+por contenido y solo se sube si el destino no lo tiene. Si algo falla, el lote se reintenta con backoff exponencial; como las
+entradas siguen en disco, un reinicio las vuelve a encolar. Tras RETRY_MAX_ATTEMPTS intentos, o
+ante un error que no se arregla reintentando (registro o imagen ilegibles), el lote se reintenta
+corrección por corrección: solo las que vuelven a fallar pasan al dead-letter del journal
+(evento mlops.dead_letter) y la cola sigue. Un error inesperado fuera de ese flujo (p. ej. del
+propio journal) se informa como mlops.writer_error sin detener el worker. Las llamadas al destino (cliente
+Supabase síncrono) corren en hilos, nunca en el event loop. Con un SimilarImageIndex, cada lote
+persistido se añade además al índice de platos corregidos que consulta /detect.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Any
+
+from corrections.config import (
+    FLUSH_INTERVAL_MS,
+    INSERT_BATCH_SIZE,
+    JOURNAL_DIR,
+    RETRY_BASE_SECONDS,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_SECONDS,
+    UPLOAD_CONCURRENCY,
+)
+from corrections.dedup import ImageDeduplicator
+from corrections.journal import Correction, CorrectionJournal, JournalEntry
+from corrections.similar import SimilarImageIndex
+from corrections.sinks import CorrectionSink
+from telemetry import CORRECTIONS_SECONDS, emit
+
+# Errores que un reintento no arregla: el lote va directo al dead-letter
+PERMANENT_ERRORS = (ValueError, TypeError, KeyError, FileNotFoundError)
+
+
+class CorrectionWriter:
+    """Cola write-behind entre el journal local y un CorrectionSink."""
+
+    def __init__(
+        self,
+        sink: CorrectionSink,
+        journal: CorrectionJournal | None = None,
+        upload_concurrency: int = UPLOAD_CONCURRENCY,
+        batch_size: int = INSERT_BATCH_SIZE,
+        flush_interval_ms: float = FLUSH_INTERVAL_MS,
+        retry_base_seconds: float = RETRY_BASE_SECONDS,
+        retry_max_seconds: float = RETRY_MAX_SECONDS,
+        retry_max_attempts: int = RETRY_MAX_ATTEMPTS,
+        dedup: ImageDeduplicator | None = None,
+        similar: SimilarImageIndex | None = None,
+    ):
+        self.sink = sink
+        self.journal = journal or CorrectionJournal(JOURNAL_DIR)
+        self.dedup = dedup
+        self.similar = similar
+        self.upload_concurrency = max(1, upload_concurrency)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000.0
+        self.retry_base = max(0.0, retry_base_seconds)
+        self.retry_max = max(self.retry_base, retry_max_seconds)
+        self.max_attempts = max(1, retry_max_attempts)
+        self._queue: asyncio.Queue[str] | None = None
+        self._task: asyncio.Task | None = None
+        self._in_flight = 0
+        self.persisted = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.uploaded = 0
+        self.deduplicated = 0
+
+    @property
+    def running(self) -> bool:
+        """El worker en segundo plano está activo (False si no arrancó o terminó)."""
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        """Correcciones aceptadas que todavía no llegaron al destino."""
+        return (self._queue.qsize() if self._queue is not None else 0) + self._in_flight
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "sink": self.sink.name,
+            "running": self.running,
+            "pending": self.pending,
+            "persisted": self.persisted,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            "images_uploaded": self.uploaded,
+            "images_deduplicated": self.deduplicated,
+        }
+
+    async def start(self) -> int:
+        """Arranca el worker y vuelve a encolar lo que quedó en el journal. Devuelve cuántas había."""
+        if self._task is not None:
+            return 0
+        self._queue = asyncio.Queue()
+        pending = await asyncio.to_thread(self.journal.pending_ids)
+        for image_id in pending:
+            self._queue.put_nowait(image_id)
+        if pending:
+            emit("mlops.resume", f"Reanudando {len(pending)} correcciones pendientes del journal", pending=len(pending))
+        self._task = asyncio.create_task(self._run())
+        return len(pending)
+
+    async def submit(self, correction: Correction, image: bytes | bytearray) -> None:
+        """Guarda la corrección en el journal (durable al volver) y la encola para persistirla."""
+        if self._task is None:
+            await self.start()
+        start = time.perf_counter()
+        await asyncio.to_thread(self.journal.write, correction, image)
+        CORRECTIONS_SECONDS.observe(time.perf_counter() - start, "journal")
+        self._queue.put_nowait(correction.image_id)
+
+    async def drain(self, timeout: float | None = None) -> bool:
+        """Espera a que no quede nada pendiente (útil en pruebas y benchmarks). False si vence el plazo."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while self.pending:
+            if deadline is not None and loop.time() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    async def close(self) -> None:
+        """Detiene el worker; lo que no se persistió sigue en el journal para el próximo arranque."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            ids = [await self._queue.get()]
+            self._in_flight = 1
+            deadline = loop.time() + self.flush_interval
+            while len(ids) < self.batch_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        ids.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    ids.append(self._queue.get_nowait())
+                self._in_flight = len(ids)
+            try:
+                await self._flush_with_retry(ids)
+            except Exception as e:
+                # Un lote no debe parar el worker: sus entradas siguen en el journal y se
+                # retoman en el próximo arranque
+                emit(
+                    "mlops.writer_error",
+                    f"Error inesperado en el writer con {len(ids)} correcciones (quedan en el journal): {e}",
+                    sink=self.sink.name,
+                    rows=len(ids),
+                    error=f"{type(e).__name__}: {e}",
+                )
+            finally:
+                self._in_flight = 0
+
+    async def _flush_with_retry(self, ids: list[str]) -> None:
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                await self._flush(ids)
+            except Exception as e:
+                attempt += 1
+                if isinstance(e, PERMANENT_ERRORS) or attempt >= self.max_attempts:
+                    if len(ids) > 1:
+                        await self._flush_one_by_one(ids, e, attempt)
+                    else:
+                        await self._dead_letter(ids, e, attempt)
+                    return
+                self.retries += 1
+                delay = min(self.retry_max, self.retry_base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                emit(
+                    "mlops.flush_error",
+                    f"Error al persistir {len(ids)} correcciones en {self.sink.name}: {e}",
+                    sink=self.sink.name,
+                    rows=len(ids),
+                    attempt=attempt,
+                    retry_in=round(delay, 2),
+                    seconds=round(time.perf_counter() - start, 4),
+                    error=str(e),
+                )
+                await asyncio.sleep(delay)
+                continue
+            seconds = time.perf_counter() - start
+            CORRECTIONS_SECONDS.observe(seconds, "flush")
+            emit("mlops.flush", sink=self.sink.name, rows=len(ids), attempt=attempt + 1, seconds=round(seconds, 4))
+            return
+
+    async def _flush_one_by_one(self, ids: list[str], error: Exception, attempts: int) -> None:
+        """
+        El lote no se pudo persistir: una sola corrección mala no debe arrastrar a las demás.
+        Cada una se intenta una vez por separado y solo las que fallan van al dead-letter.
+        """
+        emit(
+            "mlops.flush_split",
+            f"Lote de {len(ids)} correcciones fallido tras {attempts} intentos ({error}); se reintenta una a una",
+            sink=self.sink.name,
+            rows=len(ids),
+            attempts=attempts,
+            error=str(error),
+        )
+        for image_id in ids:
+            try:
+                await self._flush([image_id])
+            except Exception as e:
+                await self._dead_letter([image_id], e, attempts + 1)
+
+    async def _dead_letter(self, ids: list[str], error: Exception, attempts: int) -> None:
+        """Aparta el lote en el dead-letter del journal para que la cola siga con los siguientes."""
+        reason = "permanent" if isinstance(error, PERMANENT_ERRORS) else "max_attempts"
+        message = f"{type(error).__name__}: {error}"
+        moved = await asyncio.to_thread(
+            lambda: sum(self.journal.dead_letter(i, message, attempts) for i in ids)
+        )
+        self.dead_lettered += moved
+        emit(
+            "mlops.dead_letter",
+            f"{moved} correcciones apartadas en {self.journal.dead_letter_dir} tras {attempts} intentos: {error}",
+            sink=self.sink.name,
+            rows=moved,
+            attempts=attempts,
+            reason=reason,
+            error=str(error),
+        )
+
+    async def _index_similar(self, entries: list[JournalEntry]) -> None:
+        """Añade el lote ya persistido al índice de platos corregidos; un fallo no reintenta el lote."""
+        try:
+            await asyncio.to_thread(self.similar.add_many, [(e.correction, e.image_path) for e in entries])
+        except Exception as e:
+            emit("mlops.similar_error", f"No se pudo indexar el lote de correcciones: {e}", rows=len(entries), error=str(e))
+
+    async def _flush(self, ids: list[str]) -> None:
+        entries = [e for e in await asyncio.to_thread(lambda: [self.journal.load(i) for i in ids]) if e is not None]
+        if not entries:
+            return
+        # Misma imagen (mismo hash) dentro del lote: un solo objeto y una sola subida
+        groups: dict[str, list[JournalEntry]] = {}
+        for entry in entries:
+            if not entry.uploaded:
+                key = entry.correction.image_sha256 or entry.correction.image_id
+                groups.setdefault(key, []).append(entry)
+        semaphore = asyncio.Semaphore(self.upload_concurrency)
+
+        async def store(group: list[JournalEntry]) -> None:
+            first = group[0]
+            async with semaphore:
+                if self.dedup is not None:
+                    resolution = await asyncio.to_thread(self.dedup.resolve, first.correction, first.image_path)
+                    object_name, needs_upload = resolution.object_name, resolution.upload
+                else:
+                    resolution, object_name, needs_upload = None, first.correction.object_name, True
+                first.correction.image_object = object_name
+                if needs_upload:
+                    await asyncio.to_thread(self.sink.upload_image, first.correction, first.image_path)
+                    if resolution is not None:
+                        await asyncio.to_thread(self.dedup.record, first.correction, first.image_path, resolution)
+            self.uploaded += int(needs_upload)
+            self.deduplicated += len(group) - int(needs_upload)
+            for entry in group:
+                entry.correction.image_object = object_name
+                await asyncio.to_thread(self.journal.mark_uploaded, entry)
+
+        # Todas las subidas terminan (o fallan) antes de decidir: un reintento solo repite las fallidas
+        results = await asyncio.gather(*(store(g) for g in groups.values()), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise errors[0]
+        await asyncio.to_thread(self.sink.insert_rows, [e.correction for e in entries])
+        if self.similar is not None:
+            await self._index_similar(entries)
+        await asyncio.to_thread(lambda: [self.journal.remove(e) for e in entries])
+        self.persisted += len(entries)
@@ -1,5 +1,8 @@
 """
 Pipeline de detección de ingredientes guiado por texto (Grounding DINO).
+
+GroundingDinoDetector se importa bajo demanda (PEP 562): importar detection.config o cualquier
+otro submódulo liviano no carga torch ni transformers, que solo entran con el primer detector.
 """
 
 from detection.config import (
@@ -7,11 +10,11 @@ from detection.config import (
     INGREDIENTS_LIST,
     INGREDIENTS_PROMPT_STR,
     LABEL_ES,
+    MEAL_CATEGORIES,
     BOX_THRESHOLD,
     TEXT_THRESHOLD,
     ingredients_from_string,
 )
-from detection.grounding_dino import GroundingDinoDetector
 
 __all__ = [
     "GroundingDinoDetector",
@@ -19,7 +22,16 @@ __all__ = [
     "INGREDIENTS_LIST",
     "INGREDIENTS_PROMPT_STR",
     "LABEL_ES",
+    "MEAL_CATEGORIES",
     "BOX_THRESHOLD",
     "TEXT_THRESHOLD",
     "ingredients_from_string",
 ]
+
+
+def __getattr__(name: str):
+    if name == "GroundingDinoDetector":
+        from detection.grounding_dino import GroundingDinoDetector
+
+        return GroundingDinoDetector
+    raise AttributeError(f"module 'detection' has no attribute {name!r}")
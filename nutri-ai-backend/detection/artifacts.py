@@ -0,0 +1,96 @@
+"""
+Artefactos del modelo horneados en la imagen Docker (arranque en frío sin red).
+
+Sin esto, el primer /detect de un contenedor nuevo descarga Grounding DINO del Hub. En el build:
+
+    python -m detection.artifacts fetch --revision <commit> --output models/grounding-dino
+
+descarga config, processor/tokenizer y pesos en safetensors de un commit fijo del Hub, y escribe
+artifact.json con el modelo, el commit resuelto y los archivos. En ejecución, con
+GROUNDING_DINO_MODEL_DIR apuntando a esa carpeta, processor y modelo se cargan de disco
+(local_files_only) y los pesos safetensors se mapean en memoria (mmap) con low_cpu_mem_usage:
+no se inicializan pesos aleatorios para luego sobrescribirlos ni se copia el archivo entero.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+from detection.config import MODEL_DIR, MODEL_ID, MODEL_REVISION
+
+MANIFEST = "artifact.json"
+# Lo necesario para AutoProcessor + AutoModelForZeroShotObjectDetection (sin pesos .bin ni onnx)
+_ALLOW_PATTERNS = ["*.json", "*.txt", "*.safetensors", "*.model"]
+
+
+def local_model_dir(model_dir: str | Path | None = None) -> Path | None:
+    """Carpeta con el modelo horneado si existe (config.json presente), si no None."""
+    path = model_dir or MODEL_DIR
+    if path and (Path(path) / "config.json").is_file():
+        return Path(path)
+    return None
+
+
+def model_source(model_id: str | None = None) -> tuple[str, dict[str, Any], dict[str, Any]]:
+    """
+    (ruta o id, kwargs del processor, kwargs del modelo) para from_pretrained. Con el modelo
+    horneado: solo disco y pesos safetensors (mmap); si no, el id del Hub en MODEL_REVISION
+    (se descarga a la cache de HF la primera vez).
+    """
+    model_id = model_id or MODEL_ID
+    local = local_model_dir()
+    if local is not None and _manifest_model(local) in (None, model_id):
+        hub: dict[str, Any] = {"local_files_only": True}
+        return str(local), hub, {**hub, "use_safetensors": True, "low_cpu_mem_usage": True}
+    hub = {"revision": MODEL_REVISION}
+    return model_id, hub, {**hub, "low_cpu_mem_usage": True}
+
+
+def _manifest_model(path: Path) -> str | None:
+    try:
+        return json.loads((path / MANIFEST).read_text())["model_id"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def fetch(model_id: str, revision: str, output: Path) -> dict[str, Any]:
+    """Descarga el modelo en `output` fijado al commit de `revision` y escribe el manifiesto."""
+    from huggingface_hub import HfApi, snapshot_download
+
+    commit = HfApi().model_info(model_id, revision=revision).sha
+    output.mkdir(parents=True, exist_ok=True)
+    snapshot_download(model_id, revision=commit, local_dir=output, allow_patterns=_ALLOW_PATTERNS)
+    if not any(output.glob("*.safetensors")):
+        # Repos que solo publican pytorch_model.bin: se convierten una vez aquí, no en cada arranque
+        from transformers import AutoModelForZeroShotObjectDetection
+
+        model = AutoModelForZeroShotObjectDetection.from_pretrained(model_id, revision=commit)
+        model.save_pretrained(output, safe_serialization=True)
+    manifest = {
+        "model_id": model_id,
+        "revision": commit,
+        "files": {p.name: p.stat().st_size for p in sorted(output.iterdir()) if p.is_file() and p.name != MANIFEST},
+    }
+    (output / MANIFEST).write_text(json.dumps(manifest, indent=2) + "\n")
+    return manifest
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_fetch = sub.add_parser("fetch", help="Descargar y fijar el modelo en una carpeta")
+    p_fetch.add_argument("--model-id", default=MODEL_ID)
+    p_fetch.add_argument("--revision", default=MODEL_REVISION, help="Rama, tag o commit del Hub")
+    p_fetch.add_argument("--output", type=Path, default=Path(MODEL_DIR or "models/grounding-dino"))
+    args = parser.parse_args(argv)
+
+    manifest = fetch(args.model_id, args.revision, args.output)
+    size_mb = sum(manifest["files"].values()) / 1e6
+    print(f"[artifacts] {manifest['model_id']}@{manifest['revision'][:12]} → {args.output} ({size_mb:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Backends de inferencia para Grounding DINO, elegidos con GROUNDING_DINO_BACKEND.
+
+- eager: PyTorch fp32 tal cual (AutoModelForZeroShotObjectDetection).
+- int8:  PyTorch con cuantización dinámica int8 de las capas Linear (solo CPU).
+- onnx:  grafo exportado con `python -m detection.export onnx`, ejecutado con ONNX Runtime.
+
+Todos reciben el dict de tensores del processor y devuelven un objeto con `logits` y
+`pred_boxes`, que es lo que necesita post_process_grounded_object_detection. Así el
+detector produce siempre los mismos dicts {"label","box","score"}.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import torch
+
+from detection.artifacts import model_source
+
+BACKENDS = ("eager", "int8", "onnx")
+
+# Entradas del grafo ONNX, en el orden de exportación
+ONNX_INPUT_NAMES = ["pixel_values", "pixel_mask", "input_ids", "token_type_ids", "attention_mask"]
+ONNX_OUTPUT_NAMES = ["logits", "pred_boxes"]
+
+
+@dataclass
+class DetectionOutputs:
+    """Salida mínima compatible con post_process_grounded_object_detection."""
+    logits: torch.Tensor
+    pred_boxes: torch.Tensor
+
+
+class EagerBackend:
+    """PyTorch eager fp32. `model` queda expuesto para la cache de texto del detector."""
+
+    name = "eager"
+
+    def __init__(self, model_id: str, device: str):
+        from transformers import AutoModelForZeroShotObjectDetection
+
+        source, _, kwargs = model_source(model_id)
+        self.model = AutoModelForZeroShotObjectDetection.from_pretrained(source, **kwargs).to(device)
+        self.model.eval()
+
+    @property
+    def device(self) -> torch.device:
+        return self.model.device
+
+    def __call__(self, inputs: dict[str, torch.Tensor]) -> Any:
+        return self.model(**inputs)
+
+
+class QuantizedBackend(EagerBackend):
+    """Cuantización dinámica int8 (pesos int8, activaciones cuantizadas al vuelo) de nn.Linear."""
+
+    name = "int8"
+
+    def __init__(self, model_id: str, device: str):
+        if device != "cpu":
+            raise ValueError("El backend int8 (cuantización dinámica) solo funciona en CPU.")
+        super().__init__(model_id, "cpu")
+        self.model = torch.ao.quantization.quantize_dynamic(
+            self.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        self.model.eval()
+
+    @property
+    def device(self) -> torch.device:
+        return torch.device("cpu")
+
+
+class OnnxBackend:
+    """
+    Grafo ONNX con ONNX Runtime en CPU. La sesión se crea en el primer forward: así, con el
+    pool de procesos, cada worker crea la suya después del fork (los hilos de ORT no sobreviven
+    al fork).
+    """
+
+    name = "onnx"
+    model = None
+
+    def __init__(self, onnx_path: str | Path, num_threads: int = 0):
+        self.onnx_path = Path(onnx_path)
+        if not self.onnx_path.exists():
+            raise FileNotFoundError(
+                f"No existe {self.onnx_path}. Exportar con: python -m detection.export onnx --output {self.onnx_path}"
+            )
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError as e:
+            raise ImportError("GROUNDING_DINO_BACKEND=onnx requiere `pip install onnxruntime`.") from e
+        self.num_threads = num_threads
+        self._session = None
+        self._input_names: list[str] = []
+
+    @property
+    def device(self) -> torch.device:
+        return torch.device("cpu")
+
+    def _get_session(self):
+        if self._session is None:
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.num_threads:
+                options.intra_op_num_threads = self.num_threads
+            self._session = ort.InferenceSession(
+                str(self.onnx_path), options, providers=["CPUExecutionProvider"]
+            )
+            self._input_names = [i.name for i in self._session.get_inputs()]
+        return self._session
+
+    def __call__(self, inputs: dict[str, torch.Tensor]) -> DetectionOutputs:
+        session = self._get_session()
+        feed = {name: inputs[name].cpu().numpy() for name in self._input_names}
+        logits, pred_boxes = session.run(ONNX_OUTPUT_NAMES, feed)
+        return DetectionOutputs(
+            logits=torch.from_numpy(logits),
+            pred_boxes=torch.from_numpy(pred_boxes),
+        )
+
+
+def create_backend(name: str, model_id: str, device: str, onnx_path: str | Path):
+    """Instancia el backend `name` (eager, int8 u onnx)."""
+    name = (name or "eager").lower()
+    if name == "eager":
+        return EagerBackend(model_id, device)
+    if name == "int8":
+        return QuantizedBackend(model_id, device)
+    if name == "onnx":
+        return OnnxBackend(onnx_path)
+    raise ValueError(f"Backend desconocido: {name}. Valores permitidos: {list(BACKENDS)}")
@@ -0,0 +1,137 @@
+"""
+Entrada de POST /detect/batch: imágenes sueltas o dentro de archivos zip.
+
+Las partes multipart se copian a un directorio temporal por petición y los zip se expanden
+ahí mismo, entrada por entrada y con tope de tamaño, así la respuesta en streaming puede leer
+cada imagen cuando le toca sin tener todo el batch en memoria.
+"""
+
+from __future__ import annotations
+
+import shutil
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed", "application/x-zip"}
+
+_COPY_CHUNK = 1024 * 1024
+
+
+class BatchInputError(ValueError):
+    """El batch no se puede aceptar (zip inválido, ...)."""
+
+
+class BatchTooLargeError(BatchInputError):
+    """El batch supera el máximo de imágenes por petición."""
+
+
+@dataclass
+class BatchItem:
+    """Una imagen del batch: nombre original, posición y copia en disco (o el motivo del rechazo)."""
+    index: int
+    filename: str
+    path: Path | None = None
+    error: str | None = None
+    status: int = 400
+
+
+def is_archive(filename: str | None, content_type: str | None) -> bool:
+    return (content_type or "").lower() in ZIP_CONTENT_TYPES or (filename or "").lower().endswith(".zip")
+
+
+def _copy_limited(src: BinaryIO, dest: Path, max_bytes: int) -> bool:
+    """Copia src a dest por bloques; False (y sin archivo) si supera max_bytes."""
+    written = 0
+    with open(dest, "wb") as out:
+        while True:
+            chunk = src.read(_COPY_CHUNK)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > max_bytes:
+                break
+            out.write(chunk)
+    if written > max_bytes:
+        dest.unlink(missing_ok=True)
+        return False
+    return True
+
+
+class BatchSpool:
+    """
+    Acumula las imágenes de un batch en `workdir` respetando max_items y max_item_bytes.
+    Los métodos hacen I/O bloqueante: llamarlos desde un hilo (asyncio.to_thread).
+    """
+
+    def __init__(self, workdir: Path, max_items: int, max_item_bytes: int):
+        self.workdir = workdir
+        self.max_items = max(1, max_items)
+        self.max_item_bytes = max_item_bytes
+        self.items: list[BatchItem] = []
+
+    def _next(self, filename: str) -> BatchItem:
+        if len(self.items) >= self.max_items:
+            raise BatchTooLargeError(f"Demasiadas imágenes en el batch (máximo {self.max_items}).")
+        item = BatchItem(index=len(self.items), filename=filename)
+        self.items.append(item)
+        return item
+
+    def _target(self, item: BatchItem) -> Path:
+        return self.workdir / f"{item.index:06d}{PurePosixPath(item.filename).suffix.lower()}"
+
+    def reject(self, filename: str, reason: str, status: int = 400) -> None:
+        """Registra una parte que no se procesará (su línea NDJSON lleva el error)."""
+        item = self._next(filename)
+        item.error, item.status = reason, status
+
+    def _too_large(self, item: BatchItem) -> None:
+        item.error = f"Imagen demasiado grande (máximo {self.max_item_bytes // (1024 * 1024)} MB)."
+        item.status = 413
+
+    def add_file(self, filename: str, src: BinaryIO) -> None:
+        item = self._next(filename)
+        target = self._target(item)
+        if _copy_limited(src, target, self.max_item_bytes):
+            item.path = target
+        else:
+            self._too_large(item)
+
+    def add_archive(self, archive_name: str, src: BinaryIO) -> None:
+        """Expande las imágenes del zip (ignora directorios, ocultos y __MACOSX) en orden de nombre."""
+        try:
+            zf = zipfile.ZipFile(src)
+        except zipfile.BadZipFile as e:
+            raise BatchInputError(f"Archivo zip no válido ({archive_name}): {e}")
+        with zf:
+            infos = sorted(
+                (
+                    info for info in zf.infolist()
+                    if not info.is_dir()
+                    and PurePosixPath(info.filename).suffix.lower() in IMAGE_SUFFIXES
+                    and not any(p.startswith((".", "__MACOSX")) for p in PurePosixPath(info.filename).parts)
+                ),
+                key=lambda info: info.filename,
+            )
+            for info in infos:
+                item = self._next(info.filename)
+                # file_size viene de la cabecera del zip: se vuelve a comprobar al copiar
+                if info.file_size > self.max_item_bytes:
+                    self._too_large(item)
+                    continue
+                target = self._target(item)
+                try:
+                    with zf.open(info) as entry:
+                        ok = _copy_limited(entry, target, self.max_item_bytes)
+                except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+                    item.error = f"No se pudo extraer del zip: {e}"
+                    continue
+                if ok:
+                    item.path = target
+                else:
+                    self._too_large(item)
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.workdir, ignore_errors=True)
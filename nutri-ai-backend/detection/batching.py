@@ -0,0 +1,309 @@
+"""
+Scheduler de micro-batching delante de GroundingDinoDetector.
+
+Las peticiones HTTP encolan (imagen, prompt, umbrales) y esperan un Future.
+Un dispatcher agrupa las que comparten prompt y umbrales hasta `max_batch_size`
+imágenes o hasta que la más antigua lleve `max_wait_ms` esperando, ejecuta un único
+forward batched (detector.detect_batch) en un hilo aparte y reparte los resultados.
+Las peticiones en modo teselas ya forman un batch por sí solas (sus teselas): se agrupan
+aparte (la TileSpec es parte de la clave) y cada imagen va a detector.detect_tiled.
+Así el event loop nunca queda bloqueado por el modelo.
+
+Control de admisión: la cola está acotada (max_queue_depth) y admit() permite rechazar antes
+de decodificar la imagen, con un Retry-After estimado. Cada petición puede traer un deadline
+(time.monotonic()): se rechaza al llegar si la espera estimada ya no lo cumple, se abandona
+si vence en la cola, y el dispatcher descarta los trabajos que no terminarían a tiempo en vez
+de gastar un forward en un cliente que ya no espera.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from PIL import Image
+
+from detection.config import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, QUEUE_MAX_DEPTH
+from detection.tiling import TileSpec
+from telemetry import BATCH_SIZE, INFERENCE_REJECTED, QUEUE_WAIT_SECONDS, STAGE_SECONDS, observe_stages
+
+BatchKey = tuple[tuple[str, ...], float, float, TileSpec | None]
+
+
+class QueueFullError(RuntimeError):
+    """La cola de inferencia alcanzó max_queue_depth; la petición se rechaza."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(RuntimeError):
+    """El deadline de la petición venció o ya no se puede cumplir; no se ejecuta (o se abandona)."""
+
+
+class ServiceTime:
+    """Media móvil exponencial de la duración de un forward, para estimar esperas."""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.seconds = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.seconds = seconds if self.seconds == 0.0 else self.seconds + self.alpha * (seconds - self.seconds)
+
+
+def retry_after_seconds(estimated_wait: float) -> int:
+    """Valor de Retry-After: la espera estimada redondeada hacia arriba, entre 1 y 60 s."""
+    return min(60, max(1, math.ceil(estimated_wait)))
+
+
+@dataclass
+class _Job:
+    image: Image.Image | None
+    key: BatchKey
+    future: asyncio.Future
+    enqueued_at: float = field(default=0.0)
+    original_size: tuple[int, int] | None = None
+    deadline: float | None = None
+    started: bool = False
+
+
+class BatchScheduler:
+    """
+    Agrupa peticiones de detección concurrentes en forwards batched.
+
+    `detector_factory` se llama dentro del hilo de inferencia, así la carga perezosa
+    del modelo (get_detector) tampoco bloquea el event loop.
+    """
+
+    def __init__(
+        self,
+        detector_factory: Callable[[], Any],
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+        max_queue_depth: int = QUEUE_MAX_DEPTH,
+    ):
+        self._detector_factory = detector_factory
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue_depth = max(1, max_queue_depth)
+        self._queue: asyncio.Queue[_Job] | None = None
+        self._task: asyncio.Task | None = None
+        # Un único hilo: el detector no es thread-safe y un forward ya usa todos los cores.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detector")
+        self._pending = 0
+        self.service_time = ServiceTime()
+
+    @property
+    def pending(self) -> int:
+        """Peticiones aceptadas que todavía no recibieron resultado."""
+        return self._pending
+
+    def estimated_wait(self) -> float:
+        """Segundos estimados hasta tener resultado si se encolara ahora (0 sin historial)."""
+        batches = math.ceil((self._pending + 1) / self.max_batch_size)
+        return batches * self.service_time.seconds + self.max_wait
+
+    def admit(self, deadline: float | None = None) -> None:
+        """
+        Control de admisión, barato: se llama antes de leer y decodificar la imagen. Lanza
+        QueueFullError si la cola está llena y DeadlineExceededError si la espera estimada
+        ya no cabe en el deadline. submit() vuelve a comprobarlo.
+        """
+        if self._pending >= self.max_queue_depth:
+            INFERENCE_REJECTED.inc("queue_full")
+            raise QueueFullError(
+                f"Cola de inferencia llena ({self._pending}/{self.max_queue_depth}).",
+                retry_after=retry_after_seconds(self.estimated_wait()),
+            )
+        if deadline is not None and time.monotonic() + self.estimated_wait() > deadline:
+            INFERENCE_REJECTED.inc("deadline_admission")
+            raise DeadlineExceededError(
+                f"La espera estimada ({self.estimated_wait():.1f} s) supera el deadline de la petición."
+            )
+
+    async def submit(
+        self,
+        image: Image.Image,
+        text_prompts: list[str],
+        box_threshold: float,
+        text_threshold: float,
+        original_size: tuple[int, int] | None = None,
+        tiling: TileSpec | None = None,
+        deadline: float | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Encola una imagen y espera sus detecciones (mismo formato que detector.detect).
+        original_size: (ancho, alto) al que escalar las cajas si `image` es una versión reducida.
+        tiling: si se pasa, detección por teselas (detector.detect_tiled).
+        deadline: instante (time.monotonic()) a partir del cual el resultado ya no sirve.
+        """
+        self.admit(deadline)
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        key: BatchKey = (tuple(text_prompts), float(box_threshold), float(text_threshold), tiling)
+        job = _Job(
+            image=image,
+            key=key,
+            future=loop.create_future(),
+            enqueued_at=time.monotonic(),
+            original_size=original_size or image.size,
+            deadline=deadline,
+        )
+        self._pending += 1
+        try:
+            self._queue.put_nowait(job)
+            if deadline is None:
+                return await job.future
+            try:
+                return await asyncio.wait_for(job.future, max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                # wait_for cancela el future: el dispatcher lo saltea si todavía no empezó
+                if not job.started:
+                    QUEUE_WAIT_SECONDS.observe(time.monotonic() - job.enqueued_at, "expired")
+                INFERENCE_REJECTED.inc("deadline_running" if job.started else "deadline_queue")
+                raise DeadlineExceededError("El deadline de la petición venció antes de tener resultado.") from None
+        finally:
+            self._pending -= 1
+            # La imagen no se retiene en la cola mientras el trabajo espera a ser descartado
+            job.image = None
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._dispatch_loop())
+
+    async def close(self) -> None:
+        """Detiene el dispatcher (las peticiones en curso reciben CancelledError)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def _dispatch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        buckets: OrderedDict[BatchKey, list[_Job]] = OrderedDict()
+        while True:
+            if not buckets:
+                job = await self._queue.get()
+                buckets.setdefault(job.key, []).append(job)
+
+            # Vaciar lo que ya esté en cola sin esperar
+            while not self._queue.empty():
+                job = self._queue.get_nowait()
+                buckets.setdefault(job.key, []).append(job)
+
+            full_key = next(
+                (k for k, jobs in buckets.items() if len(jobs) >= self.max_batch_size),
+                None,
+            )
+            if full_key is None:
+                # Esperar más trabajos hasta que venza el plazo del bucket más antiguo
+                oldest_key, oldest_jobs = next(iter(buckets.items()))
+                timeout = oldest_jobs[0].enqueued_at + self.max_wait - time.monotonic()
+                if timeout > 0:
+                    try:
+                        job = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    else:
+                        buckets.setdefault(job.key, []).append(job)
+                        continue
+                full_key = oldest_key
+
+            jobs = buckets.pop(full_key)
+            batch, rest = jobs[: self.max_batch_size], jobs[self.max_batch_size:]
+            if rest:
+                buckets[full_key] = rest
+                buckets.move_to_end(full_key, last=False)
+            await self._run_batch(loop, batch)
+
+    async def _run_batch(self, loop: asyncio.AbstractEventLoop, batch: list[_Job]) -> None:
+        # Los clientes que ya se desconectaron no ocupan sitio en el forward
+        batch = [j for j in batch if not j.future.done()]
+        now = time.monotonic()
+        # Ni los que no recibirían el resultado a tiempo: ese forward sería trabajo perdido
+        finish = now + self.service_time.seconds
+        for j in [j for j in batch if j.deadline is not None and finish > j.deadline]:
+            QUEUE_WAIT_SECONDS.observe(now - j.enqueued_at, "expired")
+            INFERENCE_REJECTED.inc("deadline_queue")
+            j.future.set_exception(DeadlineExceededError("El deadline de la petición no se cumpliría."))
+        batch = [j for j in batch if not j.future.done()]
+        if not batch:
+            return
+        for j in batch:
+            j.started = True
+            STAGE_SECONDS.observe(now - j.enqueued_at, "queue")
+            QUEUE_WAIT_SECONDS.observe(now - j.enqueued_at, "served")
+        BATCH_SIZE.observe(len(batch))
+        text_prompts, box_threshold, text_threshold, tiling = batch[0].key
+        images = [j.image for j in batch]
+        original_sizes = [j.original_size for j in batch]
+        start = time.monotonic()
+        try:
+            results = await loop.run_in_executor(
+                self._executor,
+                self._detect_batch,
+                images,
+                list(text_prompts),
+                box_threshold,
+                text_threshold,
+                original_sizes,
+                tiling,
+            )
+        except Exception as e:
+            for j in batch:
+                if not j.future.done():
+                    j.future.set_exception(e)
+            return
+        self.service_time.observe(time.monotonic() - start)
+        for j, result in zip(batch, results):
+            if not j.future.done():
+                j.future.set_result(result)
+
+    def _detect_batch(
+        self,
+        images: list[Image.Image],
+        text_prompts: list[str],
+        box_threshold: float,
+        text_threshold: float,
+        original_sizes: list[tuple[int, int]],
+        tiling: TileSpec | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        detector = self._detector_factory()
+        timings: dict[str, float] = {}
+        if tiling is not None:
+            results = [
+                detector.detect_tiled(
+                    image,
+                    text_prompts=text_prompts,
+                    box_threshold=box_threshold,
+                    text_threshold=text_threshold,
+                    tiling=tiling,
+                    original_size=original_size,
+                    timings=timings,
+                )
+                for image, original_size in zip(images, original_sizes)
+            ]
+            observe_stages(timings)
+            return results
+        results = detector.detect_batch(
+            images,
+            text_prompts=text_prompts,
+            box_threshold=box_threshold,
+            text_threshold=text_threshold,
+            original_sizes=original_sizes,
+            timings=timings,
+        )
+        observe_stages(timings)
+        return results
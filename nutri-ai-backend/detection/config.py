@@ -7,6 +7,16 @@ import os
 
 # Modelo Grounding DINO (Hugging Face)
 MODEL_ID = os.environ.get("GROUNDING_DINO_MODEL_ID", "IDEA-Research/grounding-dino-tiny")
+# Rama, tag o commit del Hub (fijar un commit para builds reproducibles).
+MODEL_REVISION = os.environ.get("GROUNDING_DINO_MODEL_REVISION", "main")
+# Carpeta con el modelo horneado (`python -m detection.artifacts fetch`); si existe se carga de
+# disco sin red, con los pesos safetensors mapeados en memoria (ver detection/artifacts.py).
+MODEL_DIR = os.environ.get("GROUNDING_DINO_MODEL_DIR", "").strip()
+
+# Backend de inferencia: eager (PyTorch fp32), int8 (cuantización dinámica, CPU) u onnx (ONNX Runtime).
+BACKEND = os.environ.get("GROUNDING_DINO_BACKEND", "eager").strip().lower()
+# Grafo exportado con `python -m detection.export onnx` (solo para BACKEND=onnx).
+ONNX_PATH = os.environ.get("GROUNDING_DINO_ONNX_PATH", "artifacts/grounding-dino.onnx")
 
 # Lista base de ingredientes visibles (en inglés) para usar como prompt.
 # Solo ingredientes visuales, no recetas abstractas.
@@ -36,6 +46,64 @@ INGREDIENTS_LIST = [
     "croissant", "medialuna", "ice cream",
 ]
 
+# Categorías de comida: cada clave tiene una lista de etiquetas (labels) que pertenecen a esa categoría.
+# Las etiquetas están en inglés (como devuelve el modelo).
+MEAL_CATEGORIES = {
+    "breakfast": [
+        "egg", "boiled egg", "fried egg",
+        "oats", "oatmeal", "bread", "whole wheat bread", "tortilla", "wrap",
+        "croissant", "medialuna",
+        "banana", "apple", "strawberry",
+        "butter", "peanut butter", "cream cheese",
+        "avocado",
+    ],
+    "lunch": [
+        "rice", "white rice", "brown rice",
+        "pasta", "whole wheat pasta",
+        "lentils", "chickpeas", "beans", "peas",
+        "beef", "chicken", "pork", "fish", "tuna", "salmon",
+        "lettuce", "tomato", "cherry tomato",
+        "onion", "red onion", "green onion",
+        "carrot", "grated carrot",
+        "bell pepper", "red pepper", "green pepper",
+        "zucchini", "eggplant",
+        "spinach", "arugula",
+        "broccoli", "cauliflower",
+        "potato", "sweet potato", "pumpkin",
+        "french fries", "mashed potatoes",
+        "avocado", "olives",
+        "cheese", "mozzarella", "parmesan",
+        "olive oil",
+    ],
+    "snack": [
+        "bread", "whole wheat bread", "tortilla", "wrap",
+        "cookies", "biscuits", "cake", "chocolate cake",
+        "croissant", "medialuna", "ice cream",
+        "banana", "apple", "strawberry",
+        "peanut butter", "cream cheese",
+        "avocado", "olives",
+    ],
+    "dinner": [
+        "rice", "white rice", "brown rice",
+        "pasta", "whole wheat pasta",
+        "lentils", "chickpeas", "beans", "peas",
+        "beef", "chicken", "pork", "fish", "tuna", "salmon",
+        "lettuce", "tomato", "cherry tomato",
+        "onion", "red onion", "green onion",
+        "carrot", "grated carrot",
+        "bell pepper", "red pepper", "green pepper",
+        "zucchini", "eggplant",
+        "spinach", "arugula",
+        "broccoli", "cauliflower",
+        "potato", "sweet potato", "pumpkin",
+        "french fries", "mashed potatoes",
+        "avocado", "olives",
+        "cheese", "mozzarella", "parmesan",
+        "pizza", "hamburger", "sushi",
+        "olive oil",
+    ],
+}
+
 # Prompt como string separado por comas (para API o documentación).
 INGREDIENTS_PROMPT_STR = ", ".join(INGREDIENTS_LIST)
 
@@ -52,6 +120,20 @@ def ingredients_from_string(prompt_str: str) -> list[str]:
     return [s.strip() for s in prompt_str.split(",") if s.strip()]
 
 
+# Modos de ejecución del modelo torch (ver detection/execution.py). PRECISION: fp32 o bf16
+# (autocast, solo si el hardware lo soporta); COMPILE: torch.compile del backbone de imagen;
+# hilos intra-op / inter-op de torch (0 = default de torch; con el pool, ver DETECTION_WORKER_THREADS).
+PRECISION = os.environ.get("GROUNDING_DINO_PRECISION", "fp32").strip().lower()
+INFERENCE_MODE = os.environ.get("GROUNDING_DINO_INFERENCE_MODE", "true").strip().lower() in ("1", "true", "yes")
+COMPILE = os.environ.get("GROUNDING_DINO_COMPILE", "false").strip().lower() in ("1", "true", "yes")
+COMPILE_MODE = os.environ.get("GROUNDING_DINO_COMPILE_MODE", "default").strip()
+CHANNELS_LAST = os.environ.get("GROUNDING_DINO_CHANNELS_LAST", "false").strip().lower() in ("1", "true", "yes")
+INTRA_OP_THREADS = int(os.environ.get("DETECTION_INTRA_OP_THREADS", "0"))
+INTER_OP_THREADS = int(os.environ.get("DETECTION_INTER_OP_THREADS", "0"))
+
+# Prompts distintos cuya tokenización y salida del text encoder se cachean (0 = sin cache).
+TEXT_CACHE_SIZE = int(os.environ.get("GROUNDING_DINO_TEXT_CACHE_SIZE", "64"))
+
 # Umbrales iniciales (box ≈ 0.3, text ≈ 0.25)
 BOX_THRESHOLD = float(os.environ.get("GROUNDING_DINO_BOX_THRESHOLD", "0.30"))
 TEXT_THRESHOLD = float(os.environ.get("GROUNDING_DINO_TEXT_THRESHOLD", "0.25"))
@@ -76,3 +158,94 @@ LABEL_ES = {
     "ice cream": "helado", "cake": "torta", "chocolate cake": "torta de chocolate",
     "croissant": "medialuna", "medialuna": "medialuna",
 }
+
+# Micro-batching del detector (ver detection/batching.py).
+# Las peticiones con el mismo prompt y umbrales se agrupan hasta BATCH_MAX_SIZE imágenes
+# o hasta que la más antigua espere BATCH_MAX_WAIT_MS. QUEUE_MAX_DEPTH limita las pendientes.
+BATCH_MAX_SIZE = int(os.environ.get("DETECTION_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("DETECTION_BATCH_MAX_WAIT_MS", "10"))
+QUEUE_MAX_DEPTH = int(os.environ.get("DETECTION_QUEUE_MAX_DEPTH", "64"))
+# Deadline por defecto de /detect y /detect/image (ms) si el cliente no envía X-Deadline-Ms ni
+# deadline_ms; 0 = sin deadline. Lo que no llegaría a tiempo se rechaza o se descarta de la cola.
+REQUEST_DEADLINE_MS = float(os.environ.get("DETECTION_REQUEST_DEADLINE_MS", "0"))
+
+# Pool de procesos de inferencia en CPU (ver detection/worker_pool.py).
+# WORKERS = 0 desactiva el pool (inferencia en el propio proceso con el scheduler de batching).
+POOL_WORKERS = int(os.environ.get("DETECTION_WORKERS", "0"))
+# Hilos de torch por worker; 0 = repartir los cores disponibles entre los workers.
+POOL_WORKER_THREADS = int(os.environ.get("DETECTION_WORKER_THREADS", "0"))
+# Slots de memoria compartida por los que viajan las imágenes (RGB crudo) hacia los workers.
+POOL_SLOTS = int(os.environ.get("DETECTION_POOL_SLOTS", "0"))  # 0 = 2 por worker
+POOL_SLOT_MB = float(os.environ.get("DETECTION_POOL_SLOT_MB", "8"))
+# Veces que el pool vuelve a hacer fork de un worker caído; agotadas, el worker queda fuera
+# y, si no queda ninguno vivo, /ready devuelve 503.
+POOL_MAX_RESPAWNS = int(os.environ.get("DETECTION_POOL_MAX_RESPAWNS", "5"))
+
+# Cache de resultados por contenido de imagen + prompt + umbrales (ver detection/result_cache.py).
+# Acotada por número de entradas y por memoria aproximada; 0 en cualquiera la desactiva.
+RESULT_CACHE_ENTRIES = int(os.environ.get("DETECTION_RESULT_CACHE_ENTRIES", "512"))
+RESULT_CACHE_MB = float(os.environ.get("DETECTION_RESULT_CACHE_MB", "16"))
+
+# Decodificación de subidas (ver detection/image_io.py): las imágenes se reducen al tamaño
+# del processor (lado corto 800, largo ≤ 1333) y se rechazan las de más de MAX_IMAGE_PIXELS.
+DECODE_SHORTEST_EDGE = int(os.environ.get("DETECTION_DECODE_SHORTEST_EDGE", "800"))
+DECODE_LONGEST_EDGE = int(os.environ.get("DETECTION_DECODE_LONGEST_EDGE", "1333"))
+MAX_IMAGE_PIXELS = int(float(os.environ.get("DETECTION_MAX_IMAGE_PIXELS", "50e6")))
+
+# Ingesta de subidas (ver detection/upload.py): tamaño máximo de cada imagen y del cuerpo de
+# POST /detect/batch. Lo que lo supera se rechaza con 413 sin leer el resto del cuerpo.
+MAX_UPLOAD_MB = float(os.environ.get("DETECTION_MAX_UPLOAD_MB", "20"))
+MAX_BATCH_BODY_MB = float(os.environ.get("DETECTION_MAX_BATCH_BODY_MB", "512"))
+
+# Precarga y calentamiento al arrancar (ver detection/warmup.py y GET /ready).
+PRELOAD = os.environ.get("DETECTION_PRELOAD", "false").strip().lower() in ("1", "true", "yes")
+WARMUP_SIZES = os.environ.get("DETECTION_WARMUP_SIZES", "640x480,1024x768,3024x4032")
+WARMUP_RUNS = int(os.environ.get("DETECTION_WARMUP_RUNS", "1"))
+
+# POST /detect/batch (ver detection/batch_input.py): imágenes por petición (sueltas o dentro de
+# zip), tamaño máximo de cada una y cuántas se decodifican/detectan a la vez. La concurrencia
+# debería quedar por debajo de QUEUE_MAX_DEPTH para no llenar la cola de inferencia.
+BATCH_UPLOAD_MAX_ITEMS = int(os.environ.get("DETECTION_BATCH_UPLOAD_MAX_ITEMS", "500"))
+BATCH_UPLOAD_MAX_ITEM_MB = float(os.environ.get("DETECTION_BATCH_UPLOAD_MAX_ITEM_MB", str(MAX_UPLOAD_MB)))
+BATCH_UPLOAD_CONCURRENCY = int(os.environ.get("DETECTION_BATCH_UPLOAD_CONCURRENCY", "16"))
+
+# Render de POST /detect/image (ver detection/render.py): fuente TrueType opcional (si no, la
+# que traiga Pillow) y formato/calidad por defecto de la respuesta (la petición los puede cambiar).
+RENDER_FONT = os.environ.get("DETECTION_RENDER_FONT", "").strip()
+RENDER_FORMAT = os.environ.get("DETECTION_RENDER_FORMAT", "jpeg").strip().lower()
+RENDER_QUALITY = int(os.environ.get("DETECTION_RENDER_QUALITY", "90"))
+
+# Inferencia por teselas (ver detection/tiling.py), opcional por petición en POST /detect.
+# La imagen se decodifica a TILING_SHORTEST_EDGE / TILING_LONGEST_EDGE (más que el processor) y
+# se corta en teselas de TILING_TILE_SIZE px con TILING_OVERLAP de solape; TILING_MAX_BATCH
+# limita las teselas por forward (memoria). Los duplicados se eliminan con NMS por clase.
+TILING_SHORTEST_EDGE = int(os.environ.get("DETECTION_TILING_SHORTEST_EDGE", "1200"))
+TILING_LONGEST_EDGE = int(os.environ.get("DETECTION_TILING_LONGEST_EDGE", "2000"))
+TILING_TILE_SIZE = int(os.environ.get("DETECTION_TILING_TILE_SIZE", "800"))
+TILING_OVERLAP = float(os.environ.get("DETECTION_TILING_OVERLAP", "0.2"))
+TILING_INCLUDE_FULL = os.environ.get("DETECTION_TILING_INCLUDE_FULL", "true").strip().lower() in ("1", "true", "yes")
+TILING_IOU_THRESHOLD = float(os.environ.get("DETECTION_TILING_IOU_THRESHOLD", "0.5"))
+TILING_MAX_BATCH = int(os.environ.get("DETECTION_TILING_MAX_BATCH", "8"))
+
+# Detector falso (ver detection/fake.py) para pruebas de carga sin modelo: con
+# FAKE_DETECTOR_MS > 0 la API no carga Grounding DINO y cada forward duerme ese tiempo
+# más FAKE_DETECTOR_PER_IMAGE_MS por imagen del batch.
+FAKE_DETECTOR_MS = float(os.environ.get("DETECTION_FAKE_DETECTOR_MS", "0"))
+FAKE_DETECTOR_PER_IMAGE_MS = float(os.environ.get("DETECTION_FAKE_DETECTOR_PER_IMAGE_MS", "0"))
+# COMPUTE: en vez de dormir, el forward ocupa ese tiempo con una red diminuta de pesos
+# aleatorios en numpy (usa CPU y, entre llamadas a BLAS, el GIL, como un modelo de verdad).
+FAKE_DETECTOR_COMPUTE = os.environ.get("DETECTION_FAKE_DETECTOR_COMPUTE", "false").strip().lower() in ("1", "true", "yes")
+
+# Modo cámara en vivo, WebSocket /detect/live (ver detection/live.py). El modelo solo corre en
+# fotogramas clave: el primero, cuando la diferencia con el último clave (tras compensar el
+# desplazamiento de la cámara) supera LIVE_KEYFRAME_DIFF (0-1), cuando la cámara se movió más de
+# LIVE_MAX_SHIFT del ancho/alto o cada LIVE_KEYFRAME_INTERVAL_MS. Entre medias las cajas se
+# desplazan con el movimiento estimado sobre miniaturas de LIVE_SIGNATURE_SIZE px de ancho.
+LIVE_KEYFRAME_DIFF = float(os.environ.get("DETECTION_LIVE_KEYFRAME_DIFF", "0.08"))
+LIVE_MAX_SHIFT = float(os.environ.get("DETECTION_LIVE_MAX_SHIFT", "0.25"))
+LIVE_KEYFRAME_INTERVAL_MS = float(os.environ.get("DETECTION_LIVE_KEYFRAME_INTERVAL_MS", "3000"))
+LIVE_SIGNATURE_SIZE = int(os.environ.get("DETECTION_LIVE_SIGNATURE_SIZE", "128"))
+# Un fotograma clave cuyo resultado tardaría más que esto ya no sirve (ver deadlines en batching.py)
+LIVE_INFERENCE_DEADLINE_MS = float(os.environ.get("DETECTION_LIVE_INFERENCE_DEADLINE_MS", "2000"))
+# Los fotogramas se decodifican más pequeños que en /detect: la cámara ya envía poca resolución
+LIVE_LONGEST_EDGE = int(os.environ.get("DETECTION_LIVE_LONGEST_EDGE", "960"))
@@ -0,0 +1,135 @@
+"""
+Modos de ejecución del modelo torch (backends eager e int8), elegidos por variables de entorno.
+
+- inference_mode: torch.inference_mode() en lugar de torch.no_grad() (sin version counters
+  ni vistas con autograd; algo menos de overhead por operación).
+- precision bf16: autocast a bfloat16 en CPUs con soporte nativo (AVX512-BF16 / AMX) o GPUs que
+  lo soporten; si no hay soporte se sigue en fp32 y se informa el motivo. Solo backend eager
+  (las capas int8 cuantizadas no admiten autocast).
+- compile: torch.compile del backbone de imagen (la parte más cara por imagen). La primera
+  llamada con cada forma compila: conviene DETECTION_PRELOAD=1 para pagarlo en el calentamiento.
+- channels_last: pesos y pixel_values en formato NHWC, mejor para las convoluciones en CPU.
+- hilos: intra-op / inter-op explícitos, para no sobresuscribir cores con varios workers.
+
+El modo pedido y el efectivo (tras comprobar soporte) se informan en / y /ready. torch se
+importa dentro de cada función: / y /ready construyen el modo configurado sin cargar torch.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import sys
+from dataclasses import asdict, dataclass, replace
+from typing import TYPE_CHECKING, Any, ContextManager
+
+from detection.config import (
+    CHANNELS_LAST,
+    COMPILE,
+    COMPILE_MODE,
+    INFERENCE_MODE,
+    INTER_OP_THREADS,
+    INTRA_OP_THREADS,
+    PRECISION,
+)
+
+if TYPE_CHECKING:
+    import torch
+
+PRECISIONS = ("fp32", "bf16")
+
+
+@dataclass(frozen=True)
+class ExecutionMode:
+    precision: str = PRECISION
+    inference_mode: bool = INFERENCE_MODE
+    compile: bool = COMPILE
+    compile_mode: str = COMPILE_MODE
+    channels_last: bool = CHANNELS_LAST
+    intra_op_threads: int = INTRA_OP_THREADS
+    inter_op_threads: int = INTER_OP_THREADS
+    note: str | None = None
+
+    def grad_context(self) -> ContextManager:
+        import torch
+
+        return torch.inference_mode() if self.inference_mode else torch.no_grad()
+
+    def autocast(self, device_type: str) -> ContextManager:
+        if self.precision == "bf16":
+            import torch
+
+            return torch.autocast(device_type, dtype=torch.bfloat16)
+        return contextlib.nullcontext()
+
+    def as_dict(self) -> dict[str, Any]:
+        body = asdict(self)
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            body["threads"] = {"intra_op": torch.get_num_threads(), "inter_op": torch.get_num_interop_threads()}
+        else:
+            # torch sin cargar: los hilos configurados (0 = default de torch)
+            body["threads"] = {"intra_op": self.intra_op_threads, "inter_op": self.inter_op_threads}
+        return body
+
+
+def bf16_supported(device: torch.device) -> bool:
+    import torch
+
+    if device.type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    try:
+        return bool(torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def configure_threads(mode: ExecutionMode) -> None:
+    """Fija los hilos de torch de este proceso (0 = dejar el default de torch)."""
+    import torch
+
+    if mode.intra_op_threads > 0:
+        torch.set_num_threads(mode.intra_op_threads)
+    if mode.inter_op_threads > 0:
+        try:
+            torch.set_num_interop_threads(mode.inter_op_threads)
+        except RuntimeError:
+            # Solo se puede fijar una vez y antes del primer trabajo paralelo inter-op
+            pass
+
+
+def resolve(mode: ExecutionMode, backend_name: str, device: torch.device) -> ExecutionMode:
+    """Modo efectivo para este backend y dispositivo: lo no soportado se desactiva con una nota."""
+    import torch
+
+    notes = []
+    if mode.precision not in PRECISIONS:
+        notes.append(f"precision {mode.precision!r} desconocida, se usa fp32")
+        mode = replace(mode, precision="fp32")
+    if backend_name == "onnx":
+        if mode.precision != "fp32" or mode.compile or mode.channels_last:
+            notes.append("backend onnx: precision, compile y channels_last no aplican")
+        mode = replace(mode, precision="fp32", compile=False, channels_last=False)
+    if mode.precision == "bf16" and backend_name != "eager":
+        notes.append(f"bf16 solo con backend eager (backend {backend_name}), se usa fp32")
+        mode = replace(mode, precision="fp32")
+    if mode.precision == "bf16" and not bf16_supported(device):
+        notes.append(f"bf16 sin soporte nativo en {device.type}, se usa fp32")
+        mode = replace(mode, precision="fp32")
+    if mode.compile and not hasattr(torch, "compile"):
+        notes.append("torch.compile no disponible (torch < 2.0)")
+        mode = replace(mode, compile=False)
+    return replace(mode, note="; ".join(notes) or None)
+
+
+def apply(model: torch.nn.Module | None, mode: ExecutionMode) -> None:
+    """Aplica channels_last y torch.compile al modelo torch (None en el backend onnx)."""
+    if model is None:
+        return
+    import torch
+
+    if mode.channels_last:
+        model.to(memory_format=torch.channels_last)
+    if mode.compile:
+        # Solo el backbone de imagen: el text backbone va envuelto por la cache de texto, cuyo
+        # estado por forward provocaría recompilaciones. dynamic=True: los tamaños de imagen varían.
+        model.model.backbone = torch.compile(model.model.backbone, mode=mode.compile_mode, dynamic=True)
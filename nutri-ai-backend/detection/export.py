@@ -0,0 +1,161 @@
+"""
+CLI para exportar y validar los artefactos de los backends acelerados.
+
+Uso (desde nutri-ai-backend/):
+    python -m detection.export onnx --output artifacts/grounding-dino.onnx
+    python -m detection.export validate --backend int8 --images fixtures/
+    python -m detection.export validate --backend onnx --images fixtures/
+
+`onnx` exporta el modelo eager a un grafo con ejes dinámicos (batch, alto, ancho, tokens),
+lo comprueba con onnx.checker y compara logits/cajas con PyTorch en una imagen sintética.
+`validate` ejecuta el backend indicado y eager fp32 sobre las imágenes y falla (exit 1)
+si la paridad queda por debajo de las tolerancias.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+import torch
+from PIL import Image
+
+from detection.backends import ONNX_INPUT_NAMES, ONNX_OUTPUT_NAMES, EagerBackend
+from detection.config import INGREDIENTS_LIST, MODEL_ID, ONNX_PATH
+from detection.parity import ParityReport
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+class _ExportWrapper(torch.nn.Module):
+    """Expone el forward con argumentos posicionales y salida (logits, pred_boxes)."""
+
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values, pixel_mask, input_ids, token_type_ids, attention_mask):
+        out = self.model(
+            pixel_values=pixel_values,
+            pixel_mask=pixel_mask,
+            input_ids=input_ids,
+            token_type_ids=token_type_ids,
+            attention_mask=attention_mask,
+            return_dict=True,
+        )
+        return out.logits, out.pred_boxes
+
+
+def _sample_inputs(model_id: str) -> dict[str, torch.Tensor]:
+    from transformers import AutoProcessor
+
+    processor = AutoProcessor.from_pretrained(model_id)
+    image = Image.effect_noise((1024, 768), 64).convert("RGB")
+    return dict(processor(images=image, text=[INGREDIENTS_LIST], return_tensors="pt"))
+
+
+def export_onnx(model_id: str, output: Path, opset: int) -> None:
+    """Exporta a ONNX y verifica el grafo contra PyTorch."""
+    backend = EagerBackend(model_id, "cpu")
+    wrapper = _ExportWrapper(backend.model).eval()
+    inputs = _sample_inputs(model_id)
+    args = tuple(inputs[name] for name in ONNX_INPUT_NAMES)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"[export] Exportando {model_id} → {output} (opset {opset})")
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            args,
+            str(output),
+            input_names=ONNX_INPUT_NAMES,
+            output_names=ONNX_OUTPUT_NAMES,
+            dynamic_axes={
+                "pixel_values": {0: "batch", 2: "height", 3: "width"},
+                "pixel_mask": {0: "batch", 1: "height", 2: "width"},
+                "input_ids": {0: "batch", 1: "tokens"},
+                "token_type_ids": {0: "batch", 1: "tokens"},
+                "attention_mask": {0: "batch", 1: "tokens"},
+                "logits": {0: "batch", 2: "tokens"},
+                "pred_boxes": {0: "batch"},
+            },
+            opset_version=opset,
+        )
+
+    try:
+        import onnx
+
+        onnx.checker.check_model(str(output))
+        print("[export] onnx.checker OK")
+    except ImportError:
+        print("[export] onnx no instalado: se omite onnx.checker")
+
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(str(output), providers=["CPUExecutionProvider"])
+    ort_logits, ort_boxes = session.run(
+        ONNX_OUTPUT_NAMES, {name: inputs[name].numpy() for name in ONNX_INPUT_NAMES}
+    )
+    with torch.no_grad():
+        ref_logits, ref_boxes = wrapper(*args)
+    logits_diff = float((ref_logits - torch.from_numpy(ort_logits)).abs().max())
+    boxes_diff = float((ref_boxes - torch.from_numpy(ort_boxes)).abs().max())
+    print(f"[export] max |Δlogits| = {logits_diff:.2e}, max |Δboxes| = {boxes_diff:.2e}")
+    if boxes_diff > 1e-2:
+        raise SystemExit("[export] El grafo ONNX no reproduce las cajas de PyTorch.")
+
+
+def load_fixture_images(folder: str | None) -> list[Image.Image]:
+    """Imágenes de la carpeta de fixtures, o dos sintéticas si no se indica carpeta."""
+    if not folder:
+        return [
+            Image.effect_noise((1024, 768), 64).convert("RGB"),
+            Image.linear_gradient("L").resize((800, 800)).convert("RGB"),
+        ]
+    paths = sorted(p for p in Path(folder).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not paths:
+        raise SystemExit(f"No hay imágenes en {folder}")
+    return [Image.open(p).convert("RGB") for p in paths]
+
+
+def validate(backend: str, images: list[Image.Image], min_mean_iou: float, max_score_drift: float) -> bool:
+    """Compara el backend con eager fp32 en las imágenes. True si cumple las tolerancias."""
+    from detection.grounding_dino import GroundingDinoDetector
+
+    reference = GroundingDinoDetector(backend="eager", device="cpu", text_cache_size=0)
+    candidate = GroundingDinoDetector(backend=backend, device="cpu", text_cache_size=0)
+    report = ParityReport()
+    for image in images:
+        report.add(reference.detect(image), candidate.detect(image))
+    summary = report.summary()
+    ok = report.passes(min_mean_iou, max_score_drift)
+    print(f"[validate] {backend} vs eager: {summary} → {'OK' if ok else 'FALLA'}")
+    return ok
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_onnx = sub.add_parser("onnx", help="Exportar el modelo a ONNX")
+    p_onnx.add_argument("--model-id", default=MODEL_ID)
+    p_onnx.add_argument("--output", type=Path, default=Path(ONNX_PATH))
+    p_onnx.add_argument("--opset", type=int, default=17)
+
+    p_val = sub.add_parser("validate", help="Validar un backend contra eager fp32")
+    p_val.add_argument("--backend", choices=["int8", "onnx"], required=True)
+    p_val.add_argument("--images", help="Carpeta de imágenes de fixture")
+    p_val.add_argument("--min-mean-iou", type=float, default=0.9)
+    p_val.add_argument("--max-score-drift", type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+    if args.command == "onnx":
+        export_onnx(args.model_id, args.output, args.opset)
+    else:
+        ok = validate(args.backend, load_fixture_images(args.images), args.min_mean_iou, args.max_score_drift)
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
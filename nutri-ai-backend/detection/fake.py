@@ -0,0 +1,114 @@
+"""
+Detector falso para pruebas de carga y del control de admisión, sin torch ni modelo.
+
+Misma interfaz que GroundingDinoDetector (load_model, prepare_prompts, detect, detect_batch,
+detect_tiled): cada forward tarda forward_ms + per_image_ms × imágenes y devuelve cajas fijas
+para los primeros prompts. Se activa en la API con DETECTION_FAKE_DETECTOR_MS > 0.
+
+Por defecto el forward duerme (libera el GIL, como un forward de torch bien aislado). Con
+compute=True (DETECTION_FAKE_DETECTOR_COMPUTE) ocupa ese tiempo con una red diminuta de pesos
+aleatorios sobre una miniatura de cada imagen: consume CPU y compite por el GIL con el event
+loop, y los scores salen de la red, así las pruebas de carga se parecen más al modelo real.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from detection.config import FAKE_DETECTOR_COMPUTE, FAKE_DETECTOR_MS, FAKE_DETECTOR_PER_IMAGE_MS, INGREDIENTS_LIST
+from detection.timing import stage
+
+# Red aleatoria del modo compute: miniatura de _THUMB×_THUMB en grises, proyectada a _HIDDEN
+_THUMB = 64
+_HIDDEN = 512
+
+
+@dataclass(frozen=True)
+class FakeExecution:
+    forward_ms: float
+    per_image_ms: float
+    compute: bool = False
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"fake": True, "forward_ms": self.forward_ms, "per_image_ms": self.per_image_ms, "compute": self.compute}
+
+
+class FakeDetector:
+    backend_name = "fake"
+
+    def __init__(
+        self,
+        forward_ms: float = FAKE_DETECTOR_MS,
+        per_image_ms: float = FAKE_DETECTOR_PER_IMAGE_MS,
+        compute: bool = FAKE_DETECTOR_COMPUTE,
+        seed: int = 0,
+    ):
+        self.execution = FakeExecution(forward_ms, per_image_ms, compute)
+        self.forwards = 0
+        self.images = 0
+        self._weights = None
+        if compute:
+            import numpy as np
+
+            rng = np.random.default_rng(seed)
+            self._projection = (rng.standard_normal((_HIDDEN, _THUMB)) / _THUMB**0.5).astype(np.float32)
+            self._weights = (rng.standard_normal((_HIDDEN, _HIDDEN)) / _HIDDEN**0.5).astype(np.float32)
+
+    def load_model(self) -> None:
+        pass
+
+    def prepare_prompts(self, prompt_lists: list[list[str]]) -> None:
+        pass
+
+    def detect(self, image: Any, text_prompts: list[str] | None = None, **kwargs: Any) -> list[dict[str, Any]]:
+        return self.detect_batch([image], text_prompts=text_prompts, **kwargs)[0]
+
+    def detect_batch(
+        self,
+        images: list[Any],
+        text_prompts: list[str] | None = None,
+        box_threshold: float | None = None,
+        text_threshold: float | None = None,
+        original_sizes: list[tuple[int, int]] | None = None,
+        timings: dict[str, float] | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        budget = (self.execution.forward_ms + self.execution.per_image_ms * len(images)) / 1000
+        with stage(timings, "forward"):
+            if self._weights is None:
+                time.sleep(budget)
+                scores = [[0.9 - 0.1 * i for i in range(3)] for _ in images]
+            else:
+                scores = self._forward(images, budget)
+        self.forwards += 1
+        self.images += len(images)
+        prompts = list(text_prompts or INGREDIENTS_LIST)[:3]
+        sizes = original_sizes or [im.size for im in images]
+        return [
+            [
+                {"label": label, "box": [w * 0.1 * (i + 1), h * 0.1, w * 0.1 * (i + 3), h * 0.3], "score": image_scores[i]}
+                for i, label in enumerate(prompts)
+            ]
+            for (w, h), image_scores in zip(sizes, scores)
+        ]
+
+    def _forward(self, images: list[Any], budget: float) -> list[list[float]]:
+        """Capas tanh(W·h) sobre la miniatura de cada imagen hasta agotar `budget` segundos."""
+        import numpy as np
+
+        end = time.perf_counter() + budget
+        thumbs = [np.asarray(im.convert("L").resize((_THUMB, _THUMB)), dtype=np.float32) / 255.0 for im in images]
+        # (HIDDEN, THUMB · imágenes): cada fila de la miniatura es un token
+        h = self._projection @ np.concatenate([t.T for t in thumbs], axis=1)
+        while True:
+            h = np.tanh(self._weights @ h)
+            if time.perf_counter() >= end:
+                break
+        pooled = h.reshape(_HIDDEN, len(images), _THUMB).mean(axis=2)
+        return [[round(0.6 + 0.3 * float(np.tanh(4 * pooled[i, n])), 4) for i in range(3)] for n in range(len(images))]
+
+    def detect_tiled(self, image: Any, text_prompts: list[str] | None = None, **kwargs: Any) -> list[dict[str, Any]]:
+        kwargs.pop("tiling", None)
+        original_size = kwargs.pop("original_size", None)
+        return self.detect_batch([image], text_prompts=text_prompts, original_sizes=[original_size or image.size], **kwargs)[0]
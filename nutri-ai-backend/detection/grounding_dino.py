@@ -6,12 +6,30 @@ Salida: bounding boxes con etiqueta y score.
 
 from __future__ import annotations
 
+import threading
+import time
 from typing import Any
 
 import torch
 from PIL import Image
 
-from detection.config import BOX_THRESHOLD, MODEL_ID, TEXT_THRESHOLD, ingredients_from_string
+from detection import execution
+from detection.artifacts import model_source
+from detection.backends import create_backend
+from detection.config import (
+    BACKEND,
+    BOX_THRESHOLD,
+    MODEL_ID,
+    ONNX_PATH,
+    TEXT_CACHE_SIZE,
+    TEXT_THRESHOLD,
+    TILING_MAX_BATCH,
+    ingredients_from_string,
+)
+from detection.text_cache import CachedTextBackbone, TextEntry, TextFeatureCache, prompt_key
+from detection.tiling import TileSpec, merge_detections, tile_windows
+from detection.timing import stage
+from telemetry import MODEL_LOAD_SECONDS, MODEL_LOADS
 
 
 class GroundingDinoDetector:
@@ -24,25 +42,56 @@ class GroundingDinoDetector:
         self,
         model_id: str | None = None,
         device: str | None = None,
+        text_cache_size: int = TEXT_CACHE_SIZE,
+        backend: str | None = None,
+        onnx_path: str | None = None,
+        execution_mode: execution.ExecutionMode | None = None,
     ):
         self.model_id = model_id or MODEL_ID
-        self._device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.backend_name = (backend or BACKEND).lower()
+        self.onnx_path = onnx_path or ONNX_PATH
+        default_device = "cuda" if torch.cuda.is_available() and self.backend_name == "eager" else "cpu"
+        self._device = device or default_device
         self._processor = None
+        self._backend = None
         self._model = None
+        self._text_backbone: CachedTextBackbone | None = None
+        self.text_cache = TextFeatureCache(text_cache_size)
+        # Modo pedido; tras load_model, `execution` es el efectivo (sin lo que no soporta el hardware)
+        self.requested_execution = execution_mode or execution.ExecutionMode()
+        self.execution = self.requested_execution
+        # El wrapper del text backbone guarda estado por forward: un forward a la vez
+        self._forward_lock = threading.Lock()
 
     def load_model(self) -> None:
-        """Carga el processor y el modelo (solo una vez)."""
-        if self._model is not None:
+        """Carga el processor y el backend de inferencia (solo una vez)."""
+        if self._backend is not None:
             return
-        from transformers import (
-            AutoProcessor,
-            AutoModelForZeroShotObjectDetection,
-        )
-        self._processor = AutoProcessor.from_pretrained(self.model_id)
-        self._model = AutoModelForZeroShotObjectDetection.from_pretrained(
-            self.model_id
-        ).to(self._device)
-        self._model.eval()
+        from transformers import AutoProcessor
+
+        start = time.perf_counter()
+        execution.configure_threads(self.requested_execution)
+        source, processor_kwargs, _ = model_source(self.model_id)
+        self._processor = AutoProcessor.from_pretrained(source, **processor_kwargs)
+        self._backend = create_backend(self.backend_name, self.model_id, self._device, self.onnx_path)
+        # eager/int8 exponen el modelo torch; en onnx solo se cachea la tokenización
+        self._model = getattr(self._backend, "model", None)
+        self.execution = execution.resolve(self.requested_execution, self.backend_name, self._backend.device)
+        execution.apply(self._model, self.execution)
+        if self._model is not None and self.text_cache.maxsize > 0:
+            self._text_backbone = CachedTextBackbone(self._model.model.text_backbone)
+            self._model.model.text_backbone = self._text_backbone
+        MODEL_LOAD_SECONDS.inc(amount=time.perf_counter() - start)
+        MODEL_LOADS.inc()
+
+    def _resolve_prompts(self, text_prompts: list[str] | str | None) -> list[str]:
+        """Normaliza el prompt: None → lista por defecto, string → lista separada por comas."""
+        if text_prompts is None:
+            from detection.config import INGREDIENTS_LIST
+            return INGREDIENTS_LIST
+        if isinstance(text_prompts, str):
+            return ingredients_from_string(text_prompts)
+        return list(text_prompts)
 
     def detect(
         self,
@@ -64,57 +113,180 @@ class GroundingDinoDetector:
         Returns:
             Lista de dicts con "label", "box" [x0,y0,x1,y1], "score".
         """
+        return self.detect_batch(
+            [image],
+            text_prompts=text_prompts,
+            box_threshold=box_threshold,
+            text_threshold=text_threshold,
+        )[0]
+
+    def detect_batch(
+        self,
+        images: list[Image.Image | str],
+        text_prompts: list[str] | str | None = None,
+        box_threshold: float | None = None,
+        text_threshold: float | None = None,
+        original_sizes: list[tuple[int, int]] | None = None,
+        timings: dict[str, float] | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """
+        Igual que detect() pero para varias imágenes con el mismo prompt en un solo forward.
+        El processor rellena (padding) las imágenes de distinto tamaño y genera pixel_mask.
+
+        original_sizes: (ancho, alto) por imagen al que escalar las cajas, si las imágenes
+        recibidas son una versión reducida del original. Default: el tamaño de cada imagen.
+        timings: si se pasa, acumula los segundos de preprocess, forward y postprocess.
+
+        Returns:
+            Una lista de detecciones por imagen, en el mismo orden que `images`.
+        """
         self.load_model()
-        if isinstance(image, str):
-            image = Image.open(image).convert("RGB")
+        images = [Image.open(im).convert("RGB") if isinstance(im, str) else im for im in images]
+        text_prompts = self._resolve_prompts(text_prompts)
 
-        if text_prompts is None:
-            from detection.config import INGREDIENTS_LIST
-            text_prompts = INGREDIENTS_LIST
-        elif isinstance(text_prompts, str):
-            text_prompts = ingredients_from_string(text_prompts)
-
-        if not text_prompts:
-            return []
-
-        # Un prompt por imagen: todas las categorías en una lista por imagen
-        text_labels = [text_prompts]
-        inputs = self._processor(
-            images=image,
-            text=text_labels,
-            return_tensors="pt",
-        ).to(self._model.device)
-
-        with torch.no_grad():
-            outputs = self._model(**inputs)
-
-        # target_sizes = (height, width) de la imagen original
-        target_sizes = torch.tensor([[image.height, image.width]])
-        results = self._processor.post_process_grounded_object_detection(
-            outputs,
-            inputs["input_ids"],
-            threshold=box_threshold or BOX_THRESHOLD,
-            text_threshold=text_threshold or TEXT_THRESHOLD,
-            target_sizes=target_sizes,
-        )
+        if not text_prompts or not images:
+            return [[] for _ in images]
 
-        out: list[dict[str, Any]] = []
-        result = results[0]
+        with stage(timings, "preprocess"):
+            pixel_inputs = self._processor.image_processor(images=images, return_tensors="pt")
+            n = len(images)
+            key = prompt_key(text_prompts)
+            entry = self.text_cache.get(key)
+            if entry is None:
+                entry = TextEntry(encoding=self._tokenize(text_prompts))
+                self.text_cache.put(key, entry)
+            inputs = {k: v.to(self._backend.device) for k, v in pixel_inputs.items()}
+            if self.execution.channels_last:
+                inputs["pixel_values"] = inputs["pixel_values"].contiguous(memory_format=torch.channels_last)
+            for k, v in entry.encoding.items():
+                inputs[k] = v.repeat(n, 1)
+
+        mode = self.execution
+        with stage(timings, "forward"), self._forward_lock, mode.grad_context():
+            with mode.autocast(self._backend.device.type):
+                outputs = self._forward(inputs, entry)
+            if mode.precision != "fp32":
+                # El post-proceso (sigmoid, umbrales, escalado de cajas) en fp32
+                outputs.logits = outputs.logits.float()
+                outputs.pred_boxes = outputs.pred_boxes.float()
+
+        # Las salidas de inference_mode no admiten operaciones in-place fuera de ese modo
+        with stage(timings, "postprocess"), mode.grad_context():
+            # target_sizes = (height, width) de cada imagen original
+            if original_sizes is None:
+                original_sizes = [im.size for im in images]
+            target_sizes = torch.tensor([[h, w] for w, h in original_sizes])
+            results = self._processor.post_process_grounded_object_detection(
+                outputs,
+                inputs["input_ids"],
+                threshold=box_threshold or BOX_THRESHOLD,
+                text_threshold=text_threshold or TEXT_THRESHOLD,
+                target_sizes=target_sizes,
+            )
+            return [self._to_detections(result, text_prompts) for result in results]
+
+    def detect_tiled(
+        self,
+        image: Image.Image,
+        text_prompts: list[str] | str | None = None,
+        box_threshold: float | None = None,
+        text_threshold: float | None = None,
+        tiling: TileSpec | None = None,
+        original_size: tuple[int, int] | None = None,
+        timings: dict[str, float] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Detección por teselas (ver detection/tiling.py): corta `image` en ventanas solapadas,
+        las detecta en forwards batched (hasta TILING_MAX_BATCH por forward), traslada las cajas
+        a coordenadas globales y elimina duplicados con NMS por clase.
+
+        original_size: (ancho, alto) al que escalar las cajas. Default: el tamaño de `image`.
+        """
+        tiling = tiling or TileSpec()
+        windows = tile_windows(image.width, image.height, tiling.tile_size, tiling.overlap)
+        crops = [image.crop(w) for w in windows]
+        if tiling.include_full and len(windows) > 1:
+            windows.append((0, 0, image.width, image.height))
+            crops.append(image)
+
+        step = max(1, TILING_MAX_BATCH)
+        per_tile: list[list[dict[str, Any]]] = []
+        for i in range(0, len(crops), step):
+            per_tile += self.detect_batch(
+                crops[i:i + step],
+                text_prompts=text_prompts,
+                box_threshold=box_threshold,
+                text_threshold=text_threshold,
+                timings=timings,
+            )
+
+        with stage(timings, "merge"):
+            width, height = original_size or image.size
+            sx, sy = width / image.width, height / image.height
+            merged = []
+            for (x0, y0, _, _), detections in zip(windows, per_tile):
+                for det in detections:
+                    bx0, by0, bx1, by1 = det["box"]
+                    det["box"] = [(bx0 + x0) * sx, (by0 + y0) * sy, (bx1 + x0) * sx, (by1 + y0) * sy]
+                    merged.append(det)
+            return merge_detections(merged, tiling.iou_threshold)
+
+    def prepare_prompts(self, prompt_lists: list[list[str]]) -> None:
+        """
+        Tokeniza y guarda en la cache de texto las listas de prompts conocidas de antemano
+        (la lista por defecto y las de cada categoría). Las features de texto se capturan en
+        el primer forward de cada una.
+        """
+        self.load_model()
+        for prompts in prompt_lists:
+            key = prompt_key(prompts)
+            if prompts and self.text_cache.peek(key) is None:
+                self.text_cache.put(key, TextEntry(encoding=self._tokenize(prompts)))
+
+    def _tokenize(self, text_prompts: list[str]) -> dict[str, torch.Tensor]:
+        """Tokeniza el prompt (batch 1) con el processor, igual que cuando se pasa junto a la imagen."""
+        # Un prompt por imagen: todas las categorías en una lista
+        encoding = self._processor(text=[text_prompts], return_tensors="pt")
+        return {k: v.to(self._backend.device) for k, v in encoding.items()}
+
+    def _forward(self, inputs: dict[str, torch.Tensor], entry: TextEntry):
+        """Forward del modelo reutilizando (o capturando) las features de texto cacheadas."""
+        if self._text_backbone is None:
+            return self._backend(inputs)
+        self._text_backbone.cached = entry.features
+        try:
+            outputs = self._backend(inputs)
+            if entry.features is None:
+                entry.features = self._text_backbone.captured
+        finally:
+            self._text_backbone.cached = None
+            self._text_backbone.captured = None
+        return outputs
+
+    @staticmethod
+    def _to_detections(result: dict[str, Any], text_prompts: list[str]) -> list[dict[str, Any]]:
+        """Convierte un resultado de post_process_grounded_object_detection en dicts label/box/score."""
+        # Una sola transferencia dispositivo → host por tensor (no .cpu() por elemento)
+        boxes = result["boxes"].detach().cpu().tolist()
+        scores = result["scores"].detach().cpu().tolist()
         labels_raw = result.get("text_labels", result.get("labels", []))
-        boxes = result["boxes"]
-        scores = result["scores"]
+        if hasattr(labels_raw, "cpu"):
+            labels_raw = labels_raw.detach().cpu().tolist()
+
+        out: list[dict[str, Any]] = []
         for i, (box, score) in enumerate(zip(boxes, scores)):
             raw = labels_raw[i] if i < len(labels_raw) else "object"
-            if hasattr(raw, "cpu"):
-                raw = raw.cpu()
-            if hasattr(raw, "item"):
-                idx = int(raw.item()) if raw.numel() == 1 else 0
-                label_str = text_prompts[idx] if 0 <= idx < len(text_prompts) else "object"
+            if hasattr(raw, "tolist"):
+                raw = raw.tolist()
+            if isinstance(raw, list):
+                raw = int(raw[0]) if len(raw) == 1 else 0
+            if isinstance(raw, int):
+                label_str = text_prompts[raw] if 0 <= raw < len(text_prompts) else "object"
             else:
                 label_str = str(raw).strip() if raw else "object"
             out.append({
                 "label": label_str,
-                "box": box.cpu().tolist(),
-                "score": float(score.cpu().item()),
+                "box": box,
+                "score": float(score),
             })
         return out
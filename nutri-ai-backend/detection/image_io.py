@@ -0,0 +1,148 @@
+"""
+Decodificación de imágenes subidas a la resolución que usa el processor.
+
+Las fotos de móvil (12 MP) se decodificaban y convertían a RGB a resolución completa para
+que luego el processor las reduzca a ~800 px. Aquí:
+- se lee solo la cabecera para validar el número de píxeles (MAX_IMAGE_PIXELS),
+- se aplica la orientación EXIF,
+- en JPEG se usa el modo draft de PIL (el decoder reduce por 1/2, 1/4 o 1/8 al decodificar),
+- y se redimensiona directamente al tamaño objetivo del processor.
+
+Las cajas se devuelven en coordenadas de la imagen original (ya orientada): el detector
+escala la salida a `original_size`, así el campo `box` sigue valiendo para la UI.
+"""
+
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps
+
+from detection.config import DECODE_LONGEST_EDGE, DECODE_SHORTEST_EDGE, MAX_IMAGE_PIXELS
+
+# Orientaciones EXIF que intercambian ancho y alto (rotaciones de 90/270 grados)
+_SWAPPING_ORIENTATIONS = {5, 6, 7, 8}
+_EXIF_ORIENTATION_TAG = 0x0112
+
+
+class ImageTooLargeError(ValueError):
+    """La imagen supera MAX_IMAGE_PIXELS (se rechaza antes de decodificarla)."""
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Archivo de solo lectura con seek sobre bytes/bytearray/memoryview sin copiarlos
+    (io.BytesIO copia un bytearray entero). Solo se copian los trozos que pide el decoder.
+
+    Mientras está abierto mantiene exportado el buffer: un bytearray no puede crecer hasta
+    cerrarlo (usar como context manager).
+    """
+
+    def __init__(self, data: bytes | bytearray | memoryview):
+        super().__init__()
+        self._view = memoryview(data)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def read(self, size: int | None = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._pos + size)
+        chunk = self._view[self._pos:end].tobytes() if end > self._pos else b""
+        self._pos += len(chunk)
+        return chunk
+
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+@dataclass
+class DecodedImage:
+    """Imagen RGB lista para el processor y tamaño (ancho, alto) de la original orientada."""
+    image: Image.Image
+    original_size: tuple[int, int]
+
+    @property
+    def scale(self) -> float:
+        """Factor imagen reducida / original (1.0 si no se redujo)."""
+        return self.image.width / self.original_size[0] if self.original_size[0] else 1.0
+
+
+def target_size(
+    width: int,
+    height: int,
+    shortest_edge: int = DECODE_SHORTEST_EDGE,
+    longest_edge: int = DECODE_LONGEST_EDGE,
+) -> tuple[int, int]:
+    """
+    Tamaño al que el processor de Grounding DINO redimensiona la imagen: lado corto a
+    `shortest_edge` sin que el largo pase de `longest_edge`. Nunca amplía.
+    """
+    short, long = min(width, height), max(width, height)
+    if short <= 0:
+        return width, height
+    scale = min(shortest_edge / short, longest_edge / long, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def decode_image(
+    contents: bytes | bytearray | memoryview,
+    max_pixels: int = MAX_IMAGE_PIXELS,
+    shortest_edge: int = DECODE_SHORTEST_EDGE,
+    longest_edge: int = DECODE_LONGEST_EDGE,
+) -> DecodedImage:
+    """
+    Decodifica `contents` reducida al tamaño objetivo, orientada según EXIF y en RGB.
+    Lee directamente de `contents` (sin copiarlo): el pico es la subida más la imagen reducida.
+
+    Raises:
+        ImageTooLargeError: si ancho × alto supera max_pixels.
+        PIL.UnidentifiedImageError / OSError: si los bytes no son una imagen válida.
+    """
+    with BufferReader(contents) as fp:
+        img = Image.open(fp)  # solo lee la cabecera
+        width, height = img.size
+        if max_pixels and width * height > max_pixels:
+            raise ImageTooLargeError(
+                f"La imagen tiene {width}x{height} píxeles; el máximo es {max_pixels:,}."
+            )
+
+        orientation = img.getexif().get(_EXIF_ORIENTATION_TAG, 1)
+        swapped = orientation in _SWAPPING_ORIENTATIONS
+        original_size = (height, width) if swapped else (width, height)
+        out_w, out_h = target_size(*original_size, shortest_edge=shortest_edge, longest_edge=longest_edge)
+
+        if img.format == "JPEG":
+            # draft trabaja en coordenadas del archivo (antes de rotar) y nunca baja del tamaño pedido
+            img.draft("RGB", (out_h, out_w) if swapped else (out_w, out_h))
+
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        if img.size != (out_w, out_h):
+            img = img.resize((out_w, out_h), Image.BILINEAR, reducing_gap=3.0)
+        img.load()  # la imagen devuelta no debe seguir leyendo del buffer de la subida
+        return DecodedImage(image=img, original_size=original_size)
@@ -0,0 +1,273 @@
+"""
+Detección en vivo sobre un stream de fotogramas de la cámara (WebSocket /detect/live).
+
+Ejecutar el modelo en cada fotograma es demasiado lento y casi siempre repite el trabajo: dos
+fotogramas seguidos de un plato son casi iguales. LiveSession:
+
+- calcula una firma barata de cada fotograma (miniatura en escala de grises) y estima el
+  desplazamiento de la cámara respecto al último fotograma clave por correlación de fase;
+- solo lanza el detector en fotogramas clave: el primero, cuando la diferencia residual tras
+  compensar el desplazamiento supera el umbral (entró o salió algo), cuando la cámara se movió
+  demasiado o cada cierto intervalo;
+- entre medias propaga las cajas del último fotograma clave con ese desplazamiento (tracker
+  de traslación global, suficiente para un móvil sobre un plato);
+- nunca encola: se procesa siempre el último fotograma recibido (los anteriores se descartan)
+  y hay como mucho una inferencia en curso, así la latencia no crece si el modelo se atrasa.
+
+Cada fotograma procesado produce un mensaje con las cajas vigentes, de qué fotograma clave
+salen y los fotogramas e inferencias por segundo de la sesión.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+import numpy as np
+from PIL import Image
+
+from detection.config import (
+    LIVE_KEYFRAME_DIFF,
+    LIVE_KEYFRAME_INTERVAL_MS,
+    LIVE_MAX_SHIFT,
+    LIVE_SIGNATURE_SIZE,
+)
+from detection.image_io import DecodedImage
+
+# Fracción mínima de una caja que tiene que seguir dentro de la imagen tras desplazarla
+_MIN_VISIBLE = 0.5
+
+
+@dataclass(frozen=True)
+class LiveOptions:
+    diff_threshold: float = LIVE_KEYFRAME_DIFF
+    max_shift: float = LIVE_MAX_SHIFT
+    keyframe_interval: float = LIVE_KEYFRAME_INTERVAL_MS / 1000.0
+    signature_size: int = LIVE_SIGNATURE_SIZE
+
+
+@dataclass(frozen=True)
+class Motion:
+    """Desplazamiento (px de la miniatura) de un fotograma respecto al clave y diferencia residual (0-1)."""
+    dx: int
+    dy: int
+    residual: float
+
+
+@dataclass
+class LiveStats:
+    received: int = 0
+    processed: int = 0
+    dropped: int = 0
+    keyframes: int = 0
+    inferences: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    def as_dict(self) -> dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "keyframes": self.keyframes,
+            "inferences": self.inferences,
+            "failed": self.failed,
+            "fps": round(self.processed / elapsed, 2),
+            "inference_per_s": round(self.inferences / elapsed, 2),
+        }
+
+
+@dataclass(frozen=True)
+class _Keyframe:
+    frame: int
+    signature: np.ndarray
+    size: tuple[int, int]
+    detections: list[dict[str, Any]]
+    captured_at: float
+
+
+def signature(image: Image.Image, width: int = LIVE_SIGNATURE_SIZE) -> np.ndarray:
+    """Miniatura en escala de grises (float32, 0-255) de `width` px de ancho."""
+    height = max(1, round(width * image.height / image.width))
+    return np.asarray(image.convert("L").resize((width, height), Image.BILINEAR), dtype=np.float32)
+
+
+def estimate_motion(reference: np.ndarray, current: np.ndarray) -> Motion:
+    """
+    Traslación de `current` respecto a `reference` por correlación de fase (un par de FFT sobre
+    la miniatura) y diferencia media absoluta, normalizada a 0-1, de la zona común ya alineada.
+    """
+    h, w = reference.shape
+    window = np.outer(np.hanning(h), np.hanning(w)).astype(np.float32)
+    a = np.fft.rfft2((reference - reference.mean()) * window)
+    b = np.fft.rfft2((current - current.mean()) * window)
+    cross = b * np.conj(a)
+    cross /= np.abs(cross) + 1e-9
+    corr = np.fft.irfft2(cross, s=(h, w))
+    dy, dx = np.unravel_index(int(np.argmax(corr)), corr.shape)
+    dy = int(dy - h if dy > h // 2 else dy)
+    dx = int(dx - w if dx > w // 2 else dx)
+    # current[y + dy, x + dx] ≈ reference[y, x]
+    ref = reference[max(0, -dy):h - max(0, dy), max(0, -dx):w - max(0, dx)]
+    cur = current[max(0, dy):h - max(0, -dy), max(0, dx):w - max(0, -dx)]
+    residual = float(np.abs(ref - cur).mean()) / 255.0 if ref.size else 1.0
+    return Motion(dx, dy, residual)
+
+
+def track(
+    detections: list[dict[str, Any]],
+    motion: Motion,
+    signature_shape: tuple[int, int],
+    image_size: tuple[int, int],
+) -> list[dict[str, Any]]:
+    """
+    Desplaza las cajas (coords de la imagen original) con el movimiento estimado, las recorta al
+    borde y quita las que quedaron mayormente fuera.
+    """
+    if not detections or (motion.dx == 0 and motion.dy == 0):
+        return detections
+    w, h = image_size
+    shift = np.array([motion.dx * w / signature_shape[1], motion.dy * h / signature_shape[0]] * 2)
+    boxes = np.asarray([d["box"] for d in detections], dtype=np.float64).reshape(-1, 4) + shift
+    clipped = boxes.clip(0, [w, h, w, h])
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    visible = (clipped[:, 2] - clipped[:, 0]) * (clipped[:, 3] - clipped[:, 1])
+    keep = visible >= _MIN_VISIBLE * np.maximum(area, 1e-9)
+    return [
+        {**d, "box": [round(v, 2) for v in box]}
+        for d, box, ok in zip(detections, clipped.tolist(), keep.tolist())
+        if ok
+    ]
+
+
+class LiveSession:
+    """
+    Una conexión de cámara. decode: bytes → DecodedImage (se llama en un hilo);
+    infer: DecodedImage → detecciones ya filtradas en coords originales, o None si la
+    inferencia se rechazó (cola llena, deadline): se sigue con el fotograma clave anterior.
+    """
+
+    def __init__(
+        self,
+        decode: Callable[[bytes], DecodedImage],
+        infer: Callable[[DecodedImage], Awaitable[list[dict[str, Any]] | None]],
+        options: LiveOptions | None = None,
+    ):
+        self._decode = decode
+        self._infer = infer
+        self.options = options or LiveOptions()
+        self.stats = LiveStats()
+        self._latest: tuple[int, bytes] | None = None
+        self._closed = False
+        self._ready = asyncio.Event()
+        self._keyframe: _Keyframe | None = None
+        self._inference: asyncio.Task | None = None
+
+    async def run(
+        self,
+        receive: Callable[[], Awaitable[bytes | None]],
+        send: Callable[[dict[str, Any]], Awaitable[None]],
+    ) -> LiveStats:
+        """Procesa fotogramas hasta que receive() devuelve None (fin del stream)."""
+        self.stats = LiveStats()
+        reader = asyncio.create_task(self._read(receive))
+        try:
+            while True:
+                item = await self._next()
+                if item is None:
+                    break
+                await send(await self._process(*item))
+        finally:
+            reader.cancel()
+            if self._inference is not None:
+                self._inference.cancel()
+        if reader.done() and not reader.cancelled() and reader.exception() is not None:
+            raise reader.exception()
+        return self.stats
+
+    async def _read(self, receive: Callable[[], Awaitable[bytes | None]]) -> None:
+        try:
+            while (data := await receive()) is not None:
+                self.stats.received += 1
+                if self._latest is not None:
+                    # El anterior todavía no se procesó: ya es viejo, se reemplaza
+                    self.stats.dropped += 1
+                self._latest = (self.stats.received, data)
+                self._ready.set()
+        finally:
+            self._closed = True
+            self._ready.set()
+
+    async def _next(self) -> tuple[int, bytes] | None:
+        while self._latest is None:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        item, self._latest = self._latest, None
+        return item
+
+    def _prepare(self, data: bytes) -> tuple[DecodedImage, np.ndarray]:
+        decoded = self._decode(data)
+        return decoded, signature(decoded.image, self.options.signature_size)
+
+    async def _process(self, frame: int, data: bytes) -> dict[str, Any]:
+        try:
+            decoded, sig = await asyncio.to_thread(self._prepare, data)
+        except Exception as e:
+            return {"frame": frame, "error": f"Fotograma no válido: {e}", "stats": self.stats.as_dict()}
+        self.stats.processed += 1
+        now = time.monotonic()
+        keyframe = self._keyframe
+        motion = None
+        if keyframe is not None and keyframe.signature.shape == sig.shape and keyframe.size == decoded.original_size:
+            motion = estimate_motion(keyframe.signature, sig)
+
+        # keyframe solo si este fotograma lanzó el modelo; con una inferencia en curso se descarta
+        started = self._inference is None and self._needs_keyframe(keyframe, motion, sig.shape, now)
+        if started:
+            self.stats.keyframes += 1
+            self._inference = asyncio.create_task(self._run_inference(frame, decoded, sig, now))
+        if keyframe is not None and motion is not None:
+            ingredients = track(keyframe.detections, motion, sig.shape, decoded.original_size)
+        else:
+            ingredients = []
+        return {
+            "frame": frame,
+            "keyframe": started,
+            "source_frame": keyframe.frame if keyframe is not None else None,
+            "age_ms": round((now - keyframe.captured_at) * 1000) if keyframe is not None else None,
+            "ingredients": ingredients,
+            "stats": self.stats.as_dict(),
+        }
+
+    def _needs_keyframe(
+        self,
+        keyframe: _Keyframe | None,
+        motion: Motion | None,
+        shape: tuple[int, int],
+        now: float,
+    ) -> bool:
+        if keyframe is None or motion is None:
+            return True
+        if now - keyframe.captured_at > self.options.keyframe_interval:
+            return True
+        if abs(motion.dx) > self.options.max_shift * shape[1] or abs(motion.dy) > self.options.max_shift * shape[0]:
+            return True
+        return motion.residual > self.options.diff_threshold
+
+    async def _run_inference(self, frame: int, decoded: DecodedImage, sig: np.ndarray, captured_at: float) -> None:
+        try:
+            self.stats.inferences += 1
+            detections = await self._infer(decoded)
+            if detections is None:
+                self.stats.failed += 1
+                return
+            self._keyframe = _Keyframe(frame, sig, decoded.original_size, detections, captured_at)
+        except Exception:
+            self.stats.failed += 1
+        finally:
+            self._inference = None
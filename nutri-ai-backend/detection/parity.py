@@ -0,0 +1,68 @@
+"""
+Comparación de detecciones entre backends (paridad con PyTorch eager fp32).
+
+Cada detección de referencia se empareja con la candidata de la misma etiqueta con mayor
+IoU. Se reportan IoU de cajas, deriva de score y detecciones sin pareja en cada lado.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+
+def box_iou(a: list[float], b: list[float]) -> float:
+    """IoU de dos cajas [x0, y0, x1, y1]."""
+    ix0, iy0 = max(a[0], b[0]), max(a[1], b[1])
+    ix1, iy1 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix1 - ix0) * max(0.0, iy1 - iy0)
+    area_a = max(0.0, a[2] - a[0]) * max(0.0, a[3] - a[1])
+    area_b = max(0.0, b[2] - b[0]) * max(0.0, b[3] - b[1])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+@dataclass
+class ParityReport:
+    """Acumula métricas de paridad sobre varias imágenes."""
+    min_iou: float = 0.5
+    ious: list[float] = field(default_factory=list)
+    score_drifts: list[float] = field(default_factory=list)
+    missing: int = 0  # detecciones de referencia sin pareja
+    extra: int = 0  # detecciones del candidato sin pareja
+
+    def add(self, reference: list[dict[str, Any]], candidate: list[dict[str, Any]]) -> None:
+        used: set[int] = set()
+        for ref in reference:
+            best_iou, best_idx = 0.0, -1
+            for idx, cand in enumerate(candidate):
+                if idx in used or cand["label"] != ref["label"]:
+                    continue
+                iou = box_iou(ref["box"], cand["box"])
+                if iou > best_iou:
+                    best_iou, best_idx = iou, idx
+            if best_idx < 0 or best_iou < self.min_iou:
+                self.missing += 1
+                continue
+            used.add(best_idx)
+            self.ious.append(best_iou)
+            self.score_drifts.append(abs(ref["score"] - candidate[best_idx]["score"]))
+        self.extra += len(candidate) - len(used)
+
+    def summary(self) -> dict[str, Any]:
+        matched = len(self.ious)
+        return {
+            "matched": matched,
+            "missing": self.missing,
+            "extra": self.extra,
+            "mean_iou": round(sum(self.ious) / matched, 4) if matched else None,
+            "min_iou": round(min(self.ious), 4) if matched else None,
+            "mean_score_drift": round(sum(self.score_drifts) / matched, 4) if matched else None,
+            "max_score_drift": round(max(self.score_drifts), 4) if matched else None,
+        }
+
+    def passes(self, min_mean_iou: float, max_score_drift: float) -> bool:
+        s = self.summary()
+        if not s["matched"]:
+            return self.missing == 0 and self.extra == 0
+        return s["mean_iou"] >= min_mean_iou and s["max_score_drift"] <= max_score_drift
@@ -0,0 +1,69 @@
+"""
+Post-proceso de detecciones con operaciones vectorizadas.
+
+- large_box_mask: filtro de área relativa de todas las cajas a la vez (numpy).
+- LabelIndex: índice por lista de prompts para normalizar etiquetas concatenadas del modelo
+  ("chickpeas beans whole wheat pasta" → "chickpeas"). Las frases y sus conjuntos de palabras
+  se calculan una vez por lista y cada etiqueta distinta se resuelve una sola vez.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+import numpy as np
+
+
+def large_box_mask(boxes: np.ndarray, image_width: int, image_height: int, max_area_ratio: float) -> np.ndarray:
+    """
+    True para las cajas [x0, y0, x1, y1] (array n×4) que ocupan más de max_area_ratio
+    del área de la imagen. Con área de imagen no positiva no se descarta ninguna.
+    """
+    if boxes.size == 0:
+        return np.zeros(0, dtype=bool)
+    image_area = image_width * image_height
+    if image_area <= 0:
+        return np.zeros(len(boxes), dtype=bool)
+    w = np.maximum(0.0, boxes[:, 2] - boxes[:, 0])
+    h = np.maximum(0.0, boxes[:, 3] - boxes[:, 1])
+    return (w * h) / image_area > max_area_ratio
+
+
+class LabelIndex:
+    """
+    Normaliza etiquetas contra una lista de ingredientes: devuelve el primer ingrediente
+    (en el orden de la lista) contenido como substring en la etiqueta o cuyas palabras
+    estén todas en la etiqueta. Si ninguno coincide, devuelve la etiqueta tal cual.
+    El orden importa: así "rice" matchea antes que "mashed potatoes" en "rice white mashed potatoes".
+    """
+
+    _MAX_MEMO = 4096
+
+    def __init__(self, ingredients: tuple[str, ...]):
+        self._entries = [
+            (ing, ing.lower(), frozenset(ing.lower().split()))
+            for ing in ingredients
+        ]
+        self._memo: dict[str, str] = {}
+
+    def normalize(self, label: str) -> str:
+        cached = self._memo.get(label)
+        if cached is not None:
+            return cached
+        label_lower = label.lower().strip()
+        label_words = set(label_lower.split())
+        result = label
+        for ing, ing_lower, ing_words in self._entries:
+            if ing_lower in label_lower or (ing_words and ing_words <= label_words):
+                result = ing
+                break
+        if len(self._memo) >= self._MAX_MEMO:
+            self._memo.clear()
+        self._memo[label] = result
+        return result
+
+
+@lru_cache(maxsize=128)
+def label_index(ingredients: tuple[str, ...]) -> LabelIndex:
+    """Índice compartido por lista de prompts (la lista por defecto y las de categoría se reutilizan)."""
+    return LabelIndex(ingredients)
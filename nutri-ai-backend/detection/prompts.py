@@ -0,0 +1,33 @@
+"""
+Planificador de prompts por categoría.
+
+Con `category` la API solo devuelve etiquetas de MEAL_CATEGORIES[category], así que no
+tiene sentido pagar en la cross-attention los ~70 prompts de INGREDIENTS_LIST. El plan es
+la intersección (en el orden de la lista activa, que la normalización de etiquetas respeta)
+del prompt activo con la categoría. Sin categoría se usa la lista completa.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+from detection.config import INGREDIENTS_LIST, MEAL_CATEGORIES
+
+
+@lru_cache(maxsize=256)
+def plan_prompts(text_prompts: tuple[str, ...], category: str | None) -> tuple[str, ...]:
+    """
+    Prompts que realmente pueden sobrevivir al filtro de categoría.
+    Puede devolver una tupla vacía (prompt personalizado sin ingredientes de la categoría).
+    """
+    if category is None:
+        return text_prompts
+    allowed = set(MEAL_CATEGORIES[category])
+    return tuple(p for p in text_prompts if p in allowed)
+
+
+def category_prompt_lists() -> list[list[str]]:
+    """Planes de la lista por defecto: la completa y una por categoría (para precargar la cache de texto)."""
+    plans = [list(INGREDIENTS_LIST)]
+    plans += [list(plan_prompts(tuple(INGREDIENTS_LIST), c)) for c in MEAL_CATEGORIES]
+    return plans
@@ -0,0 +1,113 @@
+"""
+Render de POST /detect/image: cajas y etiquetas dibujadas sobre la imagen y codificación.
+
+Antes, cada petición copiaba la imagen, intentaba ImageFont.truetype("arial.ttf") (que en
+Linux falla y cae a la fuente por defecto) y dibujaba y codificaba JPEG q90 en el event loop.
+Aquí:
+- las fuentes se cargan una vez por tamaño (lru_cache),
+- si el cliente pide un lado máximo, se dibuja sobre una copia reducida (menos píxeles que
+  dibujar y codificar); si no, se dibuja directamente sobre la imagen recibida, sin copiarla,
+- el formato de salida es configurable: JPEG (calidad, progresivo) o WebP (calidad),
+- render_detections es bloqueante y se llama desde un hilo (asyncio.to_thread).
+"""
+
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Sequence
+
+from PIL import Image, ImageDraw, ImageFont
+
+from detection.config import RENDER_FONT, RENDER_FORMAT, RENDER_QUALITY
+from telemetry import STAGE_SECONDS
+
+# Fuentes TrueType que se prueban en orden (la primera que exista); luego la de Pillow
+_FONT_CANDIDATES = ("DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "arial.ttf")
+
+MEDIA_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """Formato de la imagen devuelta. max_size: lado mayor máximo en píxeles (None = sin reducir)."""
+    format: str = RENDER_FORMAT
+    quality: int = RENDER_QUALITY
+    progressive: bool = False
+    max_size: int | None = None
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.format]
+
+
+@lru_cache(maxsize=32)
+def get_font(size: int) -> Any:
+    """Fuente para las etiquetas; se resuelve una vez por tamaño."""
+    for path in ((RENDER_FONT,) if RENDER_FONT else ()) + _FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(path, size=size)
+        except (OSError, IOError):
+            continue
+    try:
+        return ImageFont.load_default(size=size)  # Pillow >= 10.1: fuente escalable incluida
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def fit_within(image: Image.Image, max_size: int | None) -> Image.Image:
+    """Copia reducida con el lado mayor ≤ max_size, o la misma imagen si ya cabe."""
+    if not max_size or max(image.size) <= max_size:
+        return image
+    factor = max_size / max(image.size)
+    size = (max(1, round(image.width * factor)), max(1, round(image.height * factor)))
+    return image.resize(size, Image.BILINEAR, reducing_gap=3.0)
+
+
+def draw_detections(image: Image.Image, ingredients: Sequence[Any], scale: float = 1.0) -> Image.Image:
+    """
+    Dibuja cajas y etiquetas (label + score) sobre `image`, que se modifica.
+    scale: factor para pasar las cajas (coords originales) a las coordenadas de `image`.
+    """
+    draw = ImageDraw.Draw(image)
+    font = get_font(max(14, image.width // 50))
+    width = max(2, image.width // 300)
+    for ing in ingredients:
+        if ing.box is None or len(ing.box) != 4:
+            continue
+        x0, y0, x1, y1 = [int(round(x * scale)) for x in ing.box]
+        draw.rectangle([x0, y0, x1, y1], outline="lime", width=width)
+        text = f"{ing.label} {ing.score:.2f}"
+        bbox = draw.textbbox((x0, y0), text, font=font)
+        draw.rectangle(bbox, fill="green")
+        draw.text((x0, y0 - 2), text, fill="white", font=font)
+    return image
+
+
+def encode_image(image: Image.Image, options: RenderOptions) -> bytes:
+    buf = io.BytesIO()
+    if options.format == "webp":
+        image.save(buf, format="WEBP", quality=options.quality)
+    else:
+        image.save(buf, format="JPEG", quality=options.quality, progressive=options.progressive)
+    return buf.getvalue()
+
+
+def render_detections(
+    image: Image.Image,
+    ingredients: Sequence[Any],
+    scale: float = 1.0,
+    options: RenderOptions = RenderOptions(),
+) -> bytes:
+    """
+    Imagen con las detecciones, codificada según `options`. Si no hay que reducirla, dibuja
+    sobre `image` directamente: el llamador no debe volver a usarla.
+    """
+    with STAGE_SECONDS.time("draw"):
+        canvas = fit_within(image, options.max_size)
+        if canvas.mode != "RGB":
+            canvas = canvas.convert("RGB")
+        draw_detections(canvas, ingredients, scale=scale * canvas.width / image.width)
+    with STAGE_SECONDS.time("encode"):
+        return encode_image(canvas, options)
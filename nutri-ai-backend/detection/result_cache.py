@@ -0,0 +1,198 @@
+"""
+Cache de resultados de detección direccionada por contenido.
+
+Clave: hash SHA-256 de los bytes subidos + prompt + umbrales efectivos (+ modo, p. ej. teselas). Se guardan las
+detecciones crudas del modelo (antes de filtrar por tamaño o categoría) y el tamaño de la
+imagen, así /detect y /detect/image pueden rehacer filtrado y dibujo sin volver a ejecutar
+el modelo. Las peticiones idénticas concurrentes esperan a una única computación en curso,
+que corre en su propia tarea; cada petición aplica su propio deadline mientras espera.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from detection.batching import DeadlineExceededError
+from detection.config import RESULT_CACHE_ENTRIES, RESULT_CACHE_MB
+
+
+@dataclass(frozen=True)
+class CachedDetection:
+    """Detecciones crudas ({"label","box","score"}) y tamaño (ancho, alto) de la imagen."""
+    detections: list[dict[str, Any]]
+    image_size: tuple[int, int]
+
+    def approx_bytes(self) -> int:
+        """Estimación de memoria: dicts, listas de floats y strings de etiquetas."""
+        per_item = 400
+        return 200 + sum(per_item + sys.getsizeof(d.get("label", "")) for d in self.detections)
+
+
+@dataclass
+class _Inflight:
+    """Computación compartida en curso y cuántos llamadores la están esperando."""
+    task: asyncio.Task
+    waiters: int = 0
+
+
+def content_hash(contents: bytes) -> str:
+    return hashlib.sha256(contents).hexdigest()
+
+
+def make_key(
+    image_hash: str,
+    text_prompts: list[str],
+    box_threshold: float,
+    text_threshold: float,
+    variant: str = "",
+) -> str:
+    """
+    Clave de cache: imagen + prompt + umbrales (los mismos bytes con otro prompt son otra entrada).
+    variant: modo de inferencia que cambia el resultado (p. ej. TileSpec.cache_tag); vacío = normal.
+    """
+    h = hashlib.sha256()
+    h.update(image_hash.encode())
+    h.update(b"\0")
+    h.update("\x1f".join(text_prompts).encode("utf-8"))
+    h.update(f"\0{float(box_threshold):.6f}\0{float(text_threshold):.6f}".encode())
+    if variant:
+        h.update(f"\0{variant}".encode())
+    return h.hexdigest()
+
+
+class DetectionResultCache:
+    """LRU acotada por número de entradas y por memoria aproximada, con coalescing de peticiones."""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_ENTRIES, max_mb: float = RESULT_CACHE_MB):
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: OrderedDict[str, tuple[CachedDetection, int]] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[str, _Inflight] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: str) -> CachedDetection | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            self._entries.move_to_end(key)
+            return item[0]
+
+    def lookup(self, key: str) -> CachedDetection | None:
+        """Como get(), pero cuenta el acierto (para quien decide qué hacer según haya entrada o no)."""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: CachedDetection) -> None:
+        if not self.enabled:
+            return
+        size = value.approx_bytes()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[CachedDetection]],
+        deadline: float | None = None,
+        admit: Callable[[], None] | None = None,
+    ) -> CachedDetection:
+        """
+        Devuelve la entrada cacheada o ejecuta `compute` una sola vez por clave:
+        las peticiones idénticas que llegan mientras tanto esperan el mismo resultado.
+        Los errores se propagan a todos los que esperaban y no se cachean.
+
+        La computación corre en una tarea propia, no en la de quien llegó primero: si ese
+        cliente se desconecta o vence su deadline, los demás siguen esperando el resultado.
+        La tarea se cancela solo cuando ya no queda nadie esperándola.
+        deadline: instante (time.monotonic()) hasta el que espera *este* llamador; al vencer
+        recibe DeadlineExceededError y la computación sigue para los demás.
+        admit: control de admisión de este llamador, solo si hace falta lanzar la computación
+        (sumarse a una en curso no añade trabajo).
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+        else:
+            if admit is not None:
+                admit()
+            self.misses += 1
+            inflight = _Inflight(asyncio.get_running_loop().create_task(compute()))
+            self._inflight[key] = inflight
+            inflight.task.add_done_callback(functools.partial(self._finish, key))
+
+        inflight.waiters += 1
+        try:
+            # shield: la cancelación o el timeout de este llamador no llegan a la tarea
+            if deadline is None:
+                return await asyncio.shield(inflight.task)
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                return await asyncio.wait_for(asyncio.shield(inflight.task), timeout)
+            except asyncio.TimeoutError:
+                raise DeadlineExceededError(
+                    "El deadline de la petición venció antes de tener resultado."
+                ) from None
+        finally:
+            inflight.waiters -= 1
+            if inflight.waiters == 0 and not inflight.task.done():
+                # Nadie espera ya el resultado: no gastar el forward. Se retira ya de _inflight
+                # para que una petición nueva no se sume a una tarea que se está cancelando.
+                if self._inflight.get(key) is inflight:
+                    del self._inflight[key]
+                inflight.task.cancel()
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        """Fin de la computación compartida: cachea el resultado y deja de ser la que está en curso."""
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.task is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        # Recuperar la excepción evita el aviso "exception was never retrieved" si nadie esperaba
+        if task.exception() is None:
+            self.put(key, task.result())
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
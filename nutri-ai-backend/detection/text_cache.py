@@ -0,0 +1,106 @@
+"""
+Cache LRU de la rama de texto de Grounding DINO.
+
+Casi todas las peticiones usan el mismo prompt (INGREDIENTS_LIST o una lista por categoría).
+Para cada prompt normalizado se guardan los tensores tokenizados (input_ids, attention_mask,
+token_type_ids) y la salida del text backbone (BERT). En un acierto el modelo solo ejecuta
+la rama de imagen y las capas de fusión.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+import torch
+
+PromptKey = tuple[str, ...]
+
+
+def prompt_key(text_prompts: list[str]) -> PromptKey:
+    """Clave normalizada de un prompt: frases sin espacios extremos y en minúsculas (BERT uncased)."""
+    return tuple(p.strip().lower() for p in text_prompts)
+
+
+@dataclass
+class TextEntry:
+    """Tokenización (batch 1) y, tras el primer forward, la salida del text backbone."""
+    encoding: dict[str, torch.Tensor]
+    features: torch.Tensor | None = None
+
+
+class TextFeatureCache:
+    """LRU por prompt normalizado con contadores de aciertos/fallos. maxsize=0 lo desactiva."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[PromptKey, TextEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: PromptKey) -> TextEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.features is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def peek(self, key: PromptKey) -> TextEntry | None:
+        """Como get, sin contar acierto/fallo ni tocar el orden LRU (solo comprobar)."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: PromptKey, entry: TextEntry) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+class CachedTextBackbone(torch.nn.Module):
+    """
+    Envuelve model.model.text_backbone. Si `cached` tiene features (batch 1) las devuelve
+    expandidas al batch sin ejecutar BERT; si no, ejecuta el backbone y deja la primera fila
+    en `captured` (todas las filas son iguales porque el prompt es el mismo).
+    """
+
+    def __init__(self, backbone: torch.nn.Module):
+        super().__init__()
+        self.backbone = backbone
+        self.cached: torch.Tensor | None = None
+        self.captured: torch.Tensor | None = None
+
+    def forward(self, input_ids: torch.Tensor, *args, **kwargs):
+        from transformers.modeling_outputs import BaseModelOutput
+
+        if self.cached is not None:
+            hidden = self.cached.expand(input_ids.shape[0], -1, -1)
+            return BaseModelOutput(last_hidden_state=hidden)
+        out = self.backbone(input_ids, *args, **kwargs)
+        self.captured = out[0][:1].detach()
+        return out
@@ -0,0 +1,74 @@
+"""
+Inferencia por teselas (sliced inference) para fotos de platos en alta resolución.
+
+El processor reduce la foto entera a lado corto 800, así que ingredientes pequeños (arvejas,
+aceitunas, zanahoria rallada) en fotos cenitales quedan en pocos píxeles. En modo teselas la
+imagen se decodifica a más resolución y se corta en ventanas solapadas de `tile_size` píxeles;
+todas (más, opcionalmente, la vista completa para los objetos grandes) van en forwards batched,
+las cajas se trasladan a coordenadas globales y los duplicados entre teselas vecinas se
+eliminan con NMS por clase (torchvision.ops.batched_nms, vectorizado).
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any
+
+from detection.config import TILING_INCLUDE_FULL, TILING_IOU_THRESHOLD, TILING_OVERLAP, TILING_TILE_SIZE
+
+Window = tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class TileSpec:
+    """
+    Parámetros del modo teselas. tile_size: lado de cada tesela en píxeles de la imagen
+    decodificada; overlap: fracción (0–0.5) que se solapan las vecinas; include_full: añadir la
+    imagen completa al batch. Es hashable: forma parte de la clave del scheduler y de la cache.
+    """
+    tile_size: int = TILING_TILE_SIZE
+    overlap: float = TILING_OVERLAP
+    include_full: bool = TILING_INCLUDE_FULL
+    iou_threshold: float = TILING_IOU_THRESHOLD
+
+    @property
+    def cache_tag(self) -> str:
+        return f"tiles:{self.tile_size}:{self.overlap:.3f}:{int(self.include_full)}:{self.iou_threshold:.3f}"
+
+
+def _starts(length: int, tile: int, stride: int) -> list[int]:
+    """Inicios de ventana a lo largo de un eje; la última queda alineada con el borde."""
+    if length <= tile:
+        return [0]
+    count = math.ceil((length - tile) / stride) + 1
+    return [min(i * stride, length - tile) for i in range(count)]
+
+
+def tile_windows(width: int, height: int, tile_size: int, overlap: float) -> list[Window]:
+    """Ventanas (x0, y0, x1, y1) que cubren la imagen con el solape pedido."""
+    tile_w, tile_h = min(tile_size, width), min(tile_size, height)
+    stride = max(1, int(tile_size * (1.0 - overlap)))
+    return [
+        (x, y, x + tile_w, y + tile_h)
+        for y in _starts(height, tile_h, stride)
+        for x in _starts(width, tile_w, stride)
+    ]
+
+
+def merge_detections(detections: list[dict[str, Any]], iou_threshold: float) -> list[dict[str, Any]]:
+    """
+    NMS por clase sobre detecciones ya en coordenadas globales: entre cajas de la misma
+    etiqueta con IoU > iou_threshold se queda la de mayor score. Orden: score descendente.
+    """
+    if len(detections) < 2:
+        return list(detections)
+    import torch
+    from torchvision.ops import batched_nms
+
+    label_ids: dict[str, int] = {}
+    boxes = torch.tensor([d["box"] for d in detections], dtype=torch.float32)
+    scores = torch.tensor([d["score"] for d in detections], dtype=torch.float32)
+    idxs = torch.tensor([label_ids.setdefault(d["label"], len(label_ids)) for d in detections])
+    keep = batched_nms(boxes, scores, idxs, iou_threshold).tolist()
+    return [detections[i] for i in keep]
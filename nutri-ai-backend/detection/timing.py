@@ -0,0 +1,26 @@
+"""
+Medición de tiempos por etapa del pipeline de detección.
+
+Las funciones del pipeline aceptan un dict `timings` opcional; si se pasa, cada etapa
+(decode, preprocess, forward, postprocess, serialize...) suma ahí sus segundos.
+Sin dict el coste es una comparación con None.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def stage(timings: dict[str, float] | None, name: str) -> Iterator[None]:
+    """Suma a timings[name] el tiempo (segundos) que tarda el bloque."""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
@@ -0,0 +1,208 @@
+"""
+Ingesta de subidas con memoria acotada, compartida por /detect, /detect/image, /detect/batch
+y /corrections.
+
+- BodySizeLimitMiddleware corta la petición antes de que FastAPI parsee el multipart:
+  por Content-Length si viene, o contando bytes mientras llegan (chunked).
+- read_upload lee el archivo por bloques con tope de tamaño, calcula el SHA-256 sobre la
+  marcha (clave de la cache de resultados), comprueba la firma del formato en el primer
+  bloque y el número de píxeles en cuanto la cabecera está disponible, sin decodificar.
+- Upload.release suelta los bytes en cuanto existe la imagen decodificada.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, BinaryIO
+
+from PIL import Image
+
+from detection.config import MAX_IMAGE_PIXELS, MAX_UPLOAD_MB
+from detection.image_io import BufferReader, ImageTooLargeError
+
+MAX_UPLOAD_BYTES = int(MAX_UPLOAD_MB * 1024 * 1024)
+
+_CHUNK = 64 * 1024
+# Hasta dónde se reintenta leer la cabecera (JPEG con EXIF/miniatura grande la pone tarde)
+_HEADER_PROBE_LIMIT = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """El archivo o el cuerpo de la petición supera el máximo configurado."""
+
+
+class InvalidImageError(ValueError):
+    """Los bytes no empiezan con la firma de un formato de imagen aceptado."""
+
+
+def sniff_format(head: bytes) -> str | None:
+    """Formato por firma (magic bytes): JPEG, PNG, WEBP, BMP o None."""
+    if head[:3] == b"\xff\xd8\xff":
+        return "JPEG"
+    if head[:8] == b"\x89PNG\r\n\x1a\n":
+        return "PNG"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    if head[:2] == b"BM":
+        return "BMP"
+    return None
+
+
+@dataclass
+class Upload:
+    """Bytes de una subida validada y su hash; `data` pasa a None tras release()."""
+    data: bytearray | None
+    sha256: str
+    format: str
+    size: tuple[int, int] | None  # (ancho, alto) de la cabecera, si ya se pudo leer
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) if self.data is not None else 0
+
+    def release(self) -> None:
+        self.data = None
+
+
+def _probe_size(buf: bytearray) -> tuple[int, int] | None:
+    """
+    Tamaño desde la cabecera con los bytes recibidos hasta ahora (None si aún no alcanza).
+    Lee de una vista de los primeros _HEADER_PROBE_LIMIT bytes, sin copiar el buffer.
+    """
+    with memoryview(buf) as view, BufferReader(view[:_HEADER_PROBE_LIMIT]) as head:
+        try:
+            with Image.open(head) as img:
+                return img.size
+        except Exception:
+            return None
+
+
+def read_upload(
+    src: BinaryIO,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    max_pixels: int = MAX_IMAGE_PIXELS,
+) -> Upload:
+    """
+    Lee `src` por bloques validando sobre la marcha. Bloqueante: usar asyncio.to_thread.
+
+    Raises:
+        UploadTooLargeError: más de max_bytes (se deja de leer en ese bloque).
+        InvalidImageError: vacío o sin firma de JPEG/PNG/WebP/BMP (se detecta en el primer bloque).
+        detection.image_io.ImageTooLargeError: la cabecera declara más de max_pixels.
+    """
+    digest = hashlib.sha256()
+    buf = bytearray()
+    fmt: str | None = None
+    size: tuple[int, int] | None = None
+    probe = True
+    while True:
+        chunk = src.read(_CHUNK)
+        if not chunk:
+            break
+        if len(buf) + len(chunk) > max_bytes:
+            raise UploadTooLargeError(
+                f"El archivo supera el máximo de {max_bytes // (1024 * 1024)} MB."
+            )
+        buf += chunk
+        digest.update(chunk)
+        if fmt is None and len(buf) >= 12:
+            fmt = sniff_format(bytes(buf[:12]))
+            if fmt is None:
+                raise InvalidImageError("El archivo no es una imagen JPEG, PNG, WebP o BMP.")
+        if fmt is not None and size is None and probe:
+            size = _probe_size(buf)
+            # Se deja de sondear al leer la cabecera o al pasar el límite
+            probe = size is None and len(buf) < _HEADER_PROBE_LIMIT
+            if size is not None and max_pixels and size[0] * size[1] > max_pixels:
+                raise ImageTooLargeError(
+                    f"La imagen tiene {size[0]}x{size[1]} píxeles; el máximo es {max_pixels:,}."
+                )
+    if not buf:
+        raise InvalidImageError("El archivo está vacío.")
+    if fmt is None:
+        fmt = sniff_format(bytes(buf[:12]))
+        if fmt is None:
+            raise InvalidImageError("El archivo no es una imagen JPEG, PNG, WebP o BMP.")
+    return Upload(data=buf, sha256=digest.hexdigest(), format=fmt, size=size)
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class BodySizeLimitMiddleware:
+    """
+    Middleware ASGI que responde 413 cuando el cuerpo supera el límite de la ruta.
+    `limits` asigna límites por path; el resto usa `default_limit` (0 = sin límite).
+    """
+
+    def __init__(self, app: Any, default_limit: int, limits: dict[str, int] | None = None):
+        self.app = app
+        self.default_limit = default_limit
+        self.limits = limits or {}
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = self.limits.get(scope["path"], self.default_limit)
+        if not limit:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await self._reject(send, limit)
+            return
+
+        received = 0
+        exceeded = False
+        replaced = False
+
+        async def limited_receive() -> dict:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message: dict) -> None:
+            nonlocal replaced
+            if exceeded:
+                # La app convierte el corte en un 400 de parseo: se sustituye por el 413
+                if message["type"] == "http.response.start" and not replaced:
+                    replaced = True
+                    await self._reject(send, limit)
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+            if not replaced:
+                await self._reject(send, limit)
+
+    @staticmethod
+    async def _reject(send: Any, limit: int) -> None:
+        body = json.dumps(
+            {"detail": f"Petición demasiado grande (máximo {limit // (1024 * 1024)} MB)."},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
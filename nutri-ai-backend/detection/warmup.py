@@ -0,0 +1,93 @@
+"""
+Precarga del modelo al arrancar y forwards de calentamiento.
+
+El primer forward paga asignaciones de memoria, selección de kernels y (en el pool) el
+arranque de cada worker. Con DETECTION_PRELOAD=1 el lifespan de la API carga el modelo y
+ejecuta forwards con imágenes sintéticas de los tamaños de DETECTION_WARMUP_SIZES y el
+prompt por defecto; /ready informa del estado y de los tiempos.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from PIL import Image
+
+from detection.config import BOX_THRESHOLD, INGREDIENTS_LIST, TEXT_THRESHOLD
+from detection.image_io import target_size
+
+
+def parse_sizes(spec: str) -> list[tuple[int, int]]:
+    """'640x480,1024x768' → [(640, 480), (1024, 768)]. Ignora entradas mal formadas."""
+    sizes = []
+    for part in spec.split(","):
+        try:
+            w, h = (int(x) for x in part.lower().strip().split("x"))
+        except ValueError:
+            continue
+        if w > 0 and h > 0:
+            sizes.append((w, h))
+    return sizes
+
+
+@dataclass
+class Readiness:
+    """Estado de preparación del servicio (distinto de la liveness de /health)."""
+    preload: bool
+    status: str = "cold"  # cold | loading | warming | ready | error | lazy
+    load_seconds: float | None = None
+    warmup_seconds: float | None = None
+    warmup: list[dict[str, Any]] = field(default_factory=list)
+    error: str | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "lazy")
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "status": self.status,
+            "preload": self.preload,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "warmup": self.warmup,
+            "error": self.error,
+        }
+
+
+async def run_warmup(
+    inference: Any,
+    sizes: list[tuple[int, int]],
+    runs: int = 1,
+    parallel: int = 1,
+) -> list[dict[str, Any]]:
+    """
+    Ejecuta `runs` forwards por tamaño a través del motor de inferencia (scheduler o pool).
+    Las imágenes se reducen igual que decode_image; `parallel` > 1 envía varias a la vez
+    para repartirlas entre los workers del pool.
+    """
+    timings = []
+    for width, height in sizes:
+        image = Image.effect_noise(target_size(width, height), 64).convert("RGB")
+        for run in range(runs):
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                inference.submit(
+                    image,
+                    INGREDIENTS_LIST,
+                    BOX_THRESHOLD,
+                    TEXT_THRESHOLD,
+                    original_size=(width, height),
+                )
+                for _ in range(parallel)
+            ))
+            timings.append({
+                "size": f"{width}x{height}",
+                "run": run,
+                "seconds": round(time.perf_counter() - start, 3),
+            })
+    return timings
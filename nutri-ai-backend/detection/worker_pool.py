@@ -0,0 +1,474 @@
+"""
+Pool de procesos de inferencia en CPU con los pesos de Grounding DINO compartidos.
+
+El proceso padre carga el modelo una sola vez y luego hace fork de N workers: los tensores
+de pesos se comparten copy-on-write (nadie los escribe), así la memoria total queda cerca
+de una sola copia del modelo. Cada worker fija su presupuesto de hilos de torch
+(torch.set_num_threads) y, si el sistema lo permite, su afinidad de CPU.
+
+Las imágenes no se serializan con pickle: el padre copia los píxeles RGB crudos en un slot
+de memoria compartida y por la cola solo viaja (slot, tamaño, prompt, umbrales, teselas).
+Cada worker tiene su propia cola y el padre asigna cada trabajo al worker con menos trabajos
+pendientes, así siempre sabe qué trabajos tenía un worker.
+Con deadline, el worker descarta el trabajo si ya venció al sacarlo de la cola (el padre
+deja de esperarlo en cuanto vence; ver el control de admisión en detection/batching.py).
+
+Si un worker muere (OOM, segfault), el hilo colector lo detecta: los trabajos asignados a él
+(en curso o aún en su cola) fallan con WorkerDiedError (sus slots se liberan), su cola se
+descarta (un proceso muerto a mitad de get() puede dejarla bloqueada) y se hace fork de un
+reemplazo con una cola nueva, como mucho
+POOL_MAX_RESPAWNS veces. Sin ningún worker vivo, el pool deja de estar sano (healthy) y los
+trabajos pendientes fallan.
+
+Importante: el padre no debe ejecutar ningún forward antes del fork (el pool de hilos de
+OpenMP no sobrevive al fork) y el pool solo tiene sentido en CPU.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import itertools
+import math
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
+
+from PIL import Image
+
+from detection.batching import DeadlineExceededError, QueueFullError, ServiceTime, retry_after_seconds
+from detection.config import (
+    INTER_OP_THREADS,
+    POOL_MAX_RESPAWNS,
+    POOL_SLOT_MB,
+    POOL_SLOTS,
+    POOL_WORKER_THREADS,
+    POOL_WORKERS,
+    QUEUE_MAX_DEPTH,
+)
+from detection.tiling import TileSpec
+from telemetry import INFERENCE_REJECTED, QUEUE_WAIT_SECONDS, emit, observe_stages
+
+# Respuesta de un worker para un trabajo cuyo deadline venció antes de empezar
+_EXPIRED = "expired"
+# Cada cuánto (s) el colector comprueba que los workers sigan vivos
+_HEALTH_INTERVAL = 1.0
+
+
+class WorkerDiedError(RuntimeError):
+    """El worker que ejecutaba el trabajo murió (o no queda ningún worker vivo)."""
+
+
+def _worker_main(
+    detector: Any,
+    slots: list[SharedMemory],
+    tasks: mp.Queue,
+    results: mp.Queue,
+    num_threads: int,
+    cpus: list[int] | None,
+) -> None:
+    """Bucle de un worker: lee trabajos de su cola, reconstruye la imagen desde el slot y detecta."""
+    # Ctrl+C lo gestiona el padre (envía None a cada worker al cerrar)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError:
+            pass
+
+    import torch
+
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(INTER_OP_THREADS or 1)
+    except RuntimeError:
+        pass
+
+    while True:
+        msg = tasks.get()
+        if msg is None:
+            break
+        (job_id, slot_idx, size, nbytes, original_size, text_prompts, box_threshold, text_threshold,
+         tiling, enqueued_at, deadline) = msg
+        # time.monotonic() es el mismo reloj en el padre y en los hijos del fork
+        started = time.monotonic()
+        if deadline is not None and started >= deadline:
+            results.put((job_id, False, _EXPIRED))
+            continue
+        view = slots[slot_idx].buf[:nbytes]
+        image = None
+        try:
+            image = Image.frombuffer("RGB", size, view, "raw", "RGB", 0, 1)
+            # Los tiempos por etapa viajan con el resultado: las métricas viven en el padre
+            timings: dict[str, float] = {"queue": started - enqueued_at}
+            if tiling is not None:
+                detections = detector.detect_tiled(
+                    image,
+                    text_prompts=text_prompts,
+                    box_threshold=box_threshold,
+                    text_threshold=text_threshold,
+                    tiling=tiling,
+                    original_size=original_size,
+                    timings=timings,
+                )
+            else:
+                detections = detector.detect_batch(
+                    [image],
+                    text_prompts=text_prompts,
+                    box_threshold=box_threshold,
+                    text_threshold=text_threshold,
+                    original_sizes=[original_size],
+                    timings=timings,
+                )[0]
+            results.put((job_id, True, (detections, timings)))
+        except Exception as e:
+            results.put((job_id, False, f"{type(e).__name__}: {e}"))
+        finally:
+            # La imagen apunta a la vista: soltarla antes de liberar la vista del slot
+            image = None
+            view.release()
+
+
+class DetectorPool:
+    """
+    Pool de procesos fork con la misma interfaz async que BatchScheduler (submit / close).
+
+    `detector` debe tener el modelo ya cargado (load_model) antes de start().
+    """
+
+    def __init__(
+        self,
+        detector: Any,
+        num_workers: int = POOL_WORKERS,
+        threads_per_worker: int = POOL_WORKER_THREADS,
+        num_slots: int = POOL_SLOTS,
+        slot_mb: float = POOL_SLOT_MB,
+        max_queue_depth: int = QUEUE_MAX_DEPTH,
+        max_respawns: int = POOL_MAX_RESPAWNS,
+    ):
+        self._detector = detector
+        self.num_workers = max(1, num_workers)
+        available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self._cpus = available
+        self.threads_per_worker = threads_per_worker or max(1, len(available) // self.num_workers)
+        self.num_slots = num_slots or 2 * self.num_workers
+        self.slot_bytes = int(slot_mb * 1024 * 1024)
+        self.max_queue_depth = max(1, max_queue_depth)
+        self.max_respawns = max(0, max_respawns)
+        self.respawns = 0
+
+        self._ctx = mp.get_context("fork")
+        self._slots: list[SharedMemory] = []
+        self._tasks: list[mp.Queue] = []  # una cola por worker
+        self._results: mp.Queue | None = None
+        self._processes: list[mp.Process] = []
+        self._lost: set[int] = set()  # workers caídos sin reemplazo
+        self._collector: threading.Thread | None = None
+        self._ids = itertools.count()
+        # job_id -> (future, loop, slot, worker); lo tocan el event loop y el hilo colector
+        self._jobs: dict[int, tuple[asyncio.Future, asyncio.AbstractEventLoop, int, int]] = {}
+        self._assigned: list[int] = []  # trabajos sin resolver por worker
+        self._jobs_lock = threading.Lock()
+        self._free_slots: list[int] = []
+        self._slot_sem: asyncio.Semaphore | None = None
+        self._pending = 0
+        self._closed = False
+        self.service_time = ServiceTime()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def estimated_wait(self) -> float:
+        """Segundos estimados hasta tener resultado si se encolara ahora (0 sin historial)."""
+        return math.ceil((self._pending + 1) / self.num_workers) * self.service_time.seconds
+
+    def admit(self, deadline: float | None = None) -> None:
+        """Control de admisión antes de decodificar (misma semántica que BatchScheduler.admit)."""
+        if self._pending >= self.max_queue_depth:
+            INFERENCE_REJECTED.inc("queue_full")
+            raise QueueFullError(
+                f"Cola de inferencia llena ({self._pending}/{self.max_queue_depth}).",
+                retry_after=retry_after_seconds(self.estimated_wait()),
+            )
+        if deadline is not None and time.monotonic() + self.estimated_wait() > deadline:
+            INFERENCE_REJECTED.inc("deadline_admission")
+            raise DeadlineExceededError(
+                f"La espera estimada ({self.estimated_wait():.1f} s) supera el deadline de la petición."
+            )
+
+    @property
+    def detector(self) -> Any:
+        """Detector del proceso padre (modelo cargado, sin forwards): lo comparten los workers."""
+        return self._detector
+
+    @property
+    def worker_pids(self) -> list[int]:
+        return [p.pid for p in self._processes if p.pid is not None]
+
+    @property
+    def alive_workers(self) -> int:
+        return sum(1 for p in self._processes if p.is_alive())
+
+    @property
+    def healthy(self) -> bool:
+        """Iniciado, sin cerrar y con al menos un worker vivo."""
+        return bool(self._processes) and not self._closed and self.alive_workers > 0
+
+    def health(self) -> dict[str, Any]:
+        return {
+            "workers": self.num_workers,
+            "alive": self.alive_workers,
+            "respawns": self.respawns,
+            "lost": len(self._lost),
+        }
+
+    def start(self) -> None:
+        """Crea los slots de memoria compartida y hace fork de los workers."""
+        self._slots = [SharedMemory(create=True, size=self.slot_bytes) for _ in range(self.num_slots)]
+        self._free_slots = list(range(self.num_slots))
+        self._tasks = [self._ctx.Queue() for _ in range(self.num_workers)]
+        self._assigned = [0] * self.num_workers
+        self._results = self._ctx.Queue()
+        # Mover los objetos vivos a la generación permanente: el GC del hijo no los recorre
+        # y así no ensucia (copia) las páginas compartidas.
+        gc.collect()
+        gc.freeze()
+        self._processes = [self._spawn(idx) for idx in range(self.num_workers)]
+        gc.unfreeze()
+        self._collector = threading.Thread(target=self._collect, name="detector-pool-results", daemon=True)
+        self._collector.start()
+        emit(
+            "detector.pool_started",
+            f"Pool iniciado: {self.num_workers} workers × {self.threads_per_worker} hilos, "
+            f"{self.num_slots} slots de {self.slot_bytes // (1024 * 1024)} MB",
+            workers=self.num_workers,
+            threads_per_worker=self.threads_per_worker,
+            slots=self.num_slots,
+            slot_mb=self.slot_bytes // (1024 * 1024),
+        )
+
+    def _spawn(self, idx: int) -> mp.Process:
+        """Hace fork del worker `idx` (mismos CPUs e hilos que el original)."""
+        cpus = self._cpus[idx * self.threads_per_worker:(idx + 1) * self.threads_per_worker] or None
+        p = self._ctx.Process(
+            target=_worker_main,
+            args=(self._detector, self._slots, self._tasks[idx], self._results,
+                  self.threads_per_worker, cpus),
+            name=f"detector-worker-{idx}",
+            daemon=True,
+        )
+        p.start()
+        return p
+
+    def _fit(self, image: Image.Image) -> Image.Image:
+        """
+        Reduce la imagen si no cabe en un slot (las cajas se reescalan al tamaño original) y lo
+        avisa con el evento detector.image_downscaled: pierde detalle frente a BatchScheduler.
+        """
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        nbytes = image.width * image.height * 3
+        if nbytes <= self.slot_bytes:
+            return image
+        factor = math.sqrt(self.slot_bytes / nbytes)
+        size = (max(1, int(image.width * factor)), max(1, int(image.height * factor)))
+        emit(
+            "detector.image_downscaled",
+            f"Imagen {image.width}x{image.height} reducida a {size[0]}x{size[1]} para caber en un "
+            f"slot de {self.slot_bytes // (1024 * 1024)} MB (subir DETECTION_POOL_SLOT_MB)",
+            width=image.width,
+            height=image.height,
+            fitted_width=size[0],
+            fitted_height=size[1],
+            slot_mb=self.slot_bytes // (1024 * 1024),
+        )
+        return image.resize(size, Image.BILINEAR)
+
+    def _pick_worker(self) -> int:
+        """(Con _jobs_lock) Worker vivo con menos trabajos asignados (uno caído si no hay otro)."""
+        candidates = [i for i, p in enumerate(self._processes) if i not in self._lost and p.is_alive()]
+        return min(candidates or range(len(self._processes)), key=lambda i: self._assigned[i])
+
+    async def submit(
+        self,
+        image: Image.Image,
+        text_prompts: list[str],
+        box_threshold: float,
+        text_threshold: float,
+        original_size: tuple[int, int] | None = None,
+        tiling: TileSpec | None = None,
+        deadline: float | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Envía la imagen a un worker y espera sus detecciones (cajas en original_size).
+        tiling: si se pasa, el worker detecta por teselas (detector.detect_tiled).
+        deadline: instante (time.monotonic()) a partir del cual el resultado ya no sirve.
+        """
+        if self._closed or not self._processes:
+            raise RuntimeError("El pool de detección no está iniciado.")
+        if not self.healthy:
+            raise WorkerDiedError("No queda ningún worker de detección vivo.")
+        self.admit(deadline)
+        if self._slot_sem is None:
+            self._slot_sem = asyncio.Semaphore(self.num_slots)
+
+        self._pending += 1
+        submitted = time.monotonic()
+        try:
+            if deadline is None:
+                return await self._run(image, text_prompts, box_threshold, text_threshold, original_size, tiling, None)
+            try:
+                return await asyncio.wait_for(
+                    self._run(image, text_prompts, box_threshold, text_threshold, original_size, tiling, deadline),
+                    max(0.0, deadline - time.monotonic()),
+                )
+            except asyncio.TimeoutError:
+                QUEUE_WAIT_SECONDS.observe(time.monotonic() - submitted, "expired")
+                INFERENCE_REJECTED.inc("deadline_queue")
+                raise DeadlineExceededError("El deadline de la petición venció antes de tener resultado.") from None
+        finally:
+            self._pending -= 1
+
+    async def _run(
+        self,
+        image: Image.Image,
+        text_prompts: list[str],
+        box_threshold: float,
+        text_threshold: float,
+        original_size: tuple[int, int] | None,
+        tiling: TileSpec | None,
+        deadline: float | None,
+    ) -> list[dict[str, Any]]:
+        """Espera un slot libre, copia la imagen y espera el resultado del worker."""
+        loop = asyncio.get_running_loop()
+        enqueued_at = time.monotonic()
+        await self._slot_sem.acquire()
+        slot_idx = self._free_slots.pop()
+        original_size = original_size or image.size
+        fitted = self._fit(image)
+        data = fitted.tobytes()
+        self._slots[slot_idx].buf[:len(data)] = data
+        job_id = next(self._ids)
+        future = loop.create_future()
+        with self._jobs_lock:
+            worker_idx = self._pick_worker()
+            self._jobs[job_id] = (future, loop, slot_idx, worker_idx)
+            self._assigned[worker_idx] += 1
+            # Dentro del lock: el colector no puede descartar esta cola entre asignar y encolar
+            self._tasks[worker_idx].put((
+                job_id, slot_idx, fitted.size, len(data), original_size,
+                list(text_prompts), float(box_threshold), float(text_threshold), tiling,
+                enqueued_at, deadline,
+            ))
+        del data, fitted
+        return await future
+
+    def _collect(self) -> None:
+        """Hilo que recibe resultados de los workers y resuelve los futures en su event loop."""
+        checked = time.monotonic()
+        while not self._closed:
+            # También con resultados llegando sin pausa: un worker caído no debe pasar inadvertido
+            if time.monotonic() - checked >= _HEALTH_INTERVAL:
+                self._check_workers()
+                checked = time.monotonic()
+            try:
+                job_id, ok, payload = self._results.get(timeout=_HEALTH_INTERVAL)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            self._resolve(job_id, ok, payload)
+
+    def _resolve(self, job_id: int, ok: bool, payload: Any) -> None:
+        with self._jobs_lock:
+            entry = self._jobs.pop(job_id, None)
+            if entry is None:
+                return
+            future, loop, slot_idx, worker_idx = entry
+            self._assigned[worker_idx] -= 1
+        loop.call_soon_threadsafe(self._complete, future, slot_idx, ok, payload)
+
+    def _check_workers(self) -> None:
+        """
+        (Hilo colector) Por cada worker caído: falla los trabajos asignados a él (en curso o en
+        su cola), que así liberan su slot y su plaza en `pending`, y hace fork de un reemplazo
+        con una cola nueva mientras queden reintentos.
+        """
+        for idx, p in enumerate(self._processes):
+            if self._closed or idx in self._lost or p.is_alive():
+                continue
+            with self._jobs_lock:
+                job_ids = [job_id for job_id, entry in self._jobs.items() if entry[3] == idx]
+                # Puede haber muerto dentro de get() con el lock de lectura tomado
+                dead_queue = self._tasks[idx]
+                self._tasks[idx] = self._ctx.Queue()
+            dead_queue.cancel_join_thread()
+            dead_queue.close()
+            for job_id in job_ids:
+                self._resolve(job_id, False, f"WorkerDiedError: el worker {p.name} murió (código {p.exitcode})")
+            replace = self.respawns < self.max_respawns
+            emit(
+                "detector.worker_died",
+                f"Worker {p.name} caído (código {p.exitcode})"
+                + ("; se reemplaza" if replace else "; sin reemplazo, reintentos agotados"),
+                worker=p.name,
+                exitcode=p.exitcode,
+                jobs_failed=len(job_ids),
+                respawn=replace,
+                alive=self.alive_workers,
+            )
+            if replace:
+                self.respawns += 1
+                gc.collect()
+                gc.freeze()
+                self._processes[idx] = self._spawn(idx)
+                gc.unfreeze()
+            else:
+                self._lost.add(idx)
+        if not self._closed and not self.healthy:
+            # Nadie va a leer la cola de trabajos: que los que esperan no se queden colgados
+            for job_id in list(self._jobs):
+                self._resolve(job_id, False, "WorkerDiedError: no queda ningún worker de detección vivo")
+
+    def _complete(self, future: asyncio.Future, slot_idx: int, ok: bool, payload: Any) -> None:
+        # El slot se libera cuando el worker terminó de leerlo, aunque el cliente ya no espere
+        self._free_slots.append(slot_idx)
+        self._slot_sem.release()
+        if ok:
+            payload, timings = payload
+            observe_stages(timings)
+            QUEUE_WAIT_SECONDS.observe(timings.get("queue", 0.0), "served")
+            self.service_time.observe(sum(v for k, v in timings.items() if k != "queue"))
+        if future.done():
+            return
+        if ok:
+            future.set_result(payload)
+        elif payload == _EXPIRED:
+            INFERENCE_REJECTED.inc("deadline_queue")
+            future.set_exception(DeadlineExceededError("El deadline de la petición venció en la cola."))
+        elif payload.startswith("WorkerDiedError: "):
+            future.set_exception(WorkerDiedError(payload.split(": ", 1)[1]))
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    async def close(self) -> None:
+        """Detiene los workers y libera la memoria compartida."""
+        if self._closed:
+            return
+        self._closed = True
+        for tasks in self._tasks:
+            tasks.put(None)
+        for p in self._processes:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        for shm in self._slots:
+            shm.close()
+            shm.unlink()
+        self._slots = []
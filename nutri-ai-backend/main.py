@@ -5,11 +5,17 @@ No usa Roboflow ni modelos entrenados en datasets cerrados.
 """
 from __future__ import annotations
 
-import io
+import asyncio
+import dataclasses
 import json
 import os
+import tempfile
+import threading
+import time
 import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import BinaryIO
 
 # Cargar .env de nutri-ai-backend/ y de la raíz del repo (donde suele estar VITE_SUPABASE_URL)
 try:
@@ -20,143 +26,519 @@ try:
 except ImportError:
     pass
 
-from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Query
+import numpy as np
+from fastapi import FastAPI, File, Form, Header, UploadFile, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
-from PIL import Image, ImageDraw, ImageFont
-from pydantic import BaseModel
-
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from PIL import Image
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+from corrections import (
+    Correction,
+    CorrectionWriter,
+    ImageDeduplicator,
+    ImageIndex,
+    SimilarImageIndex,
+    SimilarMatch,
+    create_sink,
+)
+from corrections.config import SIMILAR_LOOKUP
+from detection.batch_input import (
+    BatchInputError,
+    BatchItem,
+    BatchSpool,
+    BatchTooLargeError,
+    is_archive,
+)
+from detection.batching import BatchScheduler, DeadlineExceededError, QueueFullError
+from detection.worker_pool import WorkerDiedError
 from detection.config import (
+    BACKEND,
+    BATCH_UPLOAD_CONCURRENCY,
+    BATCH_UPLOAD_MAX_ITEM_MB,
+    BATCH_UPLOAD_MAX_ITEMS,
     BOX_THRESHOLD,
+    DECODE_LONGEST_EDGE,
+    DECODE_SHORTEST_EDGE,
+    FAKE_DETECTOR_MS,
     INGREDIENTS_LIST,
+    LIVE_INFERENCE_DEADLINE_MS,
+    LIVE_LONGEST_EDGE,
+    MAX_BATCH_BODY_MB,
+    MEAL_CATEGORIES,
+    POOL_WORKERS,
+    PRELOAD,
+    RENDER_FORMAT,
+    RENDER_QUALITY,
+    REQUEST_DEADLINE_MS,
     TEXT_THRESHOLD,
+    TILING_LONGEST_EDGE,
+    TILING_OVERLAP,
+    TILING_SHORTEST_EDGE,
+    TILING_TILE_SIZE,
+    WARMUP_RUNS,
+    WARMUP_SIZES,
     ingredients_from_string,
 )
+from detection.image_io import BufferReader, DecodedImage, ImageTooLargeError, decode_image
+from detection.live import LiveSession
+from detection.postprocess import label_index, large_box_mask
+from detection.prompts import category_prompt_lists, plan_prompts
+from detection.render import RenderOptions, render_detections
+from detection.result_cache import (
+    CachedDetection,
+    DetectionResultCache,
+    make_key as make_cache_key,
+)
+from detection.tiling import TileSpec
+from detection.upload import (
+    MAX_UPLOAD_BYTES,
+    BodySizeLimitMiddleware,
+    InvalidImageError,
+    Upload,
+    UploadTooLargeError,
+    read_upload,
+)
+from detection.warmup import Readiness, parse_sizes, run_warmup
+from telemetry import (
+    CORRECTIONS_PENDING,
+    DETECTIONS,
+    INFERENCE_PENDING,
+    RESULT_CACHE_HITS,
+    RESULT_CACHE_MISSES,
+    SIMILAR_HITS,
+    SIMILAR_INDEX_SIZE,
+    SIMILAR_MISSES,
+    STAGE_SECONDS,
+    MetricsMiddleware,
+    emit,
+    render as render_metrics,
+)
 
 _detector = None
+_scheduler = None
+_pool = None
+_result_cache = None
+_detector_lock = threading.Lock()
+_correction_writer: CorrectionWriter | None = None
+_similar_index: SimilarImageIndex | None = None
+_readiness = Readiness(preload=PRELOAD, status="cold" if PRELOAD else "lazy")
 
 # Máxima fracción del área de la imagen que puede ocupar una caja (evita falsos positivos tipo "medialuna").
 MAX_BOX_AREA_RATIO = 0.45
 
-# Categorías de comida: cada clave tiene una lista de etiquetas (labels) que pertenecen a esa categoría.
-# Las etiquetas están en inglés (como devuelve el modelo).
-MEAL_CATEGORIES = {
-    "breakfast": [
-        "egg", "boiled egg", "fried egg",
-        "oats", "oatmeal", "bread", "whole wheat bread", "tortilla", "wrap",
-        "croissant", "medialuna",
-        "banana", "apple", "strawberry",
-        "butter", "peanut butter", "cream cheese",
-        "avocado",
-    ],
-    "lunch": [
-        "rice", "white rice", "brown rice",
-        "pasta", "whole wheat pasta",
-        "lentils", "chickpeas", "beans", "peas",
-        "beef", "chicken", "pork", "fish", "tuna", "salmon",
-        "lettuce", "tomato", "cherry tomato",
-        "onion", "red onion", "green onion",
-        "carrot", "grated carrot",
-        "bell pepper", "red pepper", "green pepper",
-        "zucchini", "eggplant",
-        "spinach", "arugula",
-        "broccoli", "cauliflower",
-        "potato", "sweet potato", "pumpkin",
-        "french fries", "mashed potatoes",
-        "avocado", "olives",
-        "cheese", "mozzarella", "parmesan",
-        "olive oil",
-    ],
-    "snack": [
-        "bread", "whole wheat bread", "tortilla", "wrap",
-        "cookies", "biscuits", "cake", "chocolate cake",
-        "croissant", "medialuna", "ice cream",
-        "banana", "apple", "strawberry",
-        "peanut butter", "cream cheese",
-        "avocado", "olives",
-    ],
-    "dinner": [
-        "rice", "white rice", "brown rice",
-        "pasta", "whole wheat pasta",
-        "lentils", "chickpeas", "beans", "peas",
-        "beef", "chicken", "pork", "fish", "tuna", "salmon",
-        "lettuce", "tomato", "cherry tomato",
-        "onion", "red onion", "green onion",
-        "carrot", "grated carrot",
-        "bell pepper", "red pepper", "green pepper",
-        "zucchini", "eggplant",
-        "spinach", "arugula",
-        "broccoli", "cauliflower",
-        "potato", "sweet potato", "pumpkin",
-        "french fries", "mashed potatoes",
-        "avocado", "olives",
-        "cheese", "mozzarella", "parmesan",
-        "pizza", "hamburger", "sushi",
-        "olive oil",
-    ],
-}
+# Etiquetas con serie propia en detections_total; las de prompts libres se cuentan como "other"
+_METRIC_LABELS = frozenset(INGREDIENTS_LIST).union(*MEAL_CATEGORIES.values())
 
+def _new_detector(**kwargs):
+    """Grounding DINO, o el detector falso (sin modelo) si DETECTION_FAKE_DETECTOR_MS > 0."""
+    if FAKE_DETECTOR_MS > 0:
+        from detection.fake import FakeDetector
 
-def _normalize_label(label: str, ingredients_list: list[str]) -> str:
-    """
-    Si el modelo devuelve etiquetas concatenadas ("chickpeas beans whole wheat pasta"),
-    devuelve el primer ingrediente de la lista que aparezca en la etiqueta.
-    Orden de lista: así "rice" matchea antes que "mashed potatoes" en "rice white mashed potatoes".
-    """
-    label_lower = label.lower().strip()
-    label_words = set(label_lower.split())
-    for ing in ingredients_list:
-        ing_lower = ing.lower()
-        if ing_lower in label_lower:
-            return ing
-        ing_words = set(ing_lower.split())
-        if ing_words and ing_words <= label_words:
-            return ing
-    return label
-
-
-def _is_box_too_large(box: list[float], image_width: int, image_height: int) -> bool:
-    """True si la caja ocupa más de MAX_BOX_AREA_RATIO del área de la imagen (falso positivo)."""
-    x0, y0, x1, y1 = box
-    w = max(0, x1 - x0)
-    h = max(0, y1 - y0)
-    box_area = w * h
-    image_area = image_width * image_height
-    if image_area <= 0:
-        return False
-    return box_area / image_area > MAX_BOX_AREA_RATIO
-
-
-def _draw_detections(image: Image.Image, ingredients: list["DetectedIngredient"]) -> Image.Image:
-    """Dibuja cajas y etiquetas (label + score) sobre la imagen. Devuelve una copia."""
-    img = image.copy()
-    draw = ImageDraw.Draw(img)
-    try:
-        font = ImageFont.truetype("arial.ttf", size=max(14, img.width // 50))
-    except (OSError, IOError):
-        font = ImageFont.load_default()
-    for ing in ingredients:
-        if ing.box is None or len(ing.box) != 4:
-            continue
-        x0, y0, x1, y1 = [int(round(x)) for x in ing.box]
-        draw.rectangle([x0, y0, x1, y1], outline="lime", width=max(2, img.width // 300))
-        text = f"{ing.label} {ing.score:.2f}"
-        bbox = draw.textbbox((x0, y0), text, font=font)
-        draw.rectangle(bbox, fill="green")
-        draw.text((x0, y0 - 2), text, fill="white", font=font)
-    return img
+        return FakeDetector()
+    from detection.grounding_dino import GroundingDinoDetector
+
+    return GroundingDinoDetector(**kwargs)
 
 
 def get_detector():
-    """Carga Grounding DINO una sola vez (singleton). Solo al primer /detect."""
+    """Carga Grounding DINO una sola vez (singleton). Al primer /detect o en la precarga."""
     global _detector
     if _detector is None:
-        from detection.grounding_dino import GroundingDinoDetector
-        _detector = GroundingDinoDetector()
-        _detector.load_model()
+        with _detector_lock:
+            if _detector is None:
+                detector = _new_detector()
+                detector.load_model()
+                detector.prepare_prompts(category_prompt_lists())
+                _detector = detector
     return _detector
 
 
+def get_scheduler() -> BatchScheduler:
+    """Scheduler de micro-batching (singleton). El modelo se carga en su hilo de inferencia."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = BatchScheduler(get_detector)
+    return _scheduler
+
+
+def get_inference():
+    """
+    Motor de inferencia activo: el pool de procesos si DETECTION_WORKERS > 0
+    (se inicia en el lifespan), o el scheduler de micro-batching en este proceso.
+    """
+    if _pool is not None:
+        return _pool
+    return get_scheduler()
+
+
+def _start_pool() -> None:
+    """Carga el modelo en este proceso (sin ejecutar ningún forward) y hace fork de los workers."""
+    global _pool
+    from detection.worker_pool import DetectorPool
+
+    detector = _new_detector(device="cpu")
+    detector.load_model()
+    detector.prepare_prompts(category_prompt_lists())
+    _pool = DetectorPool(detector, num_workers=POOL_WORKERS)
+    _pool.start()
+
+
+async def _preload() -> None:
+    """Carga el modelo y ejecuta los forwards de calentamiento; actualiza el estado de /ready."""
+    try:
+        if POOL_WORKERS == 0:
+            # Con pool, el modelo ya se cargó en lifespan (antes del fork)
+            _readiness.status = "loading"
+            start = time.perf_counter()
+            await asyncio.to_thread(get_detector)
+            _readiness.load_seconds = round(time.perf_counter() - start, 3)
+
+        _readiness.status = "warming"
+        start = time.perf_counter()
+        _readiness.warmup = await run_warmup(
+            get_inference(),
+            parse_sizes(WARMUP_SIZES),
+            runs=WARMUP_RUNS,
+            parallel=max(1, POOL_WORKERS),
+        )
+        _readiness.warmup_seconds = round(time.perf_counter() - start, 3)
+        _readiness.status = "ready"
+        emit(
+            "detector.ready",
+            f"Listo: carga {_readiness.load_seconds}s, calentamiento {_readiness.warmup_seconds}s",
+            load_seconds=_readiness.load_seconds,
+            warmup_seconds=_readiness.warmup_seconds,
+        )
+    except Exception as e:
+        _preload_failed(e)
+
+
+def _preload_failed(e: Exception) -> None:
+    _readiness.status = "error"
+    _readiness.error = f"{type(e).__name__}: {e}"
+    emit("detector.preload_error", f"Error en la precarga: {_readiness.error}", error=_readiness.error)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    preload_task = None
+    if POOL_WORKERS > 0:
+        # El fork se hace aquí, en el hilo principal y antes de que asyncio.to_thread cree los
+        # hilos del executor: un hijo de fork hereda los locks que otro hilo tuviera tomados
+        if not PRELOAD:
+            _start_pool()
+        else:
+            _readiness.status = "loading"
+            start = time.perf_counter()
+            try:
+                _start_pool()
+                _readiness.load_seconds = round(time.perf_counter() - start, 3)
+            except Exception as e:
+                _preload_failed(e)
+    if PRELOAD and _readiness.status != "error":
+        # En segundo plano: /health responde (liveness) mientras /ready devuelve 503
+        preload_task = asyncio.create_task(_preload())
+    # Después del fork del pool: reanuda las correcciones que quedaron en el journal
+    await get_correction_writer()
+    yield
+    if _correction_writer is not None:
+        await _correction_writer.close()
+    if preload_task is not None and not preload_task.done():
+        preload_task.cancel()
+    if _pool is not None:
+        await _pool.close()
+    if _scheduler is not None:
+        await _scheduler.close()
+
+
+async def _read_upload(src: BinaryIO) -> Upload:
+    """
+    Lee la subida por bloques en un hilo (tope DETECTION_MAX_UPLOAD_MB, firma y cabecera
+    validadas antes de decodificar) y traduce los rechazos a HTTP.
+    """
+    try:
+        with STAGE_SECONDS.time("read"):
+            return await asyncio.to_thread(read_upload, src)
+    except (UploadTooLargeError, ImageTooLargeError) as e:
+        raise HTTPException(status_code=413, detail=f"Imagen demasiado grande. {e}")
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error al leer el archivo: {str(e)}")
+
+
+async def _decode_image(
+    upload: Upload,
+    longest_edge: int = DECODE_LONGEST_EDGE,
+    shortest_edge: int = DECODE_SHORTEST_EDGE,
+) -> DecodedImage:
+    """
+    Decodifica a la resolución del processor (draft JPEG + EXIF) en un hilo, fuera del event loop,
+    y suelta los bytes de la subida: desde aquí solo vive la imagen reducida.
+    longest_edge/shortest_edge: otro tamaño objetivo (más pequeño para el render, más grande
+    para el modo teselas).
+    """
+    try:
+        with STAGE_SECONDS.time("decode"):
+            return await asyncio.to_thread(
+                decode_image, upload.data, shortest_edge=shortest_edge, longest_edge=longest_edge
+            )
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=f"Imagen demasiado grande. {e}")
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Imagen no válida o corrupta. No se pudo procesar: {str(e)}",
+        )
+    finally:
+        upload.release()
+
+
+def _plan_request_prompts(ingredients_prompt: str | None, category: str | None) -> list[str]:
+    """
+    Prompt de la petición (lista por defecto o string separado por comas) reducido a los
+    ingredientes de la categoría, si se pidió una: el modelo solo ve lo que puede sobrevivir al filtro.
+    """
+    text_prompts = ingredients_from_string(ingredients_prompt) if ingredients_prompt else INGREDIENTS_LIST
+    return list(plan_prompts(tuple(text_prompts), category))
+
+
+async def get_correction_writer() -> CorrectionWriter:
+    """Writer write-behind de /corrections (Supabase si está configurado, si no disco local)."""
+    global _correction_writer
+    if _correction_writer is None:
+        sink = create_sink()
+        # Imágenes por contenido: la misma foto corregida varias veces se sube una sola vez
+        _correction_writer = CorrectionWriter(
+            sink,
+            dedup=ImageDeduplicator(ImageIndex(), sink),
+            similar=await get_similar_index() if SIMILAR_LOOKUP else None,
+        )
+        await _correction_writer.start()
+    return _correction_writer
+
+
+async def get_similar_index() -> SimilarImageIndex:
+    """Índice de platos ya corregidos (se carga de la base de correcciones al primer uso)."""
+    global _similar_index
+    if _similar_index is None:
+        _similar_index = await asyncio.to_thread(SimilarImageIndex)
+    return _similar_index
+
+
+async def _similar_lookup(upload: Upload) -> SimilarMatch | None:
+    """Corrección de una foto casi idéntica (dHash), si la hay; la firma se calcula en un hilo."""
+    index = await get_similar_index()
+    if not len(index):
+        return None
+    try:
+        with STAGE_SECONDS.time("similar"), BufferReader(upload.data) as fp:
+            return await asyncio.to_thread(index.lookup, fp)
+    except Exception:
+        # Imagen que PIL no puede leer: que la decodificación normal devuelva el error
+        return None
+
+
+def get_result_cache() -> DetectionResultCache:
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = DetectionResultCache()
+    return _result_cache
+
+
+def _inference_pending() -> int:
+    engine = _pool if _pool is not None else _scheduler
+    return engine.pending if engine is not None else 0
+
+
+# Valores que /metrics lee al exponer (sin coste por petición)
+INFERENCE_PENDING.set_function(_inference_pending)
+CORRECTIONS_PENDING.set_function(lambda: _correction_writer.pending if _correction_writer is not None else 0)
+RESULT_CACHE_HITS.set_function(lambda: get_result_cache().hits)
+RESULT_CACHE_MISSES.set_function(lambda: get_result_cache().misses)
+SIMILAR_HITS.set_function(lambda: _similar_index.hits if _similar_index is not None else 0)
+SIMILAR_MISSES.set_function(lambda: _similar_index.misses if _similar_index is not None else 0)
+SIMILAR_INDEX_SIZE.set_function(lambda: len(_similar_index) if _similar_index is not None else 0)
+
+
+def _result_key(
+    upload: Upload,
+    text_prompts: list[str],
+    box_threshold: float | None,
+    text_threshold: float | None,
+    tiling: TileSpec | None = None,
+) -> str:
+    return make_cache_key(
+        upload.sha256,
+        text_prompts,
+        box_threshold or BOX_THRESHOLD,
+        text_threshold or TEXT_THRESHOLD,
+        variant=tiling.cache_tag if tiling else "",
+    )
+
+
+def _request_deadline(deadline_ms: int | None, header_ms: int | None) -> float | None:
+    """
+    Deadline absoluto (time.monotonic()) de la petición: el parámetro deadline_ms, si no la
+    cabecera X-Deadline-Ms, si no DETECTION_REQUEST_DEADLINE_MS (0 = sin deadline).
+    """
+    ms = deadline_ms or header_ms or REQUEST_DEADLINE_MS
+    return time.monotonic() + ms / 1000 if ms and ms > 0 else None
+
+
+def _inference_error(e: QueueFullError | DeadlineExceededError) -> HTTPException:
+    """Cola llena → 503 con Retry-After; deadline imposible o vencido → 504."""
+    if isinstance(e, QueueFullError):
+        return HTTPException(
+            status_code=503,
+            detail=f"Servicio saturado, reintenta en unos segundos. {e}",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    return HTTPException(status_code=504, detail=f"No se pudo completar la detección a tiempo. {e}")
+
+
+def _admit(deadline: float | None) -> None:
+    """Control de admisión antes de decodificar (ver BatchScheduler.admit)."""
+    try:
+        get_inference().admit(deadline)
+    except (QueueFullError, DeadlineExceededError) as e:
+        raise _inference_error(e)
+
+
+async def _detect_cached(
+    upload: Upload,
+    text_prompts: list[str],
+    box_threshold: float | None,
+    text_threshold: float | None,
+    decoded: DecodedImage | None = None,
+    tiling: TileSpec | None = None,
+    deadline: float | None = None,
+) -> CachedDetection:
+    """
+    Detecciones crudas para esta subida + prompt + umbrales, desde la cache de resultados
+    o ejecutando el modelo una sola vez aunque lleguen peticiones idénticas a la vez.
+    Si no se pasa `decoded`, solo se decodifica en caso de fallo de cache. Al terminar,
+    los bytes de la subida quedan liberados en cualquier caso.
+    Las cajas y image_size están en coordenadas de la imagen original.
+    tiling: modo teselas; la imagen se decodifica a TILING_SHORTEST_EDGE / TILING_LONGEST_EDGE.
+    deadline: instante (time.monotonic()) límite de *esta* petición. Si hay que lanzar la
+    inferencia se pasa antes el control de admisión (una petición rechazada no gasta CPU);
+    la inferencia compartida no lleva el deadline de nadie, cada petición lo aplica mientras
+    espera (504 al vencer) y el resto sigue esperando el resultado.
+    """
+    key = _result_key(upload, text_prompts, box_threshold, text_threshold, tiling)
+    # La computación compartida puede seguir después de que esta petición termine o se
+    # cancele: trabaja con su propia referencia a los bytes, que suelta al decodificar.
+    shared = dataclasses.replace(upload)
+
+    async def compute() -> CachedDetection:
+        try:
+            if decoded is not None:
+                dec = decoded
+            elif tiling is not None:
+                dec = await _decode_image(shared, longest_edge=TILING_LONGEST_EDGE, shortest_edge=TILING_SHORTEST_EDGE)
+            else:
+                dec = await _decode_image(shared)
+        finally:
+            shared.release()
+        raw = await _run_detection(
+            dec.image,
+            text_prompts,
+            box_threshold,
+            text_threshold,
+            original_size=dec.original_size,
+            tiling=tiling,
+        )
+        return CachedDetection(detections=raw, image_size=dec.original_size)
+
+    try:
+        return await get_result_cache().get_or_compute(
+            key, compute, deadline=deadline, admit=lambda: _admit(deadline)
+        )
+    except DeadlineExceededError as e:
+        raise _inference_error(e)
+    finally:
+        upload.release()
+
+
+def _build_ingredients(
+    result: CachedDetection,
+    text_prompts: list[str],
+    category: str | None,
+    include_boxes: bool,
+) -> list["DetectedIngredient"]:
+    """
+    Filtra cajas demasiado grandes (vectorizado), normaliza etiquetas con el índice
+    precalculado de la lista de prompts y aplica el filtro de categoría.
+    """
+    detections = result.detections
+    if not detections:
+        return []
+    start = time.perf_counter()
+    w, h = result.image_size
+    boxes = np.asarray([d["box"] for d in detections], dtype=np.float64).reshape(-1, 4)
+    too_large = large_box_mask(boxes, w, h, MAX_BOX_AREA_RATIO)
+    index = label_index(tuple(text_prompts))
+    allowed_labels = set(MEAL_CATEGORIES[category]) if category is not None else None
+
+    ingredients = []
+    for d, skip in zip(detections, too_large.tolist()):
+        if skip:
+            continue
+        label = index.normalize(d["label"])
+        if allowed_labels is not None and label not in allowed_labels:
+            continue
+        ingredients.append(
+            DetectedIngredient(
+                label=label,
+                score=round(d["score"], 4),
+                box=d["box"] if include_boxes else None,
+            )
+        )
+        DETECTIONS.inc(label if label in _METRIC_LABELS else "other")
+    STAGE_SECONDS.observe(time.perf_counter() - start, "filter")
+    return ingredients
+
+
+async def _run_detection(
+    image: Image.Image,
+    text_prompts: list[str],
+    box_threshold: float | None,
+    text_threshold: float | None,
+    original_size: tuple[int, int] | None = None,
+    tiling: TileSpec | None = None,
+    deadline: float | None = None,
+) -> list[dict]:
+    """Envía la imagen al motor de inferencia (fuera del event loop) y traduce errores a HTTP."""
+    try:
+        # inference: espera en cola + forward (las etapas del modelo se miden por separado)
+        with STAGE_SECONDS.time("inference"):
+            return await get_inference().submit(
+                image,
+                text_prompts=text_prompts,
+                box_threshold=box_threshold or BOX_THRESHOLD,
+                text_threshold=text_threshold or TEXT_THRESHOLD,
+                original_size=original_size,
+                tiling=tiling,
+                deadline=deadline,
+            )
+    except (QueueFullError, DeadlineExceededError) as e:
+        raise _inference_error(e)
+    except WorkerDiedError as e:
+        # El pool ya está reemplazando el worker: reintentar tiene sentido
+        raise HTTPException(
+            status_code=503,
+            detail=f"El proceso de detección se reinició, reintenta en unos segundos. {e}",
+            headers={"Retry-After": "1"},
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error en la detección: {str(e)}",
+        )
+
+
 app = FastAPI(
     title="Food Ingredients Detection API",
     description=(
@@ -165,8 +547,21 @@ app = FastAPI(
         "El usuario puede corregir manualmente los resultados después."
     ),
     version="2.0.0",
+    lifespan=lifespan,
 )
 
+# Margen para los campos de formulario y los delimitadores del multipart
+_FORM_OVERHEAD_BYTES = 1024 * 1024
+
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    default_limit=MAX_UPLOAD_BYTES + _FORM_OVERHEAD_BYTES,
+    limits={"/detect/batch": int(MAX_BATCH_BODY_MB * 1024 * 1024)},
+)
+app.add_middleware(
+    MetricsMiddleware,
+    endpoints={"/", "/health", "/ready", "/metrics", "/detect", "/detect/batch", "/detect/image", "/corrections"},
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://127.0.0.1:5173"],
@@ -187,6 +582,21 @@ class DetectedIngredient(BaseModel):
 class DetectionResponse(BaseModel):
     """Lista de ingredientes detectados (solo visibles, sin recetas)."""
     ingredients: list[DetectedIngredient]
+    # "model" (Grounding DINO) o "correction": ingredientes corregidos de una foto casi idéntica
+    source: str = "model"
+    # Con source="correction": distancia dHash (0-64) a esa foto
+    match_distance: int | None = None
+
+
+class DetectOptions(BaseModel):
+    """Opciones de /detect que /detect/batch aplica a todo el batch o a una imagen concreta."""
+    model_config = ConfigDict(extra="forbid")
+
+    category: str | None = None
+    ingredients_prompt: str | None = None
+    box_threshold: float | None = None
+    text_threshold: float | None = None
+    include_boxes: bool = True
 
 
 # MLOps: correcciones human-in-the-loop
@@ -196,53 +606,19 @@ class CorrectedIngredientItem(BaseModel):
     box: list[float] | None = None  # [x0, y0, x1, y1] en coords de imagen original o normalizadas 0-1
 
 
-# Supabase (si está configurado, las correcciones se guardan ahí; si no, en local)
-# Acepta SUPABASE_URL o VITE_SUPABASE_URL (mismo valor que el frontend)
-SUPABASE_URL = (
-    os.environ.get("SUPABASE_URL", "").strip()
-    or os.environ.get("VITE_SUPABASE_URL", "").strip()
-)
-# La key debe ser SERVICE_ROLE (no anon): el backend escribe en Storage y en ingredient_corrections
-SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "").strip()
-MLOPS_BUCKET = os.environ.get("MLOPS_BUCKET", "mlops-corrections")
-
-_supabase_client = None
-
-
-def _get_supabase():
-    """Cliente Supabase solo si hay URL y key (backend usa service_role)."""
-    global _supabase_client
-    if _supabase_client is not None:
-        return _supabase_client
-    if not SUPABASE_URL:
-        print("[MLOps] SUPABASE_URL / VITE_SUPABASE_URL no configurada → correcciones en local")
-        return None
-    if not SUPABASE_SERVICE_ROLE_KEY:
-        print("[MLOps] SUPABASE_SERVICE_ROLE_KEY no configurada → correcciones en local")
-        return None
-    try:
-        from supabase import create_client
-        _supabase_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-        print("[MLOps] Cliente Supabase OK → correcciones se guardarán en Supabase")
-        return _supabase_client
-    except Exception as e:
-        print(f"[MLOps] Error al crear cliente Supabase: {e} → correcciones en local")
-        return None
-
-
-# Directorio local (fallback si no hay Supabase)
-CORRECTIONS_DIR = Path(os.environ.get("MLOPS_CORRECTIONS_DIR", "data/corrections"))
-CORRECTIONS_IMAGES_DIR = CORRECTIONS_DIR / "images"
-CORRECTIONS_ANNOTATIONS_FILE = CORRECTIONS_DIR / "annotations.jsonl"
-
+ALLOWED_CONTENT_TYPES = {"image/jpeg", "image/png", "image/webp", "image/bmp"}
 
-def _ensure_corrections_dir() -> None:
-    CORRECTIONS_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
-    if not CORRECTIONS_ANNOTATIONS_FILE.exists():
-        CORRECTIONS_ANNOTATIONS_FILE.touch()
 
+def _execution_info() -> dict:
+    """Backend y modo de ejecución: el efectivo si el modelo ya está cargado, si no el configurado."""
+    detector = _detector if _detector is not None else getattr(_pool, "detector", None)
+    if detector is None and FAKE_DETECTOR_MS > 0:
+        detector = _new_detector()
+    if detector is None:
+        from detection.execution import ExecutionMode
 
-ALLOWED_CONTENT_TYPES = {"image/jpeg", "image/png", "image/webp", "image/bmp"}
+        return {"backend": BACKEND, "loaded": False, **ExecutionMode().as_dict()}
+    return {"backend": detector.backend_name, "loaded": True, **detector.execution.as_dict()}
 
 
 @app.get("/")
@@ -250,16 +626,45 @@ async def root():
     return {
         "message": "Food Ingredients Detection API",
         "model": "Grounding DINO (vision-language, zero-shot)",
+        "execution": _execution_info(),
         "docs": "/docs",
         "health": "/health",
+        "ready": "/ready",
     }
 
 
 @app.get("/health")
 async def health():
+    """Liveness. 503 si el writer de /corrections terminó: las correcciones se acumularían en el journal."""
+    if _correction_writer is not None and not _correction_writer.running:
+        return JSONResponse({"status": "error", "corrections_writer": "stopped"}, status_code=503)
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Métricas de este proceso en formato de texto de Prometheus."""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: 200 solo cuando el modelo está cargado y calentado (con DETECTION_PRELOAD=1).
+    Sin precarga el modelo se carga en el primer /detect y se informa status "lazy".
+    Con el pool de procesos, además debe quedar algún worker vivo.
+    """
+    body = _readiness.as_dict()
+    body["model_loaded"] = _detector is not None or _pool is not None
+    body["execution"] = _execution_info()
+    ready = _readiness.ready
+    if _pool is not None:
+        body["pool"] = _pool.health()
+        ready = ready and _pool.healthy
+        body["ready"] = ready
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
 @app.post("/detect", response_model=DetectionResponse)
 async def detect_ingredients(
     file: UploadFile = File(...),
@@ -283,13 +688,35 @@ async def detect_ingredients(
         True,
         description="Incluir coordenadas de las cajas para que el usuario corrija en la UI.",
     ),
+    tiles: bool = Query(
+        False,
+        description="Inferencia por teselas: más lenta, pero detecta ingredientes pequeños en fotos grandes.",
+    ),
+    tile_size: int = Query(TILING_TILE_SIZE, ge=320, le=2000, description="Lado de cada tesela en píxeles (modo teselas)."),
+    tile_overlap: float = Query(TILING_OVERLAP, ge=0.0, le=0.5, description="Solape entre teselas vecinas, 0-0.5 (modo teselas)."),
+    use_corrections: bool = Query(
+        True,
+        description="Si la foto es casi idéntica a una ya corregida, devolver esos ingredientes sin ejecutar el modelo.",
+    ),
+    deadline_ms: int | None = Query(
+        None,
+        ge=1,
+        description="Tiempo máximo de espera en ms; si no se puede cumplir se responde 504 sin ejecutar el modelo.",
+    ),
+    x_deadline_ms: int | None = Header(None, ge=1, description="Igual que deadline_ms, como cabecera X-Deadline-Ms."),
 ):
     """
     Recibe una imagen de un plato y devuelve los ingredientes visibles detectados con score.
     Si se envía category (breakfast, lunch, snack, dinner), solo se incluyen ingredientes de esa categoría.
     Usa Grounding DINO con prompts de texto (no entrenamiento).
     El usuario puede corregir manualmente los resultados después.
+    Con tiles=true la imagen se analiza en teselas solapadas a más resolución (ver detection/tiling.py).
+    Con un deadline (deadline_ms o X-Deadline-Ms) se responde 504 si no se puede cumplir y 503 con
+    Retry-After si la cola está llena.
+    Sin ingredients_prompt ni tiles, una foto casi idéntica a otra ya corregida devuelve los
+    ingredientes corregidos (source="correction", con match_distance) sin ejecutar el modelo.
     """
+    deadline = _request_deadline(deadline_ms, x_deadline_ms)
     if category is not None and category not in MEAL_CATEGORIES:
         raise HTTPException(
             status_code=400,
@@ -301,59 +728,206 @@ async def detect_ingredients(
             detail=f"Archivo no válido: se requiere una imagen (JPEG, PNG, WebP o BMP). Recibido: {file.content_type}",
         )
 
-    try:
-        contents = await file.read()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error al leer el archivo: {str(e)}")
+    upload = await _read_upload(file.file)
+
+    text_prompts = _plan_request_prompts(ingredients_prompt, category)
+    if not text_prompts:
+        # Ningún ingrediente del prompt pertenece a la categoría: no hay nada que detectar
+        upload.release()
+        return DetectionResponse(ingredients=[])
+
+    if use_corrections and SIMILAR_LOOKUP and ingredients_prompt is None and not tiles:
+        match = await _similar_lookup(upload)
+        if match is not None:
+            upload.release()
+            return _correction_response(match, category, include_boxes)
+
+    tiling = TileSpec(tile_size=tile_size, overlap=tile_overlap) if tiles else None
+    # La imagen solo se decodifica si el resultado no está en cache
+    result = await _detect_cached(
+        upload, text_prompts, box_threshold, text_threshold, tiling=tiling, deadline=deadline
+    )
+    ingredients = _build_ingredients(result, text_prompts, category, include_boxes)
+    return DetectionResponse(ingredients=ingredients)
+
 
-    if not contents:
-        raise HTTPException(status_code=400, detail="El archivo está vacío.")
+def _correction_response(match: SimilarMatch, category: str | None, include_boxes: bool) -> DetectionResponse:
+    """Respuesta de /detect con los ingredientes verificados por una persona (score 1.0)."""
+    allowed_labels = set(MEAL_CATEGORIES[category]) if category is not None else None
+    ingredients = [
+        DetectedIngredient(label=item["label"], score=1.0, box=item["box"] if include_boxes else None)
+        for item in match.ingredients()
+        if allowed_labels is None or item["label"] in allowed_labels
+    ]
+    return DetectionResponse(
+        ingredients=ingredients,
+        source="correction",
+        match_distance=match.distance,
+    )
 
+
+def _parse_item_options(items: str | None, base: DetectOptions) -> dict[str, DetectOptions]:
+    """
+    JSON {"nombre de archivo": {opciones}} → opciones completas por imagen. Lo que un ítem
+    no especifica se hereda de los parámetros del batch.
+    """
+    if not items:
+        return {}
     try:
-        image = Image.open(io.BytesIO(contents)).convert("RGB")
-    except Exception as e:
+        raw = json.loads(items)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"items no es JSON válido: {e}")
+    if not isinstance(raw, dict) or not all(isinstance(v, dict) for v in raw.values()):
         raise HTTPException(
             status_code=400,
-            detail=f"Imagen no válida o corrupta. No se pudo procesar: {str(e)}",
+            detail='items debe ser un objeto {"archivo.jpg": {"category": "...", ...}}.',
         )
+    options = {}
+    for filename, override in raw.items():
+        try:
+            options[filename] = DetectOptions.model_validate({**base.model_dump(), **override})
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"Opciones inválidas para {filename}: {e}")
+    return options
 
-    # Prompt: lista por defecto o string separado por comas
-    text_prompts = ingredients_from_string(ingredients_prompt) if ingredients_prompt else INGREDIENTS_LIST
 
+async def _detect_batch_item(item: BatchItem, options: DetectOptions) -> dict:
+    """Resultado de una imagen del batch como dict de una línea NDJSON (los errores no cortan el stream)."""
+    line = {"index": item.index, "filename": item.filename}
+    if item.error is not None:
+        return {**line, "status": item.status, "detail": item.error}
     try:
-        detector = get_detector()
-        raw = detector.detect(
-            image,
-            text_prompts=text_prompts,
-            box_threshold=box_threshold or BOX_THRESHOLD,
-            text_threshold=text_threshold or TEXT_THRESHOLD,
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error en la detección: {str(e)}",
-        )
+        try:
+            with open(item.path, "rb") as f:
+                upload = await _read_upload(f)
+        finally:
+            item.path.unlink(missing_ok=True)
+        ingredients = []
+        text_prompts = _plan_request_prompts(options.ingredients_prompt, options.category)
+        if text_prompts:
+            result = await _detect_cached(
+                upload, text_prompts, options.box_threshold, options.text_threshold
+            )
+            ingredients = _build_ingredients(result, text_prompts, options.category, options.include_boxes)
+        else:
+            upload.release()
+    except HTTPException as e:
+        return {**line, "status": e.status_code, "detail": e.detail}
+    return {**line, "status": 200, "ingredients": [i.model_dump() for i in ingredients]}
 
-    w, h = image.size
-    ingredients = []
-    for d in raw:
-        box = d["box"]
-        if _is_box_too_large(box, w, h):
-            continue
-        label = _normalize_label(d["label"], text_prompts)
-        ingredients.append(
-            DetectedIngredient(
-                label=label,
-                score=round(d["score"], 4),
-                box=box if include_boxes else None,
+
+async def _stream_batch(
+    spool: BatchSpool,
+    base: DetectOptions,
+    item_options: dict[str, DetectOptions],
+):
+    """
+    Procesa las imágenes con concurrencia acotada (el scheduler agrupa en forwards batched
+    las que comparten prompt) y emite una línea NDJSON por imagen en orden de finalización.
+    """
+    semaphore = asyncio.Semaphore(max(1, BATCH_UPLOAD_CONCURRENCY))
+
+    async def run(item: BatchItem) -> dict:
+        options = item_options.get(item.filename) or item_options.get(Path(item.filename).name) or base
+        async with semaphore:
+            return await _detect_batch_item(item, options)
+
+    tasks = [asyncio.create_task(run(item)) for item in spool.items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+    finally:
+        # Cliente desconectado o fin del stream: no seguir detectando y borrar las copias
+        for task in tasks:
+            task.cancel()
+        spool.cleanup()
+
+
+@app.post("/detect/batch")
+async def detect_ingredients_batch(
+    files: list[UploadFile] = File(
+        ...,
+        description="Imágenes (JPEG, PNG, WebP o BMP) y/o archivos .zip con imágenes.",
+    ),
+    items: str | None = Form(
+        None,
+        description=(
+            'JSON opcional con opciones por imagen, por nombre de archivo (o ruta dentro del zip): '
+            '{"foto1.jpg": {"category": "lunch", "include_boxes": false}}. '
+            "Claves: category, ingredients_prompt, box_threshold, text_threshold, include_boxes."
+        ),
+    ),
+    category: str | None = Query(
+        None,
+        description="Filtrar por categoría (todo el batch): breakfast, lunch, snack, dinner.",
+    ),
+    ingredients_prompt: str | None = Query(
+        None,
+        description="Ingredientes separados por comas (todo el batch). Si no se envía, se usa la lista base.",
+    ),
+    box_threshold: float | None = Query(None, description="Umbral de confianza de la caja (0-1)."),
+    text_threshold: float | None = Query(None, description="Umbral de alineación texto-imagen (0-1)."),
+    include_boxes: bool = Query(True, description="Incluir coordenadas de las cajas."),
+):
+    """
+    Detección sobre muchas imágenes en una sola petición. Devuelve NDJSON en streaming:
+    una línea por imagen, en el orden en que terminan, con index (posición en la petición),
+    filename, status (200 o el código de error de esa imagen) e ingredients o detail.
+    Los parámetros de query aplican a todo el batch y `items` los sobrescribe por imagen,
+    con la misma semántica que /detect.
+    """
+    base = DetectOptions(
+        category=category,
+        ingredients_prompt=ingredients_prompt,
+        box_threshold=box_threshold,
+        text_threshold=text_threshold,
+        include_boxes=include_boxes,
+    )
+    item_options = _parse_item_options(items, base)
+    for options in (base, *item_options.values()):
+        if options.category is not None and options.category not in MEAL_CATEGORIES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Categoría inválida: {options.category}. Valores permitidos: {list(MEAL_CATEGORIES.keys())}",
             )
-        )
 
-    if category is not None:
-        allowed_labels = set(MEAL_CATEGORIES[category])
-        ingredients = [i for i in ingredients if i.label in allowed_labels]
+    spool = BatchSpool(
+        Path(tempfile.mkdtemp(prefix="detect-batch-")),
+        max_items=BATCH_UPLOAD_MAX_ITEMS,
+        max_item_bytes=int(BATCH_UPLOAD_MAX_ITEM_MB * 1024 * 1024),
+    )
+    try:
+        for index, upload in enumerate(files):
+            filename = upload.filename or f"file-{index}"
+            if is_archive(upload.filename, upload.content_type):
+                await asyncio.to_thread(spool.add_archive, filename, upload.file)
+            elif upload.content_type and upload.content_type not in ALLOWED_CONTENT_TYPES:
+                spool.reject(
+                    filename,
+                    f"Archivo no válido: se requiere una imagen (JPEG, PNG, WebP o BMP). Recibido: {upload.content_type}",
+                )
+            else:
+                await asyncio.to_thread(spool.add_file, filename, upload.file)
+    except BatchTooLargeError as e:
+        spool.cleanup()
+        raise HTTPException(status_code=413, detail=str(e))
+    except BatchInputError as e:
+        spool.cleanup()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        spool.cleanup()
+        raise HTTPException(status_code=400, detail=f"Error al leer los archivos: {str(e)}")
 
-    return DetectionResponse(ingredients=ingredients)
+    if not spool.items:
+        spool.cleanup()
+        raise HTTPException(status_code=400, detail="El batch no contiene imágenes.")
+
+    # Las subidas ya están copiadas en disco: el stream no depende de que FastAPI las mantenga abiertas
+    return StreamingResponse(
+        _stream_batch(spool, base, item_options),
+        media_type="application/x-ndjson",
+    )
 
 
 @app.post("/detect/image", response_class=Response)
@@ -369,11 +943,34 @@ async def detect_ingredients_image(
     ),
     box_threshold: float | None = Query(None, description="Umbral de confianza de la caja (0-1)."),
     text_threshold: float | None = Query(None, description="Umbral de alineación texto-imagen (0-1)."),
+    output_format: str = Query(
+        RENDER_FORMAT,
+        alias="format",
+        pattern="^(jpeg|webp)$",
+        description="Formato de la imagen devuelta: jpeg o webp.",
+    ),
+    quality: int = Query(RENDER_QUALITY, ge=1, le=100, description="Calidad de compresión (1-100)."),
+    progressive: bool = Query(False, description="JPEG progresivo (se ignora en WebP)."),
+    max_size: int | None = Query(
+        None,
+        ge=64,
+        le=4096,
+        description="Lado mayor máximo de la imagen devuelta, en píxeles. Default: tamaño del processor.",
+    ),
+    deadline_ms: int | None = Query(
+        None,
+        ge=1,
+        description="Tiempo máximo de espera en ms; si no se puede cumplir se responde 504 sin ejecutar el modelo.",
+    ),
+    x_deadline_ms: int | None = Header(None, ge=1, description="Igual que deadline_ms, como cabecera X-Deadline-Ms."),
 ):
     """
     Recibe una imagen de un plato, detecta ingredientes y devuelve la misma imagen
     con las cajas y etiquetas dibujadas (segmentación visual como antes).
+    Si las detecciones ya están en cache (p. ej. tras un /detect con la misma foto) no se
+    vuelve a ejecutar el modelo y la imagen se decodifica directamente al tamaño de salida.
     """
+    deadline = _request_deadline(deadline_ms, x_deadline_ms)
     if category is not None and category not in MEAL_CATEGORIES:
         raise HTTPException(
             status_code=400,
@@ -385,62 +982,105 @@ async def detect_ingredients_image(
             detail=f"Archivo no válido: se requiere una imagen (JPEG, PNG, WebP o BMP). Recibido: {file.content_type}",
         )
 
-    try:
-        contents = await file.read()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error al leer el archivo: {str(e)}")
-
-    if not contents:
-        raise HTTPException(status_code=400, detail="El archivo está vacío.")
-
-    try:
-        image = Image.open(io.BytesIO(contents)).convert("RGB")
-    except Exception as e:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Imagen no válida o corrupta. No se pudo procesar: {str(e)}",
+    options = RenderOptions(format=output_format, quality=quality, progressive=progressive, max_size=max_size)
+    upload = await _read_upload(file.file)
+    text_prompts = _plan_request_prompts(ingredients_prompt, category)
+    cached = (
+        get_result_cache().lookup(_result_key(upload, text_prompts, box_threshold, text_threshold))
+        if text_prompts else None
+    )
+
+    if cached is not None or not text_prompts:
+        # Sin inferencia: la imagen solo se dibuja, así que se decodifica ya al tamaño de salida
+        decoded = await _decode_image(upload, longest_edge=min(DECODE_LONGEST_EDGE, max_size or DECODE_LONGEST_EDGE))
+        result = cached
+    else:
+        # La imagen hace falta para dibujar aunque otra petición idéntica ya esté en curso;
+        # el control de admisión lo pasa _detect_cached solo si hay que lanzar la inferencia
+        decoded = await _decode_image(upload)
+        result = await _detect_cached(
+            upload, text_prompts, box_threshold, text_threshold, decoded=decoded, deadline=deadline
         )
-
-    text_prompts = ingredients_from_string(ingredients_prompt) if ingredients_prompt else INGREDIENTS_LIST
-
+    ingredients = _build_ingredients(result, text_prompts, category, include_boxes=True) if result else []
+
+    # Dibujo (sobre la imagen reducida; las cajas en coords originales se escalan) y codificación en un hilo
+    content = await asyncio.to_thread(
+        render_detections, decoded.image, ingredients, decoded.scale, options
+    )
+    return Response(content=content, media_type=options.media_type)
+
+
+@app.websocket("/detect/live")
+async def detect_ingredients_live(
+    websocket: WebSocket,
+    category: str | None = None,
+    ingredients_prompt: str | None = None,
+    box_threshold: float | None = None,
+    text_threshold: float | None = None,
+):
+    """
+    Modo cámara en vivo: el cliente envía fotogramas (JPEG/PNG/WebP) como mensajes binarios y
+    recibe por cada fotograma procesado un JSON con los ingredientes y sus cajas. El modelo solo
+    corre en fotogramas clave; entre medias las cajas se desplazan con el movimiento de la cámara
+    y, si el cliente envía más rápido de lo que se procesa, se descartan los fotogramas viejos
+    (ver detection/live.py). Mismos parámetros de query que /detect.
+    """
+    if category is not None and category not in MEAL_CATEGORIES:
+        await websocket.close(code=1008, reason=f"Categoría inválida: {category}")
+        return
+    await websocket.accept()
+    text_prompts = _plan_request_prompts(ingredients_prompt, category)
+
+    def decode(data: bytes) -> DecodedImage:
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise ImageTooLargeError(f"El fotograma ocupa {len(data)} bytes; el máximo es {MAX_UPLOAD_BYTES}.")
+        with STAGE_SECONDS.time("decode"):
+            return decode_image(data, longest_edge=LIVE_LONGEST_EDGE)
+
+    async def infer(decoded: DecodedImage) -> list[dict] | None:
+        if not text_prompts:
+            return []
+        try:
+            with STAGE_SECONDS.time("inference"):
+                raw = await get_inference().submit(
+                    decoded.image,
+                    text_prompts=text_prompts,
+                    box_threshold=box_threshold or BOX_THRESHOLD,
+                    text_threshold=text_threshold or TEXT_THRESHOLD,
+                    original_size=decoded.original_size,
+                    deadline=time.monotonic() + LIVE_INFERENCE_DEADLINE_MS / 1000,
+                )
+        except (QueueFullError, DeadlineExceededError):
+            # Sin resultado a tiempo: el cliente sigue viendo las cajas del fotograma clave anterior
+            return None
+        result = CachedDetection(detections=raw, image_size=decoded.original_size)
+        return [i.model_dump() for i in _build_ingredients(result, text_prompts, category, include_boxes=True)]
+
+    async def receive() -> bytes | None:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return None
+            if message.get("bytes"):
+                return message["bytes"]
+
+    session = LiveSession(decode, infer)
     try:
-        detector = get_detector()
-        raw = detector.detect(
-            image,
-            text_prompts=text_prompts,
-            box_threshold=box_threshold or BOX_THRESHOLD,
-            text_threshold=text_threshold or TEXT_THRESHOLD,
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error en la detección: {str(e)}",
-        )
-
-    w, h = image.size
-    ingredients = []
-    for d in raw:
-        box = d["box"]
-        if _is_box_too_large(box, w, h):
-            continue
-        label = _normalize_label(d["label"], text_prompts)
-        ingredients.append(
-            DetectedIngredient(
-                label=label,
-                score=round(d["score"], 4),
-                box=box,
-            )
-        )
-
-    if category is not None:
-        allowed_labels = set(MEAL_CATEGORIES[category])
-        ingredients = [i for i in ingredients if i.label in allowed_labels]
-
-    img_with_boxes = _draw_detections(image, ingredients)
-    buf = io.BytesIO()
-    img_with_boxes.save(buf, format="JPEG", quality=90)
-    buf.seek(0)
-    return Response(content=buf.getvalue(), media_type="image/jpeg")
+        await session.run(receive, websocket.send_json)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stats = session.stats.as_dict()
+        emit("detector.live_session", f"Sesión en vivo: {stats['fps']} fps, {stats['inference_per_s']} inferencias/s", **stats)
+
+
+# Formato detectado en la subida → (extensión, content-type) del objeto guardado
+_CORRECTION_FORMATS = {
+    "JPEG": ("jpg", "image/jpeg"),
+    "PNG": ("png", "image/png"),
+    "WEBP": ("webp", "image/webp"),
+    "BMP": ("bmp", "image/bmp"),
+}
 
 
 @app.post("/corrections")
@@ -456,6 +1096,8 @@ async def save_correction(
     Si SUPABASE_URL y SUPABASE_SERVICE_ROLE_KEY están configurados, guarda en Supabase
     (Storage bucket mlops-corrections + tabla ingredient_corrections).
     Si no, guarda en data/corrections/ (local).
+    Responde en cuanto la corrección está en el journal local (corrections/writer.py);
+    la subida y el insert se hacen en segundo plano, en bloque y con reintentos.
     """
     if consent.lower() != "true":
         raise HTTPException(status_code=400, detail="Se requiere consentimiento (consent=true) para guardar la corrección.")
@@ -465,12 +1107,8 @@ async def save_correction(
             status_code=400,
             detail=f"Archivo no válido: se requiere una imagen. Recibido: {file.content_type}",
         )
-    try:
-        contents = await file.read()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error al leer el archivo: {str(e)}")
-    if not contents:
-        raise HTTPException(status_code=400, detail="El archivo está vacío.")
+    upload = await _read_upload(file.file)
+    contents = upload.data
 
     try:
         detected = json.loads(detected_ingredients)
@@ -495,63 +1133,32 @@ async def save_correction(
     detected_normalized = [{"label": str(d.get("label", "")).strip()} for d in detected if isinstance(d, dict)]
 
     image_id = str(uuid.uuid4())
-    ext = "jpg"
-    if file.filename and "." in file.filename:
-        ext = file.filename.rsplit(".", 1)[-1].lower()
-    if ext not in ("jpg", "jpeg", "png", "webp", "bmp"):
+    # Extensión y content-type según el contenido (no el nombre): mismos bytes → mismo objeto
+    ext, content_type = _CORRECTION_FORMATS.get(upload.format, (None, None))
+    if ext is None:
         ext = "jpg"
-
-    supabase = _get_supabase()
-    if supabase is not None:
-        print("[MLOps] Guardando corrección en Supabase (Storage + tabla)")
-        # Guardar en Supabase: Storage + tabla
-        storage_path = f"{image_id}.{ext}"
+        if file.filename and "." in file.filename:
+            ext = file.filename.rsplit(".", 1)[-1].lower()
+        if ext not in ("jpg", "jpeg", "png", "webp", "bmp"):
+            ext = "jpg"
         content_type = file.content_type or "image/jpeg"
-        try:
-            supabase.storage.from_(MLOPS_BUCKET).upload(
-                path=storage_path,
-                file=contents,
-                file_options={"content-type": content_type},
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error al subir la imagen a Supabase Storage: {e}. ¿Creaste el bucket '{MLOPS_BUCKET}' en Storage?",
-            )
-        image_path = f"{MLOPS_BUCKET}/{storage_path}"
-        try:
-            supabase.table("ingredient_corrections").insert({
-                "image_id": image_id,
-                "image_path": image_path,
-                "detected_ingredients": detected_normalized,
-                "corrected_ingredients": corrected_normalized,
-                "consent": True,
-            }).execute()
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error al guardar la anotación en Supabase: {e}. ¿Ejecutaste la migración supabase-migration-mlops-corrections.sql?",
-            )
-        return {"ok": True, "image_id": image_id, "message": "Corrección guardada en Supabase (MLOps)."}
-    else:
-        # Fallback: guardar en local
-        print("[MLOps] Guardando corrección en local (data/corrections/)")
-        _ensure_corrections_dir()
-        image_path = CORRECTIONS_IMAGES_DIR / f"{image_id}.{ext}"
-        try:
-            image_path.write_bytes(contents)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error al guardar la imagen: {e}")
-        record = {
-            "image_id": image_id,
-            "image_path": str(image_path),
-            "detected": detected_normalized,
-            "corrected": corrected_normalized,
-            "consent": True,
-        }
-        try:
-            with open(CORRECTIONS_ANNOTATIONS_FILE, "a", encoding="utf-8") as f:
-                f.write(json.dumps(record, ensure_ascii=False) + "\n")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error al guardar la anotación: {e}")
-        return {"ok": True, "image_id": image_id, "message": "Corrección guardada para MLOps (local)."}
+
+    correction = Correction(
+        image_id=image_id,
+        ext=ext,
+        content_type=content_type,
+        detected=detected_normalized,
+        corrected=corrected_normalized,
+        image_sha256=upload.sha256,
+    )
+    writer = await get_correction_writer()
+    try:
+        # Durable en el journal local al volver; la subida a Supabase (o la copia local) es en segundo plano
+        await writer.submit(correction, contents)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al guardar la corrección: {e}")
+    finally:
+        upload.release()
+    if writer.sink.name == "supabase":
+        return {"ok": True, "image_id": image_id, "message": "Corrección recibida; se guardará en Supabase (MLOps)."}
+    return {"ok": True, "image_id": image_id, "message": "Corrección recibida; se guardará para MLOps (local)."}
@@ -0,0 +1,51 @@
+"""
+Instrumentación del servicio: métricas Prometheus (GET /metrics) y eventos estructurados.
+"""
+
+from telemetry.events import emit
+from telemetry.metrics import (
+    BATCH_SIZE,
+    CORRECTIONS_PENDING,
+    CORRECTIONS_SECONDS,
+    DETECTIONS,
+    IN_FLIGHT,
+    INFERENCE_PENDING,
+    INFERENCE_REJECTED,
+    MODEL_LOAD_SECONDS,
+    MODEL_LOADS,
+    QUEUE_WAIT_SECONDS,
+    REQUEST_SECONDS,
+    RESULT_CACHE_HITS,
+    RESULT_CACHE_MISSES,
+    SIMILAR_HITS,
+    SIMILAR_INDEX_SIZE,
+    SIMILAR_MISSES,
+    STAGE_SECONDS,
+    MetricsMiddleware,
+    observe_stages,
+    render,
+)
+
+__all__ = [
+    "BATCH_SIZE",
+    "CORRECTIONS_PENDING",
+    "CORRECTIONS_SECONDS",
+    "DETECTIONS",
+    "IN_FLIGHT",
+    "INFERENCE_PENDING",
+    "INFERENCE_REJECTED",
+    "MODEL_LOAD_SECONDS",
+    "MODEL_LOADS",
+    "QUEUE_WAIT_SECONDS",
+    "REQUEST_SECONDS",
+    "RESULT_CACHE_HITS",
+    "RESULT_CACHE_MISSES",
+    "SIMILAR_HITS",
+    "SIMILAR_INDEX_SIZE",
+    "SIMILAR_MISSES",
+    "STAGE_SECONDS",
+    "MetricsMiddleware",
+    "emit",
+    "observe_stages",
+    "render",
+]
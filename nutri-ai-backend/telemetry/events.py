@@ -0,0 +1,27 @@
+"""
+Eventos estructurados: una línea JSON por evento en stdout (logs del contenedor / HF Spaces).
+
+Reemplazan a los print("[MLOps] ...") del servicio: cada línea lleva ts, event, un mensaje
+legible (msg) y campos con nombre, entre ellos `seconds` en los eventos de tiempo, para poder
+filtrarlos y agregarlos sin parsear texto. Cada evento también suma en events_total{event}.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from typing import Any
+
+from telemetry.metrics import EVENTS
+
+
+def emit(event: str, msg: str = "", **fields: Any) -> None:
+    """Emite `event` (p. ej. "mlops.flush") con sus campos como una línea JSON."""
+    EVENTS.inc(event)
+    record = {"ts": round(time.time(), 3), "event": event}
+    if msg:
+        record["msg"] = msg
+    record.update(fields)
+    sys.stdout.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    sys.stdout.flush()
@@ -0,0 +1,282 @@
+"""
+Métricas en memoria con exposición en formato de texto de Prometheus (GET /metrics).
+
+Sin dependencias: contadores, gauges e histogramas con etiquetas, seguros entre hilos. Un
+observe es un bisect y una suma bajo un lock (~1 µs), así que se pueden dejar activas en
+producción. Cada proceso tiene su registro: con varios workers de uvicorn, cada uno expone
+el suyo. Los workers del DetectorPool devuelven sus tiempos por etapa con cada resultado y
+los registra el proceso padre.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
+
+# Latencias: de 1 ms a 30 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines: list[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), registry: Registry | None = REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], Any] = {}
+        self._function: Callable[[], float] | None = None
+        if registry is not None:
+            registry.register(self)
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        """Valor leído al exponer (solo métricas sin etiquetas), p. ej. la profundidad de una cola."""
+        self._function = fn
+
+    def _key(self, labels: tuple[str, ...]) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}, recibió {labels}")
+        return labels
+
+    def samples(self) -> list[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class _HistogramState:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self, n: int):
+        self.buckets = [0] * n
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+        registry: Registry | None = REGISTRY,
+    ):
+        super().__init__(name, help, labelnames, registry)
+        self.bounds = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        idx = bisect_left(self.bounds, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = _HistogramState(len(self.bounds))
+            state.buckets[idx] += 1
+            state.sum += value
+            state.count += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observa los segundos que tarda el bloque (también si lanza una excepción)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def snapshot(self, *labels: str) -> tuple[int, float]:
+        """(count, sum) de una serie; útil en pruebas y benchmarks."""
+        with self._lock:
+            state = self._values.get(labels)
+            return (state.count, state.sum) if state else (0, 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = [(k, list(s.buckets), s.sum, s.count) for k, s in sorted(self._values.items())]
+        lines = []
+        for key, buckets, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.bounds, buckets):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# --- Métricas del servicio ------------------------------------------------------------------
+
+STAGE_SECONDS = Histogram(
+    "detection_stage_seconds",
+    "Segundos por etapa del pipeline (read, decode, queue, preprocess, forward, postprocess, "
+    "inference, filter, draw, encode). preprocess/forward/postprocess son por forward (batch).",
+    ["stage"],
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Duración de las peticiones HTTP por endpoint (hasta el último byte, también en streaming).",
+    ["endpoint", "method", "status"],
+)
+IN_FLIGHT = Gauge("http_requests_in_flight", "Peticiones HTTP en curso por endpoint.", ["endpoint"])
+INFERENCE_PENDING = Gauge("inference_pending", "Imágenes aceptadas por el motor de inferencia sin resultado todavía.")
+QUEUE_WAIT_SECONDS = Histogram(
+    "inference_queue_wait_seconds",
+    "Espera en la cola de inferencia: served (llegó al forward) o expired (venció su deadline).",
+    ["outcome"],
+)
+INFERENCE_REJECTED = Counter(
+    "inference_rejected_total",
+    "Peticiones no atendidas por el control de admisión: queue_full, deadline_admission "
+    "(la espera estimada no cabía), deadline_queue (venció en cola), deadline_running.",
+    ["reason"],
+)
+BATCH_SIZE = Histogram(
+    "inference_batch_size", "Imágenes por forward del scheduler de micro-batching.",
+    buckets=(1, 2, 4, 8, 16, 32),
+)
+MODEL_LOAD_SECONDS = Counter("detector_model_load_seconds_total", "Segundos acumulados cargando el modelo.")
+MODEL_LOADS = Counter("detector_model_loads_total", "Cargas del modelo en este proceso.")
+DETECTIONS = Counter("detections_total", "Ingredientes devueltos por etiqueta (tras filtros).", ["label"])
+RESULT_CACHE_HITS = Counter("detection_result_cache_hits_total", "Aciertos de la cache de resultados.")
+RESULT_CACHE_MISSES = Counter("detection_result_cache_misses_total", "Fallos de la cache de resultados.")
+SIMILAR_HITS = Counter("correction_match_hits_total", "/detect respondidos con la corrección de una foto casi idéntica.")
+SIMILAR_MISSES = Counter("correction_match_misses_total", "/detect sin foto corregida casi idéntica.")
+SIMILAR_INDEX_SIZE = Gauge("correction_match_index_size", "Imágenes corregidas en el índice de /detect.")
+CORRECTIONS_SECONDS = Histogram(
+    "corrections_stage_seconds",
+    "Segundos por etapa de /corrections (journal: escritura local; flush: subida + insert de un lote).",
+    ["stage"],
+)
+CORRECTIONS_PENDING = Gauge("corrections_pending", "Correcciones aceptadas que todavía no llegaron al destino.")
+EVENTS = Counter("events_total", "Eventos estructurados emitidos, por nombre.", ["event"])
+
+
+def observe_stages(timings: dict[str, float]) -> None:
+    """Registra en STAGE_SECONDS un dict {etapa: segundos} (ver detection/timing.py)."""
+    for name, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, name)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: duración por endpoint y peticiones en curso. Solo las rutas de `endpoints`
+    tienen etiqueta propia (el resto va a "other"), así la cardinalidad queda acotada.
+    """
+
+    def __init__(self, app: Any, endpoints: Iterable[str]):
+        self.app = app
+        self.endpoints = frozenset(endpoints)
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope.get("path", "")
+        endpoint = path if path in self.endpoints else "other"
+        status = 500
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc(endpoint)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint, scope.get("method", ""), str(status))
+            IN_FLIGHT.dec(endpoint)
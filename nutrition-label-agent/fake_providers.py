@@ -0,0 +1,88 @@
+"""
+Proveedores falsos para pruebas de carga sin red (ver loadtest/ en la raíz del repo).
+
+Con LABEL_AGENT_FAKE_PROVIDERS=1, nodes.py usa FakeGemini y FakeTavily en lugar de
+ChatGoogleGenerativeAI y TavilySearchResults. Cada llamada tarda una latencia lognormal
+(mediana FAKE_<GEMINI|TAVILY>_LATENCY_MS, dispersión FAKE_<...>_LATENCY_SIGMA) y falla con
+probabilidad FAKE_<...>_ERROR_RATE. La espera es un time.sleep, igual que los clientes síncronos.
+
+FAKE_GEMINI_ULTRAPROCESSED_RATE: fracción de etiquetas que el análisis marca como
+ultraprocesadas (las que pasan por el nodo Searcher y llaman a Tavily y otra vez a Gemini).
+"""
+import json
+import math
+import os
+import random
+import time
+
+from langchain_core.messages import AIMessage
+
+FAKE_PROVIDERS = os.getenv("LABEL_AGENT_FAKE_PROVIDERS", "false").strip().lower() in ("1", "true", "yes")
+
+_PRODUCTS = (
+    ("Galletas rellenas sabor chocolate", 4, ["harina de trigo", "azúcar", "aceite vegetal", "jarabe de glucosa", "saborizante artificial"]),
+    ("Bebida gaseosa cola", 4, ["agua carbonatada", "jarabe de maíz", "colorante caramelo", "ácido fosfórico"]),
+    ("Pan de molde blanco", 3, ["harina de trigo", "agua", "levadura", "sal", "conservante"]),
+    ("Queso fresco", 3, ["leche pasteurizada", "sal", "cuajo"]),
+    ("Avena en hojuelas", 1, ["avena integral"]),
+    ("Aceite de oliva virgen extra", 2, ["aceite de oliva"]),
+)
+_ALTERNATIVES = ("Yogur natural", "Pan integral", "Frutas frescas", "Agua con limón", "Frutos secos")
+
+
+def simulate_call(provider: str) -> None:
+    """
+    Espera la latencia simulada de `provider` (FAKE_<PROVIDER>_LATENCY_MS / _LATENCY_SIGMA) y
+    lanza RuntimeError con probabilidad FAKE_<PROVIDER>_ERROR_RATE.
+    """
+    prefix = f"FAKE_{provider.upper()}_"
+    median_ms = float(os.getenv(prefix + "LATENCY_MS", "1200"))
+    sigma = float(os.getenv(prefix + "LATENCY_SIGMA", "0.4"))
+    error_rate = float(os.getenv(prefix + "ERROR_RATE", "0"))
+    if median_ms > 0:
+        time.sleep(random.lognormvariate(math.log(median_ms / 1000), sigma))
+    if random.random() < error_rate:
+        raise RuntimeError(f"{provider}: error simulado del proveedor (503)")
+
+
+class FakeGemini:
+    """Sustituto de ChatGoogleGenerativeAI: mismo invoke(), respuestas de plantilla."""
+
+    def __init__(self):
+        self.ultraprocessed_rate = float(os.getenv("FAKE_GEMINI_ULTRAPROCESSED_RATE", "0.6"))
+
+    def invoke(self, messages: list) -> AIMessage:
+        simulate_call("gemini")
+        # El Analyzer envía un mensaje multimodal (imagen); el Searcher, un prompt de texto
+        if isinstance(messages[0], str):
+            return AIMessage(content=random.choice(_ALTERNATIVES))
+        ultra = random.random() < self.ultraprocessed_rate
+        candidates = [p for p in _PRODUCTS if (p[1] >= 3) == ultra]
+        producto, nova, ingredientes = random.choice(candidates)
+        analysis = {
+            "producto": producto,
+            "categoria_nova": nova,
+            "es_ultraprocesado": ultra,
+            "ingredientes_principales": ingredientes,
+            "razonamiento": f"Clasificado como NOVA {nova} por su lista de ingredientes.",
+        }
+        return AIMessage(content="```json\n" + json.dumps(analysis, ensure_ascii=False) + "\n```")
+
+
+class FakeTavily:
+    """Sustituto de TavilySearchResults: mismo invoke({"query": ...}), resultados de plantilla."""
+
+    def __init__(self, max_results: int = 8):
+        self.max_results = max_results
+
+    def invoke(self, payload: dict) -> list[dict]:
+        simulate_call("tavily")
+        query = payload.get("query", "")
+        return [
+            {
+                "title": f"Receta de {alt.lower()} | Cocina saludable",
+                "url": f"https://example.com/recetas/{i}-{alt.lower().replace(' ', '-')}",
+                "content": f"Cómo hacer {alt.lower()} en casa como alternativa ({query[:60]}). Ingredientes y pasos.",
+            }
+            for i, alt in enumerate(random.sample(_ALTERNATIVES, k=min(len(_ALTERNATIVES), self.max_results)))
+        ]
@@ -17,6 +17,7 @@ load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env")
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.messages import HumanMessage
 
+from fake_providers import FAKE_PROVIDERS, FakeGemini, FakeTavily
 from models import AnalysisResult
 
 
@@ -30,6 +31,8 @@ class AgentState(TypedDict):
 
 def get_gemini_model():
     """Inicializa el modelo Gemini (vision para análisis de imágenes)."""
+    if FAKE_PROVIDERS:
+        return FakeGemini()
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise ValueError("GOOGLE_API_KEY no está configurada en las variables de entorno")
@@ -45,6 +48,8 @@ def get_gemini_model():
 
 def get_tavily_tool():
     """Inicializa la herramienta de búsqueda Tavily."""
+    if FAKE_PROVIDERS:
+        return FakeTavily(max_results=8)
     api_key = os.getenv("TAVILY_API_KEY")
     if not api_key:
         raise ValueError("TAVILY_API_KEY no está configurada en las variables de entorno")
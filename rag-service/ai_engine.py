@@ -15,6 +15,9 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Proveedores falsos (sin red) para pruebas de carga: ver fake_providers.py
+FAKE_PROVIDERS = os.getenv("RAG_FAKE_PROVIDERS", "false").strip().lower() in ("1", "true", "yes")
+
 # Rutas por defecto (relativas al directorio de trabajo del servicio)
 DATA_SOURCE_DIR = Path(os.getenv("RAG_DATA_SOURCE", "data_source"))
 STORAGE_DIR = Path(os.getenv("RAG_STORAGE", "storage"))
@@ -27,8 +30,12 @@ STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 def _get_llm():
     """
     Devuelve el LLM configurado: Groq (Llama 3.1).
-    Requiere GROQ_API_KEY en las variables de entorno.
+    Requiere GROQ_API_KEY en las variables de entorno (salvo con RAG_FAKE_PROVIDERS=1).
     """
+    if FAKE_PROVIDERS:
+        from fake_providers import FakeGroq
+
+        return FakeGroq()
     groq_key = os.getenv("GROQ_API_KEY", "").strip()
     
     if not groq_key:
@@ -51,6 +58,10 @@ def _get_llm():
 
 def _get_embed_model():
     """Modelo de embeddings local (gratuito) para el índice vectorial."""
+    if FAKE_PROVIDERS:
+        from fake_providers import fake_embed_model
+
+        return fake_embed_model()
     try:
         from llama_index.embeddings.huggingface import HuggingFaceEmbedding
     except ImportError:
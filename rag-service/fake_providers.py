@@ -0,0 +1,78 @@
+"""
+Proveedores falsos para pruebas de carga sin red (ver loadtest/ en la raíz del repo).
+
+Con RAG_FAKE_PROVIDERS=1, ai_engine usa:
+- FakeGroq en lugar de Groq: cada llamada tarda una latencia lognormal (mediana
+  FAKE_GROQ_LATENCY_MS, dispersión FAKE_GROQ_LATENCY_SIGMA) y falla con probabilidad
+  FAKE_GROQ_ERROR_RATE. La espera es un time.sleep, igual que el cliente síncrono de Groq.
+- MockEmbedding de LlamaIndex en lugar de bge-small (que se descarga del Hub).
+
+Conviene apuntar RAG_STORAGE a un directorio temporal: el índice construido con embeddings
+falsos no sirve para el servicio real.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import random
+import time
+from typing import Any
+
+from llama_index.core.llms import CompletionResponse, CompletionResponseGen, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+_ANSWERS = (
+    "Para ganar masa muscular conviene repartir la proteína en 3-4 comidas, unos 1,6-2,2 g por kg de peso al día.",
+    "Una rutina de fuerza de cuerpo completo tres veces por semana es un buen punto de partida.",
+    "Antes de entrenar, una comida con carbohidratos de fácil digestión 1-2 horas antes ayuda al rendimiento.",
+    "La creatina monohidrato es el suplemento con más evidencia: 3-5 g al día, todos los días.",
+)
+
+
+def simulate_call(provider: str) -> None:
+    """
+    Espera la latencia simulada de `provider` (FAKE_<PROVIDER>_LATENCY_MS / _LATENCY_SIGMA) y
+    lanza RuntimeError con probabilidad FAKE_<PROVIDER>_ERROR_RATE.
+    """
+    prefix = f"FAKE_{provider.upper()}_"
+    median_ms = float(os.getenv(prefix + "LATENCY_MS", "600"))
+    sigma = float(os.getenv(prefix + "LATENCY_SIGMA", "0.4"))
+    error_rate = float(os.getenv(prefix + "ERROR_RATE", "0"))
+    if median_ms > 0:
+        time.sleep(random.lognormvariate(math.log(median_ms / 1000), sigma))
+    if random.random() < error_rate:
+        raise RuntimeError(f"{provider}: error simulado del proveedor (503)")
+
+
+class FakeGroq(CustomLLM):
+    """LLM de LlamaIndex con la latencia y los errores de Groq simulados; respuestas de plantilla."""
+
+    context_window: int = 8192
+    num_output: int = 256
+    model_name: str = "fake-llama-3.1-8b-instant"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(
+            context_window=self.context_window,
+            num_output=self.num_output,
+            model_name=self.model_name,
+        )
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        simulate_call("groq")
+        return CompletionResponse(text=random.choice(_ANSWERS))
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        response = self.complete(prompt, formatted=formatted, **kwargs)
+        yield response
+
+
+def fake_embed_model():
+    """Embeddings constantes de la misma dimensión que bge-small (384), sin modelo."""
+    from llama_index.core.embeddings import MockEmbedding
+
+    return MockEmbedding(embed_dim=384)
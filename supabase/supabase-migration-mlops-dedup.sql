@@ -0,0 +1,15 @@
+-- ============================================
+-- MIGRACIÓN: imágenes de correcciones por contenido (deduplicación)
+-- ============================================
+-- Ejecuta este script en el SQL Editor de Supabase (después de
+-- supabase-migration-mlops-corrections.sql).
+--
+-- Las imágenes nuevas se suben al bucket como "<sha256>.<ext>": varias filas pueden
+-- apuntar al mismo objeto (image_path) y cada una conserva su image_id.
+-- Las filas anteriores quedan con image_sha256 NULL y su imagen "<image_id>.<ext>".
+-- ============================================
+
+ALTER TABLE ingredient_corrections
+ADD COLUMN IF NOT EXISTS image_sha256 TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_ingredient_corrections_image_sha256 ON ingredient_corrections(image_sha256);
@@ -0,0 +1,38 @@
+-- ============================================
+-- MIGRACIÓN: orden de inserción de las correcciones (exportación incremental)
+-- ============================================
+-- Ejecuta este script en el SQL Editor de Supabase (después de
+-- supabase-migration-mlops-dedup.sql).
+--
+-- El backend guarda las correcciones en segundo plano (por lotes, con reintentos), así que
+-- una fila puede llegar mucho después de su created_at. La exportación incremental
+-- (python -m corrections.export --source supabase) avanza por inserted_seq en lugar de por
+-- created_at para no saltarse esas filas. Las filas existentes se numeran en orden de
+-- (created_at, image_id); las nuevas toman el siguiente valor de la secuencia al insertarse.
+-- ============================================
+
+ALTER TABLE ingredient_corrections
+ADD COLUMN IF NOT EXISTS inserted_seq BIGINT;
+
+UPDATE ingredient_corrections AS t
+SET inserted_seq = n.seq
+FROM (
+    SELECT image_id, ROW_NUMBER() OVER (ORDER BY created_at, image_id) AS seq
+    FROM ingredient_corrections
+    WHERE inserted_seq IS NULL
+) AS n
+WHERE t.image_id = n.image_id;
+
+CREATE SEQUENCE IF NOT EXISTS ingredient_corrections_inserted_seq
+OWNED BY ingredient_corrections.inserted_seq;
+
+SELECT setval(
+    'ingredient_corrections_inserted_seq',
+    COALESCE((SELECT MAX(inserted_seq) FROM ingredient_corrections), 0) + 1,
+    false
+);
+
+ALTER TABLE ingredient_corrections
+ALTER COLUMN inserted_seq SET DEFAULT nextval('ingredient_corrections_inserted_seq');
+
+CREATE INDEX IF NOT EXISTS idx_ingredient_corrections_inserted_seq ON ingredient_corrections(inserted_seq);